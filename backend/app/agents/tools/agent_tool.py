@@ -1,5 +1,7 @@
+import time
 from typing import Any, Callable, Generic, Literal, TypedDict, TypeVar
 
+from app.metrics import TOOL_CALL_DURATION
 from app.repositories.models.conversation import (
     ToolResultModel,
     TextToolResultModel,
@@ -10,6 +12,7 @@ from app.repositories.models.conversation import (
 )
 from app.repositories.models.custom_bot import BotModel
 from app.routes.schemas.conversation import type_model_name
+from app.tracing import current_span, traced
 from pydantic import BaseModel, JsonValue
 from mypy_boto3_bedrock_runtime.type_defs import (
     ToolSpecificationTypeDef,
@@ -80,7 +83,31 @@ class AgentTool(Generic[T]):
             inputSchema={"json": self._generate_input_schema()},
         )
 
+    @traced("tool.run")
     def run(self, tool_use_id: str, input: dict[str, JsonValue]) -> ToolRunResult:
+        current_span().set_attribute("tool", self.name)
+        start = time.perf_counter()
+        result = self._run(tool_use_id=tool_use_id, input=input)
+        TOOL_CALL_DURATION.observe(
+            time.perf_counter() - start, tool=self.name, status=result["status"]
+        )
+        return result
+
+    def cancelled(self, tool_use_id: str) -> ToolRunResult:
+        """Result of a tool use that was not run because the generation was cancelled."""
+        return ToolRunResult(
+            tool_use_id=tool_use_id,
+            status="error",
+            related_documents=[
+                _function_result_to_related_document(
+                    tool_name=self.name,
+                    res="Cancelled by the user before the tool was run.",
+                    source_id_base=tool_use_id,
+                )
+            ],
+        )
+
+    def _run(self, tool_use_id: str, input: dict[str, JsonValue]) -> ToolRunResult:
         try:
             arg = self.args_schema.model_validate(input)
             res = self.function(arg, self.bot, self.model)
@@ -0,0 +1,47 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.repositories.common import _get_table_public_client
+from app.repositories.custom_bot import (
+    find_aliases_without_original_bot_owner,
+    store_original_bot_owner,
+)
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+BACKFILL_CONCURRENCY = int(os.environ.get("BACKFILL_CONCURRENCY", 8))
+
+
+def backfill_original_bot_owners() -> int:
+    """Store `OriginalBotOwnerUserId` of the aliases stored before it was introduced.
+    Returns the number of updated items.
+    """
+    # NOTE: Resources of boto3 are not thread safe
+    local = threading.local()
+
+    def backfill(item: dict) -> bool:
+        if not hasattr(local, "table"):
+            local.table = _get_table_public_client()
+        return store_original_bot_owner(local.table, item)
+
+    updated = 0
+    table = _get_table_public_client()
+    with ThreadPoolExecutor(max_workers=BACKFILL_CONCURRENCY) as executor:
+        for items in find_aliases_without_original_bot_owner(table):
+            results = executor.map(backfill, items)
+            updated += sum(results)
+            logger.info(f"Stored original bot owners of {updated} aliases")
+    return updated
+
+
+def handler(event, context):
+    """Alias owner backfill handler.
+    This function is triggered once per deployment. The original bots of aliases without
+    `OriginalBotOwnerUserId` are queried one by one when bots are listed, so the owner
+    is stored for all of them. Aliases which already have it are skipped.
+    """
+    updated = backfill_original_bot_owners()
+    logger.info(f"Stored original bot owners of {updated} aliases in total")
@@ -0,0 +1,61 @@
+import logging
+
+from app.repositories.custom_bot import (
+    alias_sync_values,
+    public_bot_from_item,
+    sync_aliases_with_original_bot,
+)
+from boto3.dynamodb.types import TypeDeserializer
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+deserializer = TypeDeserializer()
+
+
+def _deserialize(image: dict) -> dict:
+    return {key: deserializer.deserialize(value) for key, value in image.items()}
+
+
+def _is_alias_sync_needed(record: dict) -> bool:
+    """Whether the record changes an attribute copied to aliases.
+    Other modifications, e.g. of the last used time on every chat, are skipped so that
+    aliases are not read for nothing.
+    """
+    old_image = record["dynamodb"].get("OldImage")
+    if record["eventName"] != "MODIFY" or old_image is None:
+        return True
+    if "PublicBotId" not in old_image:
+        # Just published
+        return True
+    old_bot = public_bot_from_item(_deserialize(old_image))
+    new_bot = public_bot_from_item(_deserialize(record["dynamodb"]["NewImage"]))
+    return alias_sync_values(old_bot) != alias_sync_values(new_bot)
+
+
+def handler(event, context):
+    """Alias synchronization handler.
+    This function is triggered by dynamodb stream when public bots are inserted or
+    modified. Aliases of the bots in the partitions of other users are updated to the
+    title, description, sync status, quick starters and active models of the bots, so
+    that listing bots does not need to write them.
+    """
+    # NOTE: Records of a shard are in order, so the last image of each bot is the latest
+    images: dict[str, dict] = {}
+    changed: set[str] = set()
+    for record in event["Records"]:
+        image = record["dynamodb"].get("NewImage")
+        if image is None:
+            continue
+        sk = image.get("SK", {}).get("S", "")
+        if "#BOT#" not in sk or "PublicBotId" not in image:
+            # Ignore items other than public bots
+            continue
+        images[sk] = image
+        if _is_alias_sync_needed(record):
+            changed.add(sk)
+
+    for sk in changed:
+        bot = public_bot_from_item(_deserialize(images[sk]))
+        updated = sync_aliases_with_original_bot(bot)
+        logger.info(f"Synchronized {updated} aliases of bot: {bot.id}")
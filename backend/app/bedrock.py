@@ -1,16 +1,21 @@
 import logging
 import os
-from typing import TypeGuard, Dict, Any, Optional, Tuple
+from functools import cache
+from types import MappingProxyType
+from typing import TypeGuard, Dict, Any, Mapping, NamedTuple, Optional, Tuple
 
 from app.agents.tools.agent_tool import AgentTool
 from app.config import BEDROCK_PRICING
 from app.config import DEFAULT_GENERATION_CONFIG as DEFAULT_CLAUDE_GENERATION_CONFIG
-from app.config import DEFAULT_MISTRAL_GENERATION_CONFIG
+from app.config import DEFAULT_MISTRAL_GENERATION_CONFIG, DEFAULT_PROMPT_CACHING_CONFIG
 from app.repositories.models.conversation import (
     SimpleMessageModel,
     ContentModel,
 )
-from app.repositories.models.custom_bot import GenerationParamsModel
+from app.repositories.models.custom_bot import (
+    GenerationParamsModel,
+    PromptCachingModel,
+)
 from app.repositories.models.custom_bot_guardrails import BedrockGuardrailsModel
 from app.routes.schemas.conversation import type_model_name
 from app.utils import get_bedrock_runtime_client
@@ -41,6 +46,85 @@ ENABLE_BEDROCK_CROSS_REGION_INFERENCE = (
 
 client = get_bedrock_runtime_client()
 
+# Ref: https://docs.aws.amazon.com/bedrock/latest/userguide/model-ids-arns.html
+BASE_MODEL_IDS: Mapping[str, str] = MappingProxyType(
+    {
+        "claude-v2": "anthropic.claude-v2:1",
+        "claude-instant-v1": "anthropic.claude-instant-v1",
+        "claude-v3-sonnet": "anthropic.claude-3-sonnet-20240229-v1:0",
+        "claude-v3-haiku": "anthropic.claude-3-haiku-20240307-v1:0",
+        "claude-v3-opus": "anthropic.claude-3-opus-20240229-v1:0",
+        "claude-v3.5-sonnet": "anthropic.claude-3-5-sonnet-20240620-v1:0",
+        "claude-v3.5-sonnet-v2": "anthropic.claude-3-5-sonnet-20241022-v2:0",
+        "claude-v3.5-haiku": "anthropic.claude-3-5-haiku-20241022-v1:0",
+        "mistral-7b-instruct": "mistral.mistral-7b-instruct-v0:2",
+        "mixtral-8x7b-instruct": "mistral.mixtral-8x7b-instruct-v0:1",
+        "mistral-large": "mistral.mistral-large-2402-v1:0",
+        # New Amazon Nova models
+        "amazon-nova-pro": "amazon.nova-pro-v1:0",
+        "amazon-nova-lite": "amazon.nova-lite-v1:0",
+        "amazon-nova-micro": "amazon.nova-micro-v1:0",
+    }
+)
+
+# Ref: https://docs.aws.amazon.com/bedrock/latest/userguide/cross-region-inference-support.html
+CROSS_REGION_INFERENCE_MODELS = frozenset(
+    {
+        "claude-v3-sonnet",
+        "claude-v3-haiku",
+        "claude-v3-opus",
+        "claude-v3.5-sonnet",
+        "claude-v3.5-sonnet-v2",
+        "claude-v3.5-haiku",
+        "amazon-nova-pro",
+        "amazon-nova-lite",
+        "amazon-nova-micro",
+    }
+)
+
+CROSS_REGION_PREFIXES: Mapping[str, str] = MappingProxyType(
+    {
+        "us-east-1": "us",
+        "us-west-2": "us",
+        "eu-west-1": "eu",
+        "eu-central-1": "eu",
+        "eu-west-3": "eu",
+    }
+)
+
+
+class ModelPricing(NamedTuple):
+    """Prices in USD per 1,000 tokens."""
+
+    input: float
+    output: float
+    cache_read: float
+    cache_write: float
+
+
+@cache
+def get_pricing_table(region: str = BEDROCK_REGION) -> Mapping[str, ModelPricing]:
+    """Resolve `BEDROCK_PRICING` for the region into an immutable table.
+    Prices missing in the region fall back to `default`, and prompt caching prices fall back to the input price.
+    The table is built once per region.
+    """
+    regional_pricing = BEDROCK_PRICING.get(region, {})
+    table: dict[str, ModelPricing] = {}
+    for model, default_pricing in BEDROCK_PRICING["default"].items():
+        pricing = {**default_pricing, **regional_pricing.get(model, {})}
+        table[model] = ModelPricing(
+            input=pricing["input"],
+            output=pricing["output"],
+            cache_read=pricing.get("cache_read", pricing["input"]),
+            cache_write=pricing.get("cache_write", pricing["input"]),
+        )
+
+    return MappingProxyType(table)
+
+
+# Build the table for the configured region at startup
+get_pricing_table(BEDROCK_REGION)
+
 
 def _is_conversation_role(role: str) -> TypeGuard[ConversationRoleType]:
     return role in ["user", "assistant"]
@@ -51,6 +135,25 @@ def _is_nova_model(model: type_model_name) -> bool:
     return model in ["amazon-nova-pro", "amazon-nova-lite", "amazon-nova-micro"]
 
 
+def _is_prompt_caching_supported(model: type_model_name) -> bool:
+    """Check if the model supports prompt caching.
+    Ref: https://docs.aws.amazon.com/bedrock/latest/userguide/prompt-caching.html
+    """
+    return model in [
+        "claude-v3.5-haiku",
+        "amazon-nova-pro",
+        "amazon-nova-lite",
+        "amazon-nova-micro",
+    ]
+
+
+def _is_tool_caching_supported(model: type_model_name) -> bool:
+    """Check if the model supports cache points in `toolConfig`.
+    Amazon Nova models accept cache points only in `system` and `messages`.
+    """
+    return _is_prompt_caching_supported(model) and not _is_nova_model(model)
+
+
 def _prepare_nova_model_params(
     model: type_model_name, generation_params: Optional[GenerationParamsModel] = None
 ) -> Tuple[InferenceConfigurationTypeDef, Dict[str, Any]]:
@@ -96,6 +199,7 @@ def compose_args_for_converse_api(
     guardrail: BedrockGuardrailsModel | None = None,
     grounding_source: GuardrailConverseContentBlockTypeDef | None = None,
     tools: dict[str, AgentTool] | None = None,
+    prompt_caching: PromptCachingModel | None = None,
     stream: bool = True,
 ) -> ConverseStreamRequestRequestTypeDef:
     def process_content(c: ContentModel, role: str) -> list[ContentBlockTypeDef]:
@@ -117,18 +221,23 @@ def compose_args_for_converse_api(
 
         return c.to_contents_for_converse()
 
-    arg_messages: list[MessageTypeDef] = [
-        {
-            "role": message.role,
-            "content": [
-                block
-                for c in message.content
-                for block in process_content(c, message.role)
-            ],
-        }
-        for message in messages
-        if _is_conversation_role(message.role)
-    ]
+    arg_messages: list[MessageTypeDef] = []
+    for message in messages:
+        if not _is_conversation_role(message.role):
+            continue
+
+        content = [
+            block for c in message.content for block in process_content(c, message.role)
+        ]
+        if len(content) == 0:
+            # NOTE: Answers cancelled after tool use, before any text, have no content
+            continue
+
+        if len(arg_messages) > 0 and arg_messages[-1]["role"] == message.role:
+            # Roles must alternate, so the contents are merged into the previous message
+            arg_messages[-1]["content"] = [*arg_messages[-1]["content"], *content]
+        else:
+            arg_messages.append({"role": message.role, "content": content})
 
     # Prepare model-specific parameters
     if _is_nova_model(model):
@@ -202,9 +311,53 @@ def compose_args_for_converse_api(
             ],
         }
 
+    if _is_prompt_caching_supported(model):
+        _insert_cache_points(
+            args=args,
+            model=model,
+            prompt_caching=(
+                prompt_caching
+                if prompt_caching is not None
+                else PromptCachingModel(**DEFAULT_PROMPT_CACHING_CONFIG)
+            ),
+        )
+
     return args
 
 
+def _insert_cache_points(
+    args: ConverseStreamRequestRequestTypeDef,
+    model: type_model_name,
+    prompt_caching: PromptCachingModel,
+):
+    """Insert cache points into the arguments for Converse API.
+    The prefix up to each cache point is cached, so cache points are placed after the parts
+    which are resent identically on every turn.
+    NOTE: The stubs of `mypy_boto3_bedrock_runtime` do not know `cachePoint` yet.
+    """
+    if prompt_caching.cache_tools and "toolConfig" in args:
+        if _is_tool_caching_supported(model):
+            args["toolConfig"]["tools"].append(  # type: ignore[attr-defined]
+                {"cachePoint": {"type": "default"}}  # type: ignore[typeddict-item]
+            )
+
+    if prompt_caching.cache_system and len(args["system"]) > 0:
+        args["system"].append(  # type: ignore[attr-defined]
+            {"cachePoint": {"type": "default"}}  # type: ignore[typeddict-unknown-key]
+        )
+
+    if prompt_caching.cache_messages:
+        # Mark the last two user messages.
+        # The former hits the cache written by the previous turn and the latter writes a new one.
+        user_messages = [
+            message for message in args["messages"] if message["role"] == "user"
+        ]
+        for message in user_messages[-2:]:
+            message["content"].append(  # type: ignore[attr-defined]
+                {"cachePoint": {"type": "default"}}  # type: ignore[typeddict-unknown-key]
+            )
+
+
 def call_converse_api(
     args: ConverseStreamRequestRequestTypeDef,
 ) -> ConverseResponseTypeDef:
@@ -217,74 +370,38 @@ def calculate_price(
     model: type_model_name,
     input_tokens: int,
     output_tokens: int,
+    cache_read_input_tokens: int = 0,
+    cache_write_input_tokens: int = 0,
     region: str = BEDROCK_REGION,
 ) -> float:
-    input_price = (
-        BEDROCK_PRICING.get(region, {})
-        .get(model, {})
-        .get("input", BEDROCK_PRICING["default"][model]["input"])
-    )
-    output_price = (
-        BEDROCK_PRICING.get(region, {})
-        .get(model, {})
-        .get("output", BEDROCK_PRICING["default"][model]["output"])
-    )
+    """Calculate the price of a model invocation.
+    NOTE: Cross-region inference is charged at the price of the source region,
+    so `region` is always the region the request is sent to, regardless of the inference profile.
+    """
+    pricing = get_pricing_table(region)[model]
 
-    return input_price * input_tokens / 1000.0 + output_price * output_tokens / 1000.0
+    return (
+        pricing.input * input_tokens / 1000.0
+        + pricing.output * output_tokens / 1000.0
+        + pricing.cache_read * cache_read_input_tokens / 1000.0
+        + pricing.cache_write * cache_write_input_tokens / 1000.0
+    )
 
 
+@cache
 def get_model_id(
     model: type_model_name,
     enable_cross_region: bool = ENABLE_BEDROCK_CROSS_REGION_INFERENCE,
     bedrock_region: str = BEDROCK_REGION,
 ) -> str:
-    # Ref: https://docs.aws.amazon.com/bedrock/latest/userguide/model-ids-arns.html
-    base_model_ids = {
-        "claude-v2": "anthropic.claude-v2:1",
-        "claude-instant-v1": "anthropic.claude-instant-v1",
-        "claude-v3-sonnet": "anthropic.claude-3-sonnet-20240229-v1:0",
-        "claude-v3-haiku": "anthropic.claude-3-haiku-20240307-v1:0",
-        "claude-v3-opus": "anthropic.claude-3-opus-20240229-v1:0",
-        "claude-v3.5-sonnet": "anthropic.claude-3-5-sonnet-20240620-v1:0",
-        "claude-v3.5-sonnet-v2": "anthropic.claude-3-5-sonnet-20241022-v2:0",
-        "claude-v3.5-haiku": "anthropic.claude-3-5-haiku-20241022-v1:0",
-        "mistral-7b-instruct": "mistral.mistral-7b-instruct-v0:2",
-        "mixtral-8x7b-instruct": "mistral.mixtral-8x7b-instruct-v0:1",
-        "mistral-large": "mistral.mistral-large-2402-v1:0",
-        # New Amazon Nova models
-        "amazon-nova-pro": "amazon.nova-pro-v1:0",
-        "amazon-nova-lite": "amazon.nova-lite-v1:0",
-        "amazon-nova-micro": "amazon.nova-micro-v1:0",
-    }
-
-    # Ref: https://docs.aws.amazon.com/bedrock/latest/userguide/cross-region-inference-support.html
-    cross_region_inference_models = {
-        "claude-v3-sonnet",
-        "claude-v3-haiku",
-        "claude-v3-opus",
-        "claude-v3.5-sonnet",
-        "claude-v3.5-sonnet-v2",
-        "claude-v3.5-haiku",
-        "amazon-nova-pro",
-        "amazon-nova-lite",
-        "amazon-nova-micro",
-    }
-
-    supported_region_prefixes = {
-        "us-east-1": "us",
-        "us-west-2": "us",
-        "eu-west-1": "eu",
-        "eu-central-1": "eu",
-        "eu-west-3": "eu",
-    }
-
-    base_model_id = base_model_ids.get(model)
+    # NOTE: Results are memoized, so the model ID is resolved (and logged) once per arguments.
+    base_model_id = BASE_MODEL_IDS.get(model)
     if not base_model_id:
         raise ValueError(f"Unsupported model: {model}")
 
     model_id = base_model_id
-    if enable_cross_region and model in cross_region_inference_models:
-        region_prefix = supported_region_prefixes.get(bedrock_region)
+    if enable_cross_region and model in CROSS_REGION_INFERENCE_MODELS:
+        region_prefix = CROSS_REGION_PREFIXES.get(bedrock_region)
         if region_prefix:
             model_id = f"{region_prefix}.{base_model_id}"
             logger.info(
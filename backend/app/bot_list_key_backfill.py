@@ -0,0 +1,44 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.repositories.common import _get_table_public_client
+from app.repositories.custom_bot import find_bots_without_list_key, store_bot_list_key
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+BACKFILL_CONCURRENCY = int(os.environ.get("BACKFILL_CONCURRENCY", 8))
+
+
+def backfill_bot_list_keys() -> int:
+    """Store `BotListKey` of the bots and aliases stored before it was introduced.
+    Returns the number of updated items.
+    """
+    # NOTE: Resources of boto3 are not thread safe
+    local = threading.local()
+
+    def backfill(item: dict) -> bool:
+        if not hasattr(local, "table"):
+            local.table = _get_table_public_client()
+        return store_bot_list_key(local.table, item)
+
+    updated = 0
+    table = _get_table_public_client()
+    with ThreadPoolExecutor(max_workers=BACKFILL_CONCURRENCY) as executor:
+        for items in find_bots_without_list_key(table):
+            results = executor.map(backfill, items)
+            updated += sum(results)
+            logger.info(f"Stored list keys of {updated} bots")
+    return updated
+
+
+def handler(event, context):
+    """Bot list key backfill handler.
+    This function is triggered once per deployment. Bots and aliases without
+    `BotListKey` are not listed by `BotListKeyIndex` until they are used again, so the
+    key is stored for all of them. Items which already have the key are skipped.
+    """
+    updated = backfill_bot_list_keys()
+    logger.info(f"Stored list keys of {updated} bots in total")
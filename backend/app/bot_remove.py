@@ -9,6 +9,8 @@ from app.repositories.api_publication import (
     find_usage_plan_by_id,
 )
 from app.repositories.common import RecordNotFoundError, decompose_bot_id
+from app.repositories.custom_bot import delete_aliases_by_original_bot_id
+from botocore.exceptions import ClientError
 
 DOCUMENT_BUCKET = os.environ.get("DOCUMENT_BUCKET", "documents")
 BEDROCK_REGION = os.environ.get("BEDROCK_REGION", "us-east-1")
@@ -49,6 +51,22 @@ def delete_from_s3(user_id: str, bot_id: str):
         print(e)
 
 
+def delete_aliases(bot_id: str):
+    """Delete the aliases of the bot of other users.
+    Skipped until `OriginalBotIdIndex` is created by the staged index migration, so that
+    the other resources are still deleted. The aliases are then listed as unavailable.
+    """
+    try:
+        progress = delete_aliases_by_original_bot_id(bot_id)
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ValidationException":
+            raise
+        print(f"Skipping deletion of aliases of bot_id: {bot_id}")
+        print(e)
+        return
+    print(f"Deleted {progress.deleted_items} aliases of bot_id: {bot_id}")
+
+
 def handler(event, context):
     """Bot removal handler.
     This function is triggered by dynamodb stream when item is deleted.
@@ -56,6 +74,7 @@ def handler(event, context):
     - vector store record (postgres)
     - s3 files
     - cloudformation stack (if exists)
+    - aliases of the bot of other users
     """
 
     print(f"Received event: {event}")
@@ -75,6 +94,7 @@ def handler(event, context):
 
     delete_from_s3(user_id, bot_id)
     delete_custom_bot_stack_by_bot_id(bot_id)
+    delete_aliases(bot_id)
 
     # Check if api published stack exists
     try:
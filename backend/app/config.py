@@ -9,6 +9,12 @@ class GenerationParams(TypedDict):
     stop_sequences: list[str]
 
 
+class PromptCachingConfig(TypedDict):
+    cache_system: bool
+    cache_messages: bool
+    cache_tools: bool
+
+
 class EmbeddingConfig(TypedDict):
     model_id: str
     chunk_size: int
@@ -36,9 +42,18 @@ DEFAULT_MISTRAL_GENERATION_CONFIG: GenerationParams = {
     "stop_sequences": ["[INST]", "[/INST]"],
 }
 
+# Configure where cache points are inserted for models supporting prompt caching.
+# Bots can override this policy individually.
+# See: https://docs.aws.amazon.com/bedrock/latest/userguide/prompt-caching.html
+DEFAULT_PROMPT_CACHING_CONFIG: PromptCachingConfig = {
+    "cache_system": True,
+    "cache_messages": True,
+    "cache_tools": True,
+}
 
 # Used for price estimation.
 # NOTE: The following is based on 2024-03-07
+# `cache_read` and `cache_write` are prices for prompt caching. If omitted, `input` is used.
 # See: https://aws.amazon.com/bedrock/pricing/
 BEDROCK_PRICING = {
     "us-east-1": {
@@ -51,16 +66,36 @@ BEDROCK_PRICING = {
             "output": 0.00240,
         },
         "claude-v3-haiku": {"input": 0.00025, "output": 0.00125},
-        "claude-v3.5-haiku": {"input": 0.001, "output": 0.005},
+        "claude-v3.5-haiku": {
+            "input": 0.001,
+            "output": 0.005,
+            "cache_read": 0.0001,
+            "cache_write": 0.00125,
+        },
         "claude-v3-sonnet": {"input": 0.00300, "output": 0.01500},
         "claude-v3.5-sonnet": {"input": 0.00300, "output": 0.01500},
         "claude-v3.5-sonnet-v2": {"input": 0.00300, "output": 0.01500},
         "mistral-7b-instruct": {"input": 0.00015, "output": 0.0002},
         "mixtral-8x7b-instruct": {"input": 0.00045, "output": 0.0007},
         "mistral-large": {"input": 0.008, "output": 0.024},
-        "amazon-nova-pro": {"input": 0.0008, "output": 0.0032},
-        "amazon-nova-lite": {"input": 0.00006, "output": 0.00024},
-        "amazon-nova-micro": {"input": 0.000035, "output": 0.00014},
+        "amazon-nova-pro": {
+            "input": 0.0008,
+            "output": 0.0032,
+            "cache_read": 0.0002,
+            "cache_write": 0.0008,
+        },
+        "amazon-nova-lite": {
+            "input": 0.00006,
+            "output": 0.00024,
+            "cache_read": 0.000015,
+            "cache_write": 0.00006,
+        },
+        "amazon-nova-micro": {
+            "input": 0.000035,
+            "output": 0.00014,
+            "cache_read": 0.00000875,
+            "cache_write": 0.000035,
+        },
     },
     "us-west-2": {
         "claude-instant-v1": {
@@ -76,9 +111,24 @@ BEDROCK_PRICING = {
         "mistral-7b-instruct": {"input": 0.00015, "output": 0.0002},
         "mixtral-8x7b-instruct": {"input": 0.00045, "output": 0.0007},
         "mistral-large": {"input": 0.008, "output": 0.024},
-        "amazon-nova-pro": {"input": 0.0008, "output": 0.0032},
-        "amazon-nova-lite": {"input": 0.00006, "output": 0.00024},
-        "amazon-nova-micro": {"input": 0.000035, "output": 0.00014},
+        "amazon-nova-pro": {
+            "input": 0.0008,
+            "output": 0.0032,
+            "cache_read": 0.0002,
+            "cache_write": 0.0008,
+        },
+        "amazon-nova-lite": {
+            "input": 0.00006,
+            "output": 0.00024,
+            "cache_read": 0.000015,
+            "cache_write": 0.00006,
+        },
+        "amazon-nova-micro": {
+            "input": 0.000035,
+            "output": 0.00014,
+            "cache_read": 0.00000875,
+            "cache_write": 0.000035,
+        },
     },
     "ap-northeast-1": {
         "claude-instant-v1": {
@@ -100,7 +150,12 @@ BEDROCK_PRICING = {
             "output": 0.00240,
         },
         "claude-v3-haiku": {"input": 0.00025, "output": 0.00125},
-        "claude-v3.5-haiku": {"input": 0.001, "output": 0.005},
+        "claude-v3.5-haiku": {
+            "input": 0.001,
+            "output": 0.005,
+            "cache_read": 0.0001,
+            "cache_write": 0.00125,
+        },
         "claude-v3-sonnet": {"input": 0.00300, "output": 0.01500},
         "claude-v3.5-sonnet": {"input": 0.00300, "output": 0.01500},
         "claude-v3.5-sonnet-v2": {"input": 0.00300, "output": 0.01500},
@@ -108,8 +163,23 @@ BEDROCK_PRICING = {
         "mistral-7b-instruct": {"input": 0.00015, "output": 0.0002},
         "mixtral-8x7b-instruct": {"input": 0.00045, "output": 0.0007},
         "mistral-large": {"input": 0.008, "output": 0.024},
-        "amazon-nova-pro": {"input": 0.0008, "output": 0.0032},
-        "amazon-nova-lite": {"input": 0.00006, "output": 0.00024},
-        "amazon-nova-micro": {"input": 0.000035, "output": 0.00014},
+        "amazon-nova-pro": {
+            "input": 0.0008,
+            "output": 0.0032,
+            "cache_read": 0.0002,
+            "cache_write": 0.0008,
+        },
+        "amazon-nova-lite": {
+            "input": 0.00006,
+            "output": 0.00024,
+            "cache_read": 0.000015,
+            "cache_write": 0.00006,
+        },
+        "amazon-nova-micro": {
+            "input": 0.000035,
+            "output": 0.00014,
+            "cache_read": 0.00000875,
+            "cache_write": 0.000035,
+        },
     },
 }
@@ -0,0 +1,56 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.repositories.common import _get_table_public_client
+from app.repositories.conversation import (
+    archive_conversation,
+    find_inactive_conversation_keys,
+)
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Days without messages until conversations are archived. Disabled if not set.
+CONVERSATION_ARCHIVE_AFTER_DAYS = os.environ.get("CONVERSATION_ARCHIVE_AFTER_DAYS")
+ARCHIVE_CONCURRENCY = int(os.environ.get("ARCHIVE_CONCURRENCY", 8))
+
+
+def archive_inactive_conversations(after_days: float) -> int:
+    """Archive the conversations without messages for `after_days`.
+    Returns the number of archived conversations.
+    """
+    inactive_since = time.time() - after_days * 24 * 60 * 60
+    # NOTE: Resources of boto3 are not thread safe
+    local = threading.local()
+
+    def archive(key: dict) -> bool:
+        if not hasattr(local, "table"):
+            local.table = _get_table_public_client()
+        return archive_conversation(local.table, key)
+
+    archived = 0
+    table = _get_table_public_client()
+    with ThreadPoolExecutor(max_workers=ARCHIVE_CONCURRENCY) as executor:
+        for keys in find_inactive_conversation_keys(table, inactive_since):
+            results = executor.map(archive, keys)
+            archived += sum(results)
+            logger.info(f"Archived {archived} conversations")
+    return archived
+
+
+def handler(event, context):
+    """Conversation archival handler.
+    This function is triggered by a schedule. Conversations inactive for
+    `CONVERSATION_ARCHIVE_AFTER_DAYS` are moved to the archive in the large message bucket,
+    and only the attributes for listing are kept in the table.
+    Archived conversations are expired by DynamoDB TTL if `CONVERSATION_ARCHIVE_TTL_DAYS` is set.
+    """
+    if CONVERSATION_ARCHIVE_AFTER_DAYS is None:
+        logger.info("CONVERSATION_ARCHIVE_AFTER_DAYS is not set. Skipping.")
+        return
+
+    archived = archive_inactive_conversations(float(CONVERSATION_ARCHIVE_AFTER_DAYS))
+    logger.info(f"Archived {archived} conversations in total")
@@ -0,0 +1,102 @@
+import json
+import logging
+import os
+
+import boto3
+from app.repositories.bulk_delete import BulkDeleteProgress
+from app.repositories.common import RecordNotFoundError, ResourceConflictError
+from app.repositories.conversation import (
+    delete_conversation_by_user_id,
+    find_conversation_deletion_by_user_id,
+    store_conversation_deletion,
+)
+from app.repositories.models.conversation import ConversationDeletionModel
+from app.routes.schemas.conversation import type_conversation_deletion_status
+from app.utils import get_current_time
+from fastapi import BackgroundTasks
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+sqs_client = boto3.client("sqs")
+# Queue of the deletions, consumed by `handler`. Deleted in the background of the request if not set.
+CONVERSATION_DELETION_QUEUE_URL = os.environ.get("CONVERSATION_DELETION_QUEUE_URL", "")
+# A deletion without progress for this long is considered stopped, and can be started again
+CONVERSATION_DELETION_TIMEOUT_MS = 20 * 60 * 1000
+
+
+def start_conversation_deletion(
+    user_id: str, background_tasks: BackgroundTasks
+) -> ConversationDeletionModel:
+    """Queue the deletion of all conversations of the user.
+    Raises `ResourceConflictError` while another deletion is in progress.
+    """
+    try:
+        current = find_conversation_deletion_by_user_id(user_id)
+        if (
+            current.status in ("QUEUED", "RUNNING")
+            and get_current_time() - current.update_time
+            < CONVERSATION_DELETION_TIMEOUT_MS
+        ):
+            raise ResourceConflictError(
+                f"Deletion of all conversations is in progress for user: {user_id}"
+            )
+
+    except RecordNotFoundError:
+        pass
+
+    deletion = ConversationDeletionModel(
+        status="QUEUED", progress=BulkDeleteProgress(), update_time=get_current_time()
+    )
+    store_conversation_deletion(user_id, deletion)
+
+    if CONVERSATION_DELETION_QUEUE_URL:
+        sqs_client.send_message(
+            QueueUrl=CONVERSATION_DELETION_QUEUE_URL,
+            MessageBody=json.dumps({"user_id": user_id}),
+        )
+
+    else:
+        background_tasks.add_task(run_conversation_deletion, user_id)
+
+    return deletion
+
+
+def run_conversation_deletion(user_id: str):
+    """Delete all conversations of the user, storing the progress after each page."""
+
+    def store(status: type_conversation_deletion_status, progress: BulkDeleteProgress):
+        store_conversation_deletion(
+            user_id,
+            ConversationDeletionModel(
+                status=status, progress=progress, update_time=get_current_time()
+            ),
+        )
+
+    def store_progress(progress: BulkDeleteProgress):
+        logger.info(f"Deleting all conversations of user {user_id}: {progress}")
+        store("RUNNING", progress)
+
+    store_progress(BulkDeleteProgress())
+    try:
+        progress = delete_conversation_by_user_id(user_id, on_progress=store_progress)
+
+    except Exception:
+        logger.exception(f"Failed to delete all conversations of user {user_id}")
+        store("FAILED", find_conversation_deletion_by_user_id(user_id).progress)
+        raise
+
+    # NOTE: Items whose objects could not be deleted are kept, and deleted by the next deletion
+    failed = progress.failed_items > 0 or progress.failed_objects > 0
+    store("FAILED" if failed else "SUCCEEDED", progress)
+    logger.info(f"Deleted all conversations of user {user_id}: {progress}")
+
+
+def handler(event, context):
+    """Conversation deletion handler.
+    This function is triggered by the SQS queue of `DELETE /conversations`.
+    A failed deletion is retried by SQS, and the retry deletes what is left.
+    """
+    for record in event["Records"]:
+        message_body = json.loads(record["body"])
+        run_conversation_deletion(message_body["user_id"])
@@ -0,0 +1,48 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.repositories.common import _get_table_public_client
+from app.repositories.conversation import (
+    find_conversations_without_last_message_time,
+    store_last_message_time,
+)
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+BACKFILL_CONCURRENCY = int(os.environ.get("BACKFILL_CONCURRENCY", 8))
+
+
+def backfill_last_message_times() -> int:
+    """Store `LastMessageTime` of the conversations stored before it was introduced.
+    Returns the number of updated items.
+    """
+    # NOTE: Resources of boto3 are not thread safe
+    local = threading.local()
+
+    def backfill(item: dict) -> bool:
+        if not hasattr(local, "table"):
+            local.table = _get_table_public_client()
+        return store_last_message_time(local.table, item)
+
+    updated = 0
+    table = _get_table_public_client()
+    with ThreadPoolExecutor(max_workers=BACKFILL_CONCURRENCY) as executor:
+        for items in find_conversations_without_last_message_time(table):
+            results = executor.map(backfill, items)
+            updated += sum(results)
+            logger.info(f"Stored last message times of {updated} conversations")
+    return updated
+
+
+def handler(event, context):
+    """Last message time backfill handler.
+    This function is triggered once per deployment. Conversations without
+    `LastMessageTime` are neither listed by `LastMessageTimeIndex` nor archived until
+    they are written again, so the time is stored for all of them.
+    Items which already have it are skipped.
+    """
+    updated = backfill_last_message_times()
+    logger.info(f"Stored last message times of {updated} conversations in total")
@@ -0,0 +1,177 @@
+"""Log formatting for payloads on hot paths.
+
+Payloads (requests to Bedrock, conversations, bots, events) can contain base64 images,
+documents and credentials. `log_payload` formats them only when the record is emitted,
+replaces binary values and secrets with placeholders, truncates long strings and collections,
+caps the total length, and can sample the records.
+"""
+
+import logging
+import os
+import random
+from collections.abc import Mapping
+from typing import Any
+
+from pydantic import BaseModel
+
+LOG_PAYLOAD_MAX_LENGTH = int(os.environ.get("LOG_PAYLOAD_MAX_LENGTH", "2000"))
+# Ratio of payload logs to emit, between 0 and 1
+LOG_PAYLOAD_SAMPLE_RATE = float(os.environ.get("LOG_PAYLOAD_SAMPLE_RATE", "1.0"))
+
+MAX_STRING_LENGTH = 200
+MAX_ITEMS = 20
+MAX_DEPTH = 10
+
+# Compared after lower-casing and replacing `-` with `_`
+REDACTED_KEYS = frozenset(
+    {
+        "authorization",
+        "cookie",
+        "token",
+        "id_token",
+        "access_token",
+        "refresh_token",
+        "password",
+        "secret",
+        "api_key",
+        "x_api_key",
+        "aws_secret_access_key",
+        "secret_access_key",
+        "session_token",
+    }
+)
+
+
+class _Writer:
+    def __init__(self, max_length: int):
+        self.parts: list[str] = []
+        self.remaining = max_length
+
+    @property
+    def full(self) -> bool:
+        return self.remaining <= 0
+
+    def write(self, text: str):
+        self.parts.append(text)
+        self.remaining -= len(text)
+
+
+def _is_redacted(key: Any) -> bool:
+    return str(key).lower().replace("-", "_") in REDACTED_KEYS
+
+
+def _write_items(writer: _Writer, items, depth: int, total: int, mapping: bool):
+    for i, item in enumerate(items):
+        if writer.full:
+            return
+        if i >= MAX_ITEMS:
+            writer.write(f", ...<{total - MAX_ITEMS} more>")
+            return
+        if i > 0:
+            writer.write(", ")
+        if mapping:
+            key, value = item
+            writer.write(f"{key!r}: ")
+            if _is_redacted(key):
+                writer.write("'***'")
+            else:
+                _write_value(writer, value, depth + 1)
+        else:
+            _write_value(writer, item, depth + 1)
+
+
+def _write_value(writer: _Writer, value: Any, depth: int):
+    if writer.full:
+        return
+
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        writer.write(f"<{len(value)} bytes>")
+
+    elif isinstance(value, str):
+        if len(value) > MAX_STRING_LENGTH:
+            writer.write(
+                repr(value[:MAX_STRING_LENGTH])
+                + f"...<{len(value) - MAX_STRING_LENGTH} more chars>"
+            )
+        else:
+            writer.write(repr(value))
+
+    elif depth >= MAX_DEPTH:
+        writer.write("...")
+
+    elif isinstance(value, BaseModel):
+        # NOTE: Read fields directly instead of `model_dump`, which copies the whole model
+        fields = type(value).model_fields
+        writer.write(f"{type(value).__name__}(")
+        for i, name in enumerate(fields):
+            if writer.full:
+                break
+            if i > 0:
+                writer.write(", ")
+            writer.write(f"{name}=")
+            if _is_redacted(name):
+                writer.write("'***'")
+            else:
+                _write_value(writer, getattr(value, name, None), depth + 1)
+        writer.write(")")
+
+    elif isinstance(value, Mapping):
+        writer.write("{")
+        _write_items(writer, value.items(), depth, len(value), mapping=True)
+        writer.write("}")
+
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        writer.write("[")
+        _write_items(writer, value, depth, len(value), mapping=False)
+        writer.write("]")
+
+    else:
+        text = repr(value)
+        if len(text) > MAX_STRING_LENGTH:
+            text = text[:MAX_STRING_LENGTH] + "..."
+        writer.write(text)
+
+
+def format_payload(value: Any, max_length: int = LOG_PAYLOAD_MAX_LENGTH) -> str:
+    """Format the value for logs. Binary values and secrets are replaced with placeholders,
+    and the result is truncated to about `max_length` characters.
+    """
+    writer = _Writer(max_length)
+    _write_value(writer, value, depth=0)
+    text = "".join(writer.parts)
+    if len(text) > max_length:
+        return text[:max_length] + "...<truncated>"
+    return text
+
+
+class LogPayload:
+    """Formatted by `format_payload` only when the log record is emitted.
+    Usage:
+        logger.info("Request: %s", LogPayload(request))
+    """
+
+    __slots__ = ("value", "max_length")
+
+    def __init__(self, value: Any, max_length: int = LOG_PAYLOAD_MAX_LENGTH):
+        self.value = value
+        self.max_length = max_length
+
+    def __str__(self) -> str:
+        return format_payload(self.value, self.max_length)
+
+
+def log_payload(
+    logger: logging.Logger,
+    message: str,
+    payload: Any,
+    level: int = logging.INFO,
+    sample_rate: float = LOG_PAYLOAD_SAMPLE_RATE,
+):
+    """Log `message % payload` lazily, keeping only `sample_rate` of the records.
+    `message` must contain a single `%s`.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    if sample_rate < 1.0 and random.random() >= sample_rate:
+        return
+    logger.log(level, message, LogPayload(payload), stacklevel=2)
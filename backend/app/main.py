@@ -3,8 +3,14 @@ import os
 import traceback
 from typing import Callable
 
-from app.dependencies import get_current_user
+from app.metrics import EmfExporter, generate_latest
+from app.middlewares import (
+    CurrentUserMiddleware,
+    RequestLoggingMiddleware,
+    RequestMetricsMiddleware,
+)
 from app.repositories.common import (
+    NEXT_TOKEN_HEADER,
     RecordAccessNotAllowedError,
     RecordNotFoundError,
     ResourceConflictError,
@@ -14,16 +20,14 @@ from app.routes.api_publication import router as api_publication_router
 from app.routes.bot import router as bot_router
 from app.routes.conversation import router as conversation_router
 from app.routes.published_api import router as published_api_router
-from app.user import User
 from app.utils import is_running_on_lambda
 from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from fastapi.security import HTTPAuthorizationCredentials
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import ValidationError
 from starlette.requests import Request
 from starlette.responses import Response
-from starlette.types import ASGIApp, Message
+from starlette.types import Message
 
 CORS_ALLOW_ORIGINS = os.environ.get("CORS_ALLOW_ORIGINS", "*")
 PUBLISHED_API_ID = os.environ.get("PUBLISHED_API_ID", None)
@@ -61,12 +65,24 @@ else:
     app.include_router(published_api_router)
 
 
+if not is_published_api and not is_running_on_lambda():
+    # NOTE: `/metrics` is not authenticated, so it is served only for local runs.
+    # On Lambda, metrics are written as EMF logs instead.
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        """Metrics in the Prometheus text format."""
+        return PlainTextResponse(
+            generate_latest(), media_type="text/plain; version=0.0.4; charset=utf-8"
+        )
+
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=CORS_ALLOW_ORIGINS.split(","),
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_TOKEN_HEADER],
 )
 
 
@@ -91,47 +107,11 @@ app.add_exception_handler(ResourceConflictError, error_handler_factory(409))
 app.add_exception_handler(Exception, error_handler_factory(500))
 
 
-@app.middleware("http")
-def add_current_user_to_request(request: Request, call_next: ASGIApp):
-    if is_running_on_lambda():
-        if not is_published_api:
-            authorization = request.headers.get("Authorization")
-            if authorization:
-                token_str = authorization.split(" ")[1]
-                token = HTTPAuthorizationCredentials(
-                    scheme="Bearer", credentials=token_str
-                )
-                request.state.current_user = get_current_user(token)
-        else:
-            request.state.current_user = User(
-                id=f"PUBLISHED_API#{PUBLISHED_API_ID}",
-                name=PUBLISHED_API_ID,  # type: ignore
-                groups=[],
-            )
-    else:
-        authorization = request.headers.get("Authorization")
-        if authorization:
-            token_str = authorization.split(" ")[1]
-            token = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token_str)
-            request.state.current_user = get_current_user(token)
-        else:
-            request.state.current_user = User(
-                id="test_user", name="test_user", groups=[]
-            )
-
-    response = call_next(request)  # type: ignore
-    return response
-
-
-@app.middleware("http")
-async def add_log_requests(request: Request, call_next: ASGIApp):
-    logger.info(f"Request path: {request.url.path}")
-    logger.info(f"Request method: {request.method}")
-    logger.info(f"Request headers: {request.headers}")
-
-    body = await request.body()
-    logger.info(f"Request body: {body.decode('utf-8')[:100]}...")
-
-    response = await call_next(request)  # type: ignore
-
-    return response
+# NOTE: The last added middleware is the outermost
+app.add_middleware(CurrentUserMiddleware, published_api_id=PUBLISHED_API_ID)
+app.add_middleware(RequestLoggingMiddleware)
+app.add_middleware(
+    RequestMetricsMiddleware,
+    # On Lambda, each instance has its own registry, so metrics are also written as EMF logs.
+    emf_exporter=EmfExporter() if is_running_on_lambda() else None,
+)
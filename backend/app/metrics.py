@@ -0,0 +1,362 @@
+"""Prometheus-style metrics for the API and the websocket handler.
+
+Each metric keeps one shard of values per thread, so recording a value never takes a lock:
+only the owner thread writes to a shard, and collection merges the shards.
+Metrics are exposed in the Prometheus text format by `/metrics` of `app.main` when running
+locally, and are written as CloudWatch embedded metric format (EMF) logs on Lambda with `EmfExporter`.
+"""
+
+import bisect
+import json
+import math
+import sys
+import threading
+import time
+from types import FrameType
+from typing import Any, Iterable
+
+# Same as the default of the Prometheus client
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.075,
+    0.1,
+    0.25,
+    0.5,
+    0.75,
+    1.0,
+    2.5,
+    5.0,
+    7.5,
+    10.0,
+)
+TOKENS_PER_SECOND_BUCKETS = (5, 10, 20, 30, 40, 50, 75, 100, 150, 200, 300)
+
+
+class _ShardedValues:
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: list[tuple[threading.Thread, dict[tuple[str, ...], Any]]] = []
+        # Values of finished threads (e.g. notification threads of Lambda invocations)
+        self.retired: dict[tuple[str, ...], Any] = {}
+        # NOTE: Only collection is serialized. Recording values never takes the lock.
+        self.collect_lock = threading.Lock()
+
+    def shard(self) -> dict[tuple[str, ...], Any]:
+        try:
+            return self._local.values
+        except AttributeError:
+            values: dict[tuple[str, ...], Any] = {}
+            self._local.values = values
+            # NOTE: `list.append` is atomic
+            self._shards.append((threading.current_thread(), values))
+            return values
+
+    def retire_finished(self) -> list[dict[tuple[str, ...], Any]]:
+        """Return shards of finished threads and forget them. Call with `collect_lock`."""
+        finished = []
+        for entry in list(self._shards):
+            thread, values = entry
+            if not thread.is_alive():
+                # NOTE: `list.remove` is atomic, so concurrent `append` is not lost
+                self._shards.remove(entry)
+                finished.append(values)
+        return finished
+
+    def live_shards(self) -> list[dict[tuple[str, ...], Any]]:
+        return [values for _, values in list(self._shards)]
+
+
+class _Metric:
+    type: str
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        registry: "MetricsRegistry | None" = None,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = _ShardedValues()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _merge(self, total: dict[tuple[str, ...], Any], values: dict):
+        raise NotImplementedError()
+
+    def collect(self) -> dict[tuple[str, ...], Any]:
+        with self._values.collect_lock:
+            for values in self._values.retire_finished():
+                self._merge(self._values.retired, values)
+
+            merged: dict[tuple[str, ...], Any] = {}
+            self._merge(merged, self._values.retired)
+            for values in self._values.live_shards():
+                self._merge(merged, values)
+            return merged
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        values = self._values.shard()
+        key = self._key(labels)
+        values[key] = values.get(key, 0.0) + amount
+
+    def _merge(self, total: dict[tuple[str, ...], float], values: dict):
+        for key, value in list(values.items()):
+            total[key] = total.get(key, 0.0) + value
+
+
+class Histogram(_Metric):
+    """Each value is `[count of bucket 0, ..., count of +Inf, sum]`.
+    Bucket counts are not cumulative until exposed.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+        registry: "MetricsRegistry | None" = None,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value: float, **labels: str):
+        values = self._values.shard()
+        key = self._key(labels)
+        counts = values.get(key)
+        if counts is None:
+            counts = [0] * (len(self.buckets) + 1) + [0.0]
+            values[key] = counts
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def _merge(self, total: dict[tuple[str, ...], list[float]], values: dict):
+        for key, counts in list(values.items()):
+            merged = total.setdefault(key, [0] * len(counts))
+            for i, count in enumerate(list(counts)):
+                merged[i] += count
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered.")
+        self._metrics[metric.name] = metric
+
+    def metrics(self) -> list[_Metric]:
+        return list(self._metrics.values())
+
+
+REGISTRY = MetricsRegistry()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def generate_latest(registry: MetricsRegistry = REGISTRY) -> str:
+    """Render all metrics in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for metric in registry.metrics():
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        if isinstance(metric, Histogram):
+            for key, counts in sorted(metric.collect().items()):
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (math.inf,), counts):
+                    cumulative += count
+                    labels = _format_labels(
+                        metric.labelnames + ("le",), key + (_format_value(bound),)
+                    )
+                    lines.append(f"{metric.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(metric.labelnames, key)
+                lines.append(f"{metric.name}_sum{labels} {_format_value(counts[-1])}")
+                lines.append(f"{metric.name}_count{labels} {cumulative}")
+        else:
+            for key, value in sorted(metric.collect().items()):
+                labels = _format_labels(metric.labelnames, key)
+                lines.append(f"{metric.name}{labels} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class EmfExporter:
+    """Write the increase of each metric since the last flush as CloudWatch EMF logs.
+    Histograms are exported as `<name>_sum` and `<name>_count`, which is enough for averages.
+    See: https://docs.aws.amazon.com/AmazonCloudWatch/latest/monitoring/CloudWatch_Embedded_Metric_Format_Specification.html
+    """
+
+    def __init__(
+        self,
+        namespace: str = "BedrockClaudeChat",
+        registry: MetricsRegistry = REGISTRY,
+        stream=None,
+    ):
+        self.namespace = namespace
+        self.registry = registry
+        self.stream = stream
+        self._last: dict[tuple[str, tuple[str, ...]], float] = {}
+
+    def _delta(self, name: str, key: tuple[str, ...], value: float) -> float:
+        previous = self._last.get((name, key), 0.0)
+        self._last[(name, key)] = value
+        return value - previous
+
+    def _series(self, metric: _Metric):
+        if isinstance(metric, Histogram):
+            for key, counts in metric.collect().items():
+                unit = "Seconds" if metric.name.endswith("_seconds") else "None"
+                yield key, f"{metric.name}_sum", unit, counts[-1]
+                yield key, f"{metric.name}_count", "Count", sum(counts[:-1])
+        else:
+            for key, value in metric.collect().items():
+                yield key, metric.name, "Count", value
+
+    def flush(self):
+        timestamp = int(time.time() * 1000)
+        stream = self.stream if self.stream is not None else sys.stdout
+        for metric in self.registry.metrics():
+            for key, name, unit, value in self._series(metric):
+                delta = self._delta(name, key, value)
+                if delta == 0:
+                    continue
+
+                document = {
+                    "_aws": {
+                        "Timestamp": timestamp,
+                        "CloudWatchMetrics": [
+                            {
+                                "Namespace": self.namespace,
+                                "Dimensions": [list(metric.labelnames)],
+                                "Metrics": [{"Name": name, "Unit": unit}],
+                            }
+                        ],
+                    },
+                    **dict(zip(metric.labelnames, key)),
+                    name: delta,
+                }
+                stream.write(json.dumps(document) + "\n")
+        stream.flush()
+
+
+def _caller_function(prefix: str = "app.repositories") -> str:
+    frame: FrameType | None = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith(prefix):
+            return f"{module.rsplit('.', 1)[-1]}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "other"
+
+
+def _on_before_call(model, context, **kwargs):
+    context["metrics_start"] = time.perf_counter()
+    context["metrics_function"] = _caller_function()
+
+
+def _on_after_call(model, context, exception=None, **kwargs):
+    start = context.get("metrics_start")
+    if start is None:
+        return
+
+    labels = dict(
+        service=model.service_model.service_name,
+        operation=model.name,
+        function=context["metrics_function"],
+    )
+    AWS_CALL_DURATION.observe(time.perf_counter() - start, **labels)
+    if exception is not None:
+        AWS_CALL_ERRORS.inc(**labels)
+
+
+def instrument_boto3_client(client):
+    """Record the count and latency of each API call of the client,
+    labeled with the repository function which made the call.
+    """
+    events = client.meta.events
+    events.register("before-call.*.*", _on_before_call, unique_id="metrics-before")
+    events.register("after-call.*.*", _on_after_call, unique_id="metrics-after")
+    events.register(
+        "after-call-error.*.*", _on_after_call, unique_id="metrics-after-error"
+    )
+    return client
+
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Latency of HTTP requests until the response starts, per route.",
+    ["method", "route", "status"],
+)
+BEDROCK_TIME_TO_FIRST_TOKEN = Histogram(
+    "bedrock_time_to_first_token_seconds",
+    "Time from the converse_stream call to the first content delta.",
+    ["model"],
+)
+BEDROCK_OUTPUT_TOKENS_PER_SECOND = Histogram(
+    "bedrock_output_tokens_per_second",
+    "Output tokens per second after the first token.",
+    ["model"],
+    buckets=TOKENS_PER_SECOND_BUCKETS,
+)
+BEDROCK_INPUT_TOKENS = Counter(
+    "bedrock_input_tokens_total",
+    "Input tokens not read from the prompt cache.",
+    ["model"],
+)
+BEDROCK_CACHE_READ_INPUT_TOKENS = Counter(
+    "bedrock_cache_read_input_tokens_total",
+    "Input tokens read from the prompt cache (cache hits).",
+    ["model"],
+)
+BEDROCK_CACHE_WRITE_INPUT_TOKENS = Counter(
+    "bedrock_cache_write_input_tokens_total",
+    "Input tokens written to the prompt cache.",
+    ["model"],
+)
+TOOL_CALL_DURATION = Histogram(
+    "tool_call_duration_seconds",
+    "Latency of agent tool calls.",
+    ["tool", "status"],
+)
+AWS_CALL_DURATION = Histogram(
+    "aws_call_duration_seconds",
+    "Latency of AWS API calls (DynamoDB, S3, STS, ...) per repository function.",
+    ["service", "operation", "function"],
+)
+AWS_CALL_ERRORS = Counter(
+    "aws_call_errors_total",
+    "AWS API calls which raised an exception.",
+    ["service", "operation", "function"],
+)
+WEBSOCKET_FRAMES_SENT = Counter(
+    "websocket_frames_sent_total",
+    "Frames posted to websocket connections.",
+    ["status"],
+)
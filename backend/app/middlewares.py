@@ -0,0 +1,155 @@
+"""Pure ASGI middlewares of the API.
+
+Unlike `BaseHTTPMiddleware`, these do not wrap the request and response in extra tasks and
+memory streams, and do not consume the request body: they only observe ASGI messages.
+"""
+
+import logging
+import time
+
+from app.dependencies import get_current_user
+from app.logging_utils import log_payload
+from app.metrics import HTTP_REQUEST_DURATION, EmfExporter
+from app.user import User
+from app.utils import is_running_on_lambda
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from fastapi.security import HTTPAuthorizationCredentials
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+REQUEST_BODY_LOG_LENGTH = 100
+
+
+class RequestLoggingMiddleware:
+    """Log the request line, headers and the first bytes of the body.
+    The body is peeked while the application reads it, so it is never buffered as a whole
+    (e.g. base64 images of `ChatInput`), and it is not read at all if the application does not.
+    """
+
+    def __init__(self, app: ASGIApp, body_log_length: int = REQUEST_BODY_LOG_LENGTH):
+        self.app = app
+        self.body_log_length = body_log_length
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        logger.info("Request path: %s", scope["path"])
+        logger.info("Request method: %s", scope["method"])
+        log_payload(logger, "Request headers: %s", dict(Headers(scope=scope)))
+
+        prefix = bytearray()
+        body_logged = False
+
+        async def receive_with_peek() -> Message:
+            nonlocal body_logged
+            message = await receive()
+            if not body_logged and message["type"] == "http.request":
+                body = message.get("body", b"")
+                prefix.extend(body[: self.body_log_length - len(prefix)])
+                if len(prefix) >= self.body_log_length or not message.get(
+                    "more_body", False
+                ):
+                    body_logged = True
+                    logger.info(
+                        "Request body: %s...", prefix.decode("utf-8", errors="replace")
+                    )
+            return message
+
+        await self.app(scope, receive_with_peek, send)
+
+
+class CurrentUserMiddleware:
+    """Set the user of the request to `request.state.current_user`."""
+
+    def __init__(self, app: ASGIApp, published_api_id: str | None = None):
+        self.app = app
+        self.published_api_id = published_api_id
+
+    async def _resolve_user(self, headers: Headers) -> User | None:
+        if is_running_on_lambda() and self.published_api_id is not None:
+            return User(
+                id=f"PUBLISHED_API#{self.published_api_id}",
+                name=self.published_api_id,
+                groups=[],
+            )
+
+        authorization = headers.get("Authorization")
+        if authorization:
+            token = HTTPAuthorizationCredentials(
+                scheme="Bearer", credentials=authorization.split(" ")[1]
+            )
+            # NOTE: Verification fetches the JWKS with a blocking request
+            return await run_in_threadpool(get_current_user, token)
+
+        if not is_running_on_lambda():
+            return User(id="test_user", name="test_user", groups=[])
+
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            user = await self._resolve_user(Headers(scope=scope))
+        except HTTPException as e:
+            response = JSONResponse(
+                {"detail": e.detail}, status_code=e.status_code, headers=e.headers
+            )
+            await response(scope, receive, send)
+            return
+
+        if user is not None:
+            scope.setdefault("state", {})["current_user"] = user
+        await self.app(scope, receive, send)
+
+
+class RequestMetricsMiddleware:
+    """Record the latency until the response starts, per route template.
+    On Lambda, metrics are flushed as EMF logs after each response.
+    """
+
+    def __init__(self, app: ASGIApp, emf_exporter: EmfExporter | None = None):
+        self.app = app
+        self.emf_exporter = emf_exporter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        recorded = False
+
+        def record(status: int):
+            nonlocal recorded
+            recorded = True
+            # NOTE: Use the route template (e.g. `/conversation/{conversation_id}`) to bound cardinality
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status),
+            )
+
+        async def send_with_metrics(message: Message):
+            if message["type"] == "http.response.start":
+                record(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            if not recorded:
+                record(500)
+            if self.emf_exporter is not None:
+                self.emf_exporter.flush()
@@ -0,0 +1,65 @@
+"""`BatchWriteItem` requests with retries of unprocessed items."""
+
+import logging
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.repositories.common import TRANSACTION_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+BATCH_WRITE_CONCURRENCY = int(os.environ.get("BATCH_WRITE_CONCURRENCY", 4))
+BATCH_WRITE_MAX_ATTEMPTS = 8
+BATCH_WRITE_BACKOFF_SECONDS = 0.05
+
+
+def backoff(attempt: int):
+    """Sleep before the `attempt`-th retry, with exponential backoff and jitter."""
+    time.sleep(random.uniform(0, BATCH_WRITE_BACKOFF_SECONDS * 2**attempt))
+
+
+def batch_write_item(client, table_name: str, write_requests: list[dict]) -> int:
+    """Send up to 25 `PutRequest` or `DeleteRequest` in one `BatchWriteItem`.
+    Unprocessed requests are retried with exponential backoff.
+    Returns the number of requests still unprocessed after the retries.
+    """
+    request_items = {table_name: write_requests}
+    remaining = len(write_requests)
+    for attempt in range(BATCH_WRITE_MAX_ATTEMPTS):
+        if attempt > 0:
+            backoff(attempt)
+
+        response = client.batch_write_item(RequestItems=request_items)
+        unprocessed = response.get("UnprocessedItems", {}).get(table_name, [])
+        remaining = len(unprocessed)
+        if remaining == 0:
+            return 0
+        request_items = {table_name: unprocessed}
+
+    logger.error(f"Failed to write {remaining} items to {table_name}")
+    return remaining
+
+
+def batch_write(table, write_requests: list[dict]) -> int:
+    """Send `write_requests` in chunks of 25, in parallel if there are several chunks.
+    Returns the number of requests unprocessed after the retries.
+    """
+    client = table.meta.client
+    chunks = [
+        write_requests[i : i + TRANSACTION_BATCH_SIZE]
+        for i in range(0, len(write_requests), TRANSACTION_BATCH_SIZE)
+    ]
+    if len(chunks) <= 1:
+        return sum(batch_write_item(client, table.name, chunk) for chunk in chunks)
+
+    with ThreadPoolExecutor(
+        max_workers=min(BATCH_WRITE_CONCURRENCY, len(chunks))
+    ) as executor:
+        return sum(
+            executor.map(
+                lambda chunk: batch_write_item(client, table.name, chunk), chunks
+            )
+        )
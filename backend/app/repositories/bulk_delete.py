@@ -0,0 +1,166 @@
+"""Streaming deletion of the items of a query and the S3 objects they reference.
+
+Items are deleted page by page while the query is read:
+- Referenced objects are deleted with `DeleteObjects`, up to 1000 keys per request.
+- Items are deleted with `BatchWriteItem`, 25 keys per request, by parallel workers.
+  Unprocessed items are retried with exponential backoff.
+An item is deleted only after the object it references, so that no item is left pointing to
+a missing object. Memory is bounded by one page and the requests in flight.
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable
+
+from pydantic import BaseModel
+
+from app.repositories.batch_write import batch_write_item
+from app.repositories.common import TRANSACTION_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+BULK_DELETE_CONCURRENCY = int(os.environ.get("BULK_DELETE_CONCURRENCY", 4))
+DELETE_OBJECTS_BATCH_SIZE = 1000
+
+
+class BulkDeleteProgress(BaseModel):
+    pages: int = 0
+    deleted_items: int = 0
+    deleted_objects: int = 0
+    # Items are kept when the deletion of their object failed
+    failed_items: int = 0
+    failed_objects: int = 0
+
+    def __add__(self, other: "BulkDeleteProgress") -> "BulkDeleteProgress":
+        """Total progress of consecutive deletions."""
+        return BulkDeleteProgress(
+            pages=self.pages + other.pages,
+            deleted_items=self.deleted_items + other.deleted_items,
+            deleted_objects=self.deleted_objects + other.deleted_objects,
+            failed_items=self.failed_items + other.failed_items,
+            failed_objects=self.failed_objects + other.failed_objects,
+        )
+
+
+class _BulkDeleter:
+    def __init__(self, table, s3_client, bucket: str | None, executor):
+        self.client = table.meta.client
+        self.table_name = table.name
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.executor = executor
+        self.progress = BulkDeleteProgress()
+        self.lock = threading.Lock()
+        self.futures: set[Future] = set()
+        self.item_keys: list[dict] = []
+        # Items waiting for the deletion of their objects
+        self.object_keys: list[tuple[dict, str]] = []
+
+    def add(self, item_key: dict, object_key: str | None):
+        if object_key is None:
+            self._add_item(item_key)
+            return
+
+        self.object_keys.append((item_key, object_key))
+        if len(self.object_keys) >= DELETE_OBJECTS_BATCH_SIZE:
+            self._delete_objects()
+
+    def finish(self):
+        self._delete_objects()
+        if self.item_keys:
+            self._submit()
+
+        done, _ = wait(self.futures)
+        for future in done:
+            # Raise the errors of the workers
+            future.result()
+
+    def _add_item(self, item_key: dict):
+        self.item_keys.append(item_key)
+        if len(self.item_keys) >= TRANSACTION_BATCH_SIZE:
+            self._submit()
+
+    def _submit(self):
+        keys, self.item_keys = self.item_keys, []
+        if len(self.futures) >= BULK_DELETE_CONCURRENCY * 2:
+            done, self.futures = wait(self.futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                future.result()
+
+        self.futures.add(self.executor.submit(self._batch_write, keys))
+
+    def _delete_objects(self):
+        if not self.object_keys:
+            return
+
+        pending, self.object_keys = self.object_keys, []
+        response = self.s3_client.delete_objects(
+            Bucket=self.bucket,
+            Delete={
+                "Objects": [{"Key": object_key} for _, object_key in pending],
+                "Quiet": True,
+            },
+        )
+        failed = {error["Key"] for error in response.get("Errors", [])}
+        for error in response.get("Errors", []):
+            logger.error(f"Failed to delete object {error['Key']}: {error['Message']}")
+
+        with self.lock:
+            self.progress.deleted_objects += len(pending) - len(failed)
+            self.progress.failed_objects += len(failed)
+            self.progress.failed_items += len(failed)
+
+        for item_key, object_key in pending:
+            if object_key not in failed:
+                self._add_item(item_key)
+
+    def _batch_write(self, keys: list[dict]):
+        unprocessed = batch_write_item(
+            self.client,
+            self.table_name,
+            [{"DeleteRequest": {"Key": key}} for key in keys],
+        )
+        with self.lock:
+            self.progress.deleted_items += len(keys) - unprocessed
+            self.progress.failed_items += unprocessed
+
+
+def bulk_delete(
+    table,
+    query_params: dict,
+    object_key: Callable[[dict], str | None] = lambda item: None,
+    s3_client=None,
+    bucket: str | None = None,
+    on_progress: Callable[[BulkDeleteProgress], None] | None = None,
+) -> BulkDeleteProgress:
+    """Delete all items of `table.query(**query_params)`.
+    `query_params` must project `PK` and `SK`, and the attributes read by `object_key`,
+    which returns the key of the object in `bucket` to delete with the item, if any.
+    `on_progress` is called with a snapshot of the progress after each page.
+    """
+    with ThreadPoolExecutor(max_workers=BULK_DELETE_CONCURRENCY) as executor:
+        deleter = _BulkDeleter(table, s3_client, bucket, executor)
+        query_params = dict(query_params)
+        while True:
+            response = table.query(**query_params)
+            for item in response.get("Items", []):
+                deleter.add({"PK": item["PK"], "SK": item["SK"]}, object_key(item))
+
+            with deleter.lock:
+                deleter.progress.pages += 1
+                progress = deleter.progress.model_copy()
+            if on_progress is not None:
+                on_progress(progress)
+
+            if "LastEvaluatedKey" not in response:
+                break
+            query_params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+        deleter.finish()
+
+    if on_progress is not None:
+        on_progress(deleter.progress.model_copy())
+    return deleter.progress
@@ -1,7 +1,10 @@
+import base64
 import json
 import os
+from decimal import Decimal as decimal
 
 import boto3
+from app.metrics import instrument_boto3_client
 
 DDB_ENDPOINT_URL = os.environ.get("DDB_ENDPOINT_URL")
 TABLE_NAME = os.environ.get("TABLE_NAME", "")
@@ -9,6 +12,8 @@ ACCOUNT = os.environ.get("ACCOUNT", "")
 REGION = os.environ.get("REGION", "ap-northeast-1")
 TABLE_ACCESS_ROLE_ARN = os.environ.get("TABLE_ACCESS_ROLE_ARN", "")
 TRANSACTION_BATCH_SIZE = 25
+BOT_LIST_KEY_PREFIX = "BOT#"
+BOT_ALIAS_LIST_KEY_PREFIX = "BOT_ALIAS#"
 
 
 class RecordNotFoundError(Exception):
@@ -32,6 +37,17 @@ def decompose_conv_id(conv_id: str):
     return conv_id.split("#")[-1]
 
 
+def compose_archived_conv_id(user_id: str, conversation_id: str):
+    # Marker of an archived conversation, kept after its item expired.
+    # NOTE: Not under `{user_id}#CONV#`, so that it is not listed as a conversation
+    return f"{user_id}#ARCHIVED_CONV#{conversation_id}"
+
+
+def compose_conversation_deletion_id(user_id: str):
+    # NOTE: Not under `{user_id}#CONV#`, so that it is neither listed nor deleted as a conversation
+    return f"{user_id}#CONVERSATION_DELETION"
+
+
 def compose_bot_id(user_id: str, bot_id: str):
     # Add user_id prefix for row level security to match with `LeadingKeys` condition
     return f"{user_id}#BOT#{bot_id}"
@@ -50,6 +66,17 @@ def decompose_bot_alias_id(composed_alias_id: str):
     return composed_alias_id.split("#")[-1]
 
 
+def is_bot_alias_id(composed_id: str) -> bool:
+    return "#BOT_ALIAS#" in composed_id
+
+
+def compose_bot_list_key(last_used_time, is_alias: bool = False):
+    # Sort key of `BotListKeyIndex`. The prefix separates owned bots from aliases,
+    # and the last used time is zero padded to be ordered as a string.
+    prefix = BOT_ALIAS_LIST_KEY_PREFIX if is_alias else BOT_LIST_KEY_PREFIX
+    return f"{prefix}{decimal(str(last_used_time)):020.3f}"
+
+
 def compose_related_document_source_id(
     user_id: str,
     conversation_id: str,
@@ -59,12 +86,60 @@ def compose_related_document_source_id(
     return f"{user_id}#RELATED_DOCUMENT#{conversation_id}#{source_id}"
 
 
+def compose_related_document_body_id(
+    user_id: str,
+    conversation_id: str,
+    content_hash: str,
+):
+    # NOTE: Not under the prefix of the related documents, so that listing them does not read
+    # the bodies. Still under `{user_id}#RELATED_DOCUMENT` to be deleted with them.
+    return f"{user_id}#RELATED_DOCUMENT_BODY#{conversation_id}#{content_hash}"
+
+
 def decompose_related_document_source_id(composed_id: str):
     return composed_id.split("#")[-1]
 
 
+# Header of the tokens in the responses of listing routes
+# NOTE: The bodies stay lists for compatibility, so the pagination token is a header
+NEXT_TOKEN_HEADER = "X-Next-Token"
+
+
+def encode_next_token(last_evaluated_key: dict | None) -> str | None:
+    """Encode `LastEvaluatedKey` of a query or scan to an opaque pagination token."""
+    if last_evaluated_key is None:
+        return None
+    # NOTE: Number keys (e.g. `LastMessageTime`) are `Decimal`, which were floats when stored
+    return base64.b64encode(
+        json.dumps(last_evaluated_key, default=float).encode("utf-8")
+    ).decode("utf-8")
+
+
+def decode_next_token(next_token: str) -> dict:
+    """Decode a token of `encode_next_token` to `ExclusiveStartKey`.
+    Raises `ValueError` if the token is malformed.
+    """
+    key = json.loads(
+        base64.b64decode(next_token, validate=True).decode("utf-8"),
+        parse_float=decimal,
+        parse_int=decimal,
+    )
+    if not isinstance(key, dict):
+        raise ValueError(f"Invalid next token: {next_token}")
+    return key
+
+
 def _get_aws_resource(service_name, user_id=None):
     """Get AWS resource with optional row-level access control for DynamoDB.
+    API calls of the resource are recorded to metrics.
+    """
+    resource = _create_aws_resource(service_name, user_id=user_id)
+    instrument_boto3_client(resource.meta.client)
+    return resource
+
+
+def _create_aws_resource(service_name, user_id=None):
+    """
     Ref: https://docs.aws.amazon.com/IAM/latest/UserGuide/reference_policies_examples_dynamodb_items.html
     """
     if "AWS_EXECUTION_ENV" not in os.environ:
@@ -109,7 +184,7 @@ def _get_aws_resource(service_name, user_id=None):
             "ForAllValues:StringLike": {"dynamodb:LeadingKeys": [f"{user_id}*"]}
         }
 
-    sts_client = boto3.client("sts")
+    sts_client = instrument_boto3_client(boto3.client("sts"))
     assumed_role_object = sts_client.assume_role(
         RoleArn=TABLE_ACCESS_ROLE_ARN,
         RoleSessionName="DynamoDBSession",
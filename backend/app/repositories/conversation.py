@@ -1,45 +1,94 @@
+import gzip
+import hashlib
 import json
 import logging
 import os
+import time
 from decimal import Decimal as decimal
+from typing import Callable, Iterator
 
 import boto3
-from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.conditions import Attr, Key
 from botocore.exceptions import ClientError
 from pydantic import TypeAdapter
 
+from app.logging_utils import log_payload
+from app.metrics import instrument_boto3_client
+from app.repositories.batch_write import backoff, batch_write
+from app.repositories.bulk_delete import BulkDeleteProgress, bulk_delete
 from app.repositories.common import (
     TRANSACTION_BATCH_SIZE,
     RecordNotFoundError,
+    _get_aws_resource,
     _get_table_client,
+    compose_archived_conv_id,
     compose_conv_id,
+    compose_conversation_deletion_id,
+    compose_related_document_body_id,
+    decode_next_token,
     decompose_conv_id,
+    encode_next_token,
     compose_related_document_source_id,
     decompose_related_document_source_id,
 )
 from app.repositories.models.conversation import (
+    ConversationDeletionModel,
     ConversationMeta,
     ConversationModel,
+    CostLedgerEntryModel,
     FeedbackModel,
     MessageModel,
+    RelatedDocumentMetaModel,
     RelatedDocumentModel,
     ToolResultModel,
 )
+from app.routes.schemas.conversation import type_conversation_order_by
+from app.tracing import traced
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
 THRESHOLD_LARGE_MESSAGE = 300 * 1024  # 300KB
+BATCH_GET_SIZE = 100
+BATCH_GET_MAX_ATTEMPTS = 3
+# Attributes of `ConversationMeta`, also projected to `LastMessageTimeIndex`
+CONVERSATION_META_PROJECTION = (
+    "PK, SK, Title, CreateTime, Model, BotId, LastMessageTime"
+)
 LARGE_MESSAGE_BUCKET = os.environ.get("LARGE_MESSAGE_BUCKET")
 
+# Archival of inactive conversations to `LARGE_MESSAGE_BUCKET`.
+# See `app/conversation_archiver.py`.
+CONVERSATION_ARCHIVE_PREFIX = os.environ.get("CONVERSATION_ARCHIVE_PREFIX", "archive/")
+CONVERSATION_ARCHIVE_COMPRESSION = os.environ.get(
+    "CONVERSATION_ARCHIVE_COMPRESSION", "gzip"
+)
+# NOTE: Must be a class readable without restoration, e.g. `STANDARD_IA` or `GLACIER_IR`
+CONVERSATION_ARCHIVE_STORAGE_CLASS = os.environ.get(
+    "CONVERSATION_ARCHIVE_STORAGE_CLASS", "STANDARD_IA"
+)
+# Days until archived conversations are removed from the table. Kept if not set.
+CONVERSATION_ARCHIVE_TTL_DAYS = os.environ.get("CONVERSATION_ARCHIVE_TTL_DAYS")
+
 BEDROCK_REGION = os.environ.get("BEDROCK_REGION", "us-east-1")
-s3_client = boto3.client("s3", BEDROCK_REGION)
+s3_client = instrument_boto3_client(boto3.client("s3", BEDROCK_REGION))
 
+# Related document bodies above this size are compressed
+RELATED_DOCUMENT_COMPRESSION_THRESHOLD = 1024  # 1KB
 
+# NOTE: Message map is (de)serialized as a whole, so that binary bodies are encoded
+# to base64 only once at the storage boundary.
+_message_map_adapter: TypeAdapter[dict[str, MessageModel]] = TypeAdapter(
+    dict[str, MessageModel]
+)
+_tool_result_adapter: TypeAdapter[ToolResultModel] = TypeAdapter(ToolResultModel)
+
+
+@traced("store_conversation")
 def store_conversation(
     user_id: str, conversation: ConversationModel, threshold=THRESHOLD_LARGE_MESSAGE
 ):
-    logger.info(f"Storing conversation: {conversation.model_dump_json()}")
+    logger.info(f"Storing conversation: {conversation.id}")
     table = _get_table_client(user_id)
 
     item_params = {
@@ -47,20 +96,38 @@ def store_conversation(
         "SK": compose_conv_id(user_id, conversation.id),
         "Title": conversation.title,
         "CreateTime": decimal(conversation.create_time),
+        # NOTE: `TotalPrice` is the aggregate of `CostLedger`, kept for usage analysis.
         # Convert to decimal via str to avoid error
         # Ref: https://stackoverflow.com/questions/63026648/errormessage-class-decimal-inexact-class-decimal-rounded-while
         "TotalPrice": decimal(str(conversation.total_price)),
+        "CostLedger": json.dumps(
+            [entry.model_dump() for entry in conversation.cost_ledger]
+        ),
         "LastMessageId": conversation.last_message_id,
         "ShouldContinue": conversation.should_continue,
     }
 
+    # NOTE: Stored separately so that listing conversations does not read the message map
+    system_message = conversation.message_map.get("system")
+    if system_message is not None:
+        item_params["Model"] = system_message.model
+    # Sort key of `LastMessageTimeIndex`
+    last_message = conversation.message_map.get(conversation.last_message_id)
+    item_params["LastMessageTime"] = decimal(
+        str(
+            last_message.create_time
+            if last_message is not None
+            else conversation.create_time
+        )
+    )
+
     if conversation.bot_id:
         item_params["BotId"] = conversation.bot_id
 
-    message_map = {
-        k: v.model_dump(by_alias=True) for k, v in conversation.message_map.items()
-    }
-    message_map_size = len(json.dumps(message_map).encode("utf-8"))
+    message_map = _message_map_adapter.dump_json(
+        conversation.message_map, by_alias=True
+    )
+    message_map_size = len(message_map)
     logger.info(f"Message map size: {message_map_size}")
     if message_map_size > threshold:
         logger.info(
@@ -73,15 +140,16 @@ def store_conversation(
         s3_client.put_object(
             Bucket=LARGE_MESSAGE_BUCKET,
             Key=large_message_path,
-            Body=json.dumps(message_map),
+            Body=message_map,
         )
         # Store only `system` attribute in DynamoDB
-        item_params["MessageMap"] = json.dumps(
-            {k: v for k, v in message_map.items() if k == "system"}
-        )
+        item_params["MessageMap"] = _message_map_adapter.dump_json(
+            {k: v for k, v in conversation.message_map.items() if k == "system"},
+            by_alias=True,
+        ).decode("utf-8")
     else:
         item_params["IsLargeMessage"] = False
-        item_params["MessageMap"] = json.dumps(message_map)
+        item_params["MessageMap"] = message_map.decode("utf-8")
 
     response = table.put_item(
         Item=item_params,
@@ -89,66 +157,187 @@ def store_conversation(
     return response
 
 
-def find_conversation_by_user_id(user_id: str) -> list[ConversationMeta]:
+def _conversation_meta_from_item(item: dict, model: str) -> ConversationMeta:
+    return ConversationMeta(
+        id=decompose_conv_id(item["SK"]),
+        create_time=float(item["CreateTime"]),
+        title=item["Title"],
+        model=model,
+        bot_id=item["BotId"] if "BotId" in item else None,
+        last_message_time=(
+            float(item["LastMessageTime"]) if "LastMessageTime" in item else None
+        ),
+    )
+
+
+def _find_models_in_message_maps(
+    user_id: str, table_name: str, items: list[dict]
+) -> dict[str, str]:
+    """Read the model of conversations stored before `Model` was an attribute.
+    Returns a map from `SK` to the model. Keys still unprocessed after the retries are omitted.
+    """
+    dynamodb = _get_aws_resource("dynamodb", user_id=user_id)
+    models = {}
+    for i in range(0, len(items), BATCH_GET_SIZE):
+        request_items = {
+            table_name: {
+                "Keys": [
+                    {"PK": item["PK"], "SK": item["SK"]}
+                    for item in items[i : i + BATCH_GET_SIZE]
+                ],
+                "ProjectionExpression": "SK, MessageMap",
+            }
+        }
+        for attempt in range(BATCH_GET_MAX_ATTEMPTS):
+            if attempt > 0:
+                backoff(attempt)
+            response = dynamodb.batch_get_item(RequestItems=request_items)
+            for item in response["Responses"].get(table_name, []):
+                # NOTE: all message has the same model
+                models[item["SK"]] = (
+                    json.loads(item["MessageMap"]).get("system", {}).get("model", "")
+                )
+            request_items = response.get("UnprocessedKeys")
+            if not request_items:
+                break
+
+    return models
+
+
+def find_conversation_page_by_user_id(
+    user_id: str,
+    limit: int | None = None,
+    next_token: str | None = None,
+    order_by: type_conversation_order_by = "create_time",
+) -> tuple[list[ConversationMeta], str | None]:
+    """Find a page of conversations, newest first.
+    Only the attributes of `ConversationMeta` are read, so a page costs the same regardless of
+    the size of message maps. The second element is the token of the next page, if any.
+    :param order_by: `last_message_time` returns the most recently active conversations first,
+        using the sparse `LastMessageTimeIndex`. Conversations not written since
+        `LastMessageTime` was introduced are not in the index.
+    """
+    if limit is not None and limit < 1:
+        raise ValueError("Limit must be a positive integer")
+
     logger.info(f"Finding conversations for user: {user_id}")
     table = _get_table_client(user_id)
 
     query_params = {
-        "KeyConditionExpression": Key("PK").eq(user_id)
-        # NOTE: Need SK to fetch only conversations
-        & Key("SK").begins_with(f"{user_id}#CONV#"),
+        "ProjectionExpression": CONVERSATION_META_PROJECTION,
         "ScanIndexForward": False,
     }
+    if order_by == "last_message_time":
+        # NOTE: Only conversations have `LastMessageTime`
+        query_params["IndexName"] = "LastMessageTimeIndex"
+        query_params["KeyConditionExpression"] = Key("PK").eq(user_id)
+    else:
+        # NOTE: Need SK to fetch only conversations
+        query_params["KeyConditionExpression"] = Key("PK").eq(user_id) & Key(
+            "SK"
+        ).begins_with(f"{user_id}#CONV#")
+    if limit is not None:
+        query_params["Limit"] = limit
+    if next_token is not None:
+        exclusive_start_key = decode_next_token(next_token)
+        if exclusive_start_key.get("PK") != user_id:
+            raise ValueError(f"Invalid next token: {next_token}")
+        query_params["ExclusiveStartKey"] = exclusive_start_key
 
+    # NOTE: max page size is 1MB
+    # See: https://docs.aws.amazon.com/amazondynamodb/latest/developerguide/Query.Pagination.html
     response = table.query(**query_params)
+    items = response["Items"]
+
+    legacy_items = [item for item in items if "Model" not in item]
+    models = (
+        _find_models_in_message_maps(user_id, table.name, legacy_items)
+        if legacy_items
+        else {}
+    )
     conversations = [
-        ConversationMeta(
-            id=decompose_conv_id(item["SK"]),
-            create_time=float(item["CreateTime"]),
-            title=item["Title"],
-            # NOTE: all message has the same model
-            model=json.loads(item["MessageMap"]).get("system", {}).get("model", ""),
-            bot_id=item["BotId"] if "BotId" in item else None,
+        _conversation_meta_from_item(
+            item, item["Model"] if "Model" in item else models.get(item["SK"], "")
         )
-        for item in response["Items"]
+        for item in items
     ]
 
-    query_count = 1
-    MAX_QUERY_COUNT = 5
-    while "LastEvaluatedKey" in response:
-        model = (
-            json.loads(response["Items"][0]["MessageMap"])
-            .get("system", {})
-            .get("model", "")
-        )
-        query_params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
-        # NOTE: max page size is 1MB
-        # See: https://docs.aws.amazon.com/amazondynamodb/latest/developerguide/Query.Pagination.html
-        response = table.query(
-            **query_params,
-        )
-        conversations.extend(
-            [
-                ConversationMeta(
-                    id=decompose_conv_id(item["SK"]),
-                    create_time=float(item["CreateTime"]),
-                    title=item["Title"],
-                    model=model,
-                    bot_id=item["BotId"] if "BotId" in item else None,
-                )
-                for item in response["Items"]
-            ]
+    log_payload(logger, "Found conversations: %s", conversations)
+    return conversations, encode_next_token(response.get("LastEvaluatedKey"))
+
+
+def find_conversation_by_user_id(
+    user_id: str, order_by: type_conversation_order_by = "create_time"
+) -> list[ConversationMeta]:
+    """Find all conversations, newest first."""
+    conversations, next_token = find_conversation_page_by_user_id(
+        user_id, order_by=order_by
+    )
+    while next_token is not None:
+        page, next_token = find_conversation_page_by_user_id(
+            user_id, next_token=next_token, order_by=order_by
         )
-        query_count += 1
-        if query_count > MAX_QUERY_COUNT:
-            logger.warning(f"Query count exceeded {MAX_QUERY_COUNT}")
-            break
+        conversations.extend(page)
 
-    logger.info(f"Found conversations: {conversations}")
     return conversations
 
 
+def _cost_ledger_from_item(
+    item: dict, message_map: dict[str, MessageModel]
+) -> list[CostLedgerEntryModel]:
+    if "CostLedger" in item:
+        return [
+            CostLedgerEntryModel.model_validate(entry)
+            for entry in json.loads(item["CostLedger"])
+        ]
+
+    # Conversations stored before the ledger was introduced only have `TotalPrice`.
+    # Carry it over as a single entry so that the aggregate is preserved.
+    total_price = float(item.get("TotalPrice", 0))
+    last_message = message_map.get(item["LastMessageId"])
+    if total_price == 0 or last_message is None:
+        return []
+
+    return [
+        CostLedgerEntryModel(
+            message_id=last_message.parent or item["LastMessageId"],
+            model=last_message.model,
+            input_tokens=0,
+            output_tokens=0,
+            price=total_price,
+        )
+    ]
+
+
+def compose_archive_path(user_id: str, conversation_id: str, compressed: bool) -> str:
+    suffix = ".json.gz" if compressed else ".json"
+    return f"{CONVERSATION_ARCHIVE_PREFIX}{user_id}/{conversation_id}{suffix}"
+
+
+def _load_archived_item(archive_path: str) -> dict:
+    response = s3_client.get_object(Bucket=LARGE_MESSAGE_BUCKET, Key=archive_path)
+    body = response["Body"].read()
+    if archive_path.endswith(".gz"):
+        body = gzip.decompress(body)
+    return json.loads(body, parse_float=decimal, parse_int=decimal)
+
+
+def _find_expired_archived_item(table, user_id: str, conversation_id: str) -> dict:
+    """Find the archive of a conversation whose item has expired,
+    by the marker stored on archival.
+    """
+    response = table.get_item(
+        Key={"PK": user_id, "SK": compose_archived_conv_id(user_id, conversation_id)}
+    )
+    if "Item" not in response:
+        raise RecordNotFoundError(f"No conversation found with id: {conversation_id}")
+    return _load_archived_item(response["Item"]["ArchivePath"])
+
+
 def find_conversation_by_id(user_id: str, conversation_id: str) -> ConversationModel:
+    """Find a conversation. Archived conversations are read from their archives,
+    and return to the table on the next store.
+    """
     logger.info(f"Finding conversation: {conversation_id}")
     table = _get_table_client(user_id)
     response = table.query(
@@ -156,33 +345,205 @@ def find_conversation_by_id(user_id: str, conversation_id: str) -> ConversationM
         KeyConditionExpression=Key("SK").eq(compose_conv_id(user_id, conversation_id)),
     )
     if len(response["Items"]) == 0:
-        raise RecordNotFoundError(f"No conversation found with id: {conversation_id}")
+        if CONVERSATION_ARCHIVE_TTL_DAYS is None:
+            raise RecordNotFoundError(
+                f"No conversation found with id: {conversation_id}"
+            )
+        item = _find_expired_archived_item(table, user_id, conversation_id)
+    else:
+        # NOTE: conversation is unique
+        item = response["Items"][0]
+        if "ArchivePath" in item:
+            logger.info(f"Rehydrating conversation: {conversation_id}")
+            # Attributes of the item (e.g. title) may be updated after archival
+            item = {**_load_archived_item(item["ArchivePath"]), **item}
 
-    # NOTE: conversation is unique
-    item = response["Items"][0]
     if item.get("IsLargeMessage", False):
         large_message_path = item["LargeMessagePath"]
         response = s3_client.get_object(
             Bucket=LARGE_MESSAGE_BUCKET, Key=large_message_path
         )
-        message_map = json.loads(response["Body"].read().decode("utf-8"))
+        messages = _message_map_adapter.validate_json(response["Body"].read())
     else:
-        message_map = json.loads(item["MessageMap"])
+        messages = _message_map_adapter.validate_json(item["MessageMap"])
 
     conv = ConversationModel(
         id=decompose_conv_id(item["SK"]),
         create_time=float(item["CreateTime"]),
         title=item["Title"],
-        total_price=item.get("TotalPrice", 0),
-        message_map={k: MessageModel.model_validate(v) for k, v in message_map.items()},
+        message_map=messages,
         last_message_id=item["LastMessageId"],
         bot_id=item["BotId"] if "BotId" in item else None,
         should_continue=item.get("ShouldContinue", False),
+        cost_ledger=_cost_ledger_from_item(item, messages),
     )
-    logger.info(f"Found conversation: {conv}")
+    logger.info(f"Found conversation: {conv.id}")
     return conv
 
 
+def find_inactive_conversation_keys(
+    table, inactive_since: float
+) -> Iterator[list[dict]]:
+    """Yield pages of the keys of conversations not archived and without messages
+    since `inactive_since`.
+    `table` must not have row-level access, since all users are scanned.
+    """
+    scan_params = {
+        # NOTE: Sparse index of conversations, with few attributes to read
+        "IndexName": "LastMessageTimeIndex",
+        "ProjectionExpression": "PK, SK, LastMessageTime",
+        "FilterExpression": Attr("LastMessageTime").lt(decimal(str(inactive_since)))
+        & Attr("ArchivePath").not_exists(),
+    }
+    while True:
+        response = table.scan(**scan_params)
+        yield response.get("Items", [])
+
+        if "LastEvaluatedKey" not in response:
+            break
+        scan_params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def find_conversations_without_last_message_time(table) -> Iterator[list[dict]]:
+    """Yield pages of the conversations stored before `LastMessageTime` was introduced,
+    which are neither listed by `LastMessageTimeIndex` nor archived.
+    `table` must not have row-level access, since all users are scanned.
+    """
+    scan_params = {
+        "ProjectionExpression": "PK, SK, CreateTime, LastMessageId, MessageMap, "
+        "IsLargeMessage, LargeMessagePath",
+        "FilterExpression": Attr("SK").contains("#CONV#")
+        & Attr("LastMessageTime").not_exists(),
+    }
+    while True:
+        response = table.scan(**scan_params)
+        yield response.get("Items", [])
+
+        if "LastEvaluatedKey" not in response:
+            break
+        scan_params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def store_last_message_time(table, item: dict) -> bool:
+    """Store `LastMessageTime` of a conversation found by
+    `find_conversations_without_last_message_time`, as `store_conversation` does.
+    Returns False if it was stored in the meantime, or the conversation was deleted.
+    """
+    if item.get("IsLargeMessage", False):
+        response = s3_client.get_object(
+            Bucket=LARGE_MESSAGE_BUCKET, Key=item["LargeMessagePath"]
+        )
+        message_map = json.loads(response["Body"].read(), parse_float=decimal)
+    else:
+        message_map = json.loads(item["MessageMap"], parse_float=decimal)
+    last_message = message_map.get(item["LastMessageId"])
+    last_message_time = (
+        last_message["create_time"] if last_message is not None else item["CreateTime"]
+    )
+
+    try:
+        table.update_item(
+            Key={"PK": item["PK"], "SK": item["SK"]},
+            UpdateExpression="SET LastMessageTime = :last_message_time",
+            ExpressionAttributeValues={
+                ":last_message_time": decimal(str(last_message_time))
+            },
+            ConditionExpression=(
+                "attribute_exists(PK) AND attribute_not_exists(LastMessageTime)"
+            ),
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return False
+        raise e
+    return True
+
+
+def archive_conversation(table, key: dict) -> bool:
+    """Archive the conversation of `key` (found by `find_inactive_conversation_keys`).
+    The item with the messages inlined is written to the archive, then only the
+    attributes for listing are kept in the table.
+    Returns False if the conversation was updated or deleted in the meantime.
+    """
+    response = table.get_item(
+        Key={"PK": key["PK"], "SK": key["SK"]}, ConsistentRead=True
+    )
+    item = response.get("Item")
+    if (
+        item is None
+        or "ArchivePath" in item
+        or item.get("LastMessageTime") != key["LastMessageTime"]
+    ):
+        return False
+
+    user_id = item["PK"]
+    conversation_id = decompose_conv_id(item["SK"])
+    archived_item = {
+        k: v for k, v in item.items() if k not in ("IsLargeMessage", "LargeMessagePath")
+    }
+    if item.get("IsLargeMessage", False):
+        response = s3_client.get_object(
+            Bucket=LARGE_MESSAGE_BUCKET, Key=item["LargeMessagePath"]
+        )
+        archived_item["MessageMap"] = response["Body"].read().decode("utf-8")
+
+    body = json.dumps(archived_item, default=float, separators=(",", ":")).encode(
+        "utf-8"
+    )
+    compressed = CONVERSATION_ARCHIVE_COMPRESSION == "gzip"
+    if compressed:
+        body = gzip.compress(body)
+    archive_path = compose_archive_path(user_id, conversation_id, compressed)
+    s3_client.put_object(
+        Bucket=LARGE_MESSAGE_BUCKET,
+        Key=archive_path,
+        Body=body,
+        StorageClass=CONVERSATION_ARCHIVE_STORAGE_CLASS,
+    )
+
+    update_expression = "SET ArchivePath = :archive_path"
+    expression_attribute_values = {
+        ":archive_path": archive_path,
+        ":last_message_time": item["LastMessageTime"],
+    }
+    if CONVERSATION_ARCHIVE_TTL_DAYS is not None:
+        # NOTE: Stored before the item can expire, so that the archive is found without
+        # looking it up in S3 for every conversation missing in the table.
+        table.put_item(
+            Item={
+                "PK": user_id,
+                "SK": compose_archived_conv_id(user_id, conversation_id),
+                "ArchivePath": archive_path,
+            }
+        )
+        update_expression += ", ExpireTime = :expire_time"
+        expression_attribute_values[":expire_time"] = int(time.time()) + int(
+            CONVERSATION_ARCHIVE_TTL_DAYS
+        ) * (24 * 60 * 60)
+    try:
+        table.update_item(
+            Key={"PK": user_id, "SK": item["SK"]},
+            UpdateExpression=update_expression
+            + " REMOVE MessageMap, CostLedger, IsLargeMessage, LargeMessagePath",
+            ConditionExpression="LastMessageTime = :last_message_time"
+            " AND attribute_not_exists(ArchivePath)",
+            ExpressionAttributeValues=expression_attribute_values,
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            # Stored in the meantime. The archive is overwritten on the next archival.
+            return False
+        raise e
+
+    if item.get("IsLargeMessage", False):
+        s3_client.delete_object(
+            Bucket=LARGE_MESSAGE_BUCKET, Key=item["LargeMessagePath"]
+        )
+
+    logger.info(f"Archived conversation: {conversation_id} to {archive_path}")
+    return True
+
+
 def delete_conversation_by_id(user_id: str, conversation_id: str):
     logger.info(f"Deleting conversation: {conversation_id}")
     table = _get_table_client(user_id)
@@ -201,6 +562,36 @@ def delete_conversation_by_id(user_id: str, conversation_id: str):
                 Bucket=LARGE_MESSAGE_BUCKET, Key=item["LargeMessagePath"]
             )
 
+        # NOTE: The archive is kept after the conversation returned to the table,
+        # and remains after the item of the archived conversation expired.
+        s3_client.delete_objects(
+            Bucket=LARGE_MESSAGE_BUCKET,
+            Delete={
+                "Objects": [
+                    {"Key": compose_archive_path(user_id, conversation_id, compressed)}
+                    for compressed in [True, False]
+                ],
+                "Quiet": True,
+            },
+        )
+        if CONVERSATION_ARCHIVE_TTL_DAYS is not None:
+            archived_key = {
+                "PK": user_id,
+                "SK": compose_archived_conv_id(user_id, conversation_id),
+            }
+            if item is None:
+                # Only the archive is left after the item expired
+                response = table.delete_item(
+                    Key=archived_key,
+                    ConditionExpression="attribute_exists(PK) AND attribute_exists(SK)",
+                )
+                delete_related_documents(
+                    user_id=user_id, conversation_id=conversation_id
+                )
+                return response
+
+            table.delete_item(Key=archived_key)
+
         # Delete the conversation from DynamoDB
         response = table.delete_item(
             Key={"PK": user_id, "SK": compose_conv_id(user_id, conversation_id)},
@@ -222,56 +613,110 @@ def delete_conversation_by_id(user_id: str, conversation_id: str):
     return response
 
 
-def delete_conversation_by_user_id(user_id: str):
+def _delete_archives(user_id: str):
+    """Delete the archives left after the items were deleted, e.g. by expiration."""
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(
+        Bucket=LARGE_MESSAGE_BUCKET, Prefix=f"{CONVERSATION_ARCHIVE_PREFIX}{user_id}/"
+    ):
+        objects = [{"Key": content["Key"]} for content in page.get("Contents", [])]
+        if objects:
+            s3_client.delete_objects(
+                Bucket=LARGE_MESSAGE_BUCKET,
+                Delete={"Objects": objects, "Quiet": True},
+            )
+
+
+def delete_conversation_by_user_id(
+    user_id: str,
+    on_progress: Callable[[BulkDeleteProgress], None] | None = None,
+) -> BulkDeleteProgress:
+    """Delete all conversations of the user, their large messages and related documents.
+    `on_progress` is called with the total progress after each page of conversations
+    and of related documents.
+    """
     logger.info(f"Deleting ALL conversations for user: {user_id}")
     table = _get_table_client(user_id)
+    total = BulkDeleteProgress()
+
+    def report(progress: BulkDeleteProgress):
+        if on_progress is not None:
+            on_progress(total + progress)
 
     query_params = {
         "KeyConditionExpression": Key("PK").eq(user_id)
         # NOTE: Need SK to fetch only conversations
         & Key("SK").begins_with(f"{user_id}#CONV#"),
-        "ProjectionExpression": "SK, IsLargeMessage, LargeMessagePath",
+        "ProjectionExpression": "PK, SK, IsLargeMessage, LargeMessagePath, ArchivePath",
     }
 
-    def delete_batch(batch):
-        with table.batch_writer() as writer:
-            for item in batch:
-                writer.delete_item(Key={"PK": user_id, "SK": item["SK"]})
-
-    def delete_large_messages(items):
-        for item in items:
-            if item.get("IsLargeMessage", False):
-                s3_client.delete_object(
-                    Bucket=LARGE_MESSAGE_BUCKET, Key=item["LargeMessagePath"]
-                )
-
     try:
-        response = table.query(
-            **query_params,
+        total = bulk_delete(
+            table,
+            query_params,
+            object_key=lambda item: (
+                item["LargeMessagePath"]
+                if item.get("IsLargeMessage", False)
+                else item.get("ArchivePath")
+            ),
+            s3_client=s3_client,
+            bucket=LARGE_MESSAGE_BUCKET,
+            on_progress=report,
+        )
+        logger.info(f"Deleted conversations for user {user_id}: {total}")
+        _delete_archives(user_id)
+        # Markers of the archived conversations whose items expired
+        total += bulk_delete(
+            table,
+            {
+                "KeyConditionExpression": Key("PK").eq(user_id)
+                & Key("SK").begins_with(compose_archived_conv_id(user_id, "")),
+                "ProjectionExpression": "PK, SK",
+            },
+            on_progress=report,
         )
 
-        while True:
-            items = response.get("Items", [])
-            delete_large_messages(items)
+        total += delete_related_documents(user_id=user_id, on_progress=report)
 
-            for i in range(0, len(items), TRANSACTION_BATCH_SIZE):
-                batch = items[i : i + TRANSACTION_BATCH_SIZE]
-                delete_batch(batch)
+    except ClientError as e:
+        logger.error(f"An error occurred: {e.response['Error']['Message']}")
+        raise
 
-            # Check if next page exists
-            if "LastEvaluatedKey" not in response:
-                break
+    return total
 
-            # Load next page
-            query_params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
-            response = table.query(
-                **query_params,
-            )
 
-        delete_related_documents(user_id=user_id)
+def store_conversation_deletion(user_id: str, deletion: ConversationDeletionModel):
+    table = _get_table_client(user_id)
+    table.put_item(
+        Item={
+            "PK": user_id,
+            "SK": compose_conversation_deletion_id(user_id),
+            "Status": deletion.status,
+            "Progress": deletion.progress.model_dump(),
+            "UpdateTime": decimal(str(deletion.update_time)),
+        }
+    )
 
-    except ClientError as e:
-        logger.error(f"An error occurred: {e.response['Error']['Message']}")
+
+def find_conversation_deletion_by_user_id(user_id: str) -> ConversationDeletionModel:
+    """Find the latest deletion of all conversations of the user."""
+    table = _get_table_client(user_id)
+    response = table.get_item(
+        Key={"PK": user_id, "SK": compose_conversation_deletion_id(user_id)}
+    )
+    if "Item" not in response:
+        raise RecordNotFoundError(
+            f"No deletion of all conversations found for user: {user_id}"
+        )
+
+    item = response["Item"]
+    return ConversationDeletionModel(
+        status=item["Status"],
+        progress=BulkDeleteProgress(
+            **{key: int(value) for key, value in item["Progress"].items()}
+        ),
+        update_time=float(item["UpdateTime"]),
+    )
 
 
 def change_conversation_title(user_id: str, conversation_id: str, new_title: str):
@@ -318,8 +763,8 @@ def update_feedback(
         },
         UpdateExpression="set MessageMap = :m",
         ExpressionAttributeValues={
-            ":m": json.dumps(
-                {k: v.model_dump(by_alias=True) for k, v in message_map.items()}
+            ":m": _message_map_adapter.dump_json(message_map, by_alias=True).decode(
+                "utf-8"
             )
         },
         ConditionExpression="attribute_exists(PK) AND attribute_exists(SK)",
@@ -329,26 +774,150 @@ def update_feedback(
     return response
 
 
+def _related_document_body_item(
+    user_id: str, conversation_id: str, content_hash: str, body: bytes
+) -> dict:
+    item = {
+        "PK": user_id,
+        "SK": compose_related_document_body_id(
+            user_id=user_id,
+            conversation_id=conversation_id,
+            content_hash=content_hash,
+        ),
+    }
+    if len(body) <= RELATED_DOCUMENT_COMPRESSION_THRESHOLD:
+        item["Body"] = body.decode("utf-8")
+        return item
+
+    compressed_body = gzip.compress(body)
+    if len(compressed_body) <= THRESHOLD_LARGE_MESSAGE:
+        item["CompressedBody"] = compressed_body
+        return item
+
+    # NOTE: Above the item size limit even if compressed
+    body_path = f"{user_id}/{conversation_id}/related_documents/{content_hash}.json.gz"
+    s3_client.put_object(
+        Bucket=LARGE_MESSAGE_BUCKET, Key=body_path, Body=compressed_body
+    )
+    item["BodyPath"] = body_path
+    return item
+
+
+def _related_document_content_from_item(item: dict) -> ToolResultModel:
+    """Read the content of a body item, or of a related document stored with the
+    content before bodies were deduplicated.
+    """
+    if "Content" in item:
+        return _tool_result_adapter.validate_python(item["Content"])
+    if "Body" in item:
+        return _tool_result_adapter.validate_json(item["Body"])
+    if "CompressedBody" in item:
+        return _tool_result_adapter.validate_json(
+            gzip.decompress(item["CompressedBody"].value)
+        )
+
+    response = s3_client.get_object(Bucket=LARGE_MESSAGE_BUCKET, Key=item["BodyPath"])
+    return _tool_result_adapter.validate_json(gzip.decompress(response["Body"].read()))
+
+
+def _find_related_document_bodies(
+    table,
+    user_id: str,
+    conversation_id: str,
+    content_hashes: list[str],
+    projection: str | None = None,
+) -> dict[str, dict]:
+    """Find the body items of the conversation by their hashes.
+    Keys still unprocessed after the retries are omitted.
+    """
+    bodies: dict[str, dict] = {}
+    for i in range(0, len(content_hashes), BATCH_GET_SIZE):
+        keys_and_attributes: dict = {
+            "Keys": [
+                {
+                    "PK": user_id,
+                    "SK": compose_related_document_body_id(
+                        user_id=user_id,
+                        conversation_id=conversation_id,
+                        content_hash=content_hash,
+                    ),
+                }
+                for content_hash in content_hashes[i : i + BATCH_GET_SIZE]
+            ],
+        }
+        if projection is not None:
+            keys_and_attributes["ProjectionExpression"] = projection
+        request_items = {table.name: keys_and_attributes}
+        for attempt in range(BATCH_GET_MAX_ATTEMPTS):
+            if attempt > 0:
+                backoff(attempt)
+            response = table.meta.client.batch_get_item(RequestItems=request_items)
+            for item in response["Responses"].get(table.name, []):
+                bodies[item["SK"].split("#")[-1]] = item
+            request_items = response.get("UnprocessedKeys")
+            if not request_items:
+                break
+
+    return bodies
+
+
 def store_related_documents(
     user_id: str,
     conversation_id: str,
     related_documents: list[RelatedDocumentModel],
 ):
+    """Store related documents of a conversation.
+    Contents are stored once per conversation as bodies keyed by their hash, which the
+    related documents refer to. Bodies already stored in previous turns are not written.
+    """
+    if not related_documents:
+        return
+
     table = _get_table_client(user_id)
-    with table.batch_writer() as writer:
-        for related_document in related_documents:
-            item_params = {
-                "PK": user_id,
-                "SK": compose_related_document_source_id(
-                    user_id=user_id,
-                    conversation_id=conversation_id,
-                    source_id=related_document.source_id,
-                ),
-                "SourceName": related_document.source_name,
-                "SourceLink": related_document.source_link,
-                "Content": related_document.content.model_dump(by_alias=True),
+    bodies: dict[str, bytes] = {}
+    # NOTE: Keys must be unique in a batch
+    references: dict[str, dict] = {}
+    for related_document in related_documents:
+        body = _tool_result_adapter.dump_json(related_document.content, by_alias=True)
+        content_hash = hashlib.sha256(body).hexdigest()
+        bodies[content_hash] = body
+
+        sort_key = compose_related_document_source_id(
+            user_id=user_id,
+            conversation_id=conversation_id,
+            source_id=related_document.source_id,
+        )
+        references[sort_key] = {
+            "PK": user_id,
+            "SK": sort_key,
+            "SourceName": related_document.source_name,
+            "SourceLink": related_document.source_link,
+            "ContentHash": content_hash,
+        }
+
+    # NOTE: Bodies not found after the retries are written again
+    stored = _find_related_document_bodies(
+        table, user_id, conversation_id, list(bodies), projection="SK"
+    )
+    write_requests = [
+        {
+            "PutRequest": {
+                "Item": _related_document_body_item(
+                    user_id, conversation_id, content_hash, body
+                )
             }
-            writer.put_item(Item=item_params)
+        }
+        for content_hash, body in bodies.items()
+        if content_hash not in stored
+    ] + [{"PutRequest": {"Item": item}} for item in references.values()]
+
+    logger.info(
+        f"Storing {len(references)} related documents with "
+        f"{len(bodies) - len(stored)} new bodies of {len(bodies)}"
+    )
+    unprocessed = batch_write(table, write_requests)
+    if unprocessed > 0:
+        logger.error(f"Failed to store {unprocessed} related document items")
 
 
 def find_related_documents_by_conversation_id(
@@ -356,7 +925,7 @@ def find_related_documents_by_conversation_id(
     conversation_id: str,
 ) -> list[RelatedDocumentModel]:
     table = _get_table_client(user_id)
-    related_documents: list[RelatedDocumentModel] = []
+    items: list[dict] = []
 
     last_evaluated_key = None
     while True:
@@ -376,23 +945,88 @@ def find_related_documents_by_conversation_id(
                 else {}
             ),
         )
-        related_documents.extend(
+        items.extend(response.get("Items") or [])
+
+        last_evaluated_key = response.get("LastEvaluatedKey")
+        if last_evaluated_key is None:
+            break
+
+    # NOTE: A body is read and decoded once for all the related documents referring to it
+    bodies = _find_related_document_bodies(
+        table,
+        user_id,
+        conversation_id,
+        list({item["ContentHash"] for item in items if "ContentHash" in item}),
+    )
+    contents: dict[str, ToolResultModel] = {}
+    related_documents: list[RelatedDocumentModel] = []
+    for item in items:
+        if "ContentHash" in item:
+            content_hash = item["ContentHash"]
+            if content_hash not in bodies:
+                logger.warning(f"Body of related document not found: {item['SK']}")
+                continue
+            if content_hash not in contents:
+                contents[content_hash] = _related_document_content_from_item(
+                    bodies[content_hash]
+                )
+            content = contents[content_hash]
+        else:
+            content = _related_document_content_from_item(item)
+
+        related_documents.append(
             RelatedDocumentModel(
-                content=TypeAdapter(ToolResultModel).validate_python(item["Content"]),
+                content=content,
                 source_id=decompose_related_document_source_id(composed_id=item["SK"]),
                 source_name=item["SourceName"],
                 source_link=item["SourceLink"],
             )
-            for item in response.get("Items") or []
         )
 
-        last_evaluated_key = response.get("LastEvaluatedKey")
-        if last_evaluated_key is None:
-            break
-
     return related_documents
 
 
+def find_related_document_page_by_conversation_id(
+    user_id: str,
+    conversation_id: str,
+    limit: int | None = None,
+    next_token: str | None = None,
+) -> tuple[list[RelatedDocumentMetaModel], str | None]:
+    """Find a page of the related documents of a conversation without their contents.
+    Bodies are not read, so that a page costs the same regardless of the size of contents,
+    except for related documents stored with the content before bodies were deduplicated.
+    The second element is the token of the next page, if any.
+    """
+    if limit is not None and limit < 1:
+        raise ValueError("Limit must be a positive integer")
+
+    table = _get_table_client(user_id)
+    query_params = {
+        "KeyConditionExpression": Key("PK").eq(user_id)
+        & Key("SK").begins_with(f"{user_id}#RELATED_DOCUMENT#{conversation_id}#"),
+        "ProjectionExpression": "SK, SourceName, SourceLink",
+        "ScanIndexForward": False,
+    }
+    if limit is not None:
+        query_params["Limit"] = limit
+    if next_token is not None:
+        exclusive_start_key = decode_next_token(next_token)
+        if exclusive_start_key.get("PK") != user_id:
+            raise ValueError(f"Invalid next token: {next_token}")
+        query_params["ExclusiveStartKey"] = exclusive_start_key
+
+    response = table.query(**query_params)
+    related_documents = [
+        RelatedDocumentMetaModel(
+            source_id=decompose_related_document_source_id(composed_id=item["SK"]),
+            source_name=item.get("SourceName"),
+            source_link=item.get("SourceLink"),
+        )
+        for item in response["Items"]
+    ]
+    return related_documents, encode_next_token(response.get("LastEvaluatedKey"))
+
+
 def find_related_document_by_id(
     user_id: str,
     conversation_id: str,
@@ -417,50 +1051,69 @@ def find_related_document_by_id(
         )
 
     item = response["Items"][0]
+    if "ContentHash" in item:
+        response = table.get_item(
+            Key={
+                "PK": user_id,
+                "SK": compose_related_document_body_id(
+                    user_id=user_id,
+                    conversation_id=conversation_id,
+                    content_hash=item["ContentHash"],
+                ),
+            }
+        )
+        if "Item" not in response:
+            raise RecordNotFoundError(
+                f"No related document found with id: {conversation_id}#{source_id}"
+            )
+        content = _related_document_content_from_item(response["Item"])
+    else:
+        content = _related_document_content_from_item(item)
+
     return RelatedDocumentModel(
-        content=TypeAdapter(ToolResultModel).validate_python(item["Content"]),
+        content=content,
         source_id=source_id,
         source_name=item["SourceName"],
         source_link=item["SourceLink"],
     )
 
 
-def delete_related_documents(user_id: str, conversation_id: str | None = None):
+def delete_related_documents(
+    user_id: str,
+    conversation_id: str | None = None,
+    on_progress: Callable[[BulkDeleteProgress], None] | None = None,
+) -> BulkDeleteProgress:
+    """Delete the related documents of the conversation, or of all conversations of the user.
+    `on_progress` is called with the total progress after each page.
+    """
     table = _get_table_client(user_id)
-    sort_keys: list[str] = []
+    total = BulkDeleteProgress()
 
-    last_evaluated_key = None
-    while True:
-        response = table.query(
-            KeyConditionExpression=(
-                Key("PK").eq(user_id)
-                & Key("SK").begins_with(
-                    f"{user_id}#RELATED_DOCUMENT#{conversation_id}#"
-                    if conversation_id
-                    else f"{user_id}#RELATED_DOCUMENT#"
-                )
-            ),
-            ProjectionExpression="SK",
-            ScanIndexForward=False,
-            **(
-                {
-                    "ExclusiveStartKey": last_evaluated_key,
-                }
-                if last_evaluated_key is not None
-                else {}
-            ),
-        )
-        sort_keys.extend(item["SK"] for item in response.get("Items") or [])
+    def report(progress: BulkDeleteProgress):
+        if on_progress is not None:
+            on_progress(total + progress)
 
-        last_evaluated_key = response.get("LastEvaluatedKey")
-        if last_evaluated_key is None:
-            break
+    if conversation_id:
+        # Related documents and their bodies
+        prefixes = [
+            f"{user_id}#RELATED_DOCUMENT#{conversation_id}#",
+            f"{user_id}#RELATED_DOCUMENT_BODY#{conversation_id}#",
+        ]
+    else:
+        prefixes = [f"{user_id}#RELATED_DOCUMENT"]
 
-    with table.batch_writer() as writer:
-        for sort_key in sort_keys:
-            writer.delete_item(
-                Key={
-                    "PK": user_id,
-                    "SK": sort_key,
-                },
-            )
+    for prefix in prefixes:
+        total += bulk_delete(
+            table,
+            {
+                "KeyConditionExpression": Key("PK").eq(user_id)
+                & Key("SK").begins_with(prefix),
+                "ProjectionExpression": "PK, SK, BodyPath",
+            },
+            object_key=lambda item: item.get("BodyPath"),
+            s3_client=s3_client,
+            bucket=LARGE_MESSAGE_BUCKET,
+            on_progress=report,
+        )
+
+    return total
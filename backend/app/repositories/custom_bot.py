@@ -1,24 +1,33 @@
 import asyncio
-import base64
+import contextvars
 import json
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from decimal import Decimal as decimal
 from functools import partial
-from typing import Literal
+from typing import Callable, Iterator, Literal
 
 import boto3
 from app.config import DEFAULT_GENERATION_CONFIG as DEFAULT_CLAUDE_GENERATION_CONFIG
 from app.config import DEFAULT_MISTRAL_GENERATION_CONFIG
+from app.logging_utils import log_payload
+from app.repositories.batch_write import backoff
+from app.repositories.bulk_delete import BulkDeleteProgress, bulk_delete
 from app.repositories.common import (
+    BOT_LIST_KEY_PREFIX,
     RecordNotFoundError,
     _get_table_client,
     _get_table_public_client,
     compose_bot_alias_id,
     compose_bot_id,
+    compose_bot_list_key,
     decompose_bot_alias_id,
     decompose_bot_id,
+    decode_next_token,
+    encode_next_token,
+    is_bot_alias_id,
 )
 from app.repositories.models.custom_bot import (
     ActiveModelsModel,
@@ -30,6 +39,7 @@ from app.repositories.models.custom_bot import (
     ConversationQuickStarterModel,
     GenerationParamsModel,
     KnowledgeModel,
+    PromptCachingModel,
 )
 from app.repositories.models.custom_bot_guardrails import BedrockGuardrailsModel
 from app.repositories.models.custom_bot_kb import BedrockKnowledgeBaseModel
@@ -40,6 +50,14 @@ from botocore.exceptions import ClientError
 
 TABLE_NAME = os.environ.get("TABLE_NAME", "")
 ENABLE_MISTRAL = os.environ.get("ENABLE_MISTRAL", "") == "true"
+PUBLIC_BOT_QUERY_CONCURRENCY = int(os.environ.get("PUBLIC_BOT_QUERY_CONCURRENCY", 8))
+ALIAS_SYNC_CONCURRENCY = int(os.environ.get("ALIAS_SYNC_CONCURRENCY", 8))
+# Set once `BotListKeyIndex` is active and backfilled. See `docs/migration/TABLE_INDEXES.md`.
+ENABLE_BOT_LIST_KEY_INDEX = (
+    os.environ.get("ENABLE_BOT_LIST_KEY_INDEX", "true") == "true"
+)
+BATCH_GET_SIZE = 100
+BATCH_GET_MAX_ATTEMPTS = 3
 
 DEFAULT_GENERATION_CONFIG = (
     DEFAULT_MISTRAL_GENERATION_CONFIG
@@ -65,7 +83,7 @@ class BotUpdateError(Exception):
 
 def store_bot(user_id: str, custom_bot: BotModel):
     table = _get_table_client(user_id)
-    logger.info(f"Storing bot: {custom_bot}")
+    log_payload(logger, "Storing bot: %s", custom_bot)
 
     item = {
         "PK": user_id,
@@ -75,6 +93,7 @@ def store_bot(user_id: str, custom_bot: BotModel):
         "Instruction": custom_bot.instruction,
         "CreateTime": decimal(custom_bot.create_time),
         "LastBotUsed": decimal(custom_bot.last_used_time),
+        "BotListKey": compose_bot_list_key(custom_bot.last_used_time),
         "IsPinned": custom_bot.is_pinned,
         "GenerationParams": custom_bot.generation_params.model_dump(),
         "AgentData": custom_bot.agent.model_dump(),
@@ -93,8 +112,12 @@ def store_bot(user_id: str, custom_bot: BotModel):
     }
     if custom_bot.bedrock_knowledge_base:
         item["BedrockKnowledgeBase"] = custom_bot.bedrock_knowledge_base.model_dump()
+        # NOTE: Flag projected to `BotListKeyIndex` instead of the knowledge base
+        item["HasBedrockKnowledgeBase"] = True
     if custom_bot.bedrock_guardrails:
         item["GuardrailsParams"] = custom_bot.bedrock_guardrails.model_dump()
+    if custom_bot.prompt_caching:
+        item["PromptCaching"] = custom_bot.prompt_caching.model_dump()
 
     response = table.put_item(Item=item)
     return response
@@ -116,9 +139,13 @@ def update_bot(
     conversation_quick_starters: list[ConversationQuickStarterModel],
     bedrock_knowledge_base: BedrockKnowledgeBaseModel | None = None,
     bedrock_guardrails: BedrockGuardrailsModel | None = None,
+    prompt_caching: PromptCachingModel | None = None,
+    reset_prompt_caching: bool = False,
 ):
     """Update bot title, description, and instruction.
     NOTE: Use `update_bot_visibility` to update visibility.
+    :param prompt_caching: `None` keeps the current policy.
+    :param reset_prompt_caching: Remove the policy of the bot, so that the default is used.
     """
     table = _get_table_client(user_id)
     logger.info(f"Updating bot: {bot_id}")
@@ -153,10 +180,14 @@ def update_bot(
         ":active_models": active_models.model_dump(),  # type: ignore[attr-defined]
     }
     if bedrock_knowledge_base:
-        update_expression += ", BedrockKnowledgeBase = :bedrock_knowledge_base"
+        update_expression += (
+            ", BedrockKnowledgeBase = :bedrock_knowledge_base"
+            ", HasBedrockKnowledgeBase = :has_bedrock_knowledge_base"
+        )
         expression_attribute_values[":bedrock_knowledge_base"] = (
             bedrock_knowledge_base.model_dump()
         )
+        expression_attribute_values[":has_bedrock_knowledge_base"] = True
 
     if bedrock_guardrails:
         update_expression += ", GuardrailsParams = :bedrock_guardrails"
@@ -164,6 +195,12 @@ def update_bot(
             bedrock_guardrails.model_dump()
         )
 
+    if prompt_caching:
+        update_expression += ", PromptCaching = :prompt_caching"
+        expression_attribute_values[":prompt_caching"] = prompt_caching.model_dump()
+    elif reset_prompt_caching:
+        update_expression += " REMOVE PromptCaching"
+
     try:
         response = table.update_item(
             Key={"PK": user_id, "SK": compose_bot_id(user_id, bot_id)},
@@ -183,7 +220,7 @@ def update_bot(
 
 def store_alias(user_id: str, alias: BotAliasModel):
     table = _get_table_client(user_id)
-    logger.info(f"Storing alias: {alias}")
+    log_payload(logger, "Storing alias: %s", alias)
 
     item = {
         "PK": user_id,
@@ -193,6 +230,7 @@ def store_alias(user_id: str, alias: BotAliasModel):
         "OriginalBotId": alias.original_bot_id,
         "CreateTime": decimal(alias.create_time),
         "LastBotUsed": decimal(alias.last_used_time),
+        "BotListKey": compose_bot_list_key(alias.last_used_time, is_alias=True),
         "IsPinned": alias.is_pinned,
         "SyncStatus": alias.sync_status,
         "HasKnowledge": alias.has_knowledge,
@@ -202,20 +240,121 @@ def store_alias(user_id: str, alias: BotAliasModel):
         ],
         "ActiveModels": alias.active_models.model_dump(),  # type: ignore[attr-defined]
     }
+    if alias.original_bot_owner_user_id is not None:
+        item["OriginalBotOwnerUserId"] = alias.original_bot_owner_user_id
 
     response = table.put_item(Item=item)
     return response
 
 
+def is_alias_drifted(alias_item: dict, bot: BotModel) -> bool:
+    """Whether the alias item differs from its original bot."""
+    # NOTE: Compare as stored, since models are not equal to dicts
+    return (
+        bot.title != alias_item["Title"]
+        or bot.description != alias_item["Description"]
+        or bot.sync_status != alias_item["SyncStatus"]
+        or bot.has_knowledge() != alias_item["HasKnowledge"]
+        or bot.is_agent_enabled() != alias_item.get("HasAgent", False)
+        or [starter.model_dump() for starter in bot.conversation_quick_starters]
+        != alias_item.get("ConversationQuickStarters", [])
+        or bot.active_models.model_dump() != alias_item.get("ActiveModels")  # type: ignore[attr-defined]
+        or bot.owner_user_id != alias_item.get("OriginalBotOwnerUserId")
+    )
+
+
+def alias_sync_values(bot: BotModel) -> dict:
+    """Attributes of the bot copied to its aliases, as stored."""
+    return {
+        "Title": bot.title,
+        "Description": bot.description,
+        "SyncStatus": bot.sync_status,
+        "HasKnowledge": bot.has_knowledge(),
+        "HasAgent": bot.is_agent_enabled(),
+        "ConversationQuickStarters": [
+            starter.model_dump() for starter in bot.conversation_quick_starters
+        ],
+        "ActiveModels": bot.active_models.model_dump(),  # type: ignore[attr-defined]
+        "OriginalBotOwnerUserId": bot.owner_user_id,
+    }
+
+
+def _update_alias_from_original_bot(
+    client, table_name: str, user_id: str, alias_id: str, bot: BotModel
+) -> bool:
+    logger.info(f"Updating alias {alias_id} of user {user_id} from bot {bot.id}")
+    values = alias_sync_values(bot)
+    try:
+        client.update_item(
+            TableName=table_name,
+            Key={"PK": user_id, "SK": compose_bot_alias_id(user_id, alias_id)},
+            UpdateExpression="SET " + ", ".join(f"{name} = :{name}" for name in values),
+            ExpressionAttributeValues={
+                f":{name}": value for name, value in values.items()
+            },
+            ConditionExpression="attribute_exists(PK) AND attribute_exists(SK)",
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            logger.info(f"Alias {alias_id} of user {user_id} has been removed")
+            return False
+        raise
+    return True
+
+
+def sync_aliases_with_original_bot(bot: BotModel) -> int:
+    """Update all aliases of the public bot differing from it.
+    Aliases are found on `OriginalBotIdIndex` page by page, and the aliases of a page
+    are updated in parallel. Returns the number of updated aliases.
+    """
+    # Use public client to update aliases of all users
+    table = _get_table_public_client()
+    # NOTE: Clients are thread safe unlike resources
+    client = table.meta.client
+    query_params = {
+        "IndexName": "OriginalBotIdIndex",
+        "KeyConditionExpression": Key("OriginalBotId").eq(bot.id),
+    }
+
+    def update(alias_item: dict) -> bool:
+        return _update_alias_from_original_bot(
+            client,
+            table.name,
+            alias_item["PK"],
+            decompose_bot_alias_id(alias_item["SK"]),
+            bot,
+        )
+
+    updated = 0
+    with ThreadPoolExecutor(max_workers=ALIAS_SYNC_CONCURRENCY) as executor:
+        while True:
+            response = table.query(**query_params)
+            drifted = [
+                item for item in response["Items"] if is_alias_drifted(item, bot)
+            ]
+            updated += sum(executor.map(update, drifted))
+
+            if "LastEvaluatedKey" not in response:
+                break
+            query_params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    logger.info(f"Updated {updated} aliases of bot: {bot.id}")
+    return updated
+
+
 def update_bot_last_used_time(user_id: str, bot_id: str):
     """Update last used time for bot."""
     table = _get_table_client(user_id)
     logger.info(f"Updating last used time for bot: {bot_id}")
+    last_used_time = get_current_time()
     try:
         response = table.update_item(
             Key={"PK": user_id, "SK": compose_bot_id(user_id, bot_id)},
-            UpdateExpression="SET LastBotUsed = :val",
-            ExpressionAttributeValues={":val": decimal(get_current_time())},
+            UpdateExpression="SET LastBotUsed = :val, BotListKey = :list_key",
+            ExpressionAttributeValues={
+                ":val": decimal(last_used_time),
+                ":list_key": compose_bot_list_key(last_used_time),
+            },
             ConditionExpression="attribute_exists(PK) AND attribute_exists(SK)",
         )
     except ClientError as e:
@@ -230,11 +369,15 @@ def update_alias_last_used_time(user_id: str, alias_id: str):
     """Update last used time for alias."""
     table = _get_table_client(user_id)
     logger.info(f"Updating last used time for alias: {alias_id}")
+    last_used_time = get_current_time()
     try:
         response = table.update_item(
             Key={"PK": user_id, "SK": compose_bot_alias_id(user_id, alias_id)},
-            UpdateExpression="SET LastBotUsed = :val",
-            ExpressionAttributeValues={":val": decimal(get_current_time())},
+            UpdateExpression="SET LastBotUsed = :val, BotListKey = :list_key",
+            ExpressionAttributeValues={
+                ":val": decimal(last_used_time),
+                ":list_key": compose_bot_list_key(last_used_time, is_alias=True),
+            },
             ConditionExpression="attribute_exists(PK) AND attribute_exists(SK)",
         )
     except ClientError as e:
@@ -337,84 +480,193 @@ def update_guardrails_params(
     return response
 
 
+def _private_bot_meta_from_item(item: dict) -> BotMeta:
+    return BotMeta(
+        id=decompose_bot_id(item["SK"]),
+        title=item["Title"],
+        create_time=float(item["CreateTime"]),
+        last_used_time=float(item["LastBotUsed"]),
+        owned=True,
+        available=True,
+        is_pinned=item["IsPinned"],
+        description=item["Description"],
+        is_public="PublicBotId" in item,
+        sync_status=item["SyncStatus"],
+        # NOTE: Bots not backfilled yet have only the knowledge base
+        has_bedrock_knowledge_base=item.get("HasBedrockKnowledgeBase", False)
+        or bool(item.get("BedrockKnowledgeBase")),
+    )
+
+
+def find_private_bot_page_by_user_id(
+    user_id: str, limit: int | None = None, next_token: str | None = None
+) -> tuple[list[BotMeta], str | None]:
+    """Find a page of the private bots owned by user.
+    This does not include public bots.
+    The order is descending by `last_used_time`.
+    Aliases are separated by the prefix of `BotListKey`, so that `limit` is evaluated by
+    DynamoDB and the page reads only the projected attributes of `BotListKeyIndex`.
+    The second element is the token of the next page, if any.
+    Until `BotListKeyIndex` is enabled, `LastBotUsedIndex` is queried instead and aliases
+    are filtered out after `limit` is evaluated, so pages may be shorter.
+    """
+    if limit is not None and limit < 1:
+        raise ValueError("Limit must be a positive integer")
+
+    table = _get_table_client(user_id)
+    logger.info(f"Finding bots for user: {user_id}")
+
+    if ENABLE_BOT_LIST_KEY_INDEX:
+        query_params = {
+            "IndexName": "BotListKeyIndex",
+            "KeyConditionExpression": Key("PK").eq(user_id)
+            & Key("BotListKey").begins_with(BOT_LIST_KEY_PREFIX),
+            "ScanIndexForward": False,
+        }
+    else:
+        query_params = {
+            "IndexName": "LastBotUsedIndex",
+            "KeyConditionExpression": Key("PK").eq(user_id),
+            "ScanIndexForward": False,
+            # NOTE: Filter out alias bots (public shared bots)
+            "FilterExpression": Attr("OriginalBotId").not_exists()
+            | Attr("OriginalBotId").eq(""),
+        }
+    if limit is not None:
+        query_params["Limit"] = limit
+    if next_token is not None:
+        exclusive_start_key = decode_next_token(next_token)
+        if exclusive_start_key.get("PK") != user_id:
+            raise ValueError(f"Invalid next token: {next_token}")
+        query_params["ExclusiveStartKey"] = exclusive_start_key
+
+    response = table.query(**query_params)
+    bots = [_private_bot_meta_from_item(item) for item in response["Items"]]
+    return bots, encode_next_token(response.get("LastEvaluatedKey"))
+
+
 def find_private_bots_by_user_id(
     user_id: str, limit: int | None = None
 ) -> list[BotMeta]:
     """Find all private bots owned by user.
     This does not include public bots.
     The order is descending by `last_used_time`.
+    If `limit` is specified, only the first n bots are returned.
     """
-    table = _get_table_client(user_id)
-    logger.info(f"Finding bots for user: {user_id}")
+    bots: list[BotMeta] = []
+    next_token = None
+    while True:
+        page, next_token = find_private_bot_page_by_user_id(
+            user_id,
+            limit=limit - len(bots) if limit else None,
+            next_token=next_token,
+        )
+        bots.extend(page)
+        if next_token is None or (limit and len(bots) >= limit):
+            break
 
-    query_params = {
+    log_payload(logger, "Found all private bots: %s", bots)
+    return bots
+
+
+def find_bots_without_list_key(table) -> Iterator[list[dict]]:
+    """Yield pages of the bots and aliases stored without `BotListKey`, which are not
+    listed by `find_private_bot_page_by_user_id`.
+    `table` must not have row-level access, since all users are scanned.
+    """
+    scan_params = {
+        # NOTE: Sparse index of bots and aliases
         "IndexName": "LastBotUsedIndex",
-        "KeyConditionExpression": Key("PK").eq(user_id),
-        "ScanIndexForward": False,
-        # NOTE: Filter out alias bots (public shared bots)
-        "FilterExpression": Attr("OriginalBotId").not_exists()
-        | Attr("OriginalBotId").eq(""),
+        "ProjectionExpression": "PK, SK, LastBotUsed, BedrockKnowledgeBase",
+        "FilterExpression": Attr("BotListKey").not_exists(),
     }
+    while True:
+        response = table.scan(**scan_params)
+        yield response.get("Items", [])
 
-    response = table.query(**query_params)
-    bots = [
-        BotMeta(
-            id=decompose_bot_id(item["SK"]),
-            title=item["Title"],
-            create_time=float(item["CreateTime"]),
-            last_used_time=float(item["LastBotUsed"]),
-            owned=True,
-            available=True,
-            is_pinned=item["IsPinned"],
-            description=item["Description"],
-            is_public="PublicBotId" in item,
-            sync_status=item["SyncStatus"],
-            has_bedrock_knowledge_base=(
-                True if item.get("BedrockKnowledgeBase", None) else False
-            ),
+        if "LastEvaluatedKey" not in response:
+            break
+        scan_params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def store_bot_list_key(table, item: dict) -> bool:
+    """Store `BotListKey` of an item found by `find_bots_without_list_key`.
+    Returns False if the key was stored in the meantime, or the item was deleted.
+    """
+    update_expression = "SET BotListKey = :list_key"
+    expression_attribute_values = {
+        ":list_key": compose_bot_list_key(
+            item["LastBotUsed"], is_alias=is_bot_alias_id(item["SK"])
         )
-        for item in response["Items"]
-    ]
+    }
+    if item.get("BedrockKnowledgeBase"):
+        update_expression += ", HasBedrockKnowledgeBase = :true"
+        expression_attribute_values[":true"] = True
 
-    query_count = 1
-    MAX_QUERY_COUNT = 5
-    while "LastEvaluatedKey" in response:
-        query_params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
-        response = table.query(**query_params)
-        bots.extend(
-            [
-                BotMeta(
-                    id=decompose_bot_id(item["SK"]),
-                    title=item["Title"],
-                    create_time=float(item["CreateTime"]),
-                    last_used_time=float(item["LastBotUsed"]),
-                    owned=True,
-                    available=True,
-                    is_pinned=item["IsPinned"],
-                    description=item["Description"],
-                    is_public="PublicBotId" in item,
-                    sync_status=item["SyncStatus"],
-                    has_bedrock_knowledge_base=(
-                        True if item.get("BedrockKnowledgeBase", None) else False
-                    ),
-                )
-                for item in response["Items"]
-            ]
+    try:
+        table.update_item(
+            Key={"PK": item["PK"], "SK": item["SK"]},
+            UpdateExpression=update_expression,
+            ExpressionAttributeValues=expression_attribute_values,
+            ConditionExpression=(
+                "attribute_exists(PK) AND attribute_not_exists(BotListKey)"
+            ),
         )
-        query_count += 1
-        if limit and len(bots) >= limit:
-            # NOTE: `Limit` in query params is evaluated after filter expression.
-            # So limit manually here.
-            break
-        if query_count > MAX_QUERY_COUNT:
-            logger.warning(f"Query count exceeded {MAX_QUERY_COUNT}")
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return False
+        raise e
+    return True
+
+
+def find_aliases_without_original_bot_owner(table) -> Iterator[list[dict]]:
+    """Yield pages of the aliases stored without `OriginalBotOwnerUserId`, whose
+    original bots are not read by their keys in `find_original_bots_by_ids`.
+    `table` must not have row-level access, since all users are scanned.
+    """
+    scan_params = {
+        # NOTE: Sparse index of bots and aliases
+        "IndexName": "LastBotUsedIndex",
+        "ProjectionExpression": "PK, SK, OriginalBotId",
+        "FilterExpression": Attr("SK").contains("#BOT_ALIAS#")
+        & Attr("OriginalBotOwnerUserId").not_exists(),
+    }
+    while True:
+        response = table.scan(**scan_params)
+        yield response.get("Items", [])
+
+        if "LastEvaluatedKey" not in response:
             break
+        scan_params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
 
-    if limit:
-        bots = bots[:limit]
 
-    logger.info(f"Found all private bots: {bots}")
-    return bots
+def store_original_bot_owner(table, item: dict) -> bool:
+    """Store `OriginalBotOwnerUserId` of an alias found by
+    `find_aliases_without_original_bot_owner`.
+    Returns False if the original bot is removed or no longer public, the owner was
+    stored in the meantime, or the alias was deleted.
+    """
+    response = table.query(
+        IndexName="PublicBotIdIndex",
+        KeyConditionExpression=Key("PublicBotId").eq(item["OriginalBotId"]),
+    )
+    if len(response["Items"]) == 0:
+        return False
+
+    try:
+        table.update_item(
+            Key={"PK": item["PK"], "SK": item["SK"]},
+            UpdateExpression="SET OriginalBotOwnerUserId = :owner_user_id",
+            ExpressionAttributeValues={":owner_user_id": response["Items"][0]["PK"]},
+            ConditionExpression=(
+                "attribute_exists(PK) AND attribute_not_exists(OriginalBotOwnerUserId)"
+            ),
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return False
+        raise e
+    return True
 
 
 def find_private_bot_by_id(user_id: str, bot_id: str) -> BotModel:
@@ -491,26 +743,20 @@ def find_private_bot_by_id(user_id: str, bot_id: str) -> BotModel:
             else None
         ),
         active_models=ActiveModelsModel.model_validate(item.get("ActiveModels", {})),
+        prompt_caching=(
+            PromptCachingModel(**item["PromptCaching"])
+            if "PromptCaching" in item
+            else None
+        ),
     )
 
-    logger.info(f"Found bot: {bot}")
+    log_payload(logger, "Found bot: %s", bot)
     return bot
 
 
-def find_public_bot_by_id(bot_id: str) -> BotModel:
-    """Find public bot by id."""
-    table = _get_table_public_client()  # Use public client
-    logger.info(f"Finding public bot with id: {bot_id}")
-    response = table.query(
-        IndexName="PublicBotIdIndex",
-        KeyConditionExpression=Key("PublicBotId").eq(bot_id),
-    )
-    if len(response["Items"]) == 0:
-        raise RecordNotFoundError(f"Public bot with id {bot_id} not found")
-
-    item = response["Items"][0]
-
-    bot = BotModel(
+def public_bot_from_item(item: dict) -> BotModel:
+    """Convert an item of a public bot, e.g. the image of a stream record."""
+    return BotModel(
         id=decompose_bot_id(item["SK"]),
         title=item["Title"],
         description=item["Description"],
@@ -569,11 +815,101 @@ def find_public_bot_by_id(bot_id: str) -> BotModel:
             else None
         ),
         active_models=ActiveModelsModel.model_validate(item.get("ActiveModels")),
+        prompt_caching=(
+            PromptCachingModel(**item["PromptCaching"])
+            if "PromptCaching" in item
+            else None
+        ),
+    )
+
+
+def find_public_bot_by_id(bot_id: str) -> BotModel:
+    """Find public bot by id."""
+    table = _get_table_public_client()  # Use public client
+    logger.info(f"Finding public bot with id: {bot_id}")
+    response = table.query(
+        IndexName="PublicBotIdIndex",
+        KeyConditionExpression=Key("PublicBotId").eq(bot_id),
     )
-    logger.info(f"Found public bot: {bot}")
+    if len(response["Items"]) == 0:
+        raise RecordNotFoundError(f"Public bot with id {bot_id} not found")
+
+    item = response["Items"][0]
+
+    bot = public_bot_from_item(item)
+    log_payload(logger, "Found public bot: %s", bot)
     return bot
 
 
+def find_original_bots_by_ids(
+    bot_ids: list[str], owner_user_ids: dict[str, str] | None = None
+) -> dict[str, BotModel]:
+    """Find the original bots of aliases, which are public bots, by ids.
+    Bots not found or no longer public are omitted.
+    Bots of known owners (`owner_user_ids` by bot id) are read by their keys with
+    `BatchGetItem`. The others are queried on `PublicBotIdIndex` in parallel.
+    """
+    owner_user_ids = owner_user_ids or {}
+    table = _get_table_public_client()  # Use public client
+    # NOTE: Clients are thread safe unlike resources
+    client = table.meta.client
+    logger.info(f"Finding public bots with ids: {bot_ids}")
+
+    items: list[dict] = []
+    keys: list[dict] = []
+    query_bot_ids: list[str] = []
+    for bot_id in dict.fromkeys(bot_ids):
+        if bot_id in owner_user_ids:
+            owner_user_id = owner_user_ids[bot_id]
+            keys.append(
+                {"PK": owner_user_id, "SK": compose_bot_id(owner_user_id, bot_id)}
+            )
+        else:
+            query_bot_ids.append(bot_id)
+    for i in range(0, len(keys), BATCH_GET_SIZE):
+        request_items = {table.name: {"Keys": keys[i : i + BATCH_GET_SIZE]}}
+        for attempt in range(BATCH_GET_MAX_ATTEMPTS):
+            if attempt > 0:
+                backoff(attempt)
+            response = client.batch_get_item(RequestItems=request_items)
+            items.extend(response["Responses"].get(table.name, []))
+            request_items = response.get("UnprocessedKeys")
+            if not request_items:
+                break
+        else:
+            # Not to report the bots as removed
+            query_bot_ids.extend(
+                decompose_bot_id(key["SK"]) for key in request_items[table.name]["Keys"]
+            )
+
+    def query(bot_id: str) -> list[dict]:
+        return client.query(
+            TableName=table.name,
+            IndexName="PublicBotIdIndex",
+            KeyConditionExpression=Key("PublicBotId").eq(bot_id),
+        )["Items"]
+
+    if query_bot_ids:
+        with ThreadPoolExecutor(
+            max_workers=min(PUBLIC_BOT_QUERY_CONCURRENCY, len(query_bot_ids))
+        ) as executor:
+            # NOTE: Context variables (e.g. the current tracing span) are propagated
+            futures = [
+                executor.submit(contextvars.copy_context().run, query, bot_id)
+                for bot_id in query_bot_ids
+            ]
+            for future in futures:
+                items.extend(future.result())
+
+    bots = {}
+    for item in items:
+        bot_id = decompose_bot_id(item["SK"])
+        # NOTE: Items read by keys may be private now
+        if item.get("PublicBotId") == bot_id:
+            bots[bot_id] = public_bot_from_item(item)
+    return bots
+
+
 def find_alias_by_id(user_id: str, alias_id: str) -> BotAliasModel:
     """Find alias bot by id."""
     table = _get_table_client(user_id)
@@ -599,9 +935,10 @@ def find_alias_by_id(user_id: str, alias_id: str) -> BotAliasModel:
         has_agent=item.get("HasAgent", False),
         conversation_quick_starters=item.get("ConversationQuickStarters", []),
         active_models=ActiveModelsModel.model_validate(item.get("ActiveModels")),
+        original_bot_owner_user_id=item.get("OriginalBotOwnerUserId"),
     )
 
-    logger.info(f"Found alias: {bot}")
+    log_payload(logger, "Found alias: %s", bot)
     return bot
 
 
@@ -725,6 +1062,86 @@ def delete_alias_by_id(user_id: str, bot_id: str):
     return response
 
 
+def find_alias_holder_page(
+    bot_id: str, limit: int | None = None, next_token: str | None = None
+) -> tuple[list[str], str | None]:
+    """Find a page of the users having an alias of the bot, ordered by user id.
+    `OriginalBotIdIndex` is maintained by DynamoDB as aliases are stored and deleted
+    (`store_alias` / `delete_alias_by_id`). The second element is the token of the next
+    page, if any.
+    """
+    if limit is not None and limit < 1:
+        raise ValueError("Limit must be a positive integer")
+
+    table = _get_table_public_client()  # Use public client
+    query_params = {
+        "IndexName": "OriginalBotIdIndex",
+        "KeyConditionExpression": Key("OriginalBotId").eq(bot_id),
+        "ProjectionExpression": "PK",
+    }
+    if limit is not None:
+        query_params["Limit"] = limit
+    if next_token is not None:
+        exclusive_start_key = decode_next_token(next_token)
+        if exclusive_start_key.get("OriginalBotId") != bot_id:
+            raise ValueError(f"Invalid next token: {next_token}")
+        query_params["ExclusiveStartKey"] = exclusive_start_key
+
+    response = table.query(**query_params)
+    user_ids = [item["PK"] for item in response["Items"]]
+    return user_ids, encode_next_token(response.get("LastEvaluatedKey"))
+
+
+def find_alias_holders(
+    bot_id: str, page_size: int | None = None
+) -> Iterator[list[str]]:
+    """Yield the users having an alias of the bot page by page."""
+    next_token = None
+    while True:
+        user_ids, next_token = find_alias_holder_page(
+            bot_id, limit=page_size, next_token=next_token
+        )
+        if user_ids:
+            yield user_ids
+        if next_token is None:
+            break
+
+
+def count_alias_holders(bot_id: str) -> int:
+    """Count the users having an alias of the bot."""
+    table = _get_table_public_client()  # Use public client
+    query_params = {
+        "IndexName": "OriginalBotIdIndex",
+        "KeyConditionExpression": Key("OriginalBotId").eq(bot_id),
+        "Select": "COUNT",
+    }
+    count = 0
+    while True:
+        response = table.query(**query_params)
+        count += response["Count"]
+        if "LastEvaluatedKey" not in response:
+            return count
+        query_params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def delete_aliases_by_original_bot_id(
+    bot_id: str,
+    on_progress: Callable[[BulkDeleteProgress], None] | None = None,
+) -> BulkDeleteProgress:
+    """Delete the aliases of the bot of all users, e.g. after the bot is removed."""
+    table = _get_table_public_client()  # Use public client
+    logger.info(f"Deleting aliases of bot: {bot_id}")
+    return bulk_delete(
+        table,
+        {
+            "IndexName": "OriginalBotIdIndex",
+            "KeyConditionExpression": Key("OriginalBotId").eq(bot_id),
+            "ProjectionExpression": "PK, SK",
+        },
+        on_progress=on_progress,
+    )
+
+
 async def find_public_bots_by_ids(bot_ids: list[str]) -> list[BotMetaWithStackInfo]:
     """Find all public bots by ids. This method is intended for administrator use."""
     table = _get_table_public_client()
@@ -783,9 +1200,7 @@ def find_all_published_bots(
         "Limit": limit,
     }
     if next_token:
-        query_params["ExclusiveStartKey"] = json.loads(
-            base64.b64decode(next_token).decode("utf-8")
-        )
+        query_params["ExclusiveStartKey"] = decode_next_token(next_token)
 
     response = table.scan(**query_params)
 
@@ -811,10 +1226,4 @@ def find_all_published_bots(
         for item in response["Items"]
     ]
 
-    next_token = None
-    if "LastEvaluatedKey" in response:
-        next_token = base64.b64encode(
-            json.dumps(response["LastEvaluatedKey"]).encode("utf-8")
-        ).decode("utf-8")
-
-    return bots, next_token
+    return bots, encode_next_token(response.get("LastEvaluatedKey"))
@@ -1,4 +1,4 @@
-import base64
+import binascii
 from decimal import Decimal
 from typing import Annotated, Any, Dict, List, Type, get_args
 
@@ -15,16 +15,26 @@ Float = Annotated[
 
 
 def decode_base64_string(value: Any) -> bytes:
+    # NOTE: Raw bytes are kept as they are, so that a body decoded once is passed around
+    # by reference and only encoded again at the storage / API boundary.
     if type(value) == bytes:
         return value
 
+    elif type(value) in (bytearray, memoryview):
+        return bytes(value)
+
     elif type(value) == str:
-        return base64.b64decode(value)
+        return binascii.a2b_base64(value)
 
     else:
         raise ValueError(f"Invalid value type: {type(value)}")
 
 
+def encode_base64_bytes(value: bytes) -> str:
+    # `b2a_base64` without newline saves the copies made by `b64encode().decode().strip()`
+    return binascii.b2a_base64(value, newline=False).decode("ascii")
+
+
 Base64EncodedBytes = Annotated[
     bytes,
     PlainValidator(
@@ -32,7 +42,7 @@ Base64EncodedBytes = Annotated[
         json_schema_input_type=str,
     ),
     PlainSerializer(
-        func=lambda v: base64.b64encode(v).decode().strip(),
+        func=encode_base64_bytes,
         return_type=str,
     ),
 ]
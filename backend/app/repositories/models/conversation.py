@@ -5,16 +5,20 @@ from pathlib import Path
 from typing import Annotated, Any, Literal, Self, TypedDict, TypeGuard
 from urllib.parse import urlparse
 
+from app.repositories.bulk_delete import BulkDeleteProgress
 from app.repositories.models.common import Base64EncodedBytes
 from app.routes.schemas.conversation import (
     AttachmentContent,
     Content,
+    ConversationDeletionOutput,
+    ConversationDeletionProgress,
     DocumentToolResult,
     ImageContent,
     ImageToolResult,
     JsonToolResult,
     MessageInput,
     RelatedDocument,
+    RelatedDocumentMeta,
     SimpleMessage,
     TextContent,
     TextToolResult,
@@ -23,6 +27,7 @@ from app.routes.schemas.conversation import (
     ToolResultContentBody,
     ToolUseContent,
     ToolUseContentBody,
+    type_conversation_deletion_status,
     type_model_name,
 )
 from app.utils import generate_presigned_url
@@ -34,7 +39,14 @@ from mypy_boto3_bedrock_runtime.type_defs import (
     ToolUseBlockOutputTypeDef,
     ToolUseBlockTypeDef,
 )
-from pydantic import BaseModel, Discriminator, Field, JsonValue, field_validator
+from pydantic import (
+    BaseModel,
+    Discriminator,
+    Field,
+    JsonValue,
+    computed_field,
+    field_validator,
+)
 
 
 class TextContentModel(BaseModel):
@@ -587,15 +599,33 @@ class MessageModel(BaseModel):
         )
 
 
+class CostLedgerEntryModel(BaseModel):
+    """Token usage and price of a single model invocation."""
+
+    # ID of the user message which started the turn.
+    message_id: str
+    model: type_model_name
+    input_tokens: int
+    output_tokens: int
+    cache_read_input_tokens: int = 0
+    cache_write_input_tokens: int = 0
+    price: float
+
+
 class ConversationModel(BaseModel):
     id: str
     create_time: float
     title: str
-    total_price: float
     message_map: dict[str, MessageModel]
     last_message_id: str
     bot_id: str | None
     should_continue: bool
+    cost_ledger: list[CostLedgerEntryModel] = []
+
+    @computed_field  # type: ignore[misc]
+    @property
+    def total_price(self) -> float:
+        return sum(entry.price for entry in self.cost_ledger)
 
 
 class ConversationMeta(BaseModel):
@@ -604,6 +634,61 @@ class ConversationMeta(BaseModel):
     create_time: float
     model: str
     bot_id: str | None
+    # NOTE: `None` for conversations not written since `LastMessageTime` was introduced
+    last_message_time: float | None = None
+
+
+class ConversationDeletionModel(BaseModel):
+    """Deletion of all conversations of a user, run by `app/conversation_deleter.py`."""
+
+    status: type_conversation_deletion_status
+    progress: BulkDeleteProgress
+    update_time: float
+
+    def to_schema(self) -> ConversationDeletionOutput:
+        return ConversationDeletionOutput(
+            status=self.status,
+            progress=ConversationDeletionProgress(
+                deleted_items=self.progress.deleted_items,
+                deleted_objects=self.progress.deleted_objects,
+                failed_items=self.progress.failed_items,
+                failed_objects=self.progress.failed_objects,
+            ),
+            update_time=self.update_time,
+        )
+
+
+def _source_link_for_schema(source_link: str | None) -> str | None:
+    if source_link is None:
+        return None
+
+    url = urlparse(url=source_link)
+    if url.scheme == "s3":
+        # NOTE: URLs are memoized, so the same documents get the same URLs for a while
+        return generate_presigned_url(
+            bucket=url.netloc,
+            key=url.path.removeprefix("/"),
+            client_method="get_object",
+        )
+
+    else:
+        # Return the source as is for knowledge base references
+        return source_link
+
+
+class RelatedDocumentMetaModel(BaseModel):
+    """Related document without the content, to list the documents of a conversation."""
+
+    source_id: str
+    source_name: str | None = None
+    source_link: str | None = None
+
+    def to_schema(self) -> RelatedDocumentMeta:
+        return RelatedDocumentMeta(
+            source_id=self.source_id,
+            source_name=self.source_name,
+            source_link=_source_link_for_schema(self.source_link),
+        )
 
 
 class RelatedDocumentModel(BaseModel):
@@ -641,21 +726,7 @@ class RelatedDocumentModel(BaseModel):
             return self.content
 
     def get_source_link_for_schema(self) -> str | None:
-        if self.source_link is None:
-            return None
-
-        url = urlparse(url=self.source_link)
-        if url.scheme == "s3":
-            source_link = generate_presigned_url(
-                bucket=url.netloc,
-                key=url.path.removeprefix("/"),
-                client_method="get_object",
-            )
-            return source_link
-
-        else:
-            # Return the source as is for knowledge base references
-            return self.source_link
+        return _source_link_for_schema(self.source_link)
 
     def to_schema(self) -> RelatedDocument:
         return RelatedDocument(
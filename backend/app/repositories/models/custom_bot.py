@@ -55,6 +55,12 @@ class GenerationParamsModel(BaseModel):
     stop_sequences: list[str]
 
 
+class PromptCachingModel(BaseModel):
+    cache_system: bool
+    cache_messages: bool
+    cache_tools: bool
+
+
 class AgentToolModel(BaseModel):
     name: str
     description: str
@@ -94,6 +100,8 @@ class BotModel(BaseModel):
     bedrock_knowledge_base: BedrockKnowledgeBaseModel | None
     bedrock_guardrails: BedrockGuardrailsModel | None
     active_models: ActiveModelsModel  # type: ignore
+    # NOTE: `None` means the default caching policy is applied.
+    prompt_caching: PromptCachingModel | None = None
 
     def has_knowledge(self) -> bool:
         return (
@@ -126,6 +134,8 @@ class BotAliasModel(BaseModel):
     has_agent: bool
     conversation_quick_starters: list[ConversationQuickStarterModel]
     active_models: ActiveModelsModel  # type: ignore
+    # NOTE: `None` for aliases stored before the owner was recorded
+    original_bot_owner_user_id: str | None = None
 
 
 class BotMeta(BaseModel):
@@ -1,6 +1,7 @@
 from typing import Any, Dict, Literal
 
 from app.dependencies import check_creating_bot_allowed
+from app.repositories.common import NEXT_TOKEN_HEADER
 from app.repositories.custom_bot import (
     find_private_bot_by_id,
     find_private_bots_by_user_id,
@@ -23,6 +24,7 @@ from app.routes.schemas.bot import (
     ConversationQuickStarter,
     GenerationParams,
     Knowledge,
+    PromptCaching,
 )
 from app.routes.schemas.conversation import type_model_name
 from app.usecases.bot import (
@@ -31,6 +33,7 @@ from app.usecases.bot import (
     fetch_all_bots_by_user_id,
     fetch_available_agent_tools,
     fetch_bot_summary,
+    fetch_private_bot_page,
     issue_presigned_url,
     modify_owned_bot,
     modify_pin_status,
@@ -38,7 +41,7 @@ from app.usecases.bot import (
     remove_uploaded_file,
 )
 from app.user import User
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, Request, Response
 
 router = APIRouter(tags=["bot"])
 
@@ -80,13 +83,17 @@ def patch_bot_visibility(
 @router.get("/bot", response_model=list[BotMetaOutput])
 def get_all_bots(
     request: Request,
+    response: Response,
     kind: Literal["private", "mixed"] = "private",
     pinned: bool = False,
     limit: int | None = None,
+    next_token: str | None = None,
 ):
     """Get all bots. The order is descending by `last_used_time`.
     - If `kind` is `private`, only private bots will be returned.
         - If `mixed` must give either `pinned` or `limit`.
+        - If `private` and `limit` or `next_token` is given, a page is returned, and the
+          token of the next page is set to the `X-Next-Token` header if any.
     - If `pinned` is True, only pinned bots will be returned.
         - When kind is `private`, this will be ignored.
     - If `limit` is specified, only the first n bots will be returned.
@@ -94,6 +101,14 @@ def get_all_bots(
     """
     current_user: User = request.state.current_user
 
+    if kind == "private" and (limit is not None or next_token is not None):
+        bots, next_token = fetch_private_bot_page(
+            current_user.id, limit=limit, next_token=next_token
+        )
+        if next_token is not None:
+            response.headers[NEXT_TOKEN_HEADER] = next_token
+        return bots
+
     bots = fetch_all_bots(current_user.id, limit, pinned, kind)
     return bots
 
@@ -155,6 +170,11 @@ def get_private_bot(request: Request, bot_id: str):
             else None
         ),
         active_models=ActiveModelsOutput.model_validate(dict(bot.active_models)),
+        prompt_caching=(
+            PromptCaching(**bot.prompt_caching.model_dump())
+            if bot.prompt_caching
+            else None
+        ),
     )
     return output
 
@@ -1,10 +1,18 @@
+import asyncio
+import logging
+
+from app.conversation_deleter import start_conversation_deletion
+from app.repositories.common import NEXT_TOKEN_HEADER
 from app.repositories.conversation import (
+    RecordNotFoundError,
     change_conversation_title,
     delete_conversation_by_id,
-    delete_conversation_by_user_id,
     find_conversation_by_user_id,
+    find_conversation_deletion_by_user_id,
+    find_conversation_page_by_user_id,
     find_related_documents_by_conversation_id,
     find_related_document_by_id,
+    find_related_document_page_by_conversation_id,
     update_feedback,
 )
 from app.repositories.models.conversation import FeedbackModel
@@ -12,24 +20,36 @@ from app.routes.schemas.conversation import (
     ChatInput,
     ChatOutput,
     Conversation,
+    ConversationDeletionOutput,
     ConversationMetaOutput,
     FeedbackInput,
     FeedbackOutput,
     NewTitleInput,
     ProposedTitle,
     RelatedDocument,
+    RelatedDocumentMeta,
+    type_conversation_order_by,
 )
 from app.usecases.chat import (
-    chat,
+    chat_async,
     chat_output_from_message,
     fetch_conversation,
     propose_conversation_title,
 )
+from app.sse import ServerSentEventSender
+from app.stream import CancellationToken
 from app.user import User
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, BackgroundTasks, Request, Response
+from fastapi.responses import StreamingResponse
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
 
 router = APIRouter(tags=["conversation"])
 
+# Keep references to chats until they end, even after their clients disconnected
+_background_chats: set[asyncio.Task] = set()
+
 
 @router.get("/health")
 def health():
@@ -38,25 +58,128 @@ def health():
 
 
 @router.post("/conversation", response_model=ChatOutput)
-def post_message(request: Request, chat_input: ChatInput):
+async def post_message(request: Request, chat_input: ChatInput):
     """Send chat message"""
     current_user: User = request.state.current_user
 
-    conversation, message = chat(user_id=current_user.id, chat_input=chat_input)
+    conversation, message = await chat_async(
+        user_id=current_user.id, chat_input=chat_input
+    )
     output = chat_output_from_message(conversation=conversation, message=message)
     return output
 
 
+async def _cancel_on_disconnect(
+    request: Request, cancellation_token: CancellationToken
+):
+    """Cancel the chat as soon as the client disconnects.
+    NOTE: Under ASGI spec 2.4, Starlette does not listen for the disconnection while
+    streaming, and it surfaces only when sending an event fails. So it is received here,
+    even while no event is sent (e.g. until the first token).
+    """
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            logger.info("Client disconnected. Cancelling the chat.")
+            cancellation_token.cancel()
+            return
+
+
+@router.post("/conversation/stream")
+async def post_message_stream(request: Request, chat_input: ChatInput):
+    """Send chat message and stream the answer as Server-Sent Events.
+    Payloads are the same as the ones of the websocket API.
+    """
+    current_user: User = request.state.current_user
+    sender = ServerSentEventSender()
+    cancellation_token = CancellationToken()
+
+    async def run_chat():
+        try:
+            await chat_async(
+                user_id=current_user.id,
+                chat_input=chat_input,
+                on_stream=sender.on_stream,
+                on_stop=sender.on_stop,
+                on_thinking=sender.on_agent_thinking,
+                on_tool_result=sender.on_agent_tool_result,
+                cancellation_token=cancellation_token,
+            )
+
+        except RecordNotFoundError:
+            if chat_input.bot_id:
+                sender.on_error(reason=f"bot {chat_input.bot_id} not found.")
+            else:
+                sender.on_error(reason="Invalid request.")
+
+        except Exception as e:
+            logger.error(f"Failed to run stream handler: {e}")
+            sender.on_error(reason=f"Failed to run stream handler: {e}")
+
+        finally:
+            sender.finish()
+
+    async def event_stream():
+        task = asyncio.create_task(run_chat())
+        _background_chats.add(task)
+        task.add_done_callback(_background_chats.discard)
+        disconnection = asyncio.create_task(
+            _cancel_on_disconnect(request, cancellation_token)
+        )
+        try:
+            async for event in sender.events():
+                yield event
+
+        finally:
+            disconnection.cancel()
+            if not task.done():
+                # The response was closed before the chat ended.
+                # Let the chat abort the generation and store the partial answer.
+                logger.info("Response closed. Cancelling the chat.")
+                cancellation_token.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Disable buffering of reverse proxies
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
 @router.get(
     "/conversation/{conversation_id}/related-documents",
-    response_model=list[RelatedDocument],
+    response_model=list[RelatedDocument] | list[RelatedDocumentMeta],
 )
 def get_related_documents(
-    request: Request, conversation_id: str
-) -> list[RelatedDocument]:
-    """Get related documents"""
+    request: Request,
+    response: Response,
+    conversation_id: str,
+    limit: int | None = None,
+    next_token: str | None = None,
+) -> list[RelatedDocument] | list[RelatedDocumentMeta]:
+    """Get related documents.
+    All related documents are returned with their contents unless `limit` or `next_token`
+    is given. Then a page is returned without the contents, which are fetched per document,
+    and the token of the next page is set to the `X-Next-Token` header if any.
+    """
     current_user: User = request.state.current_user
 
+    if limit is not None or next_token is not None:
+        related_document_metas, next_token = (
+            find_related_document_page_by_conversation_id(
+                user_id=current_user.id,
+                conversation_id=conversation_id,
+                limit=limit,
+                next_token=next_token,
+            )
+        )
+        if next_token is not None:
+            response.headers[NEXT_TOKEN_HEADER] = next_token
+        return [meta.to_schema() for meta in related_document_metas]
+
     related_documents = find_related_documents_by_conversation_id(
         user_id=current_user.id,
         conversation_id=conversation_id,
@@ -102,11 +225,27 @@ def remove_conversation(request: Request, conversation_id: str):
 @router.get("/conversations", response_model=list[ConversationMetaOutput])
 def get_all_conversations(
     request: Request,
+    response: Response,
+    limit: int | None = None,
+    next_token: str | None = None,
+    order_by: type_conversation_order_by = "create_time",
 ):
-    """Get all conversation metadata"""
+    """Get conversation metadata, newest first.
+    All conversations are returned unless `limit` or `next_token` is given. Then a page is
+    returned, and the token of the next page is set to the `X-Next-Token` header if any.
+    With `order_by=last_message_time`, the most recently active conversations come first.
+    """
     current_user: User = request.state.current_user
 
-    conversations = find_conversation_by_user_id(current_user.id)
+    if limit is None and next_token is None:
+        conversations = find_conversation_by_user_id(current_user.id, order_by=order_by)
+    else:
+        conversations, next_token = find_conversation_page_by_user_id(
+            current_user.id, limit=limit, next_token=next_token, order_by=order_by
+        )
+        if next_token is not None:
+            response.headers[NEXT_TOKEN_HEADER] = next_token
+
     output = [
         ConversationMetaOutput(
             id=conversation.id,
@@ -114,18 +253,33 @@ def get_all_conversations(
             create_time=conversation.create_time,
             model=conversation.model,
             bot_id=conversation.bot_id,
+            last_message_time=conversation.last_message_time,
         )
         for conversation in conversations
     ]
     return output
 
 
-@router.delete("/conversations")
-def remove_all_conversations(
-    request: Request,
-):
-    """Delete all conversations"""
-    delete_conversation_by_user_id(request.state.current_user.id)
+@router.delete(
+    "/conversations", status_code=202, response_model=ConversationDeletionOutput
+)
+def remove_all_conversations(request: Request, background_tasks: BackgroundTasks):
+    """Delete all conversations in the background.
+    The progress is returned by `GET /conversations/deletion`.
+    """
+    current_user: User = request.state.current_user
+
+    deletion = start_conversation_deletion(current_user.id, background_tasks)
+    return deletion.to_schema()
+
+
+@router.get("/conversations/deletion", response_model=ConversationDeletionOutput)
+def get_conversation_deletion(request: Request):
+    """Get the progress of the latest deletion of all conversations"""
+    current_user: User = request.state.current_user
+
+    deletion = find_conversation_deletion_by_user_id(current_user.id)
+    return deletion.to_schema()
 
 
 @router.patch("/conversation/{conversation_id}/title")
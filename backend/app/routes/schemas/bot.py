@@ -57,6 +57,25 @@ class GenerationParams(BaseSchema):
     stop_sequences: list[str]
 
 
+class PromptCaching(BaseSchema):
+    cache_system: bool = Field(
+        ..., description="Insert a cache point after the system prompt."
+    )
+    cache_messages: bool = Field(
+        ..., description="Insert cache points into the conversation history."
+    )
+    cache_tools: bool = Field(
+        ..., description="Insert a cache point after the tool specifications."
+    )
+
+
+class PromptCachingReset(BaseSchema):
+    """Empty object, which resets the policy of a bot to the default."""
+
+    class Config:
+        extra = "forbid"
+
+
 class AgentTool(BaseSchema):
     name: str
     description: str
@@ -124,6 +143,7 @@ class BotInput(BaseSchema):
     bedrock_knowledge_base: BedrockKnowledgeBaseInput | None = None
     bedrock_guardrails: BedrockGuardrailsInput | None = None
     active_models: ActiveModelsInput  # type: ignore
+    prompt_caching: PromptCaching | None = None
 
 
 class BotModifyInput(BaseSchema):
@@ -138,6 +158,8 @@ class BotModifyInput(BaseSchema):
     bedrock_knowledge_base: BedrockKnowledgeBaseInput | None = None
     bedrock_guardrails: BedrockGuardrailsInput | None = None
     active_models: ActiveModelsInput  # type: ignore
+    # NOTE: `None` keeps the current policy, and an empty object resets it to the default
+    prompt_caching: PromptCaching | PromptCachingReset | None = None
 
     def _has_update_files(self) -> bool:
         return self.knowledge is not None and (
@@ -252,6 +274,7 @@ class BotModifyOutput(BaseSchema):
     bedrock_knowledge_base: BedrockKnowledgeBaseOutput | None
     bedrock_guardrails: BedrockGuardrailsOutput | None
     active_models: ActiveModelsOutput  # type: ignore
+    prompt_caching: PromptCaching | None = None
 
 
 class BotOutput(BaseSchema):
@@ -276,6 +299,7 @@ class BotOutput(BaseSchema):
     bedrock_knowledge_base: BedrockKnowledgeBaseOutput | None
     bedrock_guardrails: BedrockGuardrailsOutput | None
     active_models: ActiveModelsOutput  # type: ignore
+    prompt_caching: PromptCaching | None = None
 
 
 class BotMetaOutput(BaseSchema):
@@ -23,6 +23,10 @@ type_model_name = Literal[
     "amazon-nova-micro",
 ]
 
+# `create_time` follows `SK`, whose ULID is ordered by creation
+type_conversation_order_by = Literal["create_time", "last_message_time"]
+type_conversation_deletion_status = Literal["QUEUED", "RUNNING", "SUCCEEDED", "FAILED"]
+
 
 class TextContent(BaseSchema):
     content_type: Literal["text"] = Field(
@@ -187,12 +191,19 @@ class RelatedDocument(BaseSchema):
     source_link: str | None = None
 
 
+class RelatedDocumentMeta(BaseSchema):
+    source_id: str
+    source_name: str | None = None
+    source_link: str | None = None
+
+
 class ConversationMetaOutput(BaseSchema):
     id: str
     title: str
     create_time: float
     model: str
     bot_id: str | None
+    last_message_time: float | None = None
 
 
 class Conversation(BaseSchema):
@@ -211,3 +222,17 @@ class NewTitleInput(BaseSchema):
 
 class ProposedTitle(BaseSchema):
     title: str
+
+
+class ConversationDeletionProgress(BaseSchema):
+    deleted_items: int
+    deleted_objects: int
+    # Items and objects which could not be deleted. They are deleted by the next deletion.
+    failed_items: int
+    failed_objects: int
+
+
+class ConversationDeletionOutput(BaseSchema):
+    status: type_conversation_deletion_status
+    progress: ConversationDeletionProgress
+    update_time: float
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import logging
+from collections import deque
+from typing import AsyncIterator
+
+from app.agents.tools.agent_tool import ToolRunResult
+from app.stream import OnStopInput, OnThinking
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class ServerSentEventSender:
+    """Send chat callbacks as Server-Sent Events.
+    Payloads are the same as the ones sent through the websocket API.
+
+    Callbacks never block the chat. While the client reads slower than the model generates,
+    consecutive tokens are coalesced into a single event, so the backlog is bounded
+    by the number of non-token events instead of the number of tokens.
+    """
+
+    def __init__(self) -> None:
+        self.pending: deque[dict] = deque()
+        self.ready = asyncio.Event()
+        self.finished = False
+
+    def notify(self, payload: dict):
+        self.pending.append(payload)
+        self.ready.set()
+
+    def finish(self):
+        self.finished = True
+        self.ready.set()
+
+    async def events(self) -> AsyncIterator[str]:
+        while True:
+            await self.ready.wait()
+            self.ready.clear()
+
+            while self.pending:
+                payload = self.pending.popleft()
+                yield f"data: {json.dumps(payload)}\n\n"
+
+            if self.finished:
+                return
+
+    def on_stream(self, token: str):
+        if len(self.pending) > 0 and self.pending[-1]["status"] == "STREAMING":
+            # The client has not received the previous token yet
+            self.pending[-1]["completion"] += token
+            return
+
+        self.notify(
+            dict(
+                status="STREAMING",
+                completion=token,
+            )
+        )
+
+    def on_stop(self, arg: OnStopInput):
+        self.notify(
+            dict(
+                status="STREAMING_END",
+                completion="",
+                stop_reason=arg["stop_reason"],
+            )
+        )
+
+    def on_agent_thinking(self, tool_use: OnThinking):
+        self.notify(
+            dict(
+                status="AGENT_THINKING",
+                log={
+                    tool_use["tool_use_id"]: {
+                        "name": tool_use["name"],
+                        "input": tool_use["input"],
+                    },
+                },
+            )
+        )
+
+    def on_agent_tool_result(self, run_result: ToolRunResult):
+        self.notify(
+            dict(
+                status="AGENT_TOOL_RESULT",
+                result={
+                    "toolUseId": run_result["tool_use_id"],
+                    "status": run_result["status"],
+                },
+            )
+        )
+
+        for related_document in run_result["related_documents"]:
+            self.notify(
+                dict(
+                    status="AGENT_RELATED_DOCUMENT",
+                    result={
+                        "toolUseId": run_result["tool_use_id"],
+                        "relatedDocument": related_document.to_schema().model_dump(
+                            by_alias=True
+                        ),
+                    },
+                )
+            )
+
+    def on_error(self, reason: str):
+        self.notify(
+            dict(
+                status="ERROR",
+                reason=reason,
+            )
+        )
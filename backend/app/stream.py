@@ -1,9 +1,20 @@
 import json
 import logging
-from typing import Callable, TypedDict, TypeGuard
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Literal, TypedDict, TypeGuard, cast
 
 from app.agents.tools.agent_tool import AgentTool
 from app.bedrock import calculate_price, compose_args_for_converse_api
+from app.logging_utils import log_payload
+from app.metrics import (
+    BEDROCK_CACHE_READ_INPUT_TOKENS,
+    BEDROCK_CACHE_WRITE_INPUT_TOKENS,
+    BEDROCK_INPUT_TOKENS,
+    BEDROCK_OUTPUT_TOKENS_PER_SECOND,
+    BEDROCK_TIME_TO_FIRST_TOKEN,
+)
 from app.repositories.models.conversation import (
     SimpleMessageModel,
     ContentModel,
@@ -14,15 +25,24 @@ from app.repositories.models.conversation import (
 )
 from app.repositories.models.custom_bot import (
     GenerationParamsModel,
+    PromptCachingModel,
 )
 from app.repositories.models.custom_bot_guardrails import (
     BedrockGuardrailsModel,
 )
 from app.routes.schemas.conversation import type_model_name
-from app.utils import get_bedrock_runtime_client, get_current_time
+from app.tracing import current_span, mark, traced
+from app.utils import (
+    get_bedrock_runtime_client,
+    get_current_time,
+    get_shared_bedrock_runtime_client,
+    run_in_io_executor,
+)
 
 from pydantic import JsonValue
 from mypy_boto3_bedrock_runtime.type_defs import (
+    ConverseStreamOutputTypeDef,
+    ConverseStreamRequestRequestTypeDef,
     GuardrailConverseContentBlockTypeDef,
 )
 from mypy_boto3_bedrock_runtime.literals import (
@@ -34,11 +54,60 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 
+# NOTE: `cancelled` is not returned by Bedrock. It is used when the generation is cancelled.
+StopReason = StopReasonType | Literal["cancelled"]
+
+
+class CancellationToken:
+    """Token to cancel an in-flight generation. It can be cancelled from any thread."""
+
+    def __init__(self) -> None:
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: list[Callable[[], None]] = []
+
+    def cancel(self):
+        with self._lock:
+            if self._cancelled.is_set():
+                return
+            self._cancelled.set()
+            callbacks, self._callbacks = self._callbacks, []
+
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Failed to run cancellation callback: {e}")
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def add_callback(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Call `callback` on the cancellation, or right away if already cancelled.
+        Returns a function to remove the callback.
+        """
+        with self._lock:
+            if not self._cancelled.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove_callback(callback)
+
+        callback()
+        return lambda: None
+
+    def _remove_callback(self, callback: Callable[[], None]):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+
 class OnStopInput(TypedDict):
     message: MessageModel
-    stop_reason: StopReasonType
+    stop_reason: StopReason
     input_token_count: int
     output_token_count: int
+    cache_read_input_token_count: int
+    cache_write_input_token_count: int
     price: float
 
 
@@ -123,6 +192,320 @@ def _content_model_to_partial_content(
         raise ValueError(f"Unknown content type")
 
 
+class _ConverseStreamAccumulator:
+    """Accumulate events of `converse_stream` into a message."""
+
+    def __init__(
+        self,
+        model: type_model_name,
+        client,
+        on_stream: Callable[[str], None] | None = None,
+        on_thinking: Callable[[OnThinking], None] | None = None,
+        message_for_continue_generate: SimpleMessageModel | None = None,
+    ):
+        self.model: type_model_name = model
+        self.client = client
+        self.on_stream = on_stream
+        self.on_thinking = on_thinking
+        self.current_message = _PartialMessage(
+            role="assistant",
+            contents=(
+                {
+                    index: _content_model_to_partial_content(content=content)
+                    for index, content in enumerate(
+                        message_for_continue_generate.content
+                    )
+                }
+                if message_for_continue_generate is not None
+                else {}
+            ),
+        )
+        self.errors: list[Exception] = []
+        self.stop_reason: StopReason = "end_turn"
+        # Whether the message was completed, before any cancellation
+        self.stopped = False
+        # NOTE: The accumulator is created right before calling `converse_stream`
+        self.start_time = time.perf_counter()
+        self.first_token_time: float | None = None
+        self.input_token_count = 0
+        self.output_token_count = 0
+        self.cache_read_input_token_count = 0
+        self.cache_write_input_token_count = 0
+
+    def handle_event(self, event: ConverseStreamOutputTypeDef):
+        logger.debug("event: %s", event)
+        if "messageStart" in event:
+            message_start = event["messageStart"]
+            self.current_message["role"] = message_start["role"]
+
+        elif "contentBlockStart" in event:
+            content_block_start = event["contentBlockStart"]
+            index = content_block_start["contentBlockIndex"]
+            start = content_block_start.get("start", {})
+            tool_use_start = start.get("toolUse")
+            if tool_use_start is not None:
+                tool_use_id = tool_use_start["toolUseId"]
+                tool_name = tool_use_start["name"]
+
+                tool_use_content: _PartialToolUseContent = {
+                    "tool_use": {
+                        "tool_use_id": tool_use_id,
+                        "name": tool_name,
+                        "input": "",
+                    }
+                }
+                self.current_message["contents"][index] = tool_use_content
+
+        elif "contentBlockDelta" in event:
+            if self.first_token_time is None:
+                self.first_token_time = time.perf_counter()
+                mark("ttft")
+            content_block_delta = event["contentBlockDelta"]
+            index = content_block_delta["contentBlockIndex"]
+            delta = content_block_delta["delta"]
+            if "toolUse" in delta:
+                input_delta = delta["toolUse"]["input"]
+                if index in self.current_message["contents"]:
+                    content = self.current_message["contents"][index]
+                    if _is_tool_use_content(content=content):
+                        content["tool_use"]["input"] += input_delta
+
+            elif "text" in delta:
+                text = delta["text"]
+                if index in self.current_message["contents"]:
+                    content = self.current_message["contents"][index]
+                    if _is_text_content(content=content):
+                        content["text"] += text
+
+                else:
+                    text_content: _PartialTextContent = {
+                        "text": text,
+                    }
+                    self.current_message["contents"][index] = text_content
+
+                if self.on_stream:
+                    self.on_stream(text)
+
+        elif "contentBlockStop" in event:
+            content_block_stop = event["contentBlockStop"]
+            index = content_block_stop["contentBlockIndex"]
+            content = self.current_message["contents"][index]
+            if _is_tool_use_content(content=content):
+                tool_use_body = content["tool_use"]
+                tool_use_id = tool_use_body["tool_use_id"]
+                tool_name = tool_use_body["name"]
+                tool_input = json.loads(tool_use_body["input"] or "{}")
+
+                if self.on_thinking:
+                    self.on_thinking(
+                        {
+                            "tool_use_id": tool_use_id,
+                            "name": tool_name,
+                            "input": tool_input,
+                        }
+                    )
+
+        elif "messageStop" in event:
+            self.stop_reason = event["messageStop"]["stopReason"]
+            self.stopped = True
+
+        elif "metadata" in event:
+            metadata = event["metadata"]
+            usage = metadata["usage"]
+            self.input_token_count = usage["inputTokens"]
+            self.output_token_count = usage["outputTokens"]
+            # NOTE: Cached tokens are not included in `inputTokens`.
+            # They are not typed by the stubs yet.
+            self.cache_read_input_token_count = cast(
+                int, usage.get("cacheReadInputTokens", 0)
+            )
+            self.cache_write_input_token_count = cast(
+                int, usage.get("cacheWriteInputTokens", 0)
+            )
+
+        elif "modelStreamErrorException" in event:
+            model_stream_error = event["modelStreamErrorException"]
+            message = model_stream_error.get("message")
+            original_status_code = model_stream_error.get("originalStatusCode")
+            original_message = model_stream_error.get("originalMessage")
+            self.errors.append(
+                self.client.exceptions.ModelStreamErrorException(
+                    error_response={
+                        "Error": {
+                            "Code": "ModelStreamErrorException",
+                            "Message": message,
+                            "OriginalStatusCode": original_status_code,
+                            "OriginalMessage": original_message,
+                        },
+                    },
+                    operation_name="ConverseStream",
+                )
+            )
+
+        elif "throttlingException" in event:
+            throttling = event["throttlingException"]
+            message = throttling.get("message")
+            self.errors.append(
+                self.client.exceptions.ThrottlingException(
+                    error_response={
+                        "Error": {
+                            "Code": "ThrottlingException",
+                            "Message": message,
+                        },
+                    },
+                    operation_name="ConverseStream",
+                )
+            )
+
+        elif "internalServerException" in event:
+            internal_server_error = event["internalServerException"]
+            message = internal_server_error.get("message")
+            self.errors.append(
+                self.client.exceptions.InternalServerException(
+                    error_response={
+                        "Error": {
+                            "Code": "InternalServerException",
+                            "Message": message,
+                        },
+                    },
+                    operation_name="ConverseStream",
+                )
+            )
+
+        elif "serviceUnavailableException" in event:
+            service_unavailable = event["serviceUnavailableException"]
+            message = service_unavailable.get("message")
+            self.errors.append(
+                self.client.exceptions.ServiceUnavailableException(
+                    error_response={
+                        "Error": {
+                            "Code": "ServiceUnavailableException",
+                            "Message": message,
+                        },
+                    },
+                    operation_name="ConverseStream",
+                )
+            )
+
+        elif "validationException" in event:
+            validation_error = event["validationException"]
+            message = validation_error.get("message")
+            self.errors.append(
+                self.client.exceptions.ValidationException(
+                    error_response={
+                        "Error": {
+                            "Code": "ValidationException",
+                            "Message": message,
+                        },
+                    },
+                    operation_name="ConverseStream",
+                )
+            )
+
+    def cancel(self):
+        """Stop accumulating and keep the partial answer.
+        Tool uses are dropped since they are never run after the cancellation.
+        """
+        self.stop_reason = "cancelled"
+        self.current_message["contents"] = {
+            index: content
+            for index, content in self.current_message["contents"].items()
+            if _is_text_content(content=content)
+        }
+
+    def to_result(self) -> OnStopInput:
+        if len(self.errors) > 0:
+            if len(self.errors) == 1:
+                raise self.errors[0]
+
+            else:
+                raise ExceptionGroup("Exceptions in ConverseStream", self.errors)
+
+        # Append entire completion as the last message
+        message = MessageModel(
+            role="assistant",
+            content=[
+                _content_model_from_partial_content(content=content)
+                for _, content in sorted(self.current_message["contents"].items())
+            ],
+            model=self.model,
+            children=[],
+            parent=None,
+            create_time=get_current_time(),
+            feedback=None,
+            used_chunks=None,
+            thinking_log=None,
+        )
+
+        price = calculate_price(
+            model=self.model,
+            input_tokens=self.input_token_count,
+            output_tokens=self.output_token_count,
+            cache_read_input_tokens=self.cache_read_input_token_count,
+            cache_write_input_tokens=self.cache_write_input_token_count,
+        )
+
+        return OnStopInput(
+            message=message,
+            stop_reason=self.stop_reason,
+            input_token_count=self.input_token_count,
+            output_token_count=self.output_token_count,
+            cache_read_input_token_count=self.cache_read_input_token_count,
+            cache_write_input_token_count=self.cache_write_input_token_count,
+            price=price,
+        )
+
+
+def _record_usage(accumulator: _ConverseStreamAccumulator, result: OnStopInput):
+    span = current_span()
+    span.set_attribute("stop_reason", result["stop_reason"])
+    span.set_attribute("input_tokens", result["input_token_count"])
+    span.set_attribute("output_tokens", result["output_token_count"])
+
+    model = accumulator.model
+    BEDROCK_INPUT_TOKENS.inc(result["input_token_count"], model=model)
+    BEDROCK_CACHE_READ_INPUT_TOKENS.inc(
+        result["cache_read_input_token_count"], model=model
+    )
+    BEDROCK_CACHE_WRITE_INPUT_TOKENS.inc(
+        result["cache_write_input_token_count"], model=model
+    )
+    if accumulator.first_token_time is not None:
+        BEDROCK_TIME_TO_FIRST_TOKEN.observe(
+            accumulator.first_token_time - accumulator.start_time, model=model
+        )
+        elapsed = time.perf_counter() - accumulator.first_token_time
+        if elapsed > 0:
+            BEDROCK_OUTPUT_TOKENS_PER_SECOND.observe(
+                result["output_token_count"] / elapsed, model=model
+            )
+
+
+def _is_cancelled(cancellation_token: CancellationToken | None) -> bool:
+    return cancellation_token is not None and cancellation_token.is_cancelled
+
+
+@contextmanager
+def _close_on_cancel(stream, cancellation_token: CancellationToken | None):
+    """Close the event stream as soon as the token is cancelled, so that waiting for the
+    next event (e.g. until the first token) is interrupted.
+    """
+    if cancellation_token is None:
+        yield
+        return
+
+    remove_callback = cancellation_token.add_callback(stream.close)
+    try:
+        yield
+    except Exception as e:
+        if not cancellation_token.is_cancelled:
+            raise e
+        # Reading the closed stream fails
+        logger.info(f"Event stream closed by the cancellation: {e}")
+    finally:
+        remove_callback()
+
+
 class ConverseApiStreamHandler:
     """Stream handler using Converse API.
     Ref: https://docs.aws.amazon.com/bedrock/latest/userguide/conversation-inference.html
@@ -135,11 +518,13 @@ class ConverseApiStreamHandler:
         generation_params: GenerationParamsModel | None = None,
         guardrail: BedrockGuardrailsModel | None = None,
         tools: dict[str, AgentTool] | None = None,
+        prompt_caching: PromptCachingModel | None = None,
         on_stream: Callable[[str], None] | None = None,
         on_thinking: Callable[[OnThinking], None] | None = None,
     ):
         """Base class for stream handlers.
         :param model: Model name.
+        :param prompt_caching: Prompt caching policy. `None` means the default policy.
         :param on_stream: Callback function for streaming.
         :param on_stop: Callback function for stopping the stream.
         """
@@ -148,238 +533,122 @@ class ConverseApiStreamHandler:
         self.generation_params = generation_params
         self.guardrail = guardrail
         self.tools = tools
+        self.prompt_caching = prompt_caching
         self.on_stream = on_stream
         self.on_thinking = on_thinking
 
+    def _compose_args(
+        self,
+        messages: list[SimpleMessageModel],
+        grounding_source: GuardrailConverseContentBlockTypeDef | None,
+    ) -> ConverseStreamRequestRequestTypeDef:
+        # Create payload to invoke Bedrock
+        args = compose_args_for_converse_api(
+            messages=messages,
+            model=self.model,
+            instructions=self.instructions,
+            generation_params=self.generation_params,
+            guardrail=self.guardrail,
+            grounding_source=grounding_source,
+            tools=self.tools,
+            prompt_caching=self.prompt_caching,
+        )
+        log_payload(logger, "args for converse_stream: %s", args)
+        return args
+
+    @traced("bedrock.converse_stream")
     def run(
         self,
         messages: list[SimpleMessageModel],
         grounding_source: GuardrailConverseContentBlockTypeDef | None = None,
         message_for_continue_generate: SimpleMessageModel | None = None,
+        cancellation_token: CancellationToken | None = None,
     ) -> OnStopInput:
+        """Invoke the model and accumulate the answer.
+        :param cancellation_token: When cancelled, the stream is closed right away, even while
+            waiting for an event, and the partial answer is returned with the `cancelled`
+            stop reason.
+        """
         try:
-            # Create payload to invoke Bedrock
-            args = compose_args_for_converse_api(
-                messages=messages,
-                model=self.model,
-                instructions=self.instructions,
-                generation_params=self.generation_params,
-                guardrail=self.guardrail,
-                grounding_source=grounding_source,
-                tools=self.tools,
-            )
-            logger.info(f"args for converse_stream: {args}")
+            current_span().set_attribute("model", self.model)
+            args = self._compose_args(messages, grounding_source)
 
             client = get_bedrock_runtime_client()
-            response = client.converse_stream(**args)
-
-            current_message = _PartialMessage(
-                role="assistant",
-                contents=(
-                    {
-                        index: _content_model_to_partial_content(content=content)
-                        for index, content in enumerate(
-                            message_for_continue_generate.content
-                        )
-                    }
-                    if message_for_continue_generate is not None
-                    else {}
-                ),
+            accumulator = _ConverseStreamAccumulator(
+                model=self.model,
+                client=client,
+                on_stream=self.on_stream,
+                on_thinking=self.on_thinking,
+                message_for_continue_generate=message_for_continue_generate,
             )
-            current_errors: list[Exception] = []
-            stop_reason: StopReasonType = "end_turn"
-            input_token_count = 0
-            output_token_count = 0
-            for event in response["stream"]:
-                logger.debug(f"event: {event}")
-                if "messageStart" in event:
-                    message_start = event["messageStart"]
-                    current_message["role"] = message_start["role"]
-
-                elif "contentBlockStart" in event:
-                    content_block_start = event["contentBlockStart"]
-                    index = content_block_start["contentBlockIndex"]
-                    start = content_block_start.get("start", {})
-                    tool_use = start.get("toolUse")
-                    if tool_use is not None:
-                        tool_use_id = tool_use["toolUseId"]
-                        tool_name = tool_use["name"]
-
-                        tool_use_content: _PartialToolUseContent = {
-                            "tool_use": {
-                                "tool_use_id": tool_use_id,
-                                "name": tool_name,
-                                "input": "",
-                            }
-                        }
-                        current_message["contents"][index] = tool_use_content
-
-                elif "contentBlockDelta" in event:
-                    content_block_delta = event["contentBlockDelta"]
-                    index = content_block_delta["contentBlockIndex"]
-                    delta = content_block_delta["delta"]
-                    if "toolUse" in delta:
-                        input = delta["toolUse"]["input"]
-                        if index in current_message["contents"]:
-                            content = current_message["contents"][index]
-                            if _is_tool_use_content(content=content):
-                                content["tool_use"]["input"] += input
-
-                    elif "text" in delta:
-                        text = delta["text"]
-                        if index in current_message["contents"]:
-                            content = current_message["contents"][index]
-                            if _is_text_content(content=content):
-                                content["text"] += text
-
-                        else:
-                            text_content: _PartialTextContent = {
-                                "text": text,
-                            }
-                            current_message["contents"][index] = text_content
-
-                        if self.on_stream:
-                            self.on_stream(text)
-
-                elif "contentBlockStop" in event:
-                    content_block_stop = event["contentBlockStop"]
-                    index = content_block_stop["contentBlockIndex"]
-                    content = current_message["contents"][index]
-                    if _is_tool_use_content(content=content):
-                        tool_use = content["tool_use"]
-                        tool_use_id = tool_use["tool_use_id"]
-                        tool_name = tool_use["name"]
-                        input = json.loads(tool_use["input"] or "{}")
-
-                        if self.on_thinking:
-                            self.on_thinking(
-                                {
-                                    "tool_use_id": tool_use_id,
-                                    "name": tool_name,
-                                    "input": input,
-                                }
-                            )
-
-                elif "messageStop" in event:
-                    stop_reason = event["messageStop"]["stopReason"]
-
-                elif "metadata" in event:
-                    metadata = event["metadata"]
-                    usage = metadata["usage"]
-                    input_token_count = usage["inputTokens"]
-                    output_token_count = usage["outputTokens"]
-
-                elif "modelStreamErrorException" in event:
-                    exception = event["modelStreamErrorException"]
-                    message = exception.get("message")
-                    original_status_code = exception.get("originalStatusCode")
-                    original_message = exception.get("originalMessage")
-                    current_errors.append(
-                        client.exceptions.ModelStreamErrorException(
-                            error_response={
-                                "Error": {
-                                    "Code": "ModelStreamErrorException",
-                                    "Message": message,
-                                    "OriginalStatusCode": original_status_code,
-                                    "OriginalMessage": original_message,
-                                },
-                            },
-                            operation_name="ConverseStream",
-                        )
-                    )
+            if cancellation_token is not None and cancellation_token.is_cancelled:
+                accumulator.cancel()
+                return accumulator.to_result()
 
-                elif "throttlingException" in event:
-                    exception = event["throttlingException"]
-                    message = exception.get("message")
-                    current_errors.append(
-                        client.exceptions.ThrottlingException(
-                            error_response={
-                                "Error": {
-                                    "Code": "ThrottlingException",
-                                    "Message": message,
-                                },
-                            },
-                            operation_name="ConverseStream",
-                        )
-                    )
-
-                elif "internalServerException" in event:
-                    exception = event["internalServerException"]
-                    message = exception.get("message")
-                    current_errors.append(
-                        client.exceptions.InternalServerException(
-                            error_response={
-                                "Error": {
-                                    "Code": "InternalServerException",
-                                    "Message": message,
-                                },
-                            },
-                            operation_name="ConverseStream",
-                        )
-                    )
-
-                elif "serviceUnavailableException" in event:
-                    exception = event["serviceUnavailableException"]
-                    message = exception.get("message")
-                    current_errors.append(
-                        client.exceptions.ServiceUnavailableException(
-                            error_response={
-                                "Error": {
-                                    "Code": "ServiceUnavailableException",
-                                    "Message": message,
-                                },
-                            },
-                            operation_name="ConverseStream",
-                        )
-                    )
+            response = client.converse_stream(**args)
+            stream = response["stream"]
+            with _close_on_cancel(stream, cancellation_token):
+                for event in stream:
+                    if _is_cancelled(cancellation_token):
+                        break
+                    accumulator.handle_event(event)
+
+            if _is_cancelled(cancellation_token) and not accumulator.stopped:
+                logger.info("Generation cancelled.")
+                accumulator.cancel()
+
+            result = accumulator.to_result()
+            _record_usage(accumulator, result)
+            return result
 
-                elif "validationException" in event:
-                    exception = event["validationException"]
-                    message = exception.get("message")
-                    current_errors.append(
-                        client.exceptions.ValidationException(
-                            error_response={
-                                "Error": {
-                                    "Code": "ValidationException",
-                                    "Message": message,
-                                },
-                            },
-                            operation_name="ConverseStream",
-                        )
-                    )
+        except Exception as e:
+            logger.error(f"Error: {e}")
+            raise e
 
-            if len(current_errors) > 0:
-                if len(current_errors) == 1:
-                    raise current_errors[0]
+    @traced("bedrock.converse_stream")
+    async def run_async(
+        self,
+        messages: list[SimpleMessageModel],
+        grounding_source: GuardrailConverseContentBlockTypeDef | None = None,
+        message_for_continue_generate: SimpleMessageModel | None = None,
+        cancellation_token: CancellationToken | None = None,
+    ) -> OnStopInput:
+        """Asynchronous version of `run`.
+        Blocking reads of the event stream are offloaded to the I/O executor one event at a time,
+        so a thread is occupied only while waiting for the next event, and callbacks are called on the event loop.
+        """
+        try:
+            current_span().set_attribute("model", self.model)
+            args = self._compose_args(messages, grounding_source)
 
-                else:
-                    raise ExceptionGroup("Exceptions in ConverseStream", current_errors)
-
-            # Append entire completion as the last message
-            message = MessageModel(
-                role="assistant",
-                content=[
-                    _content_model_from_partial_content(content=content)
-                    for _, content in sorted(current_message["contents"].items())
-                ],
+            client = get_shared_bedrock_runtime_client()
+            accumulator = _ConverseStreamAccumulator(
                 model=self.model,
-                children=[],
-                parent=None,
-                create_time=get_current_time(),
-                feedback=None,
-                used_chunks=None,
-                thinking_log=None,
-            )
-
-            price = calculate_price(self.model, input_token_count, output_token_count)
-
-            result = OnStopInput(
-                message=message,
-                stop_reason=stop_reason,
-                input_token_count=input_token_count,
-                output_token_count=output_token_count,
-                price=price,
+                client=client,
+                on_stream=self.on_stream,
+                on_thinking=self.on_thinking,
+                message_for_continue_generate=message_for_continue_generate,
             )
+            if cancellation_token is not None and cancellation_token.is_cancelled:
+                accumulator.cancel()
+                return accumulator.to_result()
+
+            response = await run_in_io_executor(client.converse_stream, **args)
+            stream = response["stream"]
+            with _close_on_cancel(stream, cancellation_token):
+                events = iter(stream)
+                while True:
+                    event = await run_in_io_executor(next, events, None)
+                    if event is None or _is_cancelled(cancellation_token):
+                        break
+                    accumulator.handle_event(event)
+
+            if _is_cancelled(cancellation_token) and not accumulator.stopped:
+                logger.info("Generation cancelled.")
+                accumulator.cancel()
+
+            result = accumulator.to_result()
+            _record_usage(accumulator, result)
             return result
 
         except Exception as e:
@@ -0,0 +1,310 @@
+"""Lightweight span tracing for the chat pipeline.
+
+Spans are opened with `trace_span` (context manager) or `traced` (decorator), nest through
+`contextvars`, and are exported when they end. Marks (e.g. time to first token) are recorded
+as offsets from the start of the span.
+
+Tracing is disabled unless `TRACING_ENABLED=true`. When disabled, `trace_span` returns a shared
+no-op span and `traced` calls the function directly, so the overhead is one attribute check.
+"""
+
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Protocol, TypeVar
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+TRACING_ENABLED = os.environ.get("TRACING_ENABLED", "false") == "true"
+# Comma separated list of `log` and `otel`
+TRACING_EXPORTERS = os.environ.get("TRACING_EXPORTERS", "log")
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def _generate_id() -> str:
+    return f"{random.getrandbits(64):016x}"
+
+
+class Span:
+    __slots__ = (
+        "name",
+        "attributes",
+        "trace_id",
+        "span_id",
+        "parent",
+        "start",
+        "end",
+        "marks",
+        "error",
+        "_clock",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        attributes: dict[str, Any],
+        parent: "Span | None",
+        clock: Callable[[], float],
+    ):
+        self.name = name
+        self.attributes = attributes
+        self.trace_id: str = parent.trace_id if parent is not None else _generate_id()
+        self.span_id: str = _generate_id()
+        self.parent = parent
+        self._clock = clock
+        self.start = clock()
+        self.end: float | None = None
+        self.marks: dict[str, float] = {}
+        self.error: str | None = None
+
+    @property
+    def parent_id(self) -> str | None:
+        return self.parent.span_id if self.parent is not None else None
+
+    @property
+    def duration(self) -> float:
+        end = self.end if self.end is not None else self._clock()
+        return end - self.start
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def mark(self, name: str):
+        """Record the elapsed time from the start of the span. Only the first mark is kept."""
+        if name not in self.marks:
+            self.marks[name] = self._clock() - self.start
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "duration_ms": round(self.duration * 1000, 3),
+            "marks_ms": {k: round(v * 1000, 3) for k, v in self.marks.items()},
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """Returned while tracing is disabled. Accepts the same calls as `Span`."""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def mark(self, name: str):
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+class SpanExporter(Protocol):
+    def on_start(self, span: Span) -> None: ...
+
+    def on_end(self, span: Span) -> None: ...
+
+
+class LogSpanExporter:
+    """Write each finished span as a single JSON log line."""
+
+    def on_start(self, span: Span) -> None:
+        pass
+
+    def on_end(self, span: Span) -> None:
+        logger.info(json.dumps(span.to_dict(), default=str))
+
+
+class OpenTelemetrySpanExporter:
+    """Mirror spans to OpenTelemetry. Requires `opentelemetry-api` and a configured SDK."""
+
+    def __init__(self):
+        from opentelemetry import trace
+
+        self._trace = trace
+        self._tracer = trace.get_tracer(__name__)
+        self._otel_spans: dict[str, Any] = {}
+
+    def on_start(self, span: Span) -> None:
+        parent = (
+            self._otel_spans.get(span.parent.span_id)
+            if span.parent is not None
+            else None
+        )
+        context = self._trace.set_span_in_context(parent) if parent else None
+        self._otel_spans[span.span_id] = self._tracer.start_span(
+            span.name, context=context
+        )
+
+    def on_end(self, span: Span) -> None:
+        otel_span = self._otel_spans.pop(span.span_id, None)
+        if otel_span is None:
+            return
+
+        end_time_ns = time.time_ns()
+        start_time_ns = end_time_ns - int(span.duration * 1e9)
+        for name, offset in span.marks.items():
+            otel_span.add_event(name, timestamp=start_time_ns + int(offset * 1e9))
+        for key, value in span.attributes.items():
+            if isinstance(value, (str, bool, int, float)):
+                otel_span.set_attribute(key, value)
+        if span.error is not None:
+            otel_span.set_status(self._trace.Status(self._trace.StatusCode.ERROR))
+            otel_span.set_attribute("error", span.error)
+        otel_span.end(end_time=end_time_ns)
+
+
+class _SpanContext:
+    __slots__ = ("_tracer", "_name", "_attributes", "_span", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: dict[str, Any]):
+        self._tracer = tracer
+        self._name = name
+        self._attributes = attributes
+
+    def __enter__(self) -> Span:
+        self._span = self._tracer.start_span(self._name, self._attributes)
+        self._token = _current_span.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        _current_span.reset(self._token)
+        if exc_value is not None:
+            self._span.error = f"{exc_type.__name__}: {exc_value}"
+        self._tracer.end_span(self._span)
+
+
+class Tracer:
+    def __init__(
+        self,
+        exporters: list[SpanExporter],
+        enabled: bool = True,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        self.exporters = exporters
+        self.enabled = enabled
+        self.clock = clock
+
+    def start_span(self, name: str, attributes: dict[str, Any]) -> Span:
+        span = Span(name, attributes, parent=_current_span.get(), clock=self.clock)
+        for exporter in self.exporters:
+            exporter.on_start(span)
+        return span
+
+    def end_span(self, span: Span):
+        span.end = self.clock()
+        for exporter in self.exporters:
+            try:
+                exporter.on_end(span)
+            except Exception as e:
+                # Tracing must never break the request
+                logger.warning(f"Failed to export span {span.name}: {e}")
+
+    def span(self, name: str, **attributes: Any) -> "_SpanContext | _NoopSpan":
+        if not self.enabled:
+            return NOOP_SPAN
+        return _SpanContext(self, name, attributes)
+
+
+def _create_exporters(names: str) -> list[SpanExporter]:
+    exporters: list[SpanExporter] = []
+    for name in (n.strip() for n in names.split(",")):
+        if name == "log":
+            exporters.append(LogSpanExporter())
+        elif name == "otel":
+            try:
+                exporters.append(OpenTelemetrySpanExporter())
+            except ImportError:
+                logger.warning("opentelemetry is not installed. Skip the exporter.")
+        elif name:
+            logger.warning(f"Unknown span exporter: {name}")
+    return exporters
+
+
+_tracer = Tracer(
+    exporters=_create_exporters(TRACING_EXPORTERS) if TRACING_ENABLED else [],
+    enabled=TRACING_ENABLED,
+)
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def set_tracer(tracer: Tracer) -> Tracer:
+    """Replace the global tracer and return the previous one."""
+    global _tracer
+    previous = _tracer
+    _tracer = tracer
+    return previous
+
+
+def trace_span(name: str, **attributes: Any) -> "_SpanContext | _NoopSpan":
+    """Open a span as a context manager.
+    Usage:
+        with trace_span("retrieval", bot_id=bot.id) as span:
+            ...
+            span.set_attribute("results", len(results))
+    """
+    return _tracer.span(name, **attributes)
+
+
+def current_span() -> "Span | _NoopSpan":
+    span = _current_span.get()
+    return span if span is not None else NOOP_SPAN
+
+
+def mark(name: str):
+    """Record a mark (e.g. `ttft`) on the current span."""
+    span = _current_span.get()
+    if span is not None:
+        span.mark(name)
+
+
+def traced(name: str | None = None) -> Callable[[F], F]:
+    """Decorator version of `trace_span`. Supports both sync and async functions.
+    The span name defaults to the qualified name of the function.
+    """
+
+    def decorator(func: F) -> F:
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not _tracer.enabled:
+                    return await func(*args, **kwargs)
+                with _tracer.span(span_name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper  # type: ignore
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _tracer.enabled:
+                return func(*args, **kwargs)
+            with _tracer.span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore
+
+    return decorator
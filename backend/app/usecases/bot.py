@@ -9,14 +9,15 @@ from app.config import GenerationParams as GenerationParamsDict
 from app.repositories.common import (
     RecordNotFoundError,
     _get_table_client,
-    decompose_bot_alias_id,
     decompose_bot_id,
 )
 from app.repositories.custom_bot import (
     delete_alias_by_id,
     delete_bot_by_id,
     find_alias_by_id,
+    find_original_bots_by_ids,
     find_private_bot_by_id,
+    find_private_bot_page_by_user_id,
     find_private_bots_by_user_id,
     find_public_bot_by_id,
     store_alias,
@@ -37,6 +38,7 @@ from app.repositories.models.custom_bot import (
     ConversationQuickStarterModel,
     GenerationParamsModel,
     KnowledgeModel,
+    PromptCachingModel,
 )
 from app.repositories.models.custom_bot_guardrails import BedrockGuardrailsModel
 from app.repositories.models.custom_bot_kb import BedrockKnowledgeBaseModel
@@ -54,6 +56,8 @@ from app.routes.schemas.bot import (
     ConversationQuickStarter,
     GenerationParams,
     Knowledge,
+    PromptCaching,
+    PromptCachingReset,
     type_sync_status,
 )
 from app.routes.schemas.bot_guardrails import BedrockGuardrailsOutput
@@ -216,6 +220,11 @@ def create_new_bot(user_id: str, bot_input: BotInput) -> BotOutput:
             active_models=ActiveModelsModel.model_validate(
                 dict(bot_input.active_models)
             ),
+            prompt_caching=(
+                PromptCachingModel(**bot_input.prompt_caching.model_dump())
+                if bot_input.prompt_caching
+                else None
+            ),
         ),
     )
     return BotOutput(
@@ -269,6 +278,7 @@ def create_new_bot(user_id: str, bot_input: BotInput) -> BotOutput:
             else None
         ),
         active_models=ActiveModelsOutput.model_validate(dict(bot_input.active_models)),
+        prompt_caching=bot_input.prompt_caching,
     )
 
 
@@ -384,6 +394,14 @@ def modify_owned_bot(
         active_models=ActiveModelsOutput.model_validate(
             dict(modify_input.active_models)
         ),
+        prompt_caching=(
+            PromptCachingModel(**modify_input.prompt_caching.model_dump())
+            if isinstance(modify_input.prompt_caching, PromptCaching)
+            else None
+        ),
+        reset_prompt_caching=isinstance(
+            modify_input.prompt_caching, PromptCachingReset
+        ),
     )
 
     return BotModifyOutput(
@@ -430,6 +448,11 @@ def modify_owned_bot(
         active_models=ActiveModelsOutput.model_validate(
             dict(modify_input.active_models)
         ),
+        prompt_caching=(
+            modify_input.prompt_caching
+            if isinstance(modify_input.prompt_caching, PromptCaching)
+            else None
+        ),
     )
 
 
@@ -453,10 +476,13 @@ def fetch_bot(user_id: str, bot_id: str) -> tuple[bool, BotModel]:
 
 
 def fetch_all_bots_by_user_id(
-    user_id: str, limit: int | None = None, only_pinned: bool = False
+    user_id: str,
+    limit: int | None = None,
+    only_pinned: bool = False,
 ) -> list[BotMeta]:
     """Find all private & shared bots of a user.
     The order is descending by `last_used_time`.
+    Original bots of shared bots are found at once.
     """
     if not only_pinned and not limit:
         raise ValueError("Must specify either `limit` or `only_pinned`")
@@ -481,13 +507,26 @@ def fetch_all_bots_by_user_id(
 
     response = table.query(**query_params)
 
+    # Fetch original bots of alias bots
+    alias_items = [item for item in response["Items"] if "OriginalBotId" in item]
+    original_bots = (
+        find_original_bots_by_ids(
+            [item["OriginalBotId"] for item in alias_items],
+            owner_user_ids={
+                item["OriginalBotId"]: item["OriginalBotOwnerUserId"]
+                for item in alias_items
+                if "OriginalBotOwnerUserId" in item
+            },
+        )
+        if alias_items
+        else {}
+    )
+
     bots = []
     for item in response["Items"]:
         if "OriginalBotId" in item:
-            # Fetch original bots of alias bots
-            is_original_available = True
-            try:
-                bot = find_public_bot_by_id(item["OriginalBotId"])
+            bot = original_bots.get(item["OriginalBotId"])
+            if bot is not None:
                 logger.info(f"Found original bot: {bot.id}")
                 meta = BotMeta(
                     id=bot.id,
@@ -502,9 +541,8 @@ def fetch_all_bots_by_user_id(
                     sync_status=bot.sync_status,
                     has_bedrock_knowledge_base=bot.has_bedrock_knowledge_base(),
                 )
-            except RecordNotFoundError:
+            else:
                 # Original bot is removed
-                is_original_available = False
                 logger.info(f"Original bot {item['OriginalBotId']} has been removed")
                 meta = BotMeta(
                     id=item["OriginalBotId"],
@@ -521,40 +559,6 @@ def fetch_all_bots_by_user_id(
                     has_bedrock_knowledge_base=False,
                 )
 
-            if is_original_available and (
-                bot.title != item["Title"]
-                or bot.description != item["Description"]
-                or bot.sync_status != item["SyncStatus"]
-                or bot.has_knowledge() != item["HasKnowledge"]
-                or bot.conversation_quick_starters
-                != [
-                    ConversationQuickStarter(**starter)
-                    for starter in item.get("ConversationQuickStarters", [])
-                ]
-                or bot.active_models != item["ActiveModels"]
-            ):
-                # Update alias to the latest original bot
-                store_alias(
-                    user_id,
-                    BotAliasModel(
-                        id=decompose_bot_alias_id(item["SK"]),
-                        # Update title and description
-                        title=bot.title,
-                        description=bot.description,
-                        original_bot_id=item["OriginalBotId"],
-                        create_time=float(item["CreateTime"]),
-                        last_used_time=float(item["LastBotUsed"]),
-                        is_pinned=item["IsPinned"],
-                        sync_status=bot.sync_status,
-                        has_knowledge=bot.has_knowledge(),
-                        has_agent=bot.is_agent_enabled(),
-                        conversation_quick_starters=bot.conversation_quick_starters,
-                        active_models=ActiveModelsModel.model_validate(
-                            dict(bot.active_models)
-                        ),
-                    ),
-                )
-
             bots.append(meta)
         else:
             # Private bots
@@ -602,6 +606,23 @@ def fetch_all_bots(
     else:
         raise ValueError(f"Invalid kind: {kind}")
 
+    return _to_bot_meta_outputs(bots)
+
+
+def fetch_private_bot_page(
+    user_id: str, limit: int | None = None, next_token: str | None = None
+) -> tuple[list[BotMetaOutput], str | None]:
+    """Fetch a page of private bots.
+    The order is descending by `last_used_time`.
+    The second element is the token of the next page, if any.
+    """
+    bots, next_token = find_private_bot_page_by_user_id(
+        user_id, limit=limit, next_token=next_token
+    )
+    return _to_bot_meta_outputs(bots), next_token
+
+
+def _to_bot_meta_outputs(bots: list[BotMeta]) -> list[BotMetaOutput]:
     bot_metas = []
     for bot in bots:
         if not bot.has_bedrock_knowledge_base:
@@ -716,6 +737,7 @@ def fetch_bot_summary(user_id: str, bot_id: str) -> BotSummaryOutput:
                 active_models=ActiveModelsOutput.model_validate(
                     dict(bot.active_models)
                 ),
+                original_bot_owner_user_id=bot.owner_user_id,
             ),
         )
         return BotSummaryOutput(
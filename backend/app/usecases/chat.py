@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from typing import Callable
 
@@ -8,6 +9,7 @@ from app.agents.tools.agent_tool import (
 from app.agents.tools.knowledge import create_knowledge_tool
 from app.agents.utils import get_tool_by_name
 from app.bedrock import call_converse_api, compose_args_for_converse_api
+from app.logging_utils import log_payload
 from app.prompt import PROMPT_TO_CITE_TOOL_RESULTS, build_rag_prompt
 from app.repositories.conversation import (
     RecordNotFoundError,
@@ -18,6 +20,7 @@ from app.repositories.conversation import (
 from app.repositories.custom_bot import find_alias_by_id, store_alias
 from app.repositories.models.conversation import (
     ConversationModel,
+    CostLedgerEntryModel,
     MessageModel,
     RelatedDocumentModel,
     SimpleMessageModel,
@@ -39,9 +42,15 @@ from app.routes.schemas.conversation import (
     MessageOutput,
     type_model_name,
 )
-from app.stream import ConverseApiStreamHandler, OnStopInput, OnThinking
+from app.stream import (
+    CancellationToken,
+    ConverseApiStreamHandler,
+    OnStopInput,
+    OnThinking,
+)
+from app.tracing import traced
 from app.usecases.bot import fetch_bot, modify_bot_last_used_time
-from app.utils import get_current_time
+from app.utils import get_current_time, run_in_io_executor
 from app.vector_search import (
     SearchResult,
     search_related_docs,
@@ -54,6 +63,7 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
 
+@traced("prepare_conversation")
 def prepare_conversation(
     user_id: str,
     chat_input: ChatInput,
@@ -64,7 +74,7 @@ def prepare_conversation(
     try:
         # Fetch existing conversation
         conversation = find_conversation_by_id(user_id, chat_input.conversation_id)
-        logger.info(f"Found conversation: {conversation}")
+        logger.info(f"Found conversation: {conversation.id}")
         parent_id = chat_input.message.parent_message_id
         if chat_input.message.parent_message_id == "system" and chat_input.bot_id:
             # The case editing first user message and use bot
@@ -157,6 +167,7 @@ def prepare_conversation(
                                 ]
                             ),
                             active_models=bot.active_models,
+                            original_bot_owner_user_id=bot.owner_user_id,
                         ),
                     )
 
@@ -164,7 +175,6 @@ def prepare_conversation(
         conversation = ConversationModel(
             id=chat_input.conversation_id,
             title="New conversation",
-            total_price=0.0,
             create_time=current_time,
             message_map=initial_message_map,
             last_message_id="",
@@ -233,8 +243,42 @@ def chat(
     on_stop: Callable[[OnStopInput], None] | None = None,
     on_thinking: Callable[[OnThinking], None] | None = None,
     on_tool_result: Callable[[ToolRunResult], None] | None = None,
+    cancellation_token: CancellationToken | None = None,
 ) -> tuple[ConversationModel, MessageModel]:
-    user_msg_id, conversation, bot = prepare_conversation(user_id, chat_input)
+    """Synchronous wrapper of `chat_async`.
+    NOTE: Must not be called from a running event loop. Await `chat_async` instead.
+    """
+    return asyncio.run(
+        chat_async(
+            user_id=user_id,
+            chat_input=chat_input,
+            on_stream=on_stream,
+            on_stop=on_stop,
+            on_thinking=on_thinking,
+            on_tool_result=on_tool_result,
+            cancellation_token=cancellation_token,
+        )
+    )
+
+
+@traced("chat")
+async def chat_async(
+    user_id: str,
+    chat_input: ChatInput,
+    on_stream: Callable[[str], None] | None = None,
+    on_stop: Callable[[OnStopInput], None] | None = None,
+    on_thinking: Callable[[OnThinking], None] | None = None,
+    on_tool_result: Callable[[ToolRunResult], None] | None = None,
+    cancellation_token: CancellationToken | None = None,
+) -> tuple[ConversationModel, MessageModel]:
+    """Chat with the model. Callbacks are called on the event loop.
+    Blocking calls to DynamoDB, S3 and tools run on the I/O executor.
+    When `cancellation_token` is cancelled, the generation is aborted, no more tools are run,
+    and the partial answer is stored so that it can be continued.
+    """
+    user_msg_id, conversation, bot = await run_in_io_executor(
+        prepare_conversation, user_id, chat_input
+    )
 
     tools = (
         {t.name: get_tool_by_name(t.name) for t in bot.agent.tools}
@@ -284,8 +328,12 @@ def chat(
                         }
                     )
 
-                search_results = search_related_docs(bot=bot, query=content.body)
-                logger.info(f"Search results from vector store: {search_results}")
+                search_results = await run_in_io_executor(
+                    search_related_docs, bot=bot, query=content.body
+                )
+                log_payload(
+                    logger, "Search results from vector store: %s", search_results
+                )
 
                 if on_tool_result:
                     on_tool_result(
@@ -327,10 +375,15 @@ def chat(
 
     continue_generate = chat_input.continue_generate
 
+    previous_thinking_log: list[SimpleMessageModel] = []
     if continue_generate:
         message_for_continue_generate = SimpleMessageModel.from_message_model(
             message=message_map[conversation.last_message_id],
         )
+        # Keep the tool uses of the answer, e.g. when it was cancelled after them
+        previous_thinking_log = (
+            message_map[conversation.last_message_id].thinking_log or []
+        )
 
     else:
         messages.append(
@@ -352,29 +405,54 @@ def chat(
         generation_params=generation_params,
         guardrail=guardrail,
         tools=tools,
+        prompt_caching=bot.prompt_caching if bot else None,
         on_stream=on_stream,
         on_thinking=on_thinking,
     )
 
     thinking_log: list[SimpleMessageModel] = []
     while True:
-        result = stream_handler.run(
+        result = await stream_handler.run_async(
             messages=messages,
             grounding_source=grounding_source,
             message_for_continue_generate=message_for_continue_generate,
+            cancellation_token=cancellation_token,
         )
 
         message = result["message"]
         stop_reason = result["stop_reason"]
 
-        conversation.total_price += result["price"]
-        conversation.should_continue = stop_reason == "max_tokens"
+        conversation.cost_ledger.append(
+            CostLedgerEntryModel(
+                message_id=user_msg_id,
+                model=chat_input.message.model,
+                input_tokens=result["input_token_count"],
+                output_tokens=result["output_token_count"],
+                cache_read_input_tokens=result["cache_read_input_token_count"],
+                cache_write_input_tokens=result["cache_write_input_token_count"],
+                price=result["price"],
+            )
+        )
+        conversation.should_continue = stop_reason in ("max_tokens", "cancelled")
 
         if stop_reason != "tool_use":
+            full_thinking_log = previous_thinking_log + thinking_log
+            if (
+                stop_reason == "cancelled"
+                and len(message.content) == 0
+                and len(full_thinking_log) == 0
+            ):
+                # Nothing was generated before the cancellation
+                logger.info("Generation cancelled before the answer started.")
+                conversation.should_continue = False
+                break
+
             message.parent = user_msg_id
 
-            if len(thinking_log) > 0:
-                message.thinking_log = thinking_log
+            if len(full_thinking_log) > 0:
+                # NOTE: The answer has no content if it was cancelled after tool use.
+                # It is stored with the tool uses so that it can be continued.
+                message.thinking_log = full_thinking_log
 
             if chat_input.continue_generate:
                 # For continue generate
@@ -429,10 +507,18 @@ def chat(
         run_results: list[ToolRunResult] = []
         for content in tool_use_contents:
             tool = tools[content.body.name]
-            run_result = tool.run(
-                tool_use_id=content.body.tool_use_id,
-                input=content.body.input,
-            )
+            if cancellation_token is not None and cancellation_token.is_cancelled:
+                # NOTE: Every tool use still needs a result so that the answer can be continued.
+                # The answer is stored as cancelled by the next `run_async`.
+                run_result = tool.cancelled(tool_use_id=content.body.tool_use_id)
+
+            else:
+                run_result = await run_in_io_executor(
+                    tool.run,
+                    tool_use_id=content.body.tool_use_id,
+                    input=content.body.input,
+                )
+
             run_results.append(run_result)
 
             if run_result["status"] == "success":
@@ -455,11 +541,14 @@ def chat(
         thinking_log.append(tool_result_message)
 
     # Store conversation before finish streaming so that front-end can avoid 404 issue
-    store_conversation(user_id, conversation)
-    store_related_documents(
-        user_id=user_id,
-        conversation_id=conversation.id,
-        related_documents=related_documents,
+    await asyncio.gather(
+        run_in_io_executor(store_conversation, user_id, conversation),
+        run_in_io_executor(
+            store_related_documents,
+            user_id=user_id,
+            conversation_id=conversation.id,
+            related_documents=related_documents,
+        ),
     )
 
     if on_stop:
@@ -469,7 +558,7 @@ def chat(
     if chat_input.bot_id:
         logger.info("Bot id is provided. Updating bot last used time.")
         # Update bot last used time
-        modify_bot_last_used_time(user_id, chat_input.bot_id)
+        await run_in_io_executor(modify_bot_last_used_time, user_id, chat_input.bot_id)
 
     return conversation, message
 
@@ -1,8 +1,15 @@
+import asyncio
+import contextvars
 import json
 import logging
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Any, Literal
+from functools import partial
+from typing import Any, Callable, Literal, TypeVar
 
 import boto3
 from app.repositories.models.custom_bot_guardrails import BedrockGuardrailsModel
@@ -16,6 +23,21 @@ BEDROCK_REGION = os.environ.get("BEDROCK_REGION", "us-east-1")
 PUBLISH_API_CODEBUILD_PROJECT_NAME = os.environ.get(
     "PUBLISH_API_CODEBUILD_PROJECT_NAME", ""
 )
+ASYNC_IO_MAX_WORKERS = int(os.environ.get("ASYNC_IO_MAX_WORKERS", "256"))
+PRESIGNED_URL_CACHE_SIZE = int(os.environ.get("PRESIGNED_URL_CACHE_SIZE", "1024"))
+# Presigned URLs to get objects are reused for this part of their expiration
+PRESIGNED_URL_REUSE_RATIO = 0.5
+PRESIGNED_URL_MAX_REUSE_SECONDS = 600
+
+T = TypeVar("T")
+
+# NOTE: boto3 does not support asyncio, so blocking AWS calls of the async pipeline run on this executor.
+# It is separated from the threadpool of FastAPI (40 threads by default) so that it does not cap concurrent chats.
+_io_executor = ThreadPoolExecutor(
+    max_workers=ASYNC_IO_MAX_WORKERS, thread_name_prefix="aws-io"
+)
+_shared_clients: dict[tuple[str, str], Any] = {}
+_shared_clients_lock = threading.Lock()
 
 
 def snake_to_camel(snake_str):
@@ -37,6 +59,28 @@ def get_bedrock_runtime_client(region=BEDROCK_REGION):
     return client
 
 
+def get_shared_bedrock_runtime_client(region=BEDROCK_REGION):
+    """Get a bedrock-runtime client shared across threads.
+    Clients are thread-safe once created, but creating them concurrently is not.
+    """
+    key = ("bedrock-runtime", region)
+    with _shared_clients_lock:
+        if key not in _shared_clients:
+            _shared_clients[key] = boto3.client("bedrock-runtime", region_name=region)
+        return _shared_clients[key]
+
+
+async def run_in_io_executor(func: Callable[..., T], *args, **kwargs) -> T:
+    """Run a blocking function on the I/O executor.
+    Context variables (e.g. the current tracing span) are propagated like `asyncio.to_thread`.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        _io_executor, partial(context.run, func, *args, **kwargs)
+    )
+
+
 def get_bedrock_agent_client(region=BEDROCK_REGION):
     client = boto3.client("bedrock-agent-runtime", region_name=region)
     return client
@@ -47,6 +91,94 @@ def get_current_time():
     return int(datetime.now().timestamp() * 1000)
 
 
+class PresignedUrlSigner:
+    """Generate presigned URLs with a client shared across threads.
+    URLs to get objects are memoized per (bucket, key, expiration) and reused for a part of
+    their expiration, so that listing the same documents again does not sign them again.
+    """
+
+    def __init__(
+        self,
+        region: str = BEDROCK_REGION,
+        cache_size: int = PRESIGNED_URL_CACHE_SIZE,
+    ):
+        self.region = region
+        self.cache_size = cache_size
+        self._client = None
+        self._lock = threading.Lock()
+        # Expiration of the reuse and URL, least recently used first
+        self._urls: OrderedDict[tuple[str, str, int], tuple[float, str]] = OrderedDict()
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                # See: https://github.com/boto/boto3/issues/421#issuecomment-1849066655
+                self._client = boto3.client(
+                    "s3",
+                    region_name=self.region,
+                    config=Config(
+                        signature_version="v4", s3={"addressing_style": "path"}
+                    ),
+                )
+            return self._client
+
+    def _sign(
+        self,
+        bucket: str,
+        key: str,
+        content_type: str | None,
+        expiration: int,
+        client_method: str,
+    ) -> str:
+        params = {"Bucket": bucket, "Key": key}
+        if content_type:
+            params["ContentType"] = content_type
+        return self.client.generate_presigned_url(
+            ClientMethod=client_method,
+            Params=params,
+            ExpiresIn=expiration,
+            HttpMethod="PUT" if client_method == "put_object" else "GET",
+        )
+
+    def generate(
+        self,
+        bucket: str,
+        key: str,
+        content_type: str | None = None,
+        expiration: int = 3600,
+        client_method: Literal["put_object", "get_object"] = "put_object",
+    ) -> str:
+        if client_method != "get_object":
+            # NOTE: Upload URLs are issued for new keys, so they are not reused
+            return self._sign(bucket, key, content_type, expiration, client_method)
+
+        cache_key = (bucket, key, expiration)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._urls.get(cache_key)
+            if cached is not None and cached[0] > now:
+                self._urls.move_to_end(cache_key)
+                return cached[1]
+
+        url = self._sign(bucket, key, content_type, expiration, client_method)
+        # NOTE: URLs signed with temporary credentials expire with them. Credentials
+        # are refreshed at least 10 minutes before they expire, so URLs are reused for
+        # 10 minutes at most to be valid for the rest of their expiration.
+        reuse_seconds = min(
+            expiration * PRESIGNED_URL_REUSE_RATIO, PRESIGNED_URL_MAX_REUSE_SECONDS
+        )
+        with self._lock:
+            self._urls[cache_key] = (now + reuse_seconds, url)
+            self._urls.move_to_end(cache_key)
+            while len(self._urls) > self.cache_size:
+                self._urls.popitem(last=False)
+        return url
+
+
+_presigned_url_signer = PresignedUrlSigner()
+
+
 def generate_presigned_url(
     bucket: str,
     key: str,
@@ -54,23 +186,13 @@ def generate_presigned_url(
     expiration=3600,
     client_method: Literal["put_object", "get_object"] = "put_object",
 ) -> str:
-    # See: https://github.com/boto/boto3/issues/421#issuecomment-1849066655
-    client = boto3.client(
-        "s3",
-        region_name=BEDROCK_REGION,
-        config=Config(signature_version="v4", s3={"addressing_style": "path"}),
+    return _presigned_url_signer.generate(
+        bucket=bucket,
+        key=key,
+        content_type=content_type,
+        expiration=expiration,
+        client_method=client_method,
     )
-    params = {"Bucket": bucket, "Key": key}
-    if content_type:
-        params["ContentType"] = content_type
-    response = client.generate_presigned_url(
-        ClientMethod=client_method,
-        Params=params,
-        ExpiresIn=expiration,
-        HttpMethod="PUT" if client_method == "put_object" else "GET",
-    )
-
-    return response
 
 
 def compose_upload_temp_s3_prefix(user_id: str, bot_id: str) -> str:
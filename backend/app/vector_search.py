@@ -7,6 +7,7 @@ from app.repositories.models.conversation import (
     TextToolResultModel,
 )
 from app.repositories.models.custom_bot import BotModel
+from app.tracing import traced
 from app.utils import get_bedrock_agent_client
 
 from botocore.exceptions import ClientError
@@ -127,5 +128,6 @@ def _bedrock_knowledge_base_search(bot: BotModel, query: str) -> list[SearchResu
         raise e
 
 
+@traced("search_related_docs")
 def search_related_docs(bot: BotModel, query: str) -> list[SearchResult]:
     return _bedrock_knowledge_base_search(bot, query)
@@ -1,3 +1,5 @@
+import base64
+import gzip
 import json
 import logging
 import os
@@ -5,30 +7,49 @@ import traceback
 from datetime import datetime
 from decimal import Decimal as decimal
 from queue import SimpleQueue
-from threading import Thread
+from threading import Event, Thread
 from typing import BinaryIO, Literal, TypedDict
 
 import boto3
 from app.auth import verify_token
+from app.logging_utils import log_payload
+from app.metrics import WEBSOCKET_FRAMES_SENT, EmfExporter, instrument_boto3_client
 from app.agents.tools.agent_tool import (
     ToolRunResult,
 )
 from app.repositories.conversation import RecordNotFoundError
 from app.routes.schemas.conversation import ChatInput
-from app.stream import OnStopInput, OnThinking
+from app.stream import CancellationToken, OnStopInput, OnThinking
 from app.usecases.chat import (
     chat,
 )
-from boto3.dynamodb.conditions import Attr, Key
+from app.tracing import trace_span
+from app.utils import generate_presigned_url
+from boto3.dynamodb.conditions import Key
 
 WEBSOCKET_SESSION_TABLE_NAME = os.environ["WEBSOCKET_SESSION_TABLE_NAME"]
+LARGE_MESSAGE_BUCKET = os.environ.get("LARGE_MESSAGE_BUCKET")
+BEDROCK_REGION = os.environ.get("BEDROCK_REGION", "us-east-1")
 
 dynamodb_client = boto3.resource("dynamodb")
+instrument_boto3_client(dynamodb_client.meta.client)
 table = dynamodb_client.Table(WEBSOCKET_SESSION_TABLE_NAME)
+s3_client = instrument_boto3_client(boto3.client("s3", BEDROCK_REGION))
+emf_exporter = EmfExporter()
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Zero is reserved for user id and one or more for message parts.
+STOP_REQUEST_MESSAGE_PART_ID = -1
+STOP_REQUEST_POLLING_INTERVAL = 1.0  # seconds
+# The interval is doubled up to this, so that long generations read less
+STOP_REQUEST_MAX_POLLING_INTERVAL = float(
+    os.environ.get("STOP_REQUEST_MAX_POLLING_INTERVAL", 4.0)
+)  # seconds
+SUPPORTED_COMPRESSIONS = ["gzip"]
+CHAT_INPUT_UPLOAD_EXPIRATION = 60 * 5  # seconds
+
 
 class _NotifyCommand(TypedDict):
     type: Literal["notify"]
@@ -43,10 +64,16 @@ _Command = _NotifyCommand | _FinishCommand
 
 
 class NotificationSender:
-    def __init__(self, endpoint_url: str, connection_id: str) -> None:
+    def __init__(
+        self,
+        endpoint_url: str,
+        connection_id: str,
+        cancellation_token: CancellationToken | None = None,
+    ) -> None:
         self.commands = SimpleQueue[_Command]()
         self.endpoint_url = endpoint_url
         self.connection_id = connection_id
+        self.cancellation_token = cancellation_token
 
     def run(self):
         import boto3
@@ -60,21 +87,28 @@ class NotificationSender:
             command = self.commands.get()
             if command["type"] == "notify":
                 try:
-                    gatewayapi.post_to_connection(
-                        ConnectionId=self.connection_id,
-                        Data=command["payload"],
-                    )
+                    with trace_span("notification.post"):
+                        gatewayapi.post_to_connection(
+                            ConnectionId=self.connection_id,
+                            Data=command["payload"],
+                        )
+                    WEBSOCKET_FRAMES_SENT.inc(status="success")
 
                 except (
                     gatewayapi.exceptions.GoneException,
                     gatewayapi.exceptions.ForbiddenException,
                 ) as e:
+                    WEBSOCKET_FRAMES_SENT.inc(status="gone")
                     logger.error(
                         f"Shutdown the notification sender due to an exception: {e}"
                     )
+                    # Nobody receives the answer any more
+                    if self.cancellation_token is not None:
+                        self.cancellation_token.cancel()
                     break
 
                 except Exception as e:
+                    WEBSOCKET_FRAMES_SENT.inc(status="error")
                     logger.error(f"Failed to send notification: {e}")
 
             elif command["type"] == "finish":
@@ -161,13 +195,123 @@ class NotificationSender:
             )
 
 
+def concatenate_message_parts(table, connection_id: str) -> tuple[str, str]:
+    """Read the session and concatenate the message parts.
+    All items are read with a single query sorted by `MessagePartId`:
+    zero holds the user id and the following ones hold the message parts in order.
+    :return: Tuple of user id and the full message.
+    """
+    query_params = dict(
+        KeyConditionExpression=Key("ConnectionId").eq(connection_id)
+        & Key("MessagePartId").gte(0),
+        # The last part may have been written just before `END`
+        ConsistentRead=True,
+    )
+    items = []
+    while True:
+        response = table.query(**query_params)
+        items.extend(response["Items"])
+
+        if "LastEvaluatedKey" in response:
+            query_params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        else:
+            break
+
+    if len(items) == 0 or items[0]["MessagePartId"] != 0:
+        raise ValueError("Session is not started.")
+
+    session = items[0]
+    logger.info(f"Number of message chunks: {len(items) - 1}")
+    full_message = "".join(item["MessagePart"] for item in items[1:])
+
+    if session.get("Compression") == "gzip":
+        # Parts are the base64 encoded gzip of the full message
+        full_message = gzip.decompress(base64.b64decode(full_message)).decode("utf-8")
+
+    return session["UserId"], full_message
+
+
+def compose_chat_input_upload_key(user_id: str, connection_id: str) -> str:
+    return f"chat-inputs/{user_id}/{connection_id}.json"
+
+
+def find_session_user_id(table, connection_id: str) -> str:
+    response = table.get_item(
+        Key={"ConnectionId": connection_id, "MessagePartId": decimal(0)},
+        ProjectionExpression="UserId",
+        ConsistentRead=True,
+    )
+    if "Item" not in response:
+        raise ValueError("Session is not started.")
+
+    return response["Item"]["UserId"]
+
+
+def load_uploaded_chat_input(user_id: str, connection_id: str) -> ChatInput:
+    """Load the chat input uploaded to S3 via presigned URL and remove the object."""
+    key = compose_chat_input_upload_key(user_id, connection_id)
+    response = s3_client.get_object(Bucket=LARGE_MESSAGE_BUCKET, Key=key)
+    try:
+        # Parse the bytes directly, without building an intermediate dict with `json.loads`
+        return ChatInput.model_validate_json(response["Body"].read())
+
+    finally:
+        s3_client.delete_object(Bucket=LARGE_MESSAGE_BUCKET, Key=key)
+
+
+def watch_stop_request(
+    connection_id: str,
+    cancellation_token: CancellationToken,
+    finished: Event,
+):
+    """Poll the session table for a stop request sent by the `STOP` step,
+    which is handled by another invocation.
+    The polling interval is doubled after each read up to
+    `STOP_REQUEST_MAX_POLLING_INTERVAL`, and the polling ends when the generation is
+    cancelled otherwise (e.g. the client disconnected).
+    """
+    interval = STOP_REQUEST_POLLING_INTERVAL
+    while not finished.wait(timeout=interval):
+        if cancellation_token.is_cancelled:
+            break
+
+        interval = min(interval * 2, STOP_REQUEST_MAX_POLLING_INTERVAL)
+        try:
+            response = table.get_item(
+                Key={
+                    "ConnectionId": connection_id,
+                    "MessagePartId": decimal(STOP_REQUEST_MESSAGE_PART_ID),
+                },
+            )
+        except Exception as e:
+            logger.error(f"Failed to check stop request: {e}")
+            continue
+
+        if "Item" in response:
+            logger.info("Stop requested by the client.")
+            cancellation_token.cancel()
+            break
+
+
 def process_chat_input(
     user_id: str,
     chat_input: ChatInput,
     notificator: NotificationSender,
 ) -> dict:
     """Process chat input and send the message to the client."""
-    logger.info(f"Received chat input: {chat_input}")
+    log_payload(logger, "Received chat input: %s", chat_input)
+
+    cancellation_token = notificator.cancellation_token or CancellationToken()
+    finished = Event()
+    stop_request_thread = Thread(
+        target=lambda: watch_stop_request(
+            connection_id=notificator.connection_id,
+            cancellation_token=cancellation_token,
+            finished=finished,
+        ),
+        daemon=True,
+    )
+    stop_request_thread.start()
 
     try:
         chat(
@@ -185,6 +329,7 @@ def process_chat_input(
             on_tool_result=lambda run_result: notificator.on_agent_tool_result(
                 run_result=run_result
             ),
+            cancellation_token=cancellation_token,
         )
 
         return {"statusCode": 200, "body": "Message sent."}
@@ -223,9 +368,17 @@ def process_chat_input(
             ),
         }
 
+    finally:
+        finished.set()
+
 
 def handler(event, context):
-    logger.info(f"Received event: {event}")
+    # NOTE: The body contains the JWT on `START` and message parts otherwise
+    log_payload(
+        logger,
+        "Received event: %s",
+        {**event, "body": f"<{len(event.get('body') or '')} chars>"},
+    )
     route_key = event["requestContext"]["routeKey"]
 
     if route_key == "$connect":
@@ -240,6 +393,7 @@ def handler(event, context):
     notificator = NotificationSender(
         endpoint_url=endpoint_url,
         connection_id=connection_id,
+        cancellation_token=CancellationToken(),
     )
 
     now = datetime.now()
@@ -263,6 +417,14 @@ def handler(event, context):
         # 4. This handler receives the message parts and appends them to the item in DynamoDB with index.
         # 5. Client sends `END` message to the WebSocket API.
         # 6. This handler receives the `END` message, concatenates the parts and sends the message to Bedrock.
+        # Client can compress the message by specifying `compression` on `START`.
+        # In that case, the parts are the base64 encoded gzip of the full message.
+        #
+        # Instead of 3. and 4., large messages can be uploaded to S3 directly:
+        # 3'. Client sends `UPLOAD` message and receives a presigned URL in `UPLOAD_URL` message.
+        # 4'. Client puts the full message to the URL, then sends `END` message with the `objectKey`.
+        # While the answer is being generated, client can send `STOP` message to abort the generation.
+        # The partial answer is stored and can be continued later.
         if step == "START":
             token = body["token"]
             try:
@@ -282,56 +444,95 @@ def handler(event, context):
 
             user_id = decoded["sub"]
 
+            compression = body.get("compression")
+            if compression is not None and compression not in SUPPORTED_COMPRESSIONS:
+                return {
+                    "statusCode": 400,
+                    "body": json.dumps(
+                        dict(
+                            status="ERROR",
+                            reason=f"Unsupported compression: {compression}",
+                        )
+                    ),
+                }
+
+            # Clear the stop request of the previous message on this connection
+            table.delete_item(
+                Key={
+                    "ConnectionId": connection_id,
+                    "MessagePartId": decimal(STOP_REQUEST_MESSAGE_PART_ID),
+                },
+            )
+
             # Store user id
-            response = table.put_item(
+            session = {
+                "ConnectionId": connection_id,
+                # Store as zero
+                "MessagePartId": decimal(0),
+                "UserId": user_id,
+                "expire": expire,
+            }
+            if compression is not None:
+                session["Compression"] = compression
+
+            response = table.put_item(Item=session)
+            return {"statusCode": 200, "body": "Session started."}
+        elif step == "STOP":
+            # The invocation generating the answer polls this item
+            table.put_item(
                 Item={
                     "ConnectionId": connection_id,
-                    # Store as zero
-                    "MessagePartId": decimal(0),
-                    "UserId": user_id,
+                    "MessagePartId": decimal(STOP_REQUEST_MESSAGE_PART_ID),
                     "expire": expire,
                 }
             )
-            return {"statusCode": 200, "body": "Session started."}
-        elif step == "END":
-            # Retrieve user id
-            response = table.query(
-                KeyConditionExpression=Key("ConnectionId").eq(connection_id),
-                FilterExpression=Attr("UserId").exists(),
+            return {"statusCode": 200, "body": "Stop requested."}
+        elif step == "UPLOAD":
+            user_id = find_session_user_id(table=table, connection_id=connection_id)
+            object_key = compose_chat_input_upload_key(user_id, connection_id)
+            upload_url = generate_presigned_url(
+                LARGE_MESSAGE_BUCKET,  # type: ignore
+                object_key,
+                content_type="application/json",
+                expiration=CHAT_INPUT_UPLOAD_EXPIRATION,
+                client_method="put_object",
             )
-            user_id = response["Items"][0]["UserId"]
-
-            # Concatenate the message parts
-            message_parts = []
-            last_evaluated_key = None
-
-            while True:
-                if last_evaluated_key:
-                    response = table.query(
-                        KeyConditionExpression=Key("ConnectionId").eq(connection_id)
-                        # Zero is reserved for user id, so start from 1
-                        & Key("MessagePartId").gte(1),
-                        ExclusiveStartKey=last_evaluated_key,
-                    )
-                else:
-                    response = table.query(
-                        KeyConditionExpression=Key("ConnectionId").eq(connection_id)
-                        & Key("MessagePartId").gte(1),
+            return {
+                "statusCode": 200,
+                "body": json.dumps(
+                    dict(
+                        status="UPLOAD_URL",
+                        url=upload_url,
+                        object_key=object_key,
                     )
+                ),
+            }
+        elif step == "END":
+            object_key = body.get("objectKey")
+            if object_key is not None:
+                user_id = find_session_user_id(table=table, connection_id=connection_id)
+                # The key is issued for the session, so reject the others
+                if object_key != compose_chat_input_upload_key(user_id, connection_id):
+                    return {
+                        "statusCode": 403,
+                        "body": json.dumps(
+                            dict(
+                                status="ERROR",
+                                reason="Invalid object key.",
+                            )
+                        ),
+                    }
+
+                chat_input = load_uploaded_chat_input(user_id, connection_id)
+
+            else:
+                user_id, full_message = concatenate_message_parts(
+                    table=table, connection_id=connection_id
+                )
 
-                message_parts.extend(response["Items"])
-
-                if "LastEvaluatedKey" in response:
-                    last_evaluated_key = response["LastEvaluatedKey"]
-                else:
-                    break
-
-            logger.info(f"Number of message chunks: {len(message_parts)}")
-            message_parts.sort(key=lambda x: x["MessagePartId"])
-            full_message = "".join(item["MessagePart"] for item in message_parts)
+                # Process the concatenated full message
+                chat_input = ChatInput(**json.loads(full_message))
 
-            # Process the concatenated full message
-            chat_input = ChatInput(**json.loads(full_message))
             return process_chat_input(
                 user_id=user_id,
                 chat_input=chat_input,
@@ -371,3 +572,4 @@ def handler(event, context):
     finally:
         notificator.finish()
         notification_thread.join(timeout=60)
+        emf_exporter.flush()
@@ -0,0 +1,234 @@
+"""Memory profile of a chat turn (load and store) for a conversation with a large attachment.
+
+- legacy: per-message `model_dump` and `json.dumps` twice on store (size check and body),
+  `json.loads` and per-message `model_validate` on load, and the whole conversation
+  formatted into the log messages.
+- current: `store_conversation` / `find_conversation_by_id`, which (de)serialize the
+  message map once and keep the decoded bytes by reference.
+
+Each mode runs in its own process because peak RSS never goes down.
+DynamoDB and S3 are replaced with in-memory fakes, so only the serialization is measured.
+
+Usage:
+    python -m benchmarks.attachment_memory --size-mb 20
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from unittest.mock import MagicMock, patch
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("LARGE_MESSAGE_BUCKET", "benchmark-large-message-bucket")
+
+from app.repositories.conversation import (
+    THRESHOLD_LARGE_MESSAGE,
+    find_conversation_by_id,
+    store_conversation,
+)
+from app.repositories.models.conversation import (
+    AttachmentContentModel,
+    ConversationModel,
+    MessageModel,
+    TextContentModel,
+)
+
+
+def _message(role: str, content: list, parent: str | None, children: list[str]):
+    return MessageModel(
+        role=role,
+        content=content,
+        model="claude-v3.5-sonnet",
+        children=children,
+        parent=parent,
+        create_time=1627984879.9,
+        feedback=None,
+        used_chunks=None,
+        thinking_log=None,
+    )
+
+
+def _conversation(size_mb: int) -> ConversationModel:
+    return ConversationModel(
+        id="conversation",
+        create_time=1627984879.9,
+        title="Attachment",
+        message_map={
+            "system": _message(
+                "system",
+                [TextContentModel(content_type="text", body="")],
+                None,
+                ["user"],
+            ),
+            "user": _message(
+                "user",
+                [
+                    TextContentModel(content_type="text", body="Summarize the file."),
+                    AttachmentContentModel(
+                        content_type="attachment",
+                        file_name="report.pdf",
+                        body=os.urandom(size_mb * 1024 * 1024),
+                    ),
+                ],
+                "system",
+                ["assistant"],
+            ),
+            "assistant": _message(
+                "assistant",
+                [TextContentModel(content_type="text", body="The file is about...")],
+                "user",
+                [],
+            ),
+        },
+        last_message_id="assistant",
+        bot_id=None,
+        should_continue=False,
+    )
+
+
+class _FakeStorage:
+    def __init__(self):
+        self.item: dict = {}
+        self.body: bytes | str = b""
+        self.table = MagicMock()
+        self.table.put_item.side_effect = self._put_item
+        self.table.query.side_effect = lambda **_: {"Items": [self.item]}
+        self.s3_client = MagicMock()
+        self.s3_client.put_object.side_effect = self._put_object
+        self.s3_client.get_object.side_effect = lambda **_: {
+            "Body": MagicMock(read=lambda: self.body)
+        }
+
+    def _put_item(self, Item: dict):
+        self.item = Item
+
+    def _put_object(self, Bucket: str, Key: str, Body: bytes | str):
+        self.body = Body
+
+
+def _legacy_store(storage: _FakeStorage, conversation: ConversationModel):
+    log = f"Storing conversation: {conversation.model_dump_json()}"
+    message_map = {
+        k: v.model_dump(by_alias=True) for k, v in conversation.message_map.items()
+    }
+    message_map_size = len(json.dumps(message_map).encode("utf-8"))
+    assert message_map_size > THRESHOLD_LARGE_MESSAGE
+    storage.s3_client.put_object(
+        Bucket="bucket", Key="message_map.json", Body=json.dumps(message_map)
+    )
+    storage.table.put_item(
+        Item={
+            "MessageMap": json.dumps(
+                {k: v for k, v in message_map.items() if k == "system"}
+            )
+        }
+    )
+    del log
+
+
+def _legacy_find(storage: _FakeStorage) -> ConversationModel:
+    response = storage.s3_client.get_object(Bucket="bucket", Key="message_map.json")
+    body = response["Body"].read()
+    message_map = json.loads(body.decode("utf-8") if type(body) == bytes else body)
+    messages = {k: MessageModel.model_validate(v) for k, v in message_map.items()}
+    conversation = ConversationModel(
+        id="conversation",
+        create_time=1627984879.9,
+        title="Attachment",
+        message_map=messages,
+        last_message_id="assistant",
+        bot_id=None,
+        should_continue=False,
+    )
+    log = f"Found conversation: {conversation}"
+    del log
+    return conversation
+
+
+def _run_turn(mode: str, conversation: ConversationModel):
+    storage = _FakeStorage()
+    if mode == "legacy":
+        _legacy_store(storage, conversation)
+        found = _legacy_find(storage)
+        # The next turn stores it again
+        _legacy_store(storage, found)
+        return
+
+    with (
+        patch("app.repositories.conversation._get_table_client") as get_table_client,
+        patch("app.repositories.conversation.s3_client", storage.s3_client),
+    ):
+        get_table_client.return_value = storage.table
+        store_conversation("user", conversation)
+        found = find_conversation_by_id("user", "conversation")
+        store_conversation("user", found)
+
+
+def _measure(mode: str, size_mb: int):
+    conversation = _conversation(size_mb)
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    _run_turn(mode, conversation)
+    duration = time.perf_counter() - start
+    _, peak_traced = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # NOTE: `ru_maxrss` is in kilobytes on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(
+        json.dumps(
+            {
+                "mode": mode,
+                "duration": duration,
+                "peak_traced_mb": peak_traced / 1024 / 1024,
+                "peak_rss_mb": peak_rss / 1024,
+                "peak_rss_growth_mb": (peak_rss - baseline_rss) / 1024,
+            }
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=20)
+    parser.add_argument("--mode", choices=["legacy", "current"])
+    args = parser.parse_args()
+
+    if args.mode:
+        _measure(args.mode, args.size_mb)
+        return
+
+    for mode in ["legacy", "current"]:
+        output = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.attachment_memory",
+                "--size-mb",
+                str(args.size_mb),
+                "--mode",
+                mode,
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{args.size_mb:>3}MB {mode:<8} "
+            f"peak_rss={result['peak_rss_mb']:7.1f}MB "
+            f"(+{result['peak_rss_growth_mb']:6.1f}MB) "
+            f"peak_traced={result['peak_traced_mb']:7.1f}MB "
+            f"turn={result['duration'] * 1000:8.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
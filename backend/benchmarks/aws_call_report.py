@@ -0,0 +1,159 @@
+"""AWS API calls (fan-out) per use case of `usecases/chat.py` and `usecases/bot.py`.
+
+Each use case runs once against moto (see `local_aws`) with Bedrock replaced by
+`FakeBedrockRuntimeClient`, and the botocore calls it makes are counted by operation.
+With `--lambda`, `AWS_EXECUTION_ENV` is set so that the repositories assume the table access
+role with row-level policies as they do on Lambda, which adds the STS calls.
+
+Usage:
+    python -m benchmarks.aws_call_report [--lambda] [--output fan_out.json]
+"""
+
+import argparse
+import json
+import os
+from contextlib import ExitStack
+from typing import Callable
+from unittest.mock import patch
+
+from tests.test_usecases.utils.local_aws import local_aws
+
+from app.routes.schemas.bot import ActiveModelsInput, BotInput
+from app.usecases import bot, chat
+from benchmarks.fake_bedrock import FakeBedrockRuntimeClient
+from tests.test_usecases.utils.aws_calls import AwsCallRecorder, count_by_service
+from tests.test_usecases.utils.seed import (
+    CONVERSATION_ID,
+    OWNED_BOT_ID,
+    PUBLIC_BOT_ID,
+    TABLE_ACCESS_ROLE_ARN,
+    USER_ID,
+    chat_input,
+    seed,
+)
+
+USE_CASES: list[tuple[str, Callable[[], object]]] = [
+    (
+        "chat: new conversation without bot",
+        lambda: chat.chat(USER_ID, chat_input("new-conversation", None)),
+    ),
+    (
+        "chat: existing conversation with owned bot",
+        lambda: chat.chat(
+            USER_ID, chat_input(CONVERSATION_ID, OWNED_BOT_ID, parent_message_id="1")
+        ),
+    ),
+    (
+        "chat: new conversation with public bot",
+        lambda: chat.chat(USER_ID, chat_input("public-conversation", PUBLIC_BOT_ID)),
+    ),
+    (
+        "chat: fetch_conversation",
+        lambda: chat.fetch_conversation(USER_ID, CONVERSATION_ID),
+    ),
+    (
+        "bot: create_new_bot",
+        lambda: bot.create_new_bot(
+            USER_ID,
+            BotInput(
+                id="new-bot",
+                title="New Bot",
+                instruction="",
+                description="",
+                generation_params=None,
+                agent=None,
+                knowledge=None,
+                display_retrieved_chunks=True,
+                conversation_quick_starters=None,
+                bedrock_knowledge_base=None,
+                bedrock_guardrails=None,
+                active_models=ActiveModelsInput(),
+            ),
+        ),
+    ),
+    ("bot: fetch_bot (owned)", lambda: bot.fetch_bot(USER_ID, OWNED_BOT_ID)),
+    ("bot: fetch_bot (public)", lambda: bot.fetch_bot(USER_ID, PUBLIC_BOT_ID)),
+    (
+        "bot: fetch_all_bots_by_user_id",
+        lambda: bot.fetch_all_bots_by_user_id(USER_ID, limit=30),
+    ),
+    (
+        "bot: fetch_bot_summary (owned)",
+        lambda: bot.fetch_bot_summary(USER_ID, OWNED_BOT_ID),
+    ),
+    (
+        "bot: fetch_bot_summary (public)",
+        lambda: bot.fetch_bot_summary(USER_ID, PUBLIC_BOT_ID),
+    ),
+    (
+        "bot: modify_pin_status (alias)",
+        lambda: bot.modify_pin_status(USER_ID, PUBLIC_BOT_ID, True),
+    ),
+    (
+        "bot: modify_bot_last_used_time (alias)",
+        lambda: bot.modify_bot_last_used_time(USER_ID, PUBLIC_BOT_ID),
+    ),
+    (
+        "bot: remove_bot_by_id (alias)",
+        lambda: bot.remove_bot_by_id(USER_ID, PUBLIC_BOT_ID),
+    ),
+]
+
+
+def report(on_lambda: bool) -> dict[str, dict[str, int]]:
+    client = FakeBedrockRuntimeClient(first_token_latency=0, token_interval=0)
+    results = {}
+    with ExitStack() as stack:
+        stack.enter_context(local_aws())
+        for target in [
+            "app.stream.get_bedrock_runtime_client",
+            "app.stream.get_shared_bedrock_runtime_client",
+        ]:
+            stack.enter_context(patch(target, return_value=client))
+        seed()
+
+        if on_lambda:
+            stack.enter_context(
+                patch.dict(os.environ, {"AWS_EXECUTION_ENV": "AWS_Lambda_python3.11"})
+            )
+            stack.enter_context(
+                patch(
+                    "app.repositories.common.TABLE_ACCESS_ROLE_ARN",
+                    TABLE_ACCESS_ROLE_ARN,
+                )
+            )
+        recorder = stack.enter_context(AwsCallRecorder())
+        for name, use_case in USE_CASES:
+            with recorder.scope() as calls:
+                use_case()
+            results[name] = dict(sorted(calls.items()))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--lambda",
+        dest="on_lambda",
+        action="store_true",
+        help="Assume the table access role as on Lambda",
+    )
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = report(args.on_lambda)
+    for name, calls in results.items():
+        services = ", ".join(
+            f"{service}={count}" for service, count in count_by_service(calls).items()
+        )
+        print(f"{name:<45} {sum(calls.values()):>3} calls ({services})")
+        for call, count in calls.items():
+            print(f"    {call:<41} {count:>3}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Recorded `converse_stream` responses.
+
+A fixture is a JSON Lines file in `benchmarks/fixtures/converse_stream/`: one event per line as
+yielded by the event stream of boto3, together with the seconds elapsed since the request.
+
+    {"t": 0.412, "event": {"contentBlockDelta": {"contentBlockIndex": 0, "delta": {"text": "Hi"}}}}
+
+Any event of the Converse API can be stored: text and tool use blocks, `messageStop`,
+`metadata` with usage and guardrail traces, and errors in the stream
+(e.g. `{"throttlingException": {"message": "..."}}`).
+
+Record a fixture by wrapping a real client:
+
+    client = RecordingBedrockRuntimeClient(get_bedrock_runtime_client(), "fixture.jsonl")
+    with patch("app.stream.get_bedrock_runtime_client", return_value=client):
+        ConverseApiStreamHandler(model=MODEL).run(messages=messages)
+
+and replay it without the network with `ReplayBedrockRuntimeClient`.
+"""
+
+import json
+import time
+from pathlib import Path
+from typing import Iterator, NamedTuple
+
+import botocore.session
+
+FIXTURE_DIR = Path(__file__).parent / "fixtures" / "converse_stream"
+
+
+class RecordedEvent(NamedTuple):
+    t: float
+    event: dict
+
+
+def load_fixture(name_or_path: str | Path) -> list[RecordedEvent]:
+    """Load a fixture by name (e.g. `text`) or by path."""
+    path = Path(name_or_path)
+    if not path.suffix:
+        path = FIXTURE_DIR / f"{name_or_path}.jsonl"
+
+    with open(path) as f:
+        return [
+            RecordedEvent(t=record["t"], event=record["event"])
+            for record in map(json.loads, f)
+        ]
+
+
+def list_fixtures() -> list[str]:
+    return sorted(path.stem for path in FIXTURE_DIR.glob("*.jsonl"))
+
+
+class _RecordingEventStream:
+    def __init__(self, stream, path: str | Path, start: float):
+        self.stream = stream
+        self.path = path
+        self.start = start
+
+    def __iter__(self) -> Iterator[dict]:
+        with open(self.path, "w") as f:
+            for event in self.stream:
+                t = round(time.perf_counter() - self.start, 4)
+                f.write(json.dumps({"t": t, "event": event}) + "\n")
+                yield event
+
+    def close(self):
+        self.stream.close()
+
+
+class RecordingBedrockRuntimeClient:
+    """Pass `converse_stream` through to `client` and write the events to `path`."""
+
+    def __init__(self, client, path: str | Path):
+        self.client = client
+        self.path = path
+        self.exceptions = client.exceptions
+
+    def converse_stream(self, **kwargs) -> dict:
+        start = time.perf_counter()
+        response = self.client.converse_stream(**kwargs)
+        return {
+            **response,
+            "stream": _RecordingEventStream(response["stream"], self.path, start),
+        }
+
+
+class _ReplayEventStream:
+    def __init__(self, events: list[RecordedEvent], realtime: bool):
+        self.events = events
+        self.realtime = realtime
+        self.closed = False
+
+    def __iter__(self) -> Iterator[dict]:
+        start = time.perf_counter()
+        for recorded in self.events:
+            if self.closed:
+                return
+            if self.realtime:
+                delay = recorded.t - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            yield recorded.event
+
+    def close(self):
+        self.closed = True
+
+
+class ReplayBedrockRuntimeClient:
+    """Replay a fixture for every `converse_stream` call.
+    With `realtime`, the recorded timing is kept, otherwise events are yielded immediately.
+    """
+
+    def __init__(self, events: list[RecordedEvent], realtime: bool = False):
+        self.events = events
+        self.realtime = realtime
+        # Real exception classes, used by the stream handler to raise stream errors
+        self.exceptions = (
+            botocore.session.get_session()
+            .create_client("bedrock-runtime", region_name="us-east-1")
+            .exceptions
+        )
+
+    def converse_stream(self, **kwargs) -> dict:
+        return {"stream": _ReplayEventStream(self.events, self.realtime)}
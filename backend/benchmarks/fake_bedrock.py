@@ -0,0 +1,79 @@
+"""Fake Bedrock runtime client for benchmarks.
+`converse_stream` returns a stream of events whose timing imitates a real model:
+a first-token latency followed by a fixed delay per token.
+"""
+
+import time
+from typing import Iterator
+
+import botocore.session
+
+
+class FakeConverseEventStream:
+    def __init__(
+        self,
+        text: str,
+        first_token_latency: float,
+        token_interval: float,
+        input_tokens: int = 100,
+    ):
+        self.tokens = text.split(" ")
+        self.first_token_latency = first_token_latency
+        self.token_interval = token_interval
+        self.input_tokens = input_tokens
+
+    def __iter__(self) -> Iterator[dict]:
+        yield {"messageStart": {"role": "assistant"}}
+        time.sleep(self.first_token_latency)
+        for i, token in enumerate(self.tokens):
+            if i > 0:
+                time.sleep(self.token_interval)
+            yield {
+                "contentBlockDelta": {
+                    "contentBlockIndex": 0,
+                    "delta": {"text": token if i == 0 else f" {token}"},
+                }
+            }
+
+        yield {"contentBlockStop": {"contentBlockIndex": 0}}
+        yield {"messageStop": {"stopReason": "end_turn"}}
+        yield {
+            "metadata": {
+                "usage": {
+                    "inputTokens": self.input_tokens,
+                    "outputTokens": len(self.tokens),
+                    "totalTokens": self.input_tokens + len(self.tokens),
+                },
+                "metrics": {"latencyMs": 0},
+            }
+        }
+
+    def close(self):
+        pass
+
+
+class FakeBedrockRuntimeClient:
+    def __init__(
+        self,
+        text: str = "Hello " * 50,
+        first_token_latency: float = 0.3,
+        token_interval: float = 0.02,
+    ):
+        self.text = text.strip()
+        self.first_token_latency = first_token_latency
+        self.token_interval = token_interval
+        # Real exception classes, used by the stream handler to raise stream errors
+        self.exceptions = (
+            botocore.session.get_session()
+            .create_client("bedrock-runtime", region_name="us-east-1")
+            .exceptions
+        )
+
+    def converse_stream(self, **kwargs) -> dict:
+        return {
+            "stream": FakeConverseEventStream(
+                text=self.text,
+                first_token_latency=self.first_token_latency,
+                token_interval=self.token_interval,
+            )
+        }
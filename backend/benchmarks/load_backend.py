@@ -0,0 +1,276 @@
+"""Offline load test of the backend with local stand-ins for Bedrock, DynamoDB and S3.
+
+Scenarios (each request starts a new conversation):
+- chat: `chat()` called from a threadpool, like the SQS consumer of the published API.
+- websocket: `START`, a message part and `END` through the websocket `handler`.
+- rest: `POST /conversation`, `GET /conversation/{id}` and `GET /conversations`, calling the
+  ASGI app of `app.main` directly.
+
+Bedrock is replaced with `FakeBedrockRuntimeClient`. DynamoDB and S3 run on moto (see `local_aws`).
+Latency percentiles, throughput and AWS calls per request are reported. With `--output`,
+the results are also written as JSON so that CI can compare them with a baseline.
+Calls from threads started directly (e.g. `NotificationSender`) are counted only in the total.
+
+Usage:
+    python -m benchmarks.load_backend --scenarios chat websocket rest --requests 100 --concurrency 10 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from unittest.mock import patch
+
+from tests.test_usecases.utils.local_aws import local_aws
+
+from app.routes.schemas.conversation import (
+    ChatInput,
+    MessageInput,
+    TextContent,
+    type_model_name,
+)
+from app.usecases.chat import chat
+from benchmarks.fake_bedrock import FakeBedrockRuntimeClient
+from tests.test_usecases.utils.aws_calls import AwsCallRecorder
+
+MODEL: type_model_name = "claude-v3-haiku"
+USER_ID = "benchmark-user"
+
+
+def _chat_input(conversation_id: str) -> ChatInput:
+    return ChatInput(
+        conversation_id=conversation_id,
+        message=MessageInput(
+            role="user",
+            content=[TextContent(content_type="text", body="Hello, how are you?")],
+            model=MODEL,
+            parent_message_id=None,
+            message_id=None,
+        ),
+        bot_id=None,
+        continue_generate=False,
+    )
+
+
+def _percentiles(latencies: list[float]) -> dict[str, float]:
+    if len(latencies) < 2:
+        return {"p50": latencies[0], "p95": latencies[0], "p99": latencies[0]}
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98]}
+
+
+def _run_chat(recorder: AwsCallRecorder, index: int) -> tuple[float, Counter]:
+    with recorder.scope() as calls:
+        start = time.perf_counter()
+        chat(USER_ID, _chat_input(f"chat-{index}-{uuid.uuid4().hex}"))
+        return time.perf_counter() - start, calls
+
+
+def _websocket_event(connection_id: str, body: dict | None, route_key="$default"):
+    return {
+        "requestContext": {
+            "routeKey": route_key,
+            "connectionId": connection_id,
+            "domainName": "benchmark.execute-api.us-east-1.amazonaws.com",
+            "stage": "dev",
+        },
+        "body": json.dumps(body) if body is not None else None,
+    }
+
+
+def _run_websocket(recorder: AwsCallRecorder, index: int) -> tuple[float, Counter]:
+    from app.websocket import handler
+
+    connection_id = f"connection-{index}-{uuid.uuid4().hex}"
+    message = _chat_input(f"websocket-{index}-{uuid.uuid4().hex}").model_dump_json(
+        by_alias=True
+    )
+    with recorder.scope() as calls:
+        start = time.perf_counter()
+        bodies: list[dict] = [
+            {"step": "START", "token": "token"},
+            {"step": "BODY", "index": 0, "part": message},
+            {"step": "END", "token": "token"},
+        ]
+        for body in bodies:
+            response = handler(_websocket_event(connection_id, body), None)
+            assert response["statusCode"] == 200, response
+        return time.perf_counter() - start, calls
+
+
+async def _request(app, method: str, path: str, body: bytes = b"") -> tuple[int, bytes]:
+    """Call the ASGI app directly, without a network or an HTTP client."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"benchmark"),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("benchmark", 80),
+    }
+    request_sent = False
+    status = 500
+    response_body = bytearray()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            response_body.extend(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, bytes(response_body)
+
+
+async def _run_rest(
+    recorder: AwsCallRecorder, app, index: int
+) -> tuple[float, Counter]:
+    conversation_id = f"rest-{index}-{uuid.uuid4().hex}"
+    body = _chat_input(conversation_id).model_dump_json(by_alias=True).encode()
+    with recorder.scope() as calls:
+        start = time.perf_counter()
+        for method, path, request_body in [
+            ("POST", "/conversation", body),
+            ("GET", f"/conversation/{conversation_id}", b""),
+            ("GET", "/conversations", b""),
+        ]:
+            status, response_body = await _request(app, method, path, request_body)
+            assert status == 200, response_body
+        return time.perf_counter() - start, calls
+
+
+def _run_threaded(func, recorder, requests: int, concurrency: int):
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(lambda i: func(recorder, i), range(requests)))
+
+
+async def _run_rest_concurrently(recorder, requests: int, concurrency: int):
+    from app.main import app
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(index: int):
+        async with semaphore:
+            return await _run_rest(recorder, app, index)
+
+    return await asyncio.gather(*(run(i) for i in range(requests)))
+
+
+def run_scenario(
+    scenario: str, requests: int, concurrency: int, recorder: AwsCallRecorder
+) -> dict:
+    total_before = Counter(recorder.total)
+    start = time.perf_counter()
+    if scenario == "chat":
+        results = _run_threaded(_run_chat, recorder, requests, concurrency)
+    elif scenario == "websocket":
+        results = _run_threaded(_run_websocket, recorder, requests, concurrency)
+    elif scenario == "rest":
+        results = asyncio.run(_run_rest_concurrently(recorder, requests, concurrency))
+    else:
+        raise ValueError(f"Unknown scenario: {scenario}")
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for latency, _ in results]
+    calls: Counter = Counter()
+    for _, request_calls in results:
+        calls.update(request_calls)
+    total_calls = recorder.total - total_before
+
+    return {
+        "scenario": scenario,
+        "requests": requests,
+        "concurrency": concurrency,
+        "throughput": requests / elapsed,
+        **_percentiles(latencies),
+        "calls_per_request": {
+            call: count / requests for call, count in sorted(calls.items())
+        },
+        "total_calls_per_request": {
+            call: count / requests for call, count in sorted(total_calls.items())
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--scenarios",
+        nargs="+",
+        choices=["chat", "websocket", "rest"],
+        default=["chat", "websocket", "rest"],
+    )
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--ttft", type=float, default=0.3, help="Seconds")
+    parser.add_argument("--tokens-per-second", type=float, default=50)
+    parser.add_argument("--output-tokens", type=int, default=50)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    client = FakeBedrockRuntimeClient(
+        text="Hello " * args.output_tokens,
+        first_token_latency=args.ttft,
+        token_interval=1 / args.tokens_per_second,
+    )
+    results = []
+    with ExitStack() as stack:
+        stack.enter_context(local_aws())
+        for target in [
+            "app.stream.get_bedrock_runtime_client",
+            "app.stream.get_shared_bedrock_runtime_client",
+        ]:
+            stack.enter_context(patch(target, return_value=client))
+        stack.enter_context(
+            patch("app.websocket.verify_token", return_value={"sub": USER_ID})
+        )
+        # NOTE: The websocket handler flushes EMF logs to stdout after each event
+        devnull = stack.enter_context(open(os.devnull, "w"))
+        stack.enter_context(patch("app.websocket.emf_exporter.stream", devnull))
+        recorder = stack.enter_context(AwsCallRecorder())
+
+        for scenario in args.scenarios:
+            for concurrency in args.concurrency:
+                result = run_scenario(scenario, args.requests, concurrency, recorder)
+                results.append(result)
+                print(
+                    f"{scenario:<10} concurrency={concurrency:<4} "
+                    f"throughput={result['throughput']:7.2f}req/s "
+                    f"p50={result['p50'] * 1000:8.1f}ms "
+                    f"p95={result['p95'] * 1000:8.1f}ms "
+                    f"p99={result['p99'] * 1000:8.1f}ms"
+                )
+                for call, count in result["total_calls_per_request"].items():
+                    print(f"    {call:<45} {count:6.2f}/req")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Load test comparing concurrent Converse API streams per worker.
+
+- sync: `ConverseApiStreamHandler.run` on a threadpool of the same size as the one
+  FastAPI runs sync routes on (40 threads by default).
+- async: `ConverseApiStreamHandler.run_async` on the event loop.
+
+Bedrock is replaced with a fake client, so no AWS access is required.
+
+Usage:
+    python -m benchmarks.load_concurrent_streams --streams 50 100 200
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+from app.repositories.models.conversation import SimpleMessageModel, TextContentModel
+from app.routes.schemas.conversation import type_model_name
+from app.stream import ConverseApiStreamHandler
+from benchmarks.fake_bedrock import FakeBedrockRuntimeClient
+
+MODEL: type_model_name = "claude-v3-haiku"
+# Default size of the threadpool used by Starlette (anyio) for sync routes
+FASTAPI_THREADPOOL_SIZE = 40
+
+MESSAGES = [
+    SimpleMessageModel(
+        role="user",
+        content=[TextContentModel(content_type="text", body="Hello")],
+    )
+]
+
+
+def _run_sync(streams: int) -> list[float]:
+    # Latency includes the time waiting for a free thread
+    start = time.perf_counter()
+
+    def run_one(_: int) -> float:
+        ConverseApiStreamHandler(model=MODEL).run(messages=MESSAGES)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=FASTAPI_THREADPOOL_SIZE) as executor:
+        return list(executor.map(run_one, range(streams)))
+
+
+async def _run_async(streams: int) -> list[float]:
+    start = time.perf_counter()
+
+    async def run_one() -> float:
+        await ConverseApiStreamHandler(model=MODEL).run_async(messages=MESSAGES)
+        return time.perf_counter() - start
+
+    return await asyncio.gather(*[run_one() for _ in range(streams)])
+
+
+def _report(mode: str, streams: int, elapsed: float, latencies: list[float]):
+    print(
+        f"{mode:>5} streams={streams:<5} "
+        f"wall={elapsed:7.2f}s "
+        f"throughput={streams / elapsed:7.2f} streams/s "
+        f"p50={statistics.median(latencies):6.2f}s "
+        f"max={max(latencies):6.2f}s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--streams", type=int, nargs="+", default=[40, 100, 200])
+    parser.add_argument("--first-token-latency", type=float, default=0.3)
+    parser.add_argument("--token-interval", type=float, default=0.02)
+    args = parser.parse_args()
+
+    client = FakeBedrockRuntimeClient(
+        first_token_latency=args.first_token_latency,
+        token_interval=args.token_interval,
+    )
+    with patch("app.stream.get_bedrock_runtime_client", return_value=client), patch(
+        "app.stream.get_shared_bedrock_runtime_client", return_value=client
+    ):
+        for streams in args.streams:
+            start = time.perf_counter()
+            latencies = _run_sync(streams)
+            _report("sync", streams, time.perf_counter() - start, latencies)
+
+            start = time.perf_counter()
+            latencies = asyncio.run(_run_async(streams))
+            _report("async", streams, time.perf_counter() - start, latencies)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Throughput of `ConverseApiStreamHandler.run` with logging at INFO, before and after lazy payload logs.
+
+- legacy: payloads are formatted eagerly with f-strings as before, i.e. the whole request to
+  Bedrock including the image, and every stream event even though DEBUG is disabled.
+- current: `log_payload` formats a size-capped, redacted summary only when emitted.
+- sampled: same as current with `sample_rate=0.1`.
+
+Logs are written to /dev/null, so only the formatting cost is measured.
+Bedrock is replaced with a fake client, so no AWS access is required.
+
+Usage:
+    python -m benchmarks.log_throughput --image-kb 100 1000 --turns 50
+"""
+
+import argparse
+import logging
+import os
+import time
+from contextlib import ExitStack
+from functools import partial
+from unittest.mock import patch
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+from app.logging_utils import log_payload
+from app.repositories.models.conversation import (
+    ImageContentModel,
+    SimpleMessageModel,
+    TextContentModel,
+)
+from app.routes.schemas.conversation import type_model_name
+from app.stream import ConverseApiStreamHandler
+from benchmarks.fake_bedrock import FakeBedrockRuntimeClient
+
+MODEL: type_model_name = "claude-v3-haiku"
+
+
+def _legacy_log_payload(logger: logging.Logger, message: str, payload, **kwargs):
+    logger.info(message % (payload,))
+
+
+def _legacy_debug(message: str, *args):
+    # f-strings are evaluated regardless of the level
+    message % args
+
+
+def _messages(image_kb: int) -> list[SimpleMessageModel]:
+    return [
+        SimpleMessageModel(
+            role="user",
+            content=[
+                ImageContentModel(
+                    content_type="image",
+                    media_type="image/png",
+                    body=os.urandom(image_kb * 1024),
+                ),
+                TextContentModel(content_type="text", body="Describe the image."),
+            ],
+        )
+    ]
+
+
+def _measure(mode: str, messages: list[SimpleMessageModel], turns: int) -> float:
+    client = FakeBedrockRuntimeClient(first_token_latency=0, token_interval=0)
+    handler = ConverseApiStreamHandler(model=MODEL)
+
+    with ExitStack() as stack:
+        stack.enter_context(
+            patch("app.stream.get_bedrock_runtime_client", return_value=client)
+        )
+        if mode == "legacy":
+            stack.enter_context(patch("app.stream.log_payload", _legacy_log_payload))
+            stack.enter_context(patch("app.stream.logger.debug", _legacy_debug))
+        elif mode == "sampled":
+            stack.enter_context(
+                patch("app.stream.log_payload", partial(log_payload, sample_rate=0.1))
+            )
+
+        start = time.perf_counter()
+        for _ in range(turns):
+            handler.run(messages=messages)
+        return turns / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--image-kb", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--turns", type=int, default=50)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        stream=open(os.devnull, "w"),
+        format="%(levelname)s:%(name)s - %(message)s",
+    )
+
+    for image_kb in args.image_kb:
+        messages = _messages(image_kb)
+        for mode in ["legacy", "current", "sampled"]:
+            throughput = _measure(mode, messages, args.turns)
+            print(f"{image_kb:>6}KB {mode:<8} {throughput:8.1f} turns/s")
+
+
+if __name__ == "__main__":
+    main()
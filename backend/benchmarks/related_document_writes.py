@@ -0,0 +1,237 @@
+"""Write amplification of `store_related_documents` over the turns of a conversation.
+
+Each turn retrieves chunks from a shared pool, so that the same chunk is retrieved in several
+turns, and some turns add a large JSON tool result. The documents of every turn are stored
+against moto (see `local_aws`):
+- legacy: one item per related document with the content inlined, as stored before bodies
+  were deduplicated.
+- current: `store_related_documents`.
+
+Reported per writer: items written, write capacity units (1 WCU per started KB of an item),
+bytes written to DynamoDB and S3, and wall time.
+
+Usage:
+    python -m benchmarks.related_document_writes --turns 10 --chunks-per-turn 5
+    python -m benchmarks.related_document_writes --output writes.json
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from decimal import Decimal
+from unittest.mock import patch
+
+from tests.test_usecases.utils.local_aws import local_aws
+
+from app.repositories.common import (
+    _get_table_client,
+    compose_related_document_source_id,
+)
+from app.repositories.conversation import store_related_documents
+from app.repositories.models.conversation import (
+    JsonToolResultModel,
+    RelatedDocumentModel,
+    TextToolResultModel,
+)
+from boto3.dynamodb.types import Binary
+from botocore.client import BaseClient
+
+USER_ID = "user"
+CONVERSATION_ID = "conversation"
+
+
+def _value_size(value) -> int:
+    """Approximate size of an attribute value as counted by DynamoDB."""
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, Binary):
+        # NOTE: The stubs type `Binary.__bytes__` as returning `str`
+        return len(bytes(value))  # type: ignore[call-overload]
+    if isinstance(value, bool) or value is None:
+        return 1
+    if isinstance(value, (int, float, Decimal)):
+        return (len(str(value).lstrip("-").replace(".", "")) + 1) // 2 + 1
+    if isinstance(value, dict):
+        return 3 + sum(len(k) + _value_size(v) + 1 for k, v in value.items())
+    if isinstance(value, list):
+        return 3 + sum(_value_size(v) + 1 for v in value)
+    return len(str(value))
+
+
+def item_size(item: dict) -> int:
+    return sum(len(name) + _value_size(value) for name, value in item.items())
+
+
+class WriteRecorder:
+    """Record the items written to DynamoDB and the bytes put to S3."""
+
+    def __init__(self):
+        self.items = 0
+        self.write_units = 0
+        self.dynamodb_bytes = 0
+        self.s3_bytes = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def _record_item(self, item: dict):
+        size = item_size(item)
+        with self._lock:
+            self.items += 1
+            self.write_units += max(1, math.ceil(size / 1024))
+            self.dynamodb_bytes += size
+
+    def patch(self):
+        original = BaseClient._make_api_call
+        recorder = self
+
+        def _make_api_call(client, operation_name, api_params):
+            if operation_name == "BatchWriteItem":
+                recorder.requests += 1
+                for write_requests in api_params["RequestItems"].values():
+                    for write_request in write_requests:
+                        recorder._record_item(write_request["PutRequest"]["Item"])
+            elif operation_name == "PutItem":
+                recorder.requests += 1
+                recorder._record_item(api_params["Item"])
+            elif operation_name == "PutObject":
+                recorder.requests += 1
+                recorder.s3_bytes += len(api_params["Body"])
+            return original(client, operation_name, api_params)
+
+        return patch.object(BaseClient, "_make_api_call", _make_api_call)
+
+
+def legacy_store_related_documents(
+    user_id: str,
+    conversation_id: str,
+    related_documents: list[RelatedDocumentModel],
+):
+    table = _get_table_client(user_id)
+    with table.batch_writer() as writer:
+        for related_document in related_documents:
+            writer.put_item(
+                Item={
+                    "PK": user_id,
+                    "SK": compose_related_document_source_id(
+                        user_id=user_id,
+                        conversation_id=conversation_id,
+                        source_id=related_document.source_id,
+                    ),
+                    "SourceName": related_document.source_name,
+                    "SourceLink": related_document.source_link,
+                    "Content": related_document.content.model_dump(by_alias=True),
+                }
+            )
+
+
+def generate_turns(
+    turns: int,
+    chunks_per_turn: int,
+    pool_size: int,
+    chunk_size: int,
+    json_every: int,
+    json_size: int,
+    seed: int = 0,
+) -> list[list[RelatedDocumentModel]]:
+    rng = random.Random(seed)
+    pool = [
+        TextToolResultModel(
+            text="".join(rng.choice("abcdefghij ") for _ in range(chunk_size))
+        )
+        for _ in range(pool_size)
+    ]
+    result = []
+    for turn in range(turns):
+        documents = [
+            RelatedDocumentModel(
+                content=chunk,
+                source_id=f"tool-{turn}@{rank}",
+                source_name=f"document-{pool.index(chunk)}.pdf",
+                source_link=None,
+            )
+            for rank, chunk in enumerate(rng.sample(pool, chunks_per_turn))
+        ]
+        if json_every > 0 and turn % json_every == 0:
+            documents.append(
+                RelatedDocumentModel(
+                    content=JsonToolResultModel(
+                        json={
+                            "results": [
+                                {"title": f"result {i}", "body": "x" * 1000}
+                                for i in range(json_size // 1000)
+                            ]
+                        }
+                    ),
+                    source_id=f"search-{turn}@0",
+                    source_name="internet_search",
+                    source_link=None,
+                )
+            )
+        result.append(documents)
+    return result
+
+
+def measure(writer, turns: list[list[RelatedDocumentModel]]) -> dict:
+    recorder = WriteRecorder()
+    with local_aws(), recorder.patch():
+        start = time.perf_counter()
+        for documents in turns:
+            writer(USER_ID, CONVERSATION_ID, documents)
+        elapsed = time.perf_counter() - start
+
+    return {
+        "documents": sum(len(documents) for documents in turns),
+        "items": recorder.items,
+        "write_units": recorder.write_units,
+        "dynamodb_kb": recorder.dynamodb_bytes / 1024,
+        "s3_kb": recorder.s3_bytes / 1024,
+        "requests": recorder.requests,
+        "wall_ms": elapsed * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--chunks-per-turn", type=int, default=5)
+    parser.add_argument("--pool-size", type=int, default=12)
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    parser.add_argument("--json-every", type=int, default=3)
+    parser.add_argument("--json-size", type=int, default=30_000)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    turns = generate_turns(
+        args.turns,
+        args.chunks_per_turn,
+        args.pool_size,
+        args.chunk_size,
+        args.json_every,
+        args.json_size,
+    )
+    results = {
+        "legacy": measure(legacy_store_related_documents, turns),
+        "current": measure(store_related_documents, turns),
+    }
+    for name, result in results.items():
+        print(
+            f"{name:<8} documents={result['documents']:<4} items={result['items']:<4} "
+            f"wcu={result['write_units']:<6} dynamodb={result['dynamodb_kb']:8.1f}KB "
+            f"s3={result['s3_kb']:7.1f}KB requests={result['requests']:<3} "
+            f"wall={result['wall_ms']:7.1f}ms"
+        )
+    reduction = 1 - results["current"]["write_units"] / results["legacy"]["write_units"]
+    print(f"Write units reduced by {reduction:.0%}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""Replay recorded `converse_stream` fixtures through `ConverseApiStreamHandler.run`.
+
+Events are yielded without delay, so only the cost of the backend is measured:
+- none: the handler without callbacks.
+- noop: `on_stream` and `on_thinking` set to functions doing nothing.
+- websocket: the callbacks of `NotificationSender`, whose thread posts to a fake API Gateway
+  client. The queue is drained before the measurement ends.
+
+Reported per fixture and mode:
+- CPU and wall time per event (median of the repeats). CPU time includes all threads.
+- Callback overhead: CPU per event relative to `none`.
+- Peak and retained memory of one replay under tracemalloc.
+
+Usage:
+    python -m benchmarks.replay_stream --fixtures text tool_use --iterations 200 --repeats 5
+    python -m benchmarks.replay_stream --output replay.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import threading
+import time
+import tracemalloc
+from contextlib import ExitStack
+from unittest.mock import patch
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("WEBSOCKET_SESSION_TABLE_NAME", "benchmark-websocket-session")
+
+import botocore.session
+from app.repositories.models.conversation import SimpleMessageModel, TextContentModel
+from app.routes.schemas.conversation import type_model_name
+from app.stream import ConverseApiStreamHandler
+from app.websocket import NotificationSender
+from benchmarks.converse_fixtures import (
+    RecordedEvent,
+    ReplayBedrockRuntimeClient,
+    list_fixtures,
+    load_fixture,
+)
+
+MODEL: type_model_name = "claude-v3-haiku"
+MODES = ["none", "noop", "websocket"]
+MESSAGES = [
+    SimpleMessageModel(
+        role="user",
+        content=[TextContentModel(content_type="text", body="Hello")],
+    )
+]
+
+
+class FakeApiGatewayManagementClient:
+    def __init__(self):
+        self.exceptions = (
+            botocore.session.get_session()
+            .create_client(
+                "apigatewaymanagementapi",
+                region_name="us-east-1",
+                endpoint_url="https://example.com",
+            )
+            .exceptions
+        )
+        self.posted = 0
+
+    def post_to_connection(self, ConnectionId: str, Data: bytes):
+        self.posted += 1
+
+
+def _replay(handler: ConverseApiStreamHandler):
+    try:
+        handler.run(messages=MESSAGES)
+    except Exception:
+        # Errors in the stream are raised after all events are handled
+        pass
+
+
+def _run(mode: str, iterations: int):
+    """Replay `iterations` times in `mode`."""
+    if mode == "none":
+        handler = ConverseApiStreamHandler(model=MODEL)
+        for _ in range(iterations):
+            _replay(handler)
+
+    elif mode == "noop":
+        handler = ConverseApiStreamHandler(
+            model=MODEL,
+            on_stream=lambda token: None,
+            on_thinking=lambda tool_use: None,
+        )
+        for _ in range(iterations):
+            _replay(handler)
+
+    elif mode == "websocket":
+        sender = NotificationSender(
+            endpoint_url="https://example.com", connection_id="connection"
+        )
+        thread = threading.Thread(target=sender.run, daemon=True)
+        thread.start()
+        handler = ConverseApiStreamHandler(
+            model=MODEL,
+            on_stream=sender.on_stream,
+            on_thinking=sender.on_agent_thinking,
+        )
+        for _ in range(iterations):
+            _replay(handler)
+        sender.finish()
+        thread.join()
+
+    else:
+        raise ValueError(f"Unknown mode: {mode}")
+
+
+def _measure(
+    events: list[RecordedEvent], mode: str, iterations: int, repeats: int
+) -> dict:
+    event_count = iterations * len(events)
+    cpu_times = []
+    wall_times = []
+    for _ in range(repeats):
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        _run(mode, iterations)
+        cpu_times.append((time.process_time() - cpu_start) / event_count)
+        wall_times.append((time.perf_counter() - wall_start) / event_count)
+
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        _run(mode, 1)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "cpu_us_per_event": statistics.median(cpu_times) * 1e6,
+        "wall_us_per_event": statistics.median(wall_times) * 1e6,
+        "peak_kb": (peak - before) / 1024,
+        "retained_kb": (current - before) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", nargs="+", default=list_fixtures())
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    # Only the formatting of emitted logs would be measured otherwise
+    logging.basicConfig(level=logging.INFO, stream=open(os.devnull, "w"))
+
+    results = []
+    for name in args.fixtures:
+        events = load_fixture(name)
+        client = ReplayBedrockRuntimeClient(events)
+        with ExitStack() as stack:
+            stack.enter_context(
+                patch("app.stream.get_bedrock_runtime_client", return_value=client)
+            )
+            stack.enter_context(
+                patch("boto3.client", return_value=FakeApiGatewayManagementClient())
+            )
+            # Warm up
+            _run("none", 1)
+
+            baseline = None
+            for mode in args.modes:
+                result = _measure(events, mode, args.iterations, args.repeats)
+                if mode == "none":
+                    baseline = result["cpu_us_per_event"]
+                overhead = (
+                    result["cpu_us_per_event"] - baseline
+                    if baseline is not None
+                    else None
+                )
+                results.append(
+                    {
+                        "fixture": name,
+                        "mode": mode,
+                        "events": len(events),
+                        **result,
+                        "callback_overhead_us_per_event": overhead,
+                    }
+                )
+                print(
+                    f"{name:<20} {mode:<10} events={len(events):<4} "
+                    f"cpu={result['cpu_us_per_event']:7.1f}us/event "
+                    f"wall={result['wall_us_per_event']:7.1f}us/event "
+                    + (f"overhead={overhead:+7.1f}us/event " if overhead else "")
+                    + f"peak={result['peak_kb']:7.1f}KB "
+                    f"retained={result['retained_kb']:6.1f}KB"
+                )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
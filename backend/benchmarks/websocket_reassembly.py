@@ -0,0 +1,184 @@
+"""Benchmark of websocket message reassembly on `END` against DynamoDB Local.
+
+- legacy: query the user id with a filter, paginate parts from `MessagePartId >= 1` and sort them in Python.
+- single: `concatenate_message_parts`, a single query from `MessagePartId >= 0` sorted by key.
+- single+gzip: same as single with the message compressed by the client.
+
+Start DynamoDB Local before running:
+    docker run -p 8000:8000 amazon/dynamodb-local
+
+Usage:
+    DDB_ENDPOINT_URL=http://localhost:8000 python -m benchmarks.websocket_reassembly --sizes 1 5 10
+"""
+
+import argparse
+import base64
+import gzip
+import json
+import os
+import random
+import statistics
+import string
+import time
+from decimal import Decimal as decimal
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("WEBSOCKET_SESSION_TABLE_NAME", "benchmark-websocket-session")
+
+import boto3
+from app.websocket import concatenate_message_parts
+from boto3.dynamodb.conditions import Attr, Key
+
+DDB_ENDPOINT_URL = os.environ.get("DDB_ENDPOINT_URL", "http://localhost:8000")
+TABLE_NAME = os.environ["WEBSOCKET_SESSION_TABLE_NAME"]
+# Same as the frontend
+CHUNK_SIZE = 32 * 1024
+
+
+def _create_table(dynamodb):
+    try:
+        dynamodb.Table(TABLE_NAME).delete()
+    except dynamodb.meta.client.exceptions.ResourceNotFoundException:
+        pass
+
+    table = dynamodb.create_table(
+        TableName=TABLE_NAME,
+        KeySchema=[
+            {"AttributeName": "ConnectionId", "KeyType": "HASH"},
+            {"AttributeName": "MessagePartId", "KeyType": "RANGE"},
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "ConnectionId", "AttributeType": "S"},
+            {"AttributeName": "MessagePartId", "AttributeType": "N"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    table.wait_until_exists()
+    return table
+
+
+def _payload(size_mb: int) -> str:
+    """Chat input with an image and some text, like an image-heavy message."""
+    image = base64.b64encode(random.randbytes(size_mb * 1024 * 1024 * 3 // 4)).decode()
+    text = " ".join(
+        "".join(random.choices(string.ascii_lowercase, k=random.randint(2, 10)))
+        for _ in range(2000)
+    )
+    return json.dumps(
+        {
+            "conversationId": "conversation",
+            "message": {
+                "role": "user",
+                "content": [
+                    {"contentType": "text", "body": text},
+                    {"contentType": "image", "mediaType": "image/png", "body": image},
+                ],
+                "model": "claude-v3-haiku",
+                "parentMessageId": "system",
+            },
+        }
+    )
+
+
+def _store_session(table, connection_id: str, message: str, compression: str | None):
+    if compression == "gzip":
+        message = base64.b64encode(gzip.compress(message.encode("utf-8"))).decode()
+
+    session = {
+        "ConnectionId": connection_id,
+        "MessagePartId": decimal(0),
+        "UserId": "user",
+    }
+    if compression is not None:
+        session["Compression"] = compression
+
+    parts = [message[i : i + CHUNK_SIZE] for i in range(0, len(message), CHUNK_SIZE)]
+    # NOTE: The handler writes each part with `put_item` in its own invocation
+    with table.batch_writer() as batch:
+        batch.put_item(Item=session)
+        for index, part in enumerate(parts):
+            batch.put_item(
+                Item={
+                    "ConnectionId": connection_id,
+                    "MessagePartId": decimal(index + 1),
+                    "MessagePart": part,
+                }
+            )
+
+    return len(parts)
+
+
+def _legacy_concatenate_message_parts(table, connection_id: str) -> tuple[str, str]:
+    response = table.query(
+        KeyConditionExpression=Key("ConnectionId").eq(connection_id),
+        FilterExpression=Attr("UserId").exists(),
+    )
+    user_id = response["Items"][0]["UserId"]
+
+    message_parts = []
+    last_evaluated_key = None
+    while True:
+        if last_evaluated_key:
+            response = table.query(
+                KeyConditionExpression=Key("ConnectionId").eq(connection_id)
+                & Key("MessagePartId").gte(1),
+                ExclusiveStartKey=last_evaluated_key,
+            )
+        else:
+            response = table.query(
+                KeyConditionExpression=Key("ConnectionId").eq(connection_id)
+                & Key("MessagePartId").gte(1),
+            )
+
+        message_parts.extend(response["Items"])
+        if "LastEvaluatedKey" in response:
+            last_evaluated_key = response["LastEvaluatedKey"]
+        else:
+            break
+
+    message_parts.sort(key=lambda x: x["MessagePartId"])
+    return user_id, "".join(item["MessagePart"] for item in message_parts)
+
+
+def _measure(func, table, connection_id: str, expected: str, repeat: int) -> float:
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _, message = func(table, connection_id)
+        durations.append(time.perf_counter() - start)
+        assert message == expected
+
+    return statistics.median(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 2, 5, 10])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    dynamodb = boto3.resource("dynamodb", endpoint_url=DDB_ENDPOINT_URL)
+    table = _create_table(dynamodb)
+
+    try:
+        for size in args.sizes:
+            message = _payload(size)
+            for mode, compression, func in [
+                ("legacy", None, _legacy_concatenate_message_parts),
+                ("single", None, concatenate_message_parts),
+                ("single+gzip", "gzip", concatenate_message_parts),
+            ]:
+                connection_id = f"{mode}-{size}"
+                parts = _store_session(table, connection_id, message, compression)
+                duration = _measure(func, table, connection_id, message, args.repeat)
+                print(
+                    f"{size:>3}MB {mode:<12} parts={parts:<5} "
+                    f"reassembly(p50)={duration * 1000:8.1f}ms"
+                )
+
+    finally:
+        table.delete()
+
+
+if __name__ == "__main__":
+    main()
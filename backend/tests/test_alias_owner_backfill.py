@@ -0,0 +1,42 @@
+import sys
+
+sys.path.insert(0, ".")
+import unittest
+
+# NOTE: Must be imported before `app` so that the environment is set up first
+from tests.test_usecases.utils.local_aws import LocalAwsTestCase
+
+from app.alias_owner_backfill import backfill_original_bot_owners
+from app.repositories.common import _get_table_client, compose_bot_alias_id
+from app.repositories.custom_bot import delete_bot_by_id
+from tests.test_usecases.utils.seed import OTHER_USER_ID, PUBLIC_BOT_ID, USER_ID, seed
+
+
+class TestAliasOwnerBackfill(LocalAwsTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        seed()
+        self.table = _get_table_client(USER_ID)
+        self.key = {"PK": USER_ID, "SK": compose_bot_alias_id(USER_ID, PUBLIC_BOT_ID)}
+
+    def test_backfill(self):
+        # Alias stored before `OriginalBotOwnerUserId` was introduced
+        self.assertNotIn(
+            "OriginalBotOwnerUserId", self.table.get_item(Key=self.key)["Item"]
+        )
+
+        self.assertEqual(backfill_original_bot_owners(), 1)
+        item = self.table.get_item(Key=self.key)["Item"]
+        self.assertEqual(item["OriginalBotOwnerUserId"], OTHER_USER_ID)
+        self.assertEqual(backfill_original_bot_owners(), 0)
+
+    def test_skip_removed_original_bot(self):
+        delete_bot_by_id(OTHER_USER_ID, PUBLIC_BOT_ID)
+
+        self.assertEqual(backfill_original_bot_owners(), 0)
+        item = self.table.get_item(Key=self.key)["Item"]
+        self.assertNotIn("OriginalBotOwnerUserId", item)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import sys
+
+sys.path.insert(0, ".")
+import unittest
+
+# NOTE: Must be imported before `app` so that the environment is set up first
+from tests.test_usecases.utils.local_aws import LocalAwsTestCase
+
+from app.alias_sync import handler
+from app.repositories.common import _get_table_client, compose_bot_id
+from app.repositories.custom_bot import (
+    count_alias_holders,
+    find_alias_by_id,
+    find_alias_holder_page,
+    find_alias_holders,
+    store_alias,
+    update_alias_pin_status,
+    update_bot_last_used_time,
+)
+from tests.test_usecases.utils.aws_calls import AwsCallRecorder
+from tests.test_usecases.utils.bot_factory import create_test_bot_alias
+from tests.test_usecases.utils.seed import OTHER_USER_ID, PUBLIC_BOT_ID, USER_ID, seed
+from boto3.dynamodb.types import TypeSerializer
+
+
+class TestAliasSync(LocalAwsTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        seed()
+        self.table = _get_table_client(OTHER_USER_ID)
+        self.key = {
+            "PK": OTHER_USER_ID,
+            "SK": compose_bot_id(OTHER_USER_ID, PUBLIC_BOT_ID),
+        }
+
+    def _image(self) -> dict:
+        item = self.table.get_item(Key=self.key)["Item"]
+        serializer = TypeSerializer()
+        return {key: serializer.serialize(value) for key, value in item.items()}
+
+    def _record(
+        self, event_name: str = "MODIFY", old_image: dict | None = None
+    ) -> dict:
+        serializer = TypeSerializer()
+        record = {
+            "eventName": event_name,
+            "dynamodb": {
+                "Keys": {key: serializer.serialize(self.key[key]) for key in self.key},
+                "NewImage": self._image(),
+            },
+        }
+        if old_image is not None:
+            record["dynamodb"]["OldImage"] = old_image
+        return record
+
+    def _rename(self, title: str):
+        self.table.update_item(
+            Key=self.key,
+            UpdateExpression="SET Title = :title",
+            ExpressionAttributeValues={":title": title},
+        )
+
+    def test_sync_aliases(self):
+        update_alias_pin_status(USER_ID, PUBLIC_BOT_ID, True)
+        self._rename("Old title")
+        old_record = self._record()
+        self._rename("New title")
+
+        handler({"Records": [old_record, self._record()]}, None)
+
+        # The latest image is applied, and the attributes of the user are kept
+        alias = find_alias_by_id(USER_ID, PUBLIC_BOT_ID)
+        self.assertEqual(alias.title, "New title")
+        self.assertEqual(alias.original_bot_owner_user_id, OTHER_USER_ID)
+        self.assertTrue(alias.is_pinned)
+
+    def test_sync_aliases_on_change_of_copied_attribute(self):
+        old_image = self._image()
+        self._rename("New title")
+
+        handler({"Records": [self._record(old_image=old_image)]}, None)
+
+        self.assertEqual(find_alias_by_id(USER_ID, PUBLIC_BOT_ID).title, "New title")
+
+    def test_skip_modification_of_other_attributes(self):
+        old_image = self._image()
+        update_bot_last_used_time(OTHER_USER_ID, PUBLIC_BOT_ID)
+        record = self._record(old_image=old_image)
+
+        with AwsCallRecorder() as recorder, recorder.scope() as calls:
+            handler({"Records": [record]}, None)
+
+        # Neither aliases are read from `OriginalBotIdIndex` nor written
+        self.assertEqual(dict(calls), {})
+
+    def test_ignore_other_items(self):
+        self._rename("Private title")
+        record = self._record()
+        record["dynamodb"]["NewImage"].pop("PublicBotId")
+
+        handler({"Records": [record]}, None)
+
+        alias = find_alias_by_id(USER_ID, PUBLIC_BOT_ID)
+        self.assertNotEqual(alias.title, "Private title")
+
+
+class TestAliasHolders(LocalAwsTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        seed()
+        self.user_ids = sorted([USER_ID] + [f"user-{i}" for i in range(4)])
+        for user_id in self.user_ids:
+            if user_id != USER_ID:
+                store_alias(
+                    user_id,
+                    create_test_bot_alias(PUBLIC_BOT_ID, PUBLIC_BOT_ID, False),
+                )
+
+    def test_find_alias_holders(self):
+        pages = list(find_alias_holders(PUBLIC_BOT_ID, page_size=2))
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual(sum(pages, []), self.user_ids)
+        self.assertEqual(count_alias_holders(PUBLIC_BOT_ID), 5)
+        self.assertEqual(count_alias_holders("other-bot"), 0)
+
+    def test_invalid_next_token(self):
+        _, next_token = find_alias_holder_page(PUBLIC_BOT_ID, limit=1)
+        with self.assertRaises(ValueError):
+            find_alias_holder_page("other-bot", next_token=next_token)
+
+
+if __name__ == "__main__":
+    unittest.main()
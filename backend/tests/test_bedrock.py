@@ -9,8 +9,15 @@ import unittest
 from pprint import pprint
 from unittest.mock import patch
 
-from app.bedrock import call_converse_api, compose_args_for_converse_api, get_model_id
+from app.bedrock import (
+    calculate_price,
+    call_converse_api,
+    compose_args_for_converse_api,
+    get_model_id,
+    get_pricing_table,
+)
 from app.repositories.models.conversation import SimpleMessageModel, TextContentModel
+from app.repositories.models.custom_bot import PromptCachingModel
 from app.repositories.models.custom_bot_guardrails import BedrockGuardrailsModel
 from app.routes.schemas.conversation import type_model_name
 
@@ -48,6 +55,94 @@ class TestGetModelId(unittest.TestCase):
         )
 
 
+class TestComposeArgsWithPromptCaching(unittest.TestCase):
+    def setUp(self):
+        self.messages = [
+            SimpleMessageModel(
+                role=role,
+                content=[
+                    TextContentModel(
+                        content_type="text",
+                        body=f"Message {i}",
+                    )
+                ],
+            )
+            for i, role in enumerate(["user", "assistant", "user", "assistant", "user"])
+        ]
+
+    def _count_cache_points(self, blocks) -> int:
+        return len([block for block in blocks if "cachePoint" in block])
+
+    def test_cache_points_with_supported_model(self):
+        args = compose_args_for_converse_api(
+            self.messages,
+            "claude-v3.5-haiku",
+            instructions=["You are a helpful assistant."],
+        )
+        self.assertEqual(self._count_cache_points(args["system"]), 1)
+        self.assertEqual(args["system"][-1], {"cachePoint": {"type": "default"}})
+        # Only the last two user messages are marked
+        cache_points = [
+            self._count_cache_points(message["content"]) for message in args["messages"]
+        ]
+        self.assertEqual(cache_points, [0, 0, 1, 0, 1])
+
+    def test_cache_points_with_unsupported_model(self):
+        args = compose_args_for_converse_api(
+            self.messages,
+            MODEL,
+            instructions=["You are a helpful assistant."],
+        )
+        self.assertEqual(self._count_cache_points(args["system"]), 0)
+        for message in args["messages"]:
+            self.assertEqual(self._count_cache_points(message["content"]), 0)
+
+    def test_cache_points_disabled_by_bot(self):
+        args = compose_args_for_converse_api(
+            self.messages,
+            "claude-v3.5-haiku",
+            instructions=["You are a helpful assistant."],
+            prompt_caching=PromptCachingModel(
+                cache_system=True,
+                cache_messages=False,
+                cache_tools=False,
+            ),
+        )
+        self.assertEqual(self._count_cache_points(args["system"]), 1)
+        for message in args["messages"]:
+            self.assertEqual(self._count_cache_points(message["content"]), 0)
+
+
+class TestCalculatePrice(unittest.TestCase):
+    def test_calculate_price_with_cache_tokens(self):
+        price = calculate_price(
+            "claude-v3.5-haiku",
+            input_tokens=1000,
+            output_tokens=1000,
+            cache_read_input_tokens=1000,
+            cache_write_input_tokens=1000,
+            region="us-east-1",
+        )
+        self.assertAlmostEqual(price, 0.001 + 0.005 + 0.0001 + 0.00125)
+
+    def test_calculate_price_falls_back_to_input_price(self):
+        price = calculate_price(
+            "claude-v3-haiku",
+            input_tokens=0,
+            output_tokens=0,
+            cache_read_input_tokens=1000,
+            region="us-east-1",
+        )
+        self.assertAlmostEqual(price, 0.00025)
+
+    def test_pricing_table_falls_back_to_default_region(self):
+        table = get_pricing_table("ap-northeast-1")
+        self.assertEqual(table["claude-v3.5-haiku"].input, 0.001)
+        self.assertIs(table, get_pricing_table("ap-northeast-1"))
+        with self.assertRaises(TypeError):
+            table["claude-v3.5-haiku"] = table["claude-v3-haiku"]  # type: ignore
+
+
 class TestCallConverseApi(unittest.TestCase):
     def test_call_converse_api(self):
         message = SimpleMessageModel(
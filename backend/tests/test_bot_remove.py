@@ -0,0 +1,87 @@
+import sys
+
+sys.path.insert(0, ".")
+import unittest
+from unittest.mock import patch
+
+# NOTE: Must be imported before `app` so that the environment is set up first
+from tests.test_usecases.utils.local_aws import LocalAwsTestCase
+
+from app.bot_remove import handler
+from app.repositories.common import RecordNotFoundError, compose_bot_id
+from app.repositories.custom_bot import (
+    count_alias_holders,
+    delete_bot_by_id,
+    find_alias_by_id,
+)
+from botocore.exceptions import ClientError
+from tests.test_usecases.utils.seed import OTHER_USER_ID, PUBLIC_BOT_ID, USER_ID, seed
+
+
+class TestBotRemove(LocalAwsTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        seed()
+        # Only the deletion of aliases is tested here
+        self.delete_from_s3 = self.enterContext(patch("app.bot_remove.delete_from_s3"))
+        self.delete_stack = self.enterContext(
+            patch("app.bot_remove.delete_custom_bot_stack_by_bot_id")
+        )
+        self.enterContext(
+            patch(
+                "app.bot_remove.find_stack_by_bot_id",
+                side_effect=RecordNotFoundError(),
+            )
+        )
+
+    def _remove(self):
+        delete_bot_by_id(OTHER_USER_ID, PUBLIC_BOT_ID)
+        handler(
+            {
+                "Records": [
+                    {
+                        "eventName": "REMOVE",
+                        "dynamodb": {
+                            "Keys": {
+                                "PK": {"S": OTHER_USER_ID},
+                                "SK": {
+                                    "S": compose_bot_id(OTHER_USER_ID, PUBLIC_BOT_ID)
+                                },
+                            }
+                        },
+                    }
+                ]
+            },
+            None,
+        )
+
+    def test_delete_aliases(self):
+        self._remove()
+
+        self.assertEqual(count_alias_holders(PUBLIC_BOT_ID), 0)
+        with self.assertRaises(RecordNotFoundError):
+            find_alias_by_id(USER_ID, PUBLIC_BOT_ID)
+
+    def test_skip_aliases_without_index(self):
+        # `OriginalBotIdIndex` is not created before index stage 2
+        error = ClientError(
+            {
+                "Error": {
+                    "Code": "ValidationException",
+                    "Message": "The table does not have the specified index",
+                }
+            },
+            "Query",
+        )
+        with patch(
+            "app.bot_remove.delete_aliases_by_original_bot_id", side_effect=error
+        ):
+            self._remove()
+
+        self.delete_from_s3.assert_called_once_with(OTHER_USER_ID, PUBLIC_BOT_ID)
+        self.delete_stack.assert_called_once_with(PUBLIC_BOT_ID)
+        find_alias_by_id(USER_ID, PUBLIC_BOT_ID)
+
+
+if __name__ == "__main__":
+    unittest.main()
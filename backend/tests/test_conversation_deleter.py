@@ -0,0 +1,66 @@
+import sys
+
+sys.path.insert(0, ".")
+import json
+import unittest
+from unittest.mock import patch
+
+# NOTE: Must be imported before `app` so that the environment is set up first
+from tests.test_usecases.utils.local_aws import LocalAwsTestCase
+
+from app.conversation_deleter import handler, start_conversation_deletion
+from app.repositories.common import ResourceConflictError
+from app.repositories.conversation import (
+    find_conversation_by_user_id,
+    find_conversation_deletion_by_user_id,
+)
+from fastapi import BackgroundTasks
+from tests.test_usecases.utils.seed import USER_ID, seed
+
+
+class TestConversationDeleter(LocalAwsTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        seed()
+
+    def test_delete_in_background(self):
+        background_tasks = BackgroundTasks()
+        deletion = start_conversation_deletion(USER_ID, background_tasks)
+        self.assertEqual(deletion.status, "QUEUED")
+        self.assertEqual(len(background_tasks.tasks), 1)
+
+        task = background_tasks.tasks[0]
+        task.func(*task.args, **task.kwargs)
+
+        deletion = find_conversation_deletion_by_user_id(USER_ID)
+        self.assertEqual(deletion.status, "SUCCEEDED")
+        self.assertGreater(deletion.progress.deleted_items, 0)
+        self.assertEqual(find_conversation_by_user_id(USER_ID), [])
+
+    def test_conflict_while_in_progress(self):
+        start_conversation_deletion(USER_ID, BackgroundTasks())
+        with self.assertRaises(ResourceConflictError):
+            start_conversation_deletion(USER_ID, BackgroundTasks())
+
+    def test_delete_from_queue(self):
+        with patch(
+            "app.conversation_deleter.CONVERSATION_DELETION_QUEUE_URL", "queue-url"
+        ), patch("app.conversation_deleter.sqs_client") as sqs_client:
+            background_tasks = BackgroundTasks()
+            start_conversation_deletion(USER_ID, background_tasks)
+
+        self.assertEqual(background_tasks.tasks, [])
+        message = sqs_client.send_message.call_args.kwargs
+        self.assertEqual(message["QueueUrl"], "queue-url")
+
+        handler({"Records": [{"body": message["MessageBody"]}]}, None)
+
+        self.assertEqual(
+            find_conversation_deletion_by_user_id(USER_ID).status, "SUCCEEDED"
+        )
+        self.assertEqual(find_conversation_by_user_id(USER_ID), [])
+        self.assertEqual(json.loads(message["MessageBody"]), {"user_id": USER_ID})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import sys
+
+sys.path.insert(0, ".")
+import unittest
+
+# NOTE: Must be imported before `app` so that the environment is set up first
+from tests.test_usecases.utils.local_aws import LocalAwsTestCase
+
+from app.last_message_time_backfill import backfill_last_message_times
+from app.repositories.common import _get_table_client, compose_conv_id
+from app.repositories.conversation import find_conversation_by_user_id
+from tests.test_usecases.utils.seed import CONVERSATION_ID, USER_ID, seed
+
+
+class TestLastMessageTimeBackfill(LocalAwsTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        seed()
+
+    def test_backfill(self):
+        # Conversation stored before `LastMessageTime` was introduced
+        _get_table_client(USER_ID).update_item(
+            Key={"PK": USER_ID, "SK": compose_conv_id(USER_ID, CONVERSATION_ID)},
+            UpdateExpression="REMOVE LastMessageTime",
+        )
+        conversations = find_conversation_by_user_id(
+            USER_ID, order_by="last_message_time"
+        )
+        self.assertEqual(conversations, [])
+
+        self.assertEqual(backfill_last_message_times(), 1)
+        conversations = find_conversation_by_user_id(
+            USER_ID, order_by="last_message_time"
+        )
+        self.assertEqual([c.id for c in conversations], [CONVERSATION_ID])
+        self.assertEqual(conversations[0].last_message_time, 1627984879.9)
+        self.assertEqual(backfill_last_message_times(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import sys
+
+sys.path.append(".")
+
+import logging
+import unittest
+
+from app.logging_utils import LogPayload, format_payload, log_payload
+from app.repositories.models.conversation import ImageContentModel
+
+
+class TestFormatPayload(unittest.TestCase):
+    def test_binary_and_secrets_are_replaced(self):
+        text = format_payload(
+            {
+                "headers": {"Authorization": "Bearer secret-token"},
+                "content": [
+                    ImageContentModel(
+                        content_type="image", media_type="image/png", body=b"x" * 1024
+                    )
+                ],
+            }
+        )
+        self.assertNotIn("secret-token", text)
+        self.assertIn("'Authorization': '***'", text)
+        self.assertIn("body=<1024 bytes>", text)
+
+    def test_size_is_capped(self):
+        text = format_payload({"text": "a" * 10000, "items": list(range(1000))})
+        self.assertIn("...<9800 more chars>", text)
+        self.assertIn("...<980 more>", text)
+
+        text = format_payload([{"text": "a" * 100}] * 20, max_length=300)
+        self.assertTrue(text.endswith("...<truncated>"))
+        self.assertLess(len(text), 400)
+
+
+class TestLogPayload(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger("test_logging_utils")
+        self.logger.setLevel(logging.INFO)
+
+    def test_not_formatted_when_disabled(self):
+        class Payload:
+            def __repr__(self):
+                raise AssertionError("Must not be formatted")
+
+        log_payload(self.logger, "payload: %s", Payload(), level=logging.DEBUG)
+        log_payload(self.logger, "payload: %s", Payload(), sample_rate=0.0)
+
+    def test_logged(self):
+        with self.assertLogs(self.logger, level="INFO") as logs:
+            log_payload(self.logger, "payload: %s", {"body": b"abc"})
+        self.assertEqual(logs.records[0].getMessage(), "payload: {'body': <3 bytes>}")
+        self.assertIsInstance(logs.records[0].args[0], LogPayload)  # type: ignore
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import sys
+
+sys.path.append(".")
+
+import io
+import json
+import threading
+import unittest
+
+import boto3
+from app.metrics import (
+    AWS_CALL_DURATION,
+    Counter,
+    EmfExporter,
+    Histogram,
+    MetricsRegistry,
+    generate_latest,
+    instrument_boto3_client,
+)
+from botocore.stub import Stubber
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+        self.counter = Counter(
+            "frames_total", "Frames.", ["status"], registry=self.registry
+        )
+        self.histogram = Histogram(
+            "latency_seconds",
+            "Latency.",
+            ["route"],
+            buckets=[0.1, 1.0],
+            registry=self.registry,
+        )
+
+    def test_values_are_merged_across_threads(self):
+        def record():
+            for _ in range(1000):
+                self.counter.inc(status="success")
+
+        threads = [threading.Thread(target=record) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.counter.inc(2, status="error")
+
+        self.assertEqual(
+            self.counter.collect(), {("success",): 4000.0, ("error",): 2.0}
+        )
+        # Shards of finished threads are folded and still counted
+        self.assertEqual(self.counter.collect()[("success",)], 4000.0)
+
+    def test_exposition(self):
+        self.histogram.observe(0.05, route="/conversation")
+        self.histogram.observe(0.5, route="/conversation")
+        self.histogram.observe(3, route="/conversation")
+        self.counter.inc(status='say "hi"')
+
+        text = generate_latest(self.registry)
+        self.assertIn("# TYPE latency_seconds histogram", text)
+        self.assertIn('latency_seconds_bucket{route="/conversation",le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{route="/conversation",le="1.0"} 2', text)
+        self.assertIn('latency_seconds_bucket{route="/conversation",le="+Inf"} 3', text)
+        self.assertIn('latency_seconds_sum{route="/conversation"} 3.55', text)
+        self.assertIn('latency_seconds_count{route="/conversation"} 3', text)
+        self.assertIn('frames_total{status="say \\"hi\\""} 1.0', text)
+
+    def test_emf_exports_deltas(self):
+        stream = io.StringIO()
+        exporter = EmfExporter(namespace="Test", registry=self.registry, stream=stream)
+
+        self.counter.inc(3, status="success")
+        exporter.flush()
+        self.counter.inc(2, status="success")
+        exporter.flush()
+        # Nothing changed
+        exporter.flush()
+
+        documents = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual([d["frames_total"] for d in documents], [3.0, 2.0])
+        self.assertEqual(documents[0]["status"], "success")
+        self.assertEqual(
+            documents[0]["_aws"]["CloudWatchMetrics"][0]["Dimensions"], [["status"]]
+        )
+
+
+class TestInstrumentBoto3Client(unittest.TestCase):
+    def test_calls_are_recorded(self):
+        client = instrument_boto3_client(
+            boto3.client(
+                "s3",
+                region_name="us-east-1",
+                aws_access_key_id="key",
+                aws_secret_access_key="key",
+            )
+        )
+        labels = ("s3", "DeleteObject", "other")
+        before = sum(AWS_CALL_DURATION.collect().get(labels, [0.0])[:-1])
+
+        with Stubber(client) as stubber:
+            stubber.add_response("delete_object", {})
+            client.delete_object(Bucket="bucket", Key="key")
+
+        after = sum(AWS_CALL_DURATION.collect()[labels][:-1])
+        self.assertEqual(after - before, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import sys
+
+sys.path.append(".")
+
+import unittest
+
+from app.middlewares import CurrentUserMiddleware, RequestLoggingMiddleware
+from starlette.requests import Request
+
+
+def _scope(headers: list[tuple[bytes, bytes]] | None = None) -> dict:
+    return {
+        "type": "http",
+        "method": "POST",
+        "path": "/conversation",
+        "headers": headers or [],
+    }
+
+
+class TestRequestLoggingMiddleware(unittest.IsolatedAsyncioTestCase):
+    async def test_body_is_peeked_without_buffering(self):
+        chunks = [b'{"message": "' + b"a" * 60, b"b" * 60, b'"}']
+        messages = [
+            {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+            for i, chunk in enumerate(chunks)
+        ]
+        received = []
+
+        async def receive():
+            message = messages.pop(0)
+            received.append(message)
+            return message
+
+        async def app(scope, receive, send):
+            body = b""
+            for i in range(len(chunks)):
+                message = await receive()
+                # Chunks are passed through as the application reads them
+                self.assertEqual(len(received), i + 1)
+                body += message["body"]
+            self.assertEqual(body, b"".join(chunks))
+
+        middleware = RequestLoggingMiddleware(app, body_log_length=100)
+        with self.assertLogs("app.middlewares", level="INFO") as logs:
+            await middleware(_scope(), receive, None)  # type: ignore
+
+        body_logs = [r.getMessage() for r in logs.records if "body" in r.getMessage()]
+        self.assertEqual(
+            body_logs, ['Request body: {"message": "' + "a" * 60 + "b" * 27 + "..."]
+        )
+
+
+class TestCurrentUserMiddleware(unittest.IsolatedAsyncioTestCase):
+    async def test_local_user(self):
+        users = []
+
+        async def app(scope, receive, send):
+            users.append(Request(scope).state.current_user)
+
+        await CurrentUserMiddleware(app)(_scope(), None, None)  # type: ignore
+        self.assertEqual(users[0].id, "test_user")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import sys
+
+sys.path.insert(0, ".")
+import unittest
+from unittest.mock import patch
+
+# NOTE: Must be imported before `app` so that the environment is set up first
+from tests.test_usecases.utils.local_aws import LocalAwsTestCase
+
+from app.bot_list_key_backfill import backfill_bot_list_keys
+from app.repositories.common import _get_table_client, compose_bot_id
+from app.repositories.custom_bot import (
+    find_private_bot_page_by_user_id,
+    find_private_bots_by_user_id,
+    store_alias,
+    store_bot,
+    update_bot_last_used_time,
+)
+from tests.test_usecases.utils.bot_factory import (
+    create_test_bot_alias,
+    create_test_private_bot,
+)
+
+USER_ID = "user1"
+
+
+class TestPrivateBotListing(LocalAwsTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        for i in range(5):
+            bot = create_test_private_bot(str(i), False, USER_ID)
+            bot.last_used_time = 1627984879.9 + i
+            store_bot(USER_ID, bot)
+        # Aliases used more recently than all bots
+        for i in range(3):
+            alias = create_test_bot_alias(f"alias{i}", f"public{i}", False)
+            alias.last_used_time = 1727984879.9 + i
+            store_alias(USER_ID, alias)
+
+    def test_find_page(self):
+        bots, next_token = find_private_bot_page_by_user_id(USER_ID, limit=2)
+        self.assertEqual([bot.id for bot in bots], ["4", "3"])
+        self.assertIsNotNone(next_token)
+
+        bots, next_token = find_private_bot_page_by_user_id(
+            USER_ID, limit=3, next_token=next_token
+        )
+        self.assertEqual([bot.id for bot in bots], ["2", "1", "0"])
+        self.assertTrue(all(bot.owned for bot in bots))
+
+    def test_find_all(self):
+        bots = find_private_bots_by_user_id(USER_ID)
+        self.assertEqual([bot.id for bot in bots], ["4", "3", "2", "1", "0"])
+        bots = find_private_bots_by_user_id(USER_ID, limit=3)
+        self.assertEqual([bot.id for bot in bots], ["4", "3", "2"])
+
+    def test_order_by_last_used_time(self):
+        update_bot_last_used_time(USER_ID, "0")
+        bots, _ = find_private_bot_page_by_user_id(USER_ID, limit=1)
+        self.assertEqual(bots[0].id, "0")
+
+    def test_invalid_next_token(self):
+        _, next_token = find_private_bot_page_by_user_id(USER_ID, limit=1)
+        with self.assertRaises(ValueError):
+            find_private_bot_page_by_user_id("user2", next_token=next_token)
+        with self.assertRaises(ValueError):
+            find_private_bot_page_by_user_id(USER_ID, limit=0)
+
+    def test_backfill(self):
+        # Bot stored before `BotListKey` was introduced
+        _get_table_client(USER_ID).update_item(
+            Key={"PK": USER_ID, "SK": compose_bot_id(USER_ID, "4")},
+            UpdateExpression="SET BedrockKnowledgeBase = :kb "
+            "REMOVE BotListKey, HasBedrockKnowledgeBase",
+            ExpressionAttributeValues={":kb": {"knowledge_base_id": "kb"}},
+        )
+        bots = find_private_bots_by_user_id(USER_ID)
+        self.assertNotIn("4", [bot.id for bot in bots])
+
+        self.assertEqual(backfill_bot_list_keys(), 1)
+        bots = find_private_bots_by_user_id(USER_ID)
+        self.assertEqual(bots[0].id, "4")
+        self.assertTrue(bots[0].has_bedrock_knowledge_base)
+        self.assertEqual(backfill_bot_list_keys(), 0)
+
+    def test_find_before_backfill(self):
+        # Bot stored before `BotListKey` was introduced
+        _get_table_client(USER_ID).update_item(
+            Key={"PK": USER_ID, "SK": compose_bot_id(USER_ID, "4")},
+            UpdateExpression="SET BedrockKnowledgeBase = :kb "
+            "REMOVE BotListKey, HasBedrockKnowledgeBase",
+            ExpressionAttributeValues={":kb": {"knowledge_base_id": "kb"}},
+        )
+        with patch("app.repositories.custom_bot.ENABLE_BOT_LIST_KEY_INDEX", False):
+            bots = find_private_bots_by_user_id(USER_ID)
+            self.assertEqual([bot.id for bot in bots], ["4", "3", "2", "1", "0"])
+            self.assertTrue(bots[0].has_bedrock_knowledge_base)
+
+            # Aliases used most recently are filtered out of the first pages
+            bots, next_token = find_private_bot_page_by_user_id(USER_ID, limit=4)
+            self.assertEqual([bot.id for bot in bots], ["4"])
+            bots, _ = find_private_bot_page_by_user_id(
+                USER_ID, limit=4, next_token=next_token
+            )
+            self.assertEqual([bot.id for bot in bots], ["3", "2", "1", "0"])
+
+
+if __name__ == "__main__":
+    unittest.main()
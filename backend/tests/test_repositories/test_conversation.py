@@ -1,23 +1,31 @@
 import base64
+import gzip
 import json
 import os
 import sys
 import unittest
+from decimal import Decimal
 from unittest.mock import MagicMock, patch
 
 sys.path.append(".")
 
 
 from app.repositories.conversation import (
+    LARGE_MESSAGE_BUCKET,
     ConversationModel,
     MessageModel,
     RecordNotFoundError,
+    archive_conversation,
     change_conversation_title,
     delete_conversation_by_id,
     delete_conversation_by_user_id,
     find_conversation_by_id,
     find_conversation_by_user_id,
+    find_conversation_page_by_user_id,
+    find_related_documents_by_conversation_id,
+    find_related_document_page_by_conversation_id,
     store_conversation,
+    store_related_documents,
     update_feedback,
 )
 from app.repositories.custom_bot import (
@@ -26,11 +34,16 @@ from app.repositories.custom_bot import (
     store_bot,
 )
 from app.repositories.models.conversation import (
+    AttachmentContentModel,
     ChunkModel,
+    CostLedgerEntryModel,
     FeedbackModel,
     ImageContentModel,
+    ImageToolResultModel,
+    RelatedDocumentModel,
     SimpleMessageModel,
     TextContentModel,
+    TextToolResultModel,
     ToolUseContentModel,
     ToolUseContentModelBody,
 )
@@ -44,6 +57,7 @@ from app.repositories.models.custom_bot import (
     KnowledgeModel,
 )
 from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.types import Binary
 from botocore.exceptions import ClientError
 
 # class TestRowLevelAccess(unittest.TestCase):
@@ -159,7 +173,15 @@ class TestConversationRepository(unittest.TestCase):
             id="1",
             create_time=1627984879.9,
             title="Test Conversation",
-            total_price=100,
+            cost_ledger=[
+                CostLedgerEntryModel(
+                    message_id="a",
+                    model="claude-instant-v1",
+                    input_tokens=100,
+                    output_tokens=100,
+                    price=100,
+                )
+            ],
             message_map={
                 "a": MessageModel(
                     role="user",
@@ -244,6 +266,12 @@ class TestConversationRepository(unittest.TestCase):
                             ),
                             "CreateTime": 1627984879.9,
                             "TotalPrice": 100,
+                            "CostLedger": json.dumps(
+                                [
+                                    entry.model_dump()
+                                    for entry in conversation.cost_ledger
+                                ]
+                            ),
                             "LastMessageId": "x",
                             "MessageMap": json.dumps(message_map),
                             "IsLargeMessage": False,
@@ -262,6 +290,12 @@ class TestConversationRepository(unittest.TestCase):
                             "Title": "Test Conversation",
                             "CreateTime": 1627984879.9,
                             "TotalPrice": 100,
+                            "CostLedger": json.dumps(
+                                [
+                                    entry.model_dump()
+                                    for entry in conversation.cost_ledger
+                                ]
+                            ),
                             "LastMessageId": "x",
                             "MessageMap": json.dumps(
                                 conversation.model_dump()["message_map"]
@@ -309,6 +343,8 @@ class TestConversationRepository(unittest.TestCase):
         self.assertEqual(len(message_map["a"].used_chunks), 1)  # type: ignore
         self.assertEqual(found_conversation.last_message_id, "x")
         self.assertEqual(found_conversation.total_price, 100)
+        self.assertEqual(len(found_conversation.cost_ledger), 1)
+        self.assertEqual(found_conversation.cost_ledger[0].input_tokens, 100)
         self.assertEqual(found_conversation.bot_id, None)
         self.assertEqual(found_conversation.should_continue, False)
 
@@ -401,7 +437,15 @@ class TestConversationRepository(unittest.TestCase):
             id="2",
             create_time=1627984879.9,
             title="Large Conversation",
-            total_price=200,
+            cost_ledger=[
+                CostLedgerEntryModel(
+                    message_id="msg_8",
+                    model="claude-instant-v1",
+                    input_tokens=100,
+                    output_tokens=100,
+                    price=200,
+                )
+            ],
             message_map=large_message_map,
             last_message_id="msg_9",
             bot_id=None,
@@ -491,6 +535,7 @@ class TestConversationRepository(unittest.TestCase):
         )
         self.assertEqual(found_conversation.id, "2")
         self.assertEqual(found_conversation.title, "Large Conversation")
+        # Stored before the ledger was introduced, so `TotalPrice` is carried over
         self.assertEqual(found_conversation.total_price, 200)
         self.assertEqual(found_conversation.last_message_id, "msg_9")
         self.assertEqual(found_conversation.bot_id, None)
@@ -521,6 +566,887 @@ class TestConversationRepository(unittest.TestCase):
         conversations = find_conversation_by_user_id(user_id="user")
         self.assertEqual(len(conversations), 0)
 
+    def test_store_and_find_binary_attachment(self):
+        body = os.urandom(512 * 1024)
+        conversation = ConversationModel(
+            id="3",
+            create_time=1627984879.9,
+            title="Attachment",
+            message_map={
+                "system": MessageModel(
+                    role="system",
+                    content=[TextContentModel(content_type="text", body="Hello")],
+                    model="claude-instant-v1",
+                    children=["a"],
+                    parent=None,
+                    create_time=1627984879.9,
+                    feedback=None,
+                    used_chunks=None,
+                    thinking_log=None,
+                ),
+                "a": MessageModel(
+                    role="user",
+                    content=[
+                        AttachmentContentModel(
+                            content_type="attachment",
+                            file_name="data.bin",
+                            body=body,
+                        )
+                    ],
+                    model="claude-instant-v1",
+                    children=[],
+                    parent="system",
+                    create_time=1627984879.9,
+                    feedback=None,
+                    used_chunks=None,
+                    thinking_log=None,
+                ),
+            },
+            last_message_id="a",
+            bot_id=None,
+            should_continue=False,
+        )
+        # The body is kept by reference, not copied or re-encoded
+        self.assertIs(conversation.message_map["a"].content[0].body, body)  # type: ignore
+
+        store_conversation(user_id="user", conversation=conversation)
+
+        item = self.mock_table.put_item.call_args.kwargs["Item"]
+        stored = self.mock_s3_client.put_object.call_args.kwargs["Body"]
+        self.assertTrue(item["IsLargeMessage"])
+        self.assertIsInstance(stored, bytes)
+        self.assertEqual(
+            json.loads(stored)["a"]["content"][0]["body"],
+            base64.b64encode(body).decode(),
+        )
+        self.assertEqual(list(json.loads(item["MessageMap"]).keys()), ["system"])
+
+        self.mock_table.query.return_value = {"Items": [item]}
+        self.mock_s3_client.get_object.return_value = {
+            "Body": MagicMock(read=lambda: stored)
+        }
+        found = find_conversation_by_id("user", "3")
+        self.assertEqual(found.message_map["a"].content[0].body, body)  # type: ignore
+
+
+class TestConversationListing(unittest.TestCase):
+    def setUp(self):
+        self.patcher = patch("boto3.resource")
+        self.mock_boto3_resource = self.patcher.start()
+        self.mock_table = MagicMock()
+        self.mock_table.name = "test-table"
+        self.mock_boto3_resource.return_value.Table.return_value = self.mock_table
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def _item(self, conversation_id: str, **attributes) -> dict:
+        return {
+            "PK": "user",
+            "SK": f"user#CONV#{conversation_id}",
+            "Title": f"Conversation {conversation_id}",
+            "CreateTime": 1627984879.9,
+            **attributes,
+        }
+
+    def test_store_model_attribute(self):
+        conversation = ConversationModel(
+            id="1",
+            create_time=1627984879.9,
+            title="Test Conversation",
+            total_price=0,
+            message_map={
+                "system": MessageModel(
+                    role="system",
+                    content=[TextContentModel(content_type="text", body="")],
+                    model="claude-v3-haiku",
+                    children=["a"],
+                    parent=None,
+                    create_time=1627984879.9,
+                    feedback=None,
+                    used_chunks=None,
+                    thinking_log=None,
+                ),
+                "a": MessageModel(
+                    role="user",
+                    content=[TextContentModel(content_type="text", body="Hello")],
+                    model="claude-v3-haiku",
+                    children=[],
+                    parent="system",
+                    create_time=1627984900.5,
+                    feedback=None,
+                    used_chunks=None,
+                    thinking_log=None,
+                ),
+            },
+            last_message_id="a",
+            bot_id=None,
+            should_continue=False,
+        )
+        store_conversation("user", conversation)
+
+        item = self.mock_table.put_item.call_args.kwargs["Item"]
+        self.assertEqual(item["Model"], "claude-v3-haiku")
+        self.assertEqual(item["LastMessageTime"], Decimal("1627984900.5"))
+
+    def test_find_page(self):
+        last_evaluated_key = {"PK": "user", "SK": "user#CONV#2"}
+        self.mock_table.query.return_value = {
+            "Items": [
+                self._item("3", Model="claude-v3-haiku"),
+                self._item("2", Model="claude-v3-sonnet", BotId="bot"),
+            ],
+            "LastEvaluatedKey": last_evaluated_key,
+        }
+
+        conversations, next_token = find_conversation_page_by_user_id("user", limit=2)
+
+        query_params = self.mock_table.query.call_args.kwargs
+        self.assertEqual(query_params["Limit"], 2)
+        # Message maps are never read to list conversations
+        self.assertNotIn("MessageMap", query_params["ProjectionExpression"])
+        self.mock_boto3_resource.return_value.batch_get_item.assert_not_called()
+
+        self.assertEqual([c.id for c in conversations], ["3", "2"])
+        self.assertEqual(conversations[1].model, "claude-v3-sonnet")
+        self.assertEqual(conversations[1].bot_id, "bot")
+        self.assertIsNotNone(next_token)
+
+        self.mock_table.query.return_value = {
+            "Items": [self._item("1", Model="claude-v3-haiku")]
+        }
+        conversations, next_token = find_conversation_page_by_user_id(
+            "user", limit=2, next_token=next_token
+        )
+        self.assertEqual(
+            self.mock_table.query.call_args.kwargs["ExclusiveStartKey"],
+            last_evaluated_key,
+        )
+        self.assertEqual([c.id for c in conversations], ["1"])
+        self.assertIsNone(next_token)
+
+    def test_find_page_by_last_message_time(self):
+        last_evaluated_key = {
+            "PK": "user",
+            "SK": "user#CONV#1",
+            "LastMessageTime": Decimal("1627984900.123456"),
+        }
+        self.mock_table.query.return_value = {
+            "Items": [
+                self._item(
+                    "1",
+                    Model="claude-v3-haiku",
+                    LastMessageTime=Decimal("1627984900.123456"),
+                )
+            ],
+            "LastEvaluatedKey": last_evaluated_key,
+        }
+
+        conversations, next_token = find_conversation_page_by_user_id(
+            "user", limit=1, order_by="last_message_time"
+        )
+        query_params = self.mock_table.query.call_args.kwargs
+        self.assertEqual(query_params["IndexName"], "LastMessageTimeIndex")
+        self.assertFalse(query_params["ScanIndexForward"])
+        self.assertEqual(conversations[0].last_message_time, 1627984900.123456)
+
+        # Number keys are restored as `Decimal` as required by boto3
+        assert next_token is not None
+        find_conversation_page_by_user_id(
+            "user", limit=1, next_token=next_token, order_by="last_message_time"
+        )
+        self.assertEqual(
+            self.mock_table.query.call_args.kwargs["ExclusiveStartKey"],
+            last_evaluated_key,
+        )
+
+    def test_find_page_without_model_attribute(self):
+        self.mock_table.query.return_value = {"Items": [self._item("1")]}
+        self.mock_boto3_resource.return_value.batch_get_item.return_value = {
+            "Responses": {
+                "test-table": [
+                    {
+                        "SK": "user#CONV#1",
+                        "MessageMap": json.dumps(
+                            {"system": {"model": "claude-instant-v1"}}
+                        ),
+                    }
+                ]
+            },
+            "UnprocessedKeys": {},
+        }
+
+        conversations, _ = find_conversation_page_by_user_id("user", limit=10)
+        self.assertEqual(conversations[0].model, "claude-instant-v1")
+
+    @patch("app.repositories.batch_write.time.sleep")
+    def test_find_page_without_model_attribute_retries_with_backoff(self, mock_sleep):
+        self.mock_table.query.return_value = {
+            "Items": [self._item("1"), self._item("2")]
+        }
+        keys = [{"PK": "user", "SK": "user#CONV#2"}]
+        self.mock_boto3_resource.return_value.batch_get_item.side_effect = [
+            {
+                "Responses": {
+                    "test-table": [
+                        {
+                            "SK": "user#CONV#1",
+                            "MessageMap": json.dumps(
+                                {"system": {"model": "claude-instant-v1"}}
+                            ),
+                        }
+                    ]
+                },
+                "UnprocessedKeys": {"test-table": {"Keys": keys}},
+            },
+            {
+                "Responses": {
+                    "test-table": [
+                        {
+                            "SK": "user#CONV#2",
+                            "MessageMap": json.dumps(
+                                {"system": {"model": "claude-v2"}}
+                            ),
+                        }
+                    ]
+                },
+                "UnprocessedKeys": {},
+            },
+        ]
+
+        conversations, _ = find_conversation_page_by_user_id("user", limit=10)
+        self.assertEqual(
+            [c.model for c in conversations], ["claude-instant-v1", "claude-v2"]
+        )
+        self.assertEqual(
+            self.mock_boto3_resource.return_value.batch_get_item.call_args.kwargs[
+                "RequestItems"
+            ],
+            {"test-table": {"Keys": keys}},
+        )
+        mock_sleep.assert_called_once()
+
+    def test_find_page_with_invalid_next_token(self):
+        next_token = base64.b64encode(
+            json.dumps({"PK": "other-user", "SK": "other-user#CONV#1"}).encode()
+        ).decode()
+        with self.assertRaises(ValueError):
+            find_conversation_page_by_user_id("user", next_token=next_token)
+        with self.assertRaises(ValueError):
+            find_conversation_page_by_user_id("user", next_token="not a token")
+        with self.assertRaises(ValueError):
+            find_conversation_page_by_user_id("user", limit=0)
+        self.mock_table.query.assert_not_called()
+
+    def test_find_all_pages(self):
+        pages = [
+            {
+                "Items": [self._item(str(i), Model="claude-v3-haiku")],
+                "LastEvaluatedKey": {"PK": "user", "SK": f"user#CONV#{i}"},
+            }
+            for i in range(9, 0, -1)
+        ]
+        pages.append({"Items": [self._item("0", Model="claude-v3-haiku")]})
+        self.mock_table.query.side_effect = pages
+
+        conversations = find_conversation_by_user_id("user")
+        self.assertEqual(len(conversations), 10)
+        self.assertEqual(self.mock_table.query.call_count, 10)
+
+
+class TestBulkDeletion(unittest.TestCase):
+    def setUp(self):
+        self.patcher1 = patch("boto3.resource")
+        self.patcher2 = patch("app.repositories.conversation.s3_client")
+        self.mock_boto3_resource = self.patcher1.start()
+        self.mock_s3_client = self.patcher2.start()
+        self.mock_table = MagicMock()
+        self.mock_table.name = "test-table"
+        self.mock_boto3_resource.return_value.Table.return_value = self.mock_table
+        self.mock_client = self.mock_table.meta.client
+
+        # Calls of both clients in order, to check that objects are deleted first
+        self.calls: list[tuple[str, list[str]]] = []
+        self.mock_s3_client.delete_objects.side_effect = lambda Bucket, Delete: (
+            self.calls.append(("delete_objects", [o["Key"] for o in Delete["Objects"]]))
+            or {}
+        )
+        self.mock_client.batch_write_item.side_effect = lambda RequestItems: (
+            self.calls.append(
+                (
+                    "batch_write_item",
+                    [
+                        r["DeleteRequest"]["Key"]["SK"]
+                        for r in RequestItems["test-table"]
+                    ],
+                )
+            )
+            or {"UnprocessedItems": {}}
+        )
+
+    def tearDown(self):
+        self.patcher1.stop()
+        self.patcher2.stop()
+
+    def _pages(self, prefix: str, count: int, page_size: int, **attributes):
+        items = [
+            {"PK": "user", "SK": f"user#{prefix}#{i}", **attributes}
+            for i in range(count)
+        ]
+        pages = []
+        for i in range(0, count, page_size):
+            page: dict = {"Items": items[i : i + page_size]}
+            if i + page_size < count:
+                page["LastEvaluatedKey"] = {"PK": "user", "SK": items[-1]["SK"]}
+            pages.append(page)
+        return pages
+
+    def test_delete_by_user_id(self):
+        conversations = self._pages("CONV", 60, 20)
+        conversations[1]["Items"][0].update(
+            IsLargeMessage=True, LargeMessagePath="user/1.json"
+        )
+        self.mock_table.query.side_effect = (
+            conversations
+            # No markers of archived conversations
+            + [{"Items": []}]
+            + self._pages("RELATED_DOCUMENT", 30, 100)
+        )
+
+        progresses = []
+        delete_conversation_by_user_id("user", on_progress=progresses.append)
+
+        self.assertEqual(self.mock_table.query.call_count, 5)
+        self.assertEqual(
+            self.mock_table.query.call_args_list[1].kwargs["ExclusiveStartKey"],
+            conversations[0]["LastEvaluatedKey"],
+        )
+        self.assertEqual(
+            self.mock_s3_client.delete_objects.call_args.kwargs["Delete"]["Objects"],
+            [{"Key": "user/1.json"}],
+        )
+
+        deleted = [
+            sk for name, sks in self.calls if name == "batch_write_item" for sk in sks
+        ]
+        self.assertEqual(len(deleted), 90)
+        self.assertEqual(len(set(deleted)), 90)
+        self.assertTrue(
+            all(
+                len(sks) <= 25 for name, sks in self.calls if name == "batch_write_item"
+            )
+        )
+
+        # Each deletion reports its pages, then the total of all deletions so far
+        self.assertEqual(len(progresses), 8)
+        self.assertEqual(progresses[3].deleted_items, 60)
+        self.assertEqual(progresses[3].deleted_objects, 1)
+        self.assertEqual(progresses[7].deleted_items, 90)
+        self.assertEqual(progresses[7].deleted_objects, 1)
+
+    def test_item_deleted_after_its_object(self):
+        self.mock_table.query.side_effect = self._pages(
+            "CONV", 3, 10, IsLargeMessage=True, LargeMessagePath="user/large.json"
+        ) + [{"Items": []}, {"Items": []}]
+
+        delete_conversation_by_user_id("user")
+
+        self.assertEqual(
+            [name for name, _ in self.calls], ["delete_objects", "batch_write_item"]
+        )
+
+    def test_item_kept_when_object_deletion_failed(self):
+        items = [
+            {
+                "PK": "user",
+                "SK": f"user#CONV#{i}",
+                "IsLargeMessage": True,
+                "LargeMessagePath": f"user/{i}.json",
+            }
+            for i in range(2)
+        ]
+        self.mock_table.query.side_effect = [
+            {"Items": items},
+            {"Items": []},
+            {"Items": []},
+        ]
+        self.mock_s3_client.delete_objects.side_effect = None
+        self.mock_s3_client.delete_objects.return_value = {
+            "Errors": [{"Key": "user/0.json", "Message": "Access Denied"}]
+        }
+
+        progresses = []
+        delete_conversation_by_user_id("user", on_progress=progresses.append)
+
+        self.assertEqual(self.calls, [("batch_write_item", ["user#CONV#1"])])
+        self.assertEqual(progresses[1].failed_objects, 1)
+        self.assertEqual(progresses[1].failed_items, 1)
+
+    @patch("app.repositories.batch_write.time.sleep")
+    def test_retry_unprocessed_items(self, mock_sleep):
+        self.mock_table.query.side_effect = self._pages("CONV", 2, 10) + [
+            {"Items": []},
+            {"Items": []},
+        ]
+        unprocessed = {
+            "test-table": [
+                {"DeleteRequest": {"Key": {"PK": "user", "SK": "user#CONV#1"}}}
+            ]
+        }
+        self.mock_client.batch_write_item.side_effect = [
+            {"UnprocessedItems": unprocessed},
+            {"UnprocessedItems": {}},
+        ]
+
+        progresses = []
+        delete_conversation_by_user_id("user", on_progress=progresses.append)
+
+        self.assertEqual(self.mock_client.batch_write_item.call_count, 2)
+        self.assertEqual(
+            self.mock_client.batch_write_item.call_args.kwargs["RequestItems"],
+            unprocessed,
+        )
+        mock_sleep.assert_called_once()
+        self.assertEqual(progresses[1].deleted_items, 2)
+        self.assertEqual(progresses[1].failed_items, 0)
+
+
+class TestConversationArchive(unittest.TestCase):
+    def setUp(self):
+        self.patcher1 = patch("boto3.resource")
+        self.patcher2 = patch("app.repositories.conversation.s3_client")
+        self.mock_boto3_resource = self.patcher1.start()
+        self.mock_s3_client = self.patcher2.start()
+        self.mock_table = MagicMock()
+        self.mock_table.name = "test-table"
+        self.mock_boto3_resource.return_value.Table.return_value = self.mock_table
+
+        self.message_map = json.dumps(
+            {
+                "system": {
+                    "role": "system",
+                    "content": [
+                        {"content_type": "text", "body": "", "media_type": None}
+                    ],
+                    "model": "claude-v3-haiku",
+                    "children": [],
+                    "parent": None,
+                    "create_time": 1627984879.9,
+                    "feedback": None,
+                    "used_chunks": None,
+                    "thinking_log": None,
+                }
+            }
+        )
+        self.item = {
+            "PK": "user",
+            "SK": "user#CONV#1",
+            "Title": "Test Conversation",
+            "CreateTime": Decimal("1627984879.9"),
+            "TotalPrice": Decimal("0.5"),
+            "LastMessageId": "system",
+            "LastMessageTime": Decimal("1627984879.9"),
+            "Model": "claude-v3-haiku",
+            "MessageMap": self.message_map,
+            "CostLedger": "[]",
+        }
+
+    def tearDown(self):
+        self.patcher1.stop()
+        self.patcher2.stop()
+
+    def test_archive_conversation(self):
+        self.mock_table.get_item.return_value = {
+            "Item": {
+                **self.item,
+                "MessageMap": "{}",
+                "IsLargeMessage": True,
+                "LargeMessagePath": "user/1/message_map.json",
+            }
+        }
+        self.mock_s3_client.get_object.return_value = {
+            "Body": MagicMock(read=lambda: self.message_map.encode())
+        }
+
+        archived = archive_conversation(
+            self.mock_table,
+            {
+                "PK": "user",
+                "SK": "user#CONV#1",
+                "LastMessageTime": Decimal("1627984879.9"),
+            },
+        )
+        self.assertTrue(archived)
+
+        put_object = self.mock_s3_client.put_object.call_args.kwargs
+        self.assertEqual(put_object["Key"], "archive/user/1.json.gz")
+        self.assertEqual(put_object["StorageClass"], "STANDARD_IA")
+        archived_item = json.loads(gzip.decompress(put_object["Body"]))
+        self.assertEqual(archived_item["MessageMap"], self.message_map)
+        self.assertNotIn("LargeMessagePath", archived_item)
+
+        update_item = self.mock_table.update_item.call_args.kwargs
+        self.assertIn("REMOVE MessageMap", update_item["UpdateExpression"])
+        self.assertEqual(
+            update_item["ExpressionAttributeValues"][":archive_path"],
+            "archive/user/1.json.gz",
+        )
+        self.mock_s3_client.delete_object.assert_called_once_with(
+            Bucket=LARGE_MESSAGE_BUCKET, Key="user/1/message_map.json"
+        )
+
+    def test_archive_updated_conversation(self):
+        self.mock_table.get_item.return_value = {
+            "Item": {**self.item, "LastMessageTime": Decimal("1727984879.9")}
+        }
+
+        archived = archive_conversation(
+            self.mock_table,
+            {
+                "PK": "user",
+                "SK": "user#CONV#1",
+                "LastMessageTime": Decimal("1627984879.9"),
+            },
+        )
+        self.assertFalse(archived)
+        self.mock_s3_client.put_object.assert_not_called()
+        self.mock_table.update_item.assert_not_called()
+
+    def test_find_archived_conversation(self):
+        archived_item = {**self.item, "Title": "Old Title"}
+        stub = {
+            k: v for k, v in self.item.items() if k not in ("MessageMap", "CostLedger")
+        }
+        self.mock_table.query.return_value = {
+            "Items": [
+                {**stub, "Title": "New Title", "ArchivePath": "archive/user/1.json.gz"}
+            ]
+        }
+        self.mock_s3_client.get_object.return_value = {
+            "Body": MagicMock(
+                read=lambda: gzip.compress(
+                    json.dumps(archived_item, default=float).encode()
+                )
+            )
+        }
+
+        conversation = find_conversation_by_id("user", "1")
+        self.assertEqual(conversation.title, "New Title")
+        self.assertEqual(conversation.message_map["system"].model, "claude-v3-haiku")
+        self.mock_s3_client.get_object.assert_called_once_with(
+            Bucket=LARGE_MESSAGE_BUCKET, Key="archive/user/1.json.gz"
+        )
+
+    def test_find_expired_archived_conversation(self):
+        self.mock_table.query.return_value = {"Items": []}
+        with self.assertRaises(RecordNotFoundError):
+            find_conversation_by_id("user", "1")
+        self.mock_table.get_item.assert_not_called()
+
+        self.mock_table.get_item.return_value = {
+            "Item": {
+                "PK": "user",
+                "SK": "user#ARCHIVED_CONV#1",
+                "ArchivePath": "archive/user/1.json",
+            }
+        }
+        self.mock_s3_client.get_object.return_value = {
+            "Body": MagicMock(
+                read=lambda: json.dumps(self.item, default=float).encode()
+            )
+        }
+        with patch("app.repositories.conversation.CONVERSATION_ARCHIVE_TTL_DAYS", "90"):
+            conversation = find_conversation_by_id("user", "1")
+        self.assertEqual(conversation.title, "Test Conversation")
+        self.mock_s3_client.get_object.assert_called_once_with(
+            Bucket=LARGE_MESSAGE_BUCKET, Key="archive/user/1.json"
+        )
+
+    def test_find_missing_conversation_without_marker(self):
+        self.mock_table.query.return_value = {"Items": []}
+        self.mock_table.get_item.return_value = {}
+
+        with patch("app.repositories.conversation.CONVERSATION_ARCHIVE_TTL_DAYS", "90"):
+            with self.assertRaises(RecordNotFoundError):
+                find_conversation_by_id("user", "1")
+        # Not looked up in S3
+        self.mock_s3_client.get_object.assert_not_called()
+
+    def test_archive_stores_marker_with_ttl(self):
+        self.mock_table.get_item.return_value = {"Item": self.item}
+
+        with patch("app.repositories.conversation.CONVERSATION_ARCHIVE_TTL_DAYS", "90"):
+            archived = archive_conversation(
+                self.mock_table,
+                {
+                    "PK": "user",
+                    "SK": "user#CONV#1",
+                    "LastMessageTime": Decimal("1627984879.9"),
+                },
+            )
+        self.assertTrue(archived)
+        self.mock_table.put_item.assert_called_once_with(
+            Item={
+                "PK": "user",
+                "SK": "user#ARCHIVED_CONV#1",
+                "ArchivePath": "archive/user/1.json.gz",
+            }
+        )
+        self.assertIn(
+            "ExpireTime",
+            self.mock_table.update_item.call_args.kwargs["UpdateExpression"],
+        )
+
+
+class TestRelatedDocuments(unittest.TestCase):
+    def setUp(self):
+        self.patcher1 = patch("boto3.resource")
+        self.patcher2 = patch("app.repositories.conversation.s3_client")
+        self.mock_boto3_resource = self.patcher1.start()
+        self.mock_s3_client = self.patcher2.start()
+        self.mock_table = MagicMock()
+        self.mock_table.name = "test-table"
+        self.mock_boto3_resource.return_value.Table.return_value = self.mock_table
+        self.mock_client = self.mock_table.meta.client
+        self.mock_client.batch_get_item.return_value = {
+            "Responses": {},
+            "UnprocessedKeys": {},
+        }
+        self.mock_client.batch_write_item.return_value = {"UnprocessedItems": {}}
+
+    def tearDown(self):
+        self.patcher1.stop()
+        self.patcher2.stop()
+
+    def _written_items(self) -> list[dict]:
+        return [
+            request["PutRequest"]["Item"]
+            for call in self.mock_client.batch_write_item.call_args_list
+            for request in call.kwargs["RequestItems"]["test-table"]
+        ]
+
+    def test_store_deduplicated_bodies(self):
+        chunk = TextToolResultModel(text="chunk")
+        store_related_documents(
+            "user",
+            "1",
+            [
+                RelatedDocumentModel(content=chunk, source_id="tool@0"),
+                RelatedDocumentModel(content=chunk, source_id="tool@1"),
+                RelatedDocumentModel(
+                    content=TextToolResultModel(text="other"), source_id="tool@2"
+                ),
+            ],
+        )
+
+        items = self._written_items()
+        references = [item for item in items if "ContentHash" in item]
+        bodies = [item for item in items if "Body" in item]
+        self.assertEqual(len(references), 3)
+        self.assertEqual(len(bodies), 2)
+        self.assertEqual(references[0]["ContentHash"], references[1]["ContentHash"])
+        self.assertEqual(
+            bodies[0]["SK"],
+            f"user#RELATED_DOCUMENT_BODY#1#{references[0]['ContentHash']}",
+        )
+
+    def test_store_without_stored_bodies(self):
+        store_related_documents(
+            "user",
+            "1",
+            [
+                RelatedDocumentModel(
+                    content=TextToolResultModel(text="chunk"), source_id="tool@0"
+                )
+            ],
+        )
+        body_sort_key = next(
+            item["SK"] for item in self._written_items() if "Body" in item
+        )
+
+        # Retrieved again in the next turn
+        self.mock_client.batch_write_item.reset_mock()
+        self.mock_client.batch_get_item.return_value = {
+            "Responses": {"test-table": [{"SK": body_sort_key}]},
+            "UnprocessedKeys": {},
+        }
+        store_related_documents(
+            "user",
+            "1",
+            [
+                RelatedDocumentModel(
+                    content=TextToolResultModel(text="chunk"), source_id="tool2@0"
+                )
+            ],
+        )
+
+        items = self._written_items()
+        self.assertEqual(len(items), 1)
+        self.assertEqual(items[0]["SK"], "user#RELATED_DOCUMENT#1#tool2@0")
+
+    @patch("app.repositories.batch_write.time.sleep")
+    def test_retry_unprocessed_bodies(self, mock_sleep):
+        document = RelatedDocumentModel(
+            content=TextToolResultModel(text="chunk"), source_id="tool@0"
+        )
+        store_related_documents("user", "1", [document])
+        body_sort_key = next(
+            item["SK"] for item in self._written_items() if "Body" in item
+        )
+
+        self.mock_client.batch_write_item.reset_mock()
+        self.mock_client.batch_get_item.reset_mock()
+        unprocessed = {"test-table": {"Keys": [{"PK": "user", "SK": body_sort_key}]}}
+        self.mock_client.batch_get_item.side_effect = [
+            {"Responses": {}, "UnprocessedKeys": unprocessed},
+            {"Responses": {"test-table": [{"SK": body_sort_key}]}},
+        ]
+        store_related_documents("user", "1", [document])
+
+        self.assertEqual(self.mock_client.batch_get_item.call_count, 2)
+        self.assertEqual(
+            self.mock_client.batch_get_item.call_args.kwargs["RequestItems"],
+            unprocessed,
+        )
+        mock_sleep.assert_called_once()
+        # The stored body is not written again
+        self.assertEqual(len(self._written_items()), 1)
+
+    def test_store_large_bodies(self):
+        store_related_documents(
+            "user",
+            "1",
+            [
+                RelatedDocumentModel(
+                    content=TextToolResultModel(text="a" * 10_000), source_id="tool@0"
+                ),
+                RelatedDocumentModel(
+                    content=ImageToolResultModel(
+                        format="png", image=os.urandom(400 * 1024)
+                    ),
+                    source_id="tool@1",
+                ),
+            ],
+        )
+
+        items = self._written_items()
+        compressed = next(item for item in items if "CompressedBody" in item)
+        self.assertEqual(
+            json.loads(gzip.decompress(compressed["CompressedBody"])),
+            {"text": "a" * 10_000},
+        )
+        offloaded = next(item for item in items if "BodyPath" in item)
+        self.assertEqual(
+            self.mock_s3_client.put_object.call_args.kwargs["Key"],
+            offloaded["BodyPath"],
+        )
+
+    def test_find_related_documents(self):
+        body = json.dumps({"text": "chunk"})
+        compressed_body = gzip.compress(json.dumps({"text": "large"}).encode())
+        self.mock_table.query.return_value = {
+            "Items": [
+                {
+                    "PK": "user",
+                    "SK": "user#RELATED_DOCUMENT#1#tool@0",
+                    "SourceName": "a.pdf",
+                    "SourceLink": None,
+                    "ContentHash": "hash1",
+                },
+                {
+                    "PK": "user",
+                    "SK": "user#RELATED_DOCUMENT#1#tool@1",
+                    "SourceName": "b.pdf",
+                    "SourceLink": None,
+                    "ContentHash": "hash1",
+                },
+                {
+                    "PK": "user",
+                    "SK": "user#RELATED_DOCUMENT#1#tool@2",
+                    "SourceName": "c.pdf",
+                    "SourceLink": None,
+                    "ContentHash": "hash2",
+                },
+                # Stored with the content before bodies were deduplicated
+                {
+                    "PK": "user",
+                    "SK": "user#RELATED_DOCUMENT#1#legacy@0",
+                    "SourceName": "d.pdf",
+                    "SourceLink": None,
+                    "Content": {"text": "legacy"},
+                },
+            ]
+        }
+        self.mock_client.batch_get_item.return_value = {
+            "Responses": {
+                "test-table": [
+                    {
+                        "PK": "user",
+                        "SK": "user#RELATED_DOCUMENT_BODY#1#hash1",
+                        "Body": body,
+                    },
+                    {
+                        "PK": "user",
+                        "SK": "user#RELATED_DOCUMENT_BODY#1#hash2",
+                        "CompressedBody": Binary(compressed_body),
+                    },
+                ]
+            },
+            "UnprocessedKeys": {},
+        }
+
+        related_documents = find_related_documents_by_conversation_id("user", "1")
+        self.assertEqual(
+            [(d.source_id, d.content.text) for d in related_documents],  # type: ignore
+            [
+                ("tool@0", "chunk"),
+                ("tool@1", "chunk"),
+                ("tool@2", "large"),
+                ("legacy@0", "legacy"),
+            ],
+        )
+        # Each body is read once
+        keys = self.mock_client.batch_get_item.call_args.kwargs["RequestItems"][
+            "test-table"
+        ]["Keys"]
+        self.assertEqual(len(keys), 2)
+
+    def test_find_related_document_page(self):
+        self.mock_table.query.return_value = {
+            "Items": [
+                {
+                    "SK": "user#RELATED_DOCUMENT#1#tool@0",
+                    "SourceName": "a.pdf",
+                    "SourceLink": "s3://bucket/a.pdf",
+                },
+            ],
+            "LastEvaluatedKey": {"PK": "user", "SK": "user#RELATED_DOCUMENT#1#tool@0"},
+        }
+
+        related_documents, next_token = find_related_document_page_by_conversation_id(
+            "user", "1", limit=1
+        )
+        self.assertEqual(
+            [(d.source_id, d.source_name) for d in related_documents],
+            [("tool@0", "a.pdf")],
+        )
+        query_params = self.mock_table.query.call_args.kwargs
+        self.assertEqual(query_params["Limit"], 1)
+        self.assertNotIn("Content", query_params["ProjectionExpression"])
+        self.mock_client.batch_get_item.assert_not_called()
+
+        find_related_document_page_by_conversation_id(
+            "user", "1", limit=1, next_token=next_token
+        )
+        self.assertEqual(
+            self.mock_table.query.call_args.kwargs["ExclusiveStartKey"],
+            {"PK": "user", "SK": "user#RELATED_DOCUMENT#1#tool@0"},
+        )
+        with self.assertRaises(ValueError):
+            find_related_document_page_by_conversation_id(
+                "other", "1", next_token=next_token
+            )
+
 
 class TestConversationBotRepository(unittest.TestCase):
     def setUp(self):
@@ -547,7 +1473,15 @@ class TestConversationBotRepository(unittest.TestCase):
             id="1",
             create_time=1627984879.9,
             title="Test Conversation",
-            total_price=100,
+            cost_ledger=[
+                CostLedgerEntryModel(
+                    message_id="a",
+                    model="claude-instant-v1",
+                    input_tokens=100,
+                    output_tokens=100,
+                    price=100,
+                )
+            ],
             message_map={
                 "a": MessageModel(
                     role="user",
@@ -582,7 +1516,15 @@ class TestConversationBotRepository(unittest.TestCase):
             id="2",
             create_time=1627984879.9,
             title="Test Conversation",
-            total_price=100,
+            cost_ledger=[
+                CostLedgerEntryModel(
+                    message_id="a",
+                    model="claude-instant-v1",
+                    input_tokens=100,
+                    output_tokens=100,
+                    price=100,
+                )
+            ],
             message_map={
                 "a": MessageModel(
                     role="user",
@@ -1,14 +1,19 @@
 import sys
 import unittest
+from unittest.mock import patch
 
 sys.path.insert(0, ".")
 
+# NOTE: Must be imported before `app` so that the environment is set up first
+from tests.test_usecases.utils.local_aws import LocalAwsTestCase
 
+from app.repositories.common import _get_table_public_client, compose_bot_id
 from app.repositories.custom_bot import (
     delete_alias_by_id,
     delete_bot_by_id,
     delete_bot_publication,
     find_all_published_bots,
+    find_original_bots_by_ids,
     find_private_bot_by_id,
     find_private_bots_by_user_id,
     find_public_bots_by_ids,
@@ -29,6 +34,7 @@ from app.repositories.models.custom_bot import (
     ConversationQuickStarterModel,
     GenerationParamsModel,
     KnowledgeModel,
+    PromptCachingModel,
 )
 from app.repositories.models.custom_bot_guardrails import BedrockGuardrailsModel
 from app.repositories.models.custom_bot_kb import (
@@ -534,5 +540,79 @@ class TestUpdateBotVisibility(unittest.TestCase):
         self.assertEqual(bots[2].available, False)
 
 
+class TestUpdatePromptCaching(LocalAwsTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.bot = create_test_private_bot("1", False, "user1")
+        self.bot.prompt_caching = PromptCachingModel(
+            cache_system=False, cache_messages=False, cache_tools=False
+        )
+        store_bot("user1", self.bot)
+
+    def _update(self, **kwargs):
+        update_bot(
+            "user1",
+            "1",
+            title=self.bot.title,
+            description=self.bot.description,
+            instruction=self.bot.instruction,
+            generation_params=self.bot.generation_params,
+            agent=self.bot.agent,
+            knowledge=self.bot.knowledge,
+            sync_status=self.bot.sync_status,
+            sync_status_reason=self.bot.sync_status_reason,
+            display_retrieved_chunks=self.bot.display_retrieved_chunks,
+            active_models=self.bot.active_models,
+            conversation_quick_starters=self.bot.conversation_quick_starters,
+            **kwargs,
+        )
+
+    def test_keep_prompt_caching(self):
+        self._update()
+        bot = find_private_bot_by_id("user1", "1")
+        self.assertEqual(bot.prompt_caching, self.bot.prompt_caching)
+
+    def test_reset_prompt_caching(self):
+        self._update(reset_prompt_caching=True)
+        bot = find_private_bot_by_id("user1", "1")
+        # The default policy is used
+        self.assertIsNone(bot.prompt_caching)
+
+
+class TestFindOriginalBots(LocalAwsTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        store_bot("user2", create_test_public_bot("1", False, "user2"))
+        update_bot_visibility("user2", "1", True)
+
+    @patch("app.repositories.batch_write.time.sleep")
+    def test_retry_unprocessed_keys(self, mock_sleep):
+        table = _get_table_public_client()
+        batch_get_item = table.meta.client.batch_get_item
+        unprocessed = {
+            table.name: {"Keys": [{"PK": "user2", "SK": compose_bot_id("user2", "1")}]}
+        }
+        responses = [{"Responses": {}, "UnprocessedKeys": unprocessed}]
+
+        def throttled_batch_get_item(**kwargs):
+            return responses.pop() if responses else batch_get_item(**kwargs)
+
+        with patch(
+            "app.repositories.custom_bot._get_table_public_client",
+            return_value=table,
+        ), patch.object(
+            table.meta.client, "batch_get_item", side_effect=throttled_batch_get_item
+        ) as mock_batch_get_item, patch.object(
+            table.meta.client, "query"
+        ) as mock_query:
+            bots = find_original_bots_by_ids(["1"], owner_user_ids={"1": "user2"})
+
+        self.assertEqual(list(bots), ["1"])
+        self.assertEqual(mock_batch_get_item.call_count, 2)
+        mock_sleep.assert_called_once()
+        # Found by the retry, not by the index
+        mock_query.assert_not_called()
+
+
 if __name__ == "__main__":
     unittest.main()
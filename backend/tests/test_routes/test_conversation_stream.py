@@ -0,0 +1,144 @@
+import sys
+
+sys.path.append(".")
+
+import asyncio
+import json
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.repositories.common import RecordNotFoundError
+from app.routes.conversation import _background_chats, router
+from app.user import User
+from fastapi import FastAPI
+from starlette.requests import ClientDisconnect
+
+TOKENS = [f"token{i} " for i in range(200)]
+
+
+class SlowEventStream:
+    """Event stream of `converse_stream`, sending a token every 20 ms."""
+
+    def __init__(self):
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        yield {"messageStart": {"role": "assistant"}}
+        for token in TOKENS:
+            if self.closed.is_set():
+                return
+            time.sleep(0.02)
+            yield {
+                "contentBlockDelta": {
+                    "contentBlockIndex": 0,
+                    "delta": {"text": token},
+                }
+            }
+        yield {"contentBlockStop": {"contentBlockIndex": 0}}
+        yield {"messageStop": {"stopReason": "end_turn"}}
+
+    def close(self):
+        self.closed.set()
+
+
+class TestPostMessageStreamDisconnection(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.stream = SlowEventStream()
+        client = MagicMock()
+        client.converse_stream.return_value = {"stream": self.stream}
+        self.store_conversation = MagicMock()
+        for target, kwargs in [
+            ("app.stream.get_shared_bedrock_runtime_client", {"return_value": client}),
+            (
+                "app.usecases.chat.find_conversation_by_id",
+                {"side_effect": RecordNotFoundError()},
+            ),
+            ("app.usecases.chat.store_conversation", {"new": self.store_conversation}),
+            ("app.usecases.chat.store_related_documents", {}),
+        ]:
+            patcher = patch(target, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.app = FastAPI()
+        self.app.include_router(router)
+
+    async def _post_and_disconnect(self) -> list[bytes]:
+        """Post a message, and disconnect after the first event like a closed tab.
+        Sending fails after the disconnection, as by servers under ASGI spec 2.4.
+        """
+        body = json.dumps(
+            {
+                "conversationId": "conversation",
+                "message": {
+                    "role": "user",
+                    "content": [{"contentType": "text", "body": "Hello"}],
+                    "model": "claude-v3-haiku",
+                    "parentMessageId": None,
+                },
+            }
+        ).encode()
+        disconnected = asyncio.Event()
+        request_sent = False
+        events: list[bytes] = []
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if disconnected.is_set():
+                raise OSError("Disconnected")
+            if message["type"] == "http.response.body" and message["body"]:
+                events.append(message["body"])
+                disconnected.set()
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0", "spec_version": "2.4"},
+            "http_version": "1.1",
+            "method": "POST",
+            "scheme": "http",
+            "path": "/conversation/stream",
+            "raw_path": b"/conversation/stream",
+            "root_path": "",
+            "query_string": b"",
+            "headers": [(b"content-type", b"application/json")],
+            "client": ("127.0.0.1", 10000),
+            "server": ("127.0.0.1", 8000),
+            "state": {
+                "current_user": User(id="user", name="user", groups=[]),
+            },
+        }
+        with self.assertRaises(ClientDisconnect):
+            await self.app(scope, receive, send)
+
+        # The chat keeps running after the response until the partial answer is stored
+        await asyncio.wait_for(asyncio.gather(*_background_chats), timeout=5)
+        return events
+
+    async def test_partial_answer_is_stored(self):
+        events = await self._post_and_disconnect()
+
+        self.assertEqual(len(events), 1)
+        self.assertTrue(self.stream.closed.is_set())
+        self.assertEqual(len(_background_chats), 0)
+
+        self.store_conversation.assert_called_once()
+        conversation = self.store_conversation.call_args.args[1]
+        answer = conversation.message_map[conversation.last_message_id]
+        body = answer.content[0].body
+        self.assertTrue(body.startswith(TOKENS[0].strip()))
+        # Cancelled long before the end of the answer
+        self.assertLess(len(body), len("".join(TOKENS)) // 2)
+        self.assertTrue(conversation.should_continue)
+
+
+if __name__ == "__main__":
+    unittest.main()
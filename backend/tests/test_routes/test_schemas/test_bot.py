@@ -0,0 +1,53 @@
+import sys
+
+sys.path.append(".")
+import unittest
+
+from app.routes.schemas.bot import (
+    BotModifyInput,
+    PromptCaching,
+    PromptCachingReset,
+)
+from pydantic import ValidationError
+
+
+class TestBotModifyInputPromptCaching(unittest.TestCase):
+    def _parse(self, **prompt_caching) -> BotModifyInput:
+        return BotModifyInput.model_validate(
+            {
+                "title": "Title",
+                "instruction": "",
+                "description": None,
+                "generationParams": None,
+                "knowledge": None,
+                "displayRetrievedChunks": True,
+                "conversationQuickStarters": None,
+                "activeModels": {},
+                **prompt_caching,
+            }
+        )
+
+    def test_keep(self):
+        self.assertIsNone(self._parse().prompt_caching)
+
+    def test_set(self):
+        obj = self._parse(
+            promptCaching={
+                "cacheSystem": True,
+                "cacheMessages": False,
+                "cacheTools": True,
+            }
+        )
+        self.assertIsInstance(obj.prompt_caching, PromptCaching)
+
+    def test_reset_with_empty_object(self):
+        obj = self._parse(promptCaching={})
+        self.assertIsInstance(obj.prompt_caching, PromptCachingReset)
+
+    def test_partial_policy(self):
+        with self.assertRaises(ValidationError):
+            self._parse(promptCaching={"cacheSystem": True})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import sys
+
+sys.path.append(".")
+
+import json
+import unittest
+
+from app.sse import ServerSentEventSender
+
+
+class TestServerSentEventSender(unittest.IsolatedAsyncioTestCase):
+    async def _collect(self, sender: ServerSentEventSender) -> list[dict]:
+        payloads = []
+        async for event in sender.events():
+            self.assertTrue(event.startswith("data: "))
+            self.assertTrue(event.endswith("\n\n"))
+            payloads.append(json.loads(event[len("data: ") :]))
+        return payloads
+
+    async def test_tokens_are_coalesced_while_pending(self):
+        sender = ServerSentEventSender()
+        sender.on_stream("Hello")
+        sender.on_stream(", ")
+        sender.on_stream("World")
+        sender.on_agent_thinking(
+            {"tool_use_id": "xyz", "name": "internet_search", "input": {}}
+        )
+        sender.on_stream("!")
+        sender.finish()
+
+        payloads = await self._collect(sender)
+        self.assertEqual(
+            [p["status"] for p in payloads],
+            ["STREAMING", "AGENT_THINKING", "STREAMING"],
+        )
+        self.assertEqual(payloads[0]["completion"], "Hello, World")
+        self.assertEqual(payloads[2]["completion"], "!")
+
+    async def test_error(self):
+        sender = ServerSentEventSender()
+        sender.on_error(reason="Invalid request.")
+        sender.finish()
+
+        payloads = await self._collect(sender)
+        self.assertEqual(payloads, [{"status": "ERROR", "reason": "Invalid request."}])
+
+
+if __name__ == "__main__":
+    unittest.main()
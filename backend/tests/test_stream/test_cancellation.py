@@ -0,0 +1,158 @@
+import sys
+
+sys.path.append(".")
+
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.repositories.models.conversation import SimpleMessageModel, TextContentModel
+from app.stream import CancellationToken, ConverseApiStreamHandler
+
+MODEL = "claude-v3-haiku"
+
+
+def _text_delta(text: str) -> dict:
+    return {
+        "contentBlockDelta": {
+            "contentBlockIndex": 0,
+            "delta": {"text": text},
+        }
+    }
+
+
+class TestConverseApiStreamHandlerCancellation(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.events = [
+            {"messageStart": {"role": "assistant"}},
+            _text_delta("Hello"),
+            _text_delta(", World"),
+            {"contentBlockStop": {"contentBlockIndex": 0}},
+            {"messageStop": {"stopReason": "end_turn"}},
+        ]
+        self.stream = MagicMock()
+        self.stream.__iter__.return_value = iter(self.events)
+        self.client = MagicMock()
+        self.client.converse_stream.return_value = {"stream": self.stream}
+        self.messages = [
+            SimpleMessageModel(
+                role="user",
+                content=[TextContentModel(content_type="text", body="Hi")],
+            )
+        ]
+        self.cancellation_token = CancellationToken()
+        self.handler = ConverseApiStreamHandler(
+            model=MODEL,
+            # Cancel right after the first token
+            on_stream=lambda _: self.cancellation_token.cancel(),
+        )
+
+    def _assert_cancelled(self, result):
+        self.assertEqual(result["stop_reason"], "cancelled")
+        self.assertEqual(len(result["message"].content), 1)
+        self.assertEqual(result["message"].content[0].body, "Hello")  # type: ignore
+        self.stream.close.assert_called_once()
+
+    def test_run(self):
+        with patch("app.stream.get_bedrock_runtime_client", return_value=self.client):
+            result = self.handler.run(
+                messages=self.messages,
+                cancellation_token=self.cancellation_token,
+            )
+        self._assert_cancelled(result)
+
+    async def test_run_async(self):
+        with patch(
+            "app.stream.get_shared_bedrock_runtime_client", return_value=self.client
+        ):
+            result = await self.handler.run_async(
+                messages=self.messages,
+                cancellation_token=self.cancellation_token,
+            )
+        self._assert_cancelled(result)
+
+    def test_run_already_cancelled(self):
+        self.cancellation_token.cancel()
+        with patch("app.stream.get_bedrock_runtime_client", return_value=self.client):
+            result = self.handler.run(
+                messages=self.messages,
+                cancellation_token=self.cancellation_token,
+            )
+        self.assertEqual(result["stop_reason"], "cancelled")
+        self.assertEqual(len(result["message"].content), 0)
+        self.client.converse_stream.assert_not_called()
+
+
+class _WaitingEventStream:
+    """Event stream waiting for the first token until it is closed.
+    Reading fails after the stream is closed, like a closed connection.
+    """
+
+    def __init__(self):
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        yield {"messageStart": {"role": "assistant"}}
+        self.closed.wait(timeout=10)
+        raise ValueError("I/O operation on closed file")
+
+    def close(self):
+        self.closed.set()
+
+
+class TestCancellationWhileWaiting(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.stream = _WaitingEventStream()
+        self.client = MagicMock()
+        self.client.converse_stream.return_value = {"stream": self.stream}
+        self.messages = [
+            SimpleMessageModel(
+                role="user",
+                content=[TextContentModel(content_type="text", body="Hi")],
+            )
+        ]
+        self.cancellation_token = CancellationToken()
+        self.handler = ConverseApiStreamHandler(model=MODEL)
+
+    def _assert_cancelled_promptly(self, result, start: float):
+        self.assertLess(time.perf_counter() - start, 5)
+        self.assertTrue(self.stream.closed.is_set())
+        self.assertEqual(result["stop_reason"], "cancelled")
+        self.assertEqual(len(result["message"].content), 0)
+
+    def test_run(self):
+        threading.Timer(0.1, self.cancellation_token.cancel).start()
+        start = time.perf_counter()
+        with patch("app.stream.get_bedrock_runtime_client", return_value=self.client):
+            result = self.handler.run(
+                messages=self.messages,
+                cancellation_token=self.cancellation_token,
+            )
+        self._assert_cancelled_promptly(result, start)
+
+    async def test_run_async(self):
+        threading.Timer(0.1, self.cancellation_token.cancel).start()
+        start = time.perf_counter()
+        with patch(
+            "app.stream.get_shared_bedrock_runtime_client", return_value=self.client
+        ):
+            result = await self.handler.run_async(
+                messages=self.messages,
+                cancellation_token=self.cancellation_token,
+            )
+        self._assert_cancelled_promptly(result, start)
+
+    def test_error_without_cancellation(self):
+        # Errors of the stream are raised unless it was closed by the cancellation
+        self.stream.close()
+        with patch("app.stream.get_bedrock_runtime_client", return_value=self.client):
+            with self.assertRaises(ValueError):
+                self.handler.run(
+                    messages=self.messages,
+                    cancellation_token=self.cancellation_token,
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import sys
+
+sys.path.append(".")
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from app.repositories.models.conversation import (
+    SimpleMessageModel,
+    TextContentModel,
+    ToolUseContentModel,
+)
+from app.stream import ConverseApiStreamHandler
+from benchmarks.converse_fixtures import (
+    RecordingBedrockRuntimeClient,
+    ReplayBedrockRuntimeClient,
+    load_fixture,
+)
+
+MODEL = "claude-v3-haiku"
+
+
+class TestReplayFixtures(unittest.TestCase):
+    def setUp(self):
+        self.messages = [
+            SimpleMessageModel(
+                role="user",
+                content=[TextContentModel(content_type="text", body="Hi")],
+            )
+        ]
+        self.tokens: list[str] = []
+        self.tool_uses = []
+        self.handler = ConverseApiStreamHandler(
+            model=MODEL,
+            on_stream=self.tokens.append,
+            on_thinking=self.tool_uses.append,
+        )
+
+    def _run(self, fixture: str):
+        client = ReplayBedrockRuntimeClient(load_fixture(fixture))
+        with patch("app.stream.get_bedrock_runtime_client", return_value=client):
+            return self.handler.run(messages=self.messages)
+
+    def test_text(self):
+        result = self._run("text")
+        self.assertEqual(result["stop_reason"], "end_turn")
+        self.assertEqual(len(self.tokens), 300)
+        text = result["message"].content[0]
+        self.assertEqual(text.body, "".join(self.tokens).rstrip())  # type: ignore
+        self.assertEqual(result["input_token_count"], 1250)
+        self.assertEqual(result["cache_read_input_token_count"], 1024)
+
+    def test_tool_use(self):
+        result = self._run("tool_use")
+        self.assertEqual(result["stop_reason"], "tool_use")
+        self.assertEqual(len(self.tool_uses), 1)
+        self.assertEqual(self.tool_uses[0]["name"], "internet_search")
+
+        tool_use = result["message"].content[1]
+        self.assertIsInstance(tool_use, ToolUseContentModel)
+        self.assertEqual(tool_use.body.input, self.tool_uses[0]["input"])  # type: ignore
+
+    def test_guardrail(self):
+        result = self._run("guardrail")
+        self.assertEqual(result["stop_reason"], "guardrail_intervened")
+
+    def test_model_stream_error(self):
+        client = ReplayBedrockRuntimeClient(load_fixture("model_stream_error"))
+        with patch("app.stream.get_bedrock_runtime_client", return_value=client):
+            with self.assertRaises(client.exceptions.ModelStreamErrorException):
+                self.handler.run(messages=self.messages)
+        self.assertEqual(len(self.tokens), 40)
+
+    def test_record(self):
+        events = load_fixture("tool_use")
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "recorded.jsonl"
+            client = RecordingBedrockRuntimeClient(
+                ReplayBedrockRuntimeClient(events), path
+            )
+            with patch("app.stream.get_bedrock_runtime_client", return_value=client):
+                self.handler.run(messages=self.messages)
+
+            recorded = load_fixture(path)
+
+        self.assertEqual(
+            [json.dumps(event.event) for event in recorded],
+            [json.dumps(event.event) for event in events],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import sys
+
+sys.path.append(".")
+
+import asyncio
+import json
+import unittest
+
+from app.tracing import (
+    NOOP_SPAN,
+    LogSpanExporter,
+    Span,
+    Tracer,
+    mark,
+    set_tracer,
+    trace_span,
+    traced,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+class InMemorySpanExporter:
+    def __init__(self):
+        self.spans: list[Span] = []
+
+    def on_start(self, span: Span) -> None:
+        pass
+
+    def on_end(self, span: Span) -> None:
+        self.spans.append(span)
+
+
+class TestTracer(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.exporter = InMemorySpanExporter()
+        self.previous = set_tracer(Tracer(exporters=[self.exporter], clock=self.clock))
+
+    def tearDown(self):
+        set_tracer(self.previous)
+
+    def test_nested_spans_and_marks(self):
+        with trace_span("chat", bot_id="bot") as parent:
+            self.clock.advance(0.1)
+            with trace_span("bedrock.converse_stream") as child:
+                self.clock.advance(0.25)
+                mark("ttft")
+                self.clock.advance(1.0)
+                # Only the first mark is kept
+                mark("ttft")
+            self.clock.advance(0.05)
+
+        child_span, parent_span = self.exporter.spans
+        self.assertEqual(child_span.name, "bedrock.converse_stream")
+        self.assertEqual(child_span.parent_id, parent_span.span_id)
+        self.assertEqual(child_span.trace_id, parent_span.trace_id)
+        self.assertIsNone(parent_span.parent_id)
+        self.assertAlmostEqual(child_span.duration, 1.25)
+        self.assertAlmostEqual(child_span.marks["ttft"], 0.25)
+        self.assertAlmostEqual(parent_span.duration, 1.4)
+        self.assertEqual(parent_span.attributes, {"bot_id": "bot"})
+
+    def test_decorator(self):
+        @traced("store_conversation")
+        def store():
+            self.clock.advance(0.3)
+            return "stored"
+
+        @traced()
+        async def fetch():
+            self.clock.advance(0.2)
+            return store()
+
+        self.assertEqual(asyncio.run(fetch()), "stored")
+        store_span, fetch_span = self.exporter.spans
+        self.assertEqual(store_span.name, "store_conversation")
+        self.assertEqual(store_span.parent_id, fetch_span.span_id)
+        self.assertAlmostEqual(store_span.duration, 0.3)
+        self.assertAlmostEqual(fetch_span.duration, 0.5)
+
+    def test_error_is_recorded(self):
+        with self.assertRaises(ValueError):
+            with trace_span("tool.run"):
+                self.clock.advance(0.1)
+                raise ValueError("invalid input")
+
+        self.assertEqual(self.exporter.spans[0].error, "ValueError: invalid input")
+
+    def test_log_exporter(self):
+        set_tracer(Tracer(exporters=[LogSpanExporter()], clock=self.clock))
+        with self.assertLogs("app.tracing", level="INFO") as logs:
+            with trace_span("search_related_docs"):
+                self.clock.advance(0.5)
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["name"], "search_related_docs")
+        self.assertEqual(record["duration_ms"], 500.0)
+
+    def test_disabled(self):
+        set_tracer(Tracer(exporters=[self.exporter], enabled=False))
+
+        @traced("noop")
+        def func():
+            mark("ttft")
+            return 1
+
+        with trace_span("noop") as span:
+            self.assertIs(span, NOOP_SPAN)
+            span.set_attribute("key", "value")
+        self.assertEqual(func(), 1)
+        self.assertEqual(self.exporter.spans, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import sys
+
+sys.path.insert(0, ".")
+import unittest
+from unittest.mock import patch
+
+# NOTE: Must be imported before `app` so that the environment is set up first
+from tests.test_usecases.utils.aws_call_budget import AwsCallBudgetTestCase
+
+from app.alias_owner_backfill import backfill_original_bot_owners
+from app.usecases.bot import (
+    fetch_all_bots_by_user_id,
+    fetch_bot,
+    fetch_bot_summary,
+    modify_bot_last_used_time,
+)
+from app.usecases.chat import chat, fetch_conversation
+from benchmarks.fake_bedrock import FakeBedrockRuntimeClient
+from tests.test_usecases.utils.seed import (
+    CONVERSATION_ID,
+    OWNED_BOT_ID,
+    PUBLIC_BOT_ID,
+    USER_ID,
+    chat_input,
+    seed,
+)
+
+# NOTE: The budgets pin the current fan-out. Lower them when a round trip is removed.
+
+
+class TestAwsCallBudget(AwsCallBudgetTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        client = FakeBedrockRuntimeClient(first_token_latency=0, token_interval=0)
+        for target in [
+            "app.stream.get_bedrock_runtime_client",
+            "app.stream.get_shared_bedrock_runtime_client",
+        ]:
+            self.enterContext(patch(target, return_value=client))
+
+        seed()
+
+    def test_chat_existing_conversation_with_owned_bot(self):
+        with self.assertAwsCallBudget({"dynamodb": 4, "sts": 0}):
+            chat(
+                USER_ID,
+                chat_input(CONVERSATION_ID, OWNED_BOT_ID, parent_message_id="1"),
+            )
+
+    def test_chat_existing_conversation_with_owned_bot_on_lambda(self):
+        # One role is assumed per repository call
+        with self.on_lambda(), self.assertAwsCallBudget({"dynamodb": 4, "sts": 5}):
+            chat(
+                USER_ID,
+                chat_input(CONVERSATION_ID, OWNED_BOT_ID, parent_message_id="1"),
+            )
+
+    def test_chat_new_conversation_with_public_bot(self):
+        with self.assertAwsCallBudget({"dynamodb": 7, "dynamodb.Query": 4, "sts": 0}):
+            chat(USER_ID, chat_input("new-conversation", PUBLIC_BOT_ID))
+
+    def test_fetch_conversation(self):
+        with self.on_lambda(), self.assertAwsCallBudget({"dynamodb": 1, "sts": 1}):
+            fetch_conversation(USER_ID, CONVERSATION_ID)
+
+    def test_fetch_bot(self):
+        with self.assertAwsCallBudget({"dynamodb.Query": 1}):
+            fetch_bot(USER_ID, OWNED_BOT_ID)
+        # Private bot first, then public bot
+        with self.assertAwsCallBudget({"dynamodb.Query": 2}):
+            fetch_bot(USER_ID, PUBLIC_BOT_ID)
+
+    def test_fetch_bot_summary(self):
+        with self.assertAwsCallBudget({"dynamodb.Query": 3}):
+            fetch_bot_summary(USER_ID, PUBLIC_BOT_ID)
+
+    def test_fetch_all_bots_by_user_id(self):
+        # Aliases are not updated on the request path
+        with self.assertAwsCallBudget({"dynamodb": 2, "dynamodb.UpdateItem": 0}):
+            fetch_all_bots_by_user_id(USER_ID, limit=30)
+
+        # Aliases with the owners of original bots read them by keys
+        backfill_original_bot_owners()
+        with self.assertAwsCallBudget(
+            {"dynamodb.Query": 1, "dynamodb.BatchGetItem": 1}
+        ):
+            bots = fetch_all_bots_by_user_id(USER_ID, limit=30)
+        shared_bot = next(bot for bot in bots if not bot.owned)
+        self.assertTrue(shared_bot.available)
+
+    def test_modify_bot_last_used_time(self):
+        # Bot first, then alias
+        with self.assertAwsCallBudget({"dynamodb.UpdateItem": 2}):
+            modify_bot_last_used_time(USER_ID, PUBLIC_BOT_ID)
+
+    def test_budget_exceeded(self):
+        with self.assertRaisesRegex(AssertionError, "dynamodb.Query=1 \\(budget 0\\)"):
+            with self.assertAwsCallBudget({"dynamodb.Query": 0}):
+                fetch_bot(USER_ID, OWNED_BOT_ID)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,10 +5,12 @@ from ulid import ULID
 sys.path.insert(0, ".")
 import unittest
 from pprint import pprint
+from unittest.mock import MagicMock, patch
 
 import boto3
-from app.agents.tools.agent_tool import ToolRunResult
+from app.agents.tools.agent_tool import AgentTool, ToolRunResult
 from app.prompt import build_rag_prompt
+from app.repositories.common import RecordNotFoundError
 from app.repositories.conversation import (
     delete_conversation_by_id,
     delete_conversation_by_user_id,
@@ -35,7 +37,7 @@ from app.routes.schemas.conversation import (
     TextContent,
     type_model_name,
 )
-from app.stream import OnStopInput, OnThinking
+from app.stream import CancellationToken, OnStopInput, OnThinking
 from app.usecases.chat import (
     chat,
     chat_output_from_message,
@@ -44,6 +46,7 @@ from app.usecases.chat import (
     trace_to_root,
 )
 from app.vector_search import SearchResult
+from pydantic import BaseModel
 from tests.test_stream.get_aws_logo import get_aws_logo
 from tests.test_stream.get_pdf import get_aws_overview
 from tests.test_usecases.utils.bot_factory import (
@@ -352,7 +355,6 @@ class TestContinueChat(unittest.TestCase):
                 id=self.conversation_id,
                 create_time=1627984879.9,
                 title="Test Conversation",
-                total_price=0,
                 message_map={
                     "1-user": MessageModel(
                         role="user",
@@ -442,7 +444,6 @@ class TestRegenerateChat(unittest.TestCase):
                 id=self.conversation_id,
                 create_time=1627984879.9,
                 title="Test Conversation",
-                total_price=0,
                 message_map={
                     "a-1": MessageModel(
                         role="user",
@@ -1001,5 +1002,193 @@ class TestInsertKnowledge(unittest.TestCase):
         print(instruction)
 
 
+class _SearchInput(BaseModel):
+    query: str
+
+
+def _converse_stream(events: list[dict]) -> dict:
+    stream = MagicMock()
+    stream.__iter__.return_value = iter(events)
+    return {"stream": stream}
+
+
+def _tool_use_events() -> list[dict]:
+    return [
+        {"messageStart": {"role": "assistant"}},
+        {
+            "contentBlockStart": {
+                "contentBlockIndex": 0,
+                "start": {
+                    "toolUse": {"toolUseId": "tool-1", "name": "internet_search"}
+                },
+            }
+        },
+        {
+            "contentBlockDelta": {
+                "contentBlockIndex": 0,
+                "delta": {"toolUse": {"input": '{"query": "weather"}'}},
+            }
+        },
+        {"contentBlockStop": {"contentBlockIndex": 0}},
+        {"messageStop": {"stopReason": "tool_use"}},
+    ]
+
+
+def _text_events(text: str) -> list[dict]:
+    return [
+        {"messageStart": {"role": "assistant"}},
+        {"contentBlockDelta": {"contentBlockIndex": 0, "delta": {"text": text}}},
+        {"contentBlockStop": {"contentBlockIndex": 0}},
+        {"messageStop": {"stopReason": "end_turn"}},
+    ]
+
+
+class TestCancelAfterToolUse(unittest.TestCase):
+    def setUp(self):
+        self.bot = create_test_private_bot(
+            "bot1",
+            False,
+            "user1",
+            include_internet_tool=True,
+            set_dummy_knowledge=False,
+        )
+        self.tool = AgentTool(
+            name="internet_search",
+            description="Search the internet.",
+            args_schema=_SearchInput,
+            function=lambda arg, bot, model: arg.query,
+        )
+        self.client = MagicMock()
+        self.store_conversation = MagicMock()
+        self.find_conversation_by_id = MagicMock(side_effect=RecordNotFoundError())
+        for target, new in [
+            ("app.stream.get_shared_bedrock_runtime_client", lambda: self.client),
+            ("app.usecases.chat.find_conversation_by_id", self.find_conversation_by_id),
+            ("app.usecases.chat.fetch_bot", lambda user_id, bot_id: (True, self.bot)),
+            ("app.usecases.chat.get_tool_by_name", lambda name: self.tool),
+            ("app.usecases.chat.store_conversation", self.store_conversation),
+            ("app.usecases.chat.store_related_documents", MagicMock()),
+            ("app.usecases.chat.modify_bot_last_used_time", MagicMock()),
+        ]:
+            patcher = patch(target, new)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _chat_input(self, continue_generate=False, parent_message_id=None):
+        return ChatInput(
+            conversation_id="conversation1",
+            message=MessageInput(
+                role="user",
+                content=[TextContent(content_type="text", body="How is the weather?")],
+                model=MODEL,
+                parent_message_id=parent_message_id,
+                message_id=None,
+            ),
+            bot_id="bot1",
+            continue_generate=continue_generate,
+        )
+
+    def _cancel_after_tool_use(self) -> ConversationModel:
+        cancellation_token = CancellationToken()
+        self.client.converse_stream.side_effect = [_converse_stream(_tool_use_events())]
+        chat(
+            user_id="user1",
+            chat_input=self._chat_input(),
+            # Stopped by the user while the tool is running
+            on_tool_result=lambda run_result: cancellation_token.cancel(),
+            cancellation_token=cancellation_token,
+        )
+        self.store_conversation.assert_called_once()
+        return self.store_conversation.call_args.args[1]
+
+    def test_cancelled_answer_keeps_thinking_log(self):
+        conversation = self._cancel_after_tool_use()
+
+        # The answer after the tool use was not requested
+        self.assertEqual(self.client.converse_stream.call_count, 1)
+        answer = conversation.message_map[conversation.last_message_id]
+        self.assertEqual(answer.role, "assistant")
+        self.assertEqual(answer.content, [])
+        self.assertEqual(len(answer.thinking_log), 2)  # type: ignore[arg-type]
+        self.assertEqual(answer.thinking_log[1].content[0].content_type, "toolResult")  # type: ignore[index]
+        self.assertIn(
+            conversation.last_message_id,
+            conversation.message_map[answer.parent].children,  # type: ignore[index]
+        )
+        self.assertTrue(conversation.should_continue)
+
+    def test_continue_after_tool_use(self):
+        conversation = self._cancel_after_tool_use()
+        cancelled_answer_id = conversation.last_message_id
+        self.find_conversation_by_id.side_effect = None
+        self.find_conversation_by_id.return_value = conversation
+        self.client.converse_stream.side_effect = [
+            _converse_stream(_text_events("It is sunny."))
+        ]
+
+        conversation, message = chat(
+            user_id="user1",
+            chat_input=self._chat_input(
+                continue_generate=True, parent_message_id=cancelled_answer_id
+            ),
+        )
+
+        # Generated from the tool result, without the empty answer
+        messages = self.client.converse_stream.call_args.kwargs["messages"]
+        self.assertEqual(messages[-1]["role"], "user")
+        self.assertIn("toolResult", messages[-1]["content"][0])
+        self.assertEqual(message.content[0].body, "It is sunny.")  # type: ignore[union-attr]
+        self.assertEqual(len(message.thinking_log), 2)  # type: ignore[arg-type]
+        self.assertEqual(conversation.last_message_id, cancelled_answer_id)
+        self.assertFalse(conversation.should_continue)
+
+    def test_cancel_skips_remaining_tools(self):
+        function = MagicMock(side_effect=lambda arg, bot, model: arg.query)
+        self.tool.function = function
+        events = _tool_use_events()
+        second_tool_use = [
+            {
+                "contentBlockStart": {
+                    "contentBlockIndex": 1,
+                    "start": {
+                        "toolUse": {"toolUseId": "tool-2", "name": "internet_search"}
+                    },
+                }
+            },
+            {
+                "contentBlockDelta": {
+                    "contentBlockIndex": 1,
+                    "delta": {"toolUse": {"input": '{"query": "forecast"}'}},
+                }
+            },
+            {"contentBlockStop": {"contentBlockIndex": 1}},
+        ]
+        self.client.converse_stream.side_effect = [
+            _converse_stream(events[:-1] + second_tool_use + events[-1:])
+        ]
+        cancellation_token = CancellationToken()
+        on_stop = MagicMock()
+
+        chat(
+            user_id="user1",
+            chat_input=self._chat_input(),
+            on_stop=on_stop,
+            # Stopped by the user while the first tool is running
+            on_tool_result=lambda run_result: cancellation_token.cancel(),
+            cancellation_token=cancellation_token,
+        )
+
+        function.assert_called_once()
+        conversation = self.store_conversation.call_args.args[1]
+        answer = conversation.message_map[conversation.last_message_id]
+        tool_results = answer.thinking_log[1].content  # type: ignore[index]
+        self.assertEqual(
+            [result.body.status for result in tool_results],  # type: ignore[union-attr]
+            ["success", "error"],
+        )
+        self.assertEqual(on_stop.call_args.args[0]["stop_reason"], "cancelled")
+        self.assertTrue(conversation.should_continue)
+
+
 if __name__ == "__main__":
     unittest.main()
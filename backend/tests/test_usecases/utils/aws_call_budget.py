@@ -0,0 +1,47 @@
+import os
+from contextlib import ExitStack, contextmanager
+from typing import Iterator, Mapping
+from unittest.mock import patch
+
+from tests.test_usecases.utils.aws_calls import AwsCallRecorder, exceeded_budget
+from tests.test_usecases.utils.local_aws import LocalAwsTestCase
+from tests.test_usecases.utils.seed import TABLE_ACCESS_ROLE_ARN
+
+
+class AwsCallBudgetTestCase(LocalAwsTestCase):
+    """Assert the number of AWS API calls made by a code path.
+
+    Usage:
+        with self.assertAwsCallBudget({"dynamodb": 4, "sts": 0}):
+            chat(user_id, chat_input)
+    """
+
+    @contextmanager
+    def assertAwsCallBudget(self, budget: Mapping[str, int]) -> Iterator[None]:
+        with AwsCallRecorder() as recorder, recorder.scope() as calls:
+            yield
+        exceeded = exceeded_budget(calls, budget)
+        self.assertFalse(
+            exceeded,
+            "AWS call budget exceeded: "
+            + ", ".join(
+                f"{key}={count} (budget {limit})"
+                for key, (count, limit) in exceeded.items()
+            )
+            + f"\nCalls: {dict(calls)}",
+        )
+
+    @contextmanager
+    def on_lambda(self) -> Iterator[None]:
+        """Assume the table access role with row-level policies as on Lambda."""
+        with ExitStack() as stack:
+            stack.enter_context(
+                patch.dict(os.environ, {"AWS_EXECUTION_ENV": "AWS_Lambda_python3.11"})
+            )
+            stack.enter_context(
+                patch(
+                    "app.repositories.common.TABLE_ACCESS_ROLE_ARN",
+                    TABLE_ACCESS_ROLE_ARN,
+                )
+            )
+            yield
@@ -0,0 +1,97 @@
+"""Record botocore API calls by service and operation.
+
+Every client is covered, including module-level clients created before recording started,
+because the recorder wraps `BaseClient._make_api_call`.
+Calls are attributed to the innermost `scope()` of the calling context, so that concurrent
+requests can be counted separately. Context is propagated to the I/O executor of the async
+pipeline, but not to threads started directly (e.g. `NotificationSender`); their calls are
+counted only in the total.
+
+Usage:
+    with AwsCallRecorder() as recorder:
+        with recorder.scope() as calls:
+            chat(...)
+        print(calls)  # Counter({"dynamodb.Query": 1, "dynamodb.PutItem": 1, ...})
+
+    # Budgets are keyed by service or by operation
+    assert not exceeded_budget(calls, {"dynamodb": 4, "sts": 0})
+"""
+
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Mapping
+from unittest.mock import patch
+
+from botocore.client import BaseClient
+
+_current_scope: ContextVar["Counter[str] | None"] = ContextVar(
+    "aws_call_scope", default=None
+)
+
+
+class AwsCallRecorder:
+    def __init__(self):
+        self.total: Counter[str] = Counter()
+        self._lock = threading.Lock()
+        self._patcher = None
+
+    def __enter__(self) -> "AwsCallRecorder":
+        # NOTE: Private API, which is not in the stubs
+        original = BaseClient._make_api_call  # type: ignore[attr-defined]
+        recorder = self
+
+        def _make_api_call(client, operation_name, api_params):
+            recorder._record(
+                f"{client.meta.service_model.service_name}.{operation_name}"
+            )
+            return original(client, operation_name, api_params)
+
+        self._patcher = patch.object(BaseClient, "_make_api_call", _make_api_call)
+        self._patcher.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        assert self._patcher is not None
+        self._patcher.stop()
+        self._patcher = None
+
+    def _record(self, call: str):
+        scope = _current_scope.get()
+        with self._lock:
+            self.total[call] += 1
+            if scope is not None:
+                scope[call] += 1
+
+    @contextmanager
+    def scope(self) -> Iterator["Counter[str]"]:
+        """Count the calls made in this context (and the tasks and executors it spawns)."""
+        calls: Counter[str] = Counter()
+        token = _current_scope.set(calls)
+        try:
+            yield calls
+        finally:
+            _current_scope.reset(token)
+
+
+def count_by_service(calls: "Counter[str]") -> "Counter[str]":
+    services: Counter[str] = Counter()
+    for call, count in calls.items():
+        services[call.split(".", 1)[0]] += count
+    return services
+
+
+def exceeded_budget(
+    calls: "Counter[str]", budget: Mapping[str, int]
+) -> dict[str, tuple[int, int]]:
+    """Return `{key: (count, limit)}` of the budget entries exceeded by `calls`.
+    A key is either a service (e.g. `sts`) or an operation (e.g. `dynamodb.Query`).
+    """
+    services = count_by_service(calls)
+    exceeded = {}
+    for key, limit in budget.items():
+        count = calls[key] if "." in key else services[key]
+        if count > limit:
+            exceeded[key] = (count, limit)
+    return exceeded
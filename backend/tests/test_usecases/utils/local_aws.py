@@ -0,0 +1,202 @@
+"""Local stand-ins for DynamoDB and S3.
+
+By default everything runs in-process on moto, which is a dev dependency.
+If `DDB_ENDPOINT_URL` is set (e.g. to DynamoDB Local), the repositories use it for the
+conversation table instead, as they do in local development.
+Import this module before `app` so that the environment is set up first.
+"""
+
+import os
+import unittest
+from contextlib import ExitStack, contextmanager
+from typing import Iterator
+from unittest.mock import patch
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("REGION", "us-east-1")
+os.environ.setdefault("BEDROCK_REGION", "us-east-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+os.environ.setdefault("TABLE_NAME", "benchmark-conversation")
+os.environ.setdefault("WEBSOCKET_SESSION_TABLE_NAME", "benchmark-websocket-session")
+os.environ.setdefault("LARGE_MESSAGE_BUCKET", "benchmark-large-message")
+os.environ.setdefault("DOCUMENT_BUCKET", "benchmark-documents")
+
+import boto3
+
+# NOTE: moto must be imported before any client is created so that the clients are mocked
+from moto import mock_aws
+
+TABLE_NAME = os.environ["TABLE_NAME"]
+WEBSOCKET_SESSION_TABLE_NAME = os.environ["WEBSOCKET_SESSION_TABLE_NAME"]
+LARGE_MESSAGE_BUCKET = os.environ["LARGE_MESSAGE_BUCKET"]
+DOCUMENT_BUCKET = os.environ["DOCUMENT_BUCKET"]
+DDB_ENDPOINT_URL = os.environ.get("DDB_ENDPOINT_URL")
+# Attributes of aliases copied from their original bots
+ALIAS_SYNC_ATTRIBUTES = [
+    "Title",
+    "Description",
+    "SyncStatus",
+    "HasKnowledge",
+    "HasAgent",
+    "ConversationQuickStarters",
+    "ActiveModels",
+    "OriginalBotOwnerUserId",
+]
+
+
+def _create_conversation_table(dynamodb):
+    """Same schema as `cdk/lib/constructs/database.ts`."""
+    try:
+        dynamodb.Table(TABLE_NAME).delete()
+    except dynamodb.meta.client.exceptions.ResourceNotFoundException:
+        pass
+
+    dynamodb.create_table(
+        TableName=TABLE_NAME,
+        KeySchema=[
+            {"AttributeName": "PK", "KeyType": "HASH"},
+            {"AttributeName": "SK", "KeyType": "RANGE"},
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "PK", "AttributeType": "S"},
+            {"AttributeName": "SK", "AttributeType": "S"},
+            {"AttributeName": "PublicBotId", "AttributeType": "S"},
+            {"AttributeName": "OriginalBotId", "AttributeType": "S"},
+            {"AttributeName": "LastBotUsed", "AttributeType": "N"},
+            {"AttributeName": "LastMessageTime", "AttributeType": "N"},
+            {"AttributeName": "BotListKey", "AttributeType": "S"},
+        ],
+        GlobalSecondaryIndexes=[
+            {
+                "IndexName": "SKIndex",
+                "KeySchema": [{"AttributeName": "SK", "KeyType": "HASH"}],
+                "Projection": {"ProjectionType": "ALL"},
+            },
+            {
+                "IndexName": "PublicBotIdIndex",
+                "KeySchema": [{"AttributeName": "PublicBotId", "KeyType": "HASH"}],
+                "Projection": {"ProjectionType": "ALL"},
+            },
+            {
+                "IndexName": "LastMessageTimeIndex",
+                "KeySchema": [
+                    {"AttributeName": "PK", "KeyType": "HASH"},
+                    {"AttributeName": "LastMessageTime", "KeyType": "RANGE"},
+                ],
+                "Projection": {
+                    "ProjectionType": "INCLUDE",
+                    "NonKeyAttributes": [
+                        "Title",
+                        "CreateTime",
+                        "Model",
+                        "BotId",
+                        "ArchivePath",
+                    ],
+                },
+            },
+            {
+                "IndexName": "OriginalBotIdIndex",
+                "KeySchema": [
+                    {"AttributeName": "OriginalBotId", "KeyType": "HASH"},
+                    {"AttributeName": "PK", "KeyType": "RANGE"},
+                ],
+                "Projection": {
+                    "ProjectionType": "INCLUDE",
+                    "NonKeyAttributes": ALIAS_SYNC_ATTRIBUTES,
+                },
+            },
+            {
+                "IndexName": "BotListKeyIndex",
+                "KeySchema": [
+                    {"AttributeName": "PK", "KeyType": "HASH"},
+                    {"AttributeName": "BotListKey", "KeyType": "RANGE"},
+                ],
+                "Projection": {
+                    "ProjectionType": "INCLUDE",
+                    "NonKeyAttributes": [
+                        "Title",
+                        "Description",
+                        "CreateTime",
+                        "LastBotUsed",
+                        "IsPinned",
+                        "PublicBotId",
+                        "SyncStatus",
+                        "HasBedrockKnowledgeBase",
+                    ],
+                },
+            },
+        ],
+        LocalSecondaryIndexes=[
+            {
+                "IndexName": "LastBotUsedIndex",
+                "KeySchema": [
+                    {"AttributeName": "PK", "KeyType": "HASH"},
+                    {"AttributeName": "LastBotUsed", "KeyType": "RANGE"},
+                ],
+                "Projection": {"ProjectionType": "ALL"},
+            }
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    ).wait_until_exists()
+
+
+def _create_websocket_session_table(dynamodb):
+    dynamodb.create_table(
+        TableName=WEBSOCKET_SESSION_TABLE_NAME,
+        KeySchema=[
+            {"AttributeName": "ConnectionId", "KeyType": "HASH"},
+            {"AttributeName": "MessagePartId", "KeyType": "RANGE"},
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "ConnectionId", "AttributeType": "S"},
+            {"AttributeName": "MessagePartId", "AttributeType": "N"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    ).wait_until_exists()
+
+
+@contextmanager
+def local_aws() -> Iterator[None]:
+    """Start moto and create the tables and buckets used by the backend."""
+    with mock_aws(), ExitStack() as stack:
+        # NOTE: Settings are read at import, which may precede this module (e.g. in tests)
+        for target, value in [
+            ("app.repositories.common.REGION", os.environ["REGION"]),
+            ("app.repositories.common.TABLE_NAME", TABLE_NAME),
+            ("app.repositories.custom_bot.TABLE_NAME", TABLE_NAME),
+            (
+                "app.repositories.conversation.LARGE_MESSAGE_BUCKET",
+                LARGE_MESSAGE_BUCKET,
+            ),
+            ("app.usecases.bot.DOCUMENT_BUCKET", DOCUMENT_BUCKET),
+        ]:
+            stack.enter_context(patch(target, value))
+
+        dynamodb = boto3.resource("dynamodb")
+        if DDB_ENDPOINT_URL:
+            _create_conversation_table(
+                boto3.resource(
+                    "dynamodb",
+                    endpoint_url=DDB_ENDPOINT_URL,
+                    aws_access_key_id="key",
+                    aws_secret_access_key="key",
+                )
+            )
+        else:
+            _create_conversation_table(dynamodb)
+        _create_websocket_session_table(dynamodb)
+
+        s3 = boto3.client("s3")
+        s3.create_bucket(Bucket=LARGE_MESSAGE_BUCKET)
+        s3.create_bucket(Bucket=DOCUMENT_BUCKET)
+        # NOTE: Clients created before moto was imported are not mocked
+        stack.enter_context(patch("app.repositories.conversation.s3_client", s3))
+        yield
+
+
+class LocalAwsTestCase(unittest.TestCase):
+    """Run each test against fresh local stand-ins of DynamoDB and S3."""
+
+    def setUp(self) -> None:
+        self.enterContext(local_aws())
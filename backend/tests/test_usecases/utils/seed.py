@@ -0,0 +1,99 @@
+"""Data shared by the tests and benchmarks that run against `local_aws`."""
+
+from app.repositories.conversation import store_conversation
+from app.repositories.custom_bot import store_alias, store_bot, update_bot_visibility
+from app.repositories.models.conversation import (
+    ConversationModel,
+    MessageModel,
+    TextContentModel,
+)
+from app.routes.schemas.conversation import (
+    ChatInput,
+    MessageInput,
+    TextContent,
+    type_model_name,
+)
+from tests.test_usecases.utils.bot_factory import (
+    create_test_bot_alias,
+    create_test_private_bot,
+    create_test_public_bot,
+)
+
+MODEL: type_model_name = "claude-v3-haiku"
+USER_ID = "user"
+OTHER_USER_ID = "other-user"
+OWNED_BOT_ID = "owned-bot"
+PUBLIC_BOT_ID = "public-bot"
+CONVERSATION_ID = "conversation"
+TABLE_ACCESS_ROLE_ARN = "arn:aws:iam::123456789012:role/table-access"
+
+
+def chat_input(conversation_id: str, bot_id: str | None, parent_message_id=None):
+    return ChatInput(
+        conversation_id=conversation_id,
+        message=MessageInput(
+            role="user",
+            content=[TextContent(content_type="text", body="Hello")],
+            model=MODEL,
+            parent_message_id=parent_message_id,
+            message_id=None,
+        ),
+        bot_id=bot_id,
+        continue_generate=False,
+    )
+
+
+def seed():
+    """Store an owned bot, a public bot of another user with its alias, and a conversation."""
+    store_bot(
+        USER_ID,
+        create_test_private_bot(
+            OWNED_BOT_ID, False, USER_ID, set_dummy_knowledge=False
+        ),
+    )
+    public_bot = create_test_public_bot(
+        PUBLIC_BOT_ID, False, OTHER_USER_ID, public_bot_id=PUBLIC_BOT_ID
+    )
+    public_bot.knowledge.source_urls = []
+    public_bot.knowledge.sitemap_urls = []
+    public_bot.knowledge.filenames = []
+    public_bot.knowledge.s3_urls = []
+    store_bot(OTHER_USER_ID, public_bot)
+    update_bot_visibility(OTHER_USER_ID, PUBLIC_BOT_ID, True)
+    store_alias(USER_ID, create_test_bot_alias(PUBLIC_BOT_ID, PUBLIC_BOT_ID, False))
+    store_conversation(
+        USER_ID,
+        ConversationModel(
+            id=CONVERSATION_ID,
+            title="Test",
+            create_time=1627984879.9,
+            message_map={
+                "system": MessageModel(
+                    role="system",
+                    content=[TextContentModel(content_type="text", body="")],
+                    model=MODEL,
+                    children=["1"],
+                    parent=None,
+                    create_time=1627984879.9,
+                    feedback=None,
+                    used_chunks=None,
+                    thinking_log=None,
+                ),
+                "1": MessageModel(
+                    role="user",
+                    content=[TextContentModel(content_type="text", body="Hi")],
+                    model=MODEL,
+                    children=[],
+                    parent="system",
+                    create_time=1627984879.9,
+                    feedback=None,
+                    used_chunks=None,
+                    thinking_log=None,
+                ),
+            },
+            last_message_id="1",
+            total_price=0,
+            bot_id=OWNED_BOT_ID,
+            should_continue=False,
+        ),
+    )
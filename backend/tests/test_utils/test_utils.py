@@ -1,6 +1,7 @@
 import logging
 import sys
 import unittest
+from unittest.mock import MagicMock, patch
 
 LOGGER = logging.getLogger(__name__)
 LOGGER.setLevel(logging.DEBUG)
@@ -40,5 +41,57 @@ class TestUtils(unittest.TestCase):
         assert reg == "us-west-2"
 
 
+class TestPresignedUrlSigner(unittest.TestCase):
+    def setUp(self):
+        from app.utils import PresignedUrlSigner
+
+        self.signer = PresignedUrlSigner(cache_size=2)
+        self.client = MagicMock()
+        self.client.generate_presigned_url.side_effect = (
+            lambda ClientMethod, Params, ExpiresIn, HttpMethod: (
+                f"https://{Params['Bucket']}/{Params['Key']}?"
+                f"n={self.client.generate_presigned_url.call_count}"
+            )
+        )
+        self.patcher = patch("app.utils.boto3.client", return_value=self.client)
+        self.mock_boto3_client = self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def test_memoize_get_urls(self):
+        first = self.signer.generate("bucket", "a", client_method="get_object")
+        self.assertEqual(
+            self.signer.generate("bucket", "a", client_method="get_object"), first
+        )
+        self.assertNotEqual(
+            self.signer.generate("bucket", "b", client_method="get_object"), first
+        )
+        self.assertEqual(self.client.generate_presigned_url.call_count, 2)
+        # The client is created once
+        self.mock_boto3_client.assert_called_once()
+
+        # Not reused after a part of the expiration
+        with patch("app.utils.time.monotonic", return_value=10**9):
+            self.assertNotEqual(
+                self.signer.generate("bucket", "a", client_method="get_object"),
+                first,
+            )
+
+    def test_not_memoize_put_urls(self):
+        first = self.signer.generate("bucket", "a", content_type="text/plain")
+        self.assertNotEqual(
+            self.signer.generate("bucket", "a", content_type="text/plain"), first
+        )
+
+    def test_evict_least_recently_used(self):
+        for key in ["a", "b", "a", "c"]:
+            self.signer.generate("bucket", key, client_method="get_object")
+        self.signer.generate("bucket", "a", client_method="get_object")
+        self.assertEqual(self.client.generate_presigned_url.call_count, 3)
+        self.signer.generate("bucket", "b", client_method="get_object")
+        self.assertEqual(self.client.generate_presigned_url.call_count, 4)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,145 @@
+import os
+import sys
+
+sys.path.append(".")
+os.environ.setdefault("WEBSOCKET_SESSION_TABLE_NAME", "test-websocket-session")
+
+import base64
+import gzip
+import json
+import unittest
+from decimal import Decimal as decimal
+from unittest.mock import MagicMock, patch
+
+from app.stream import CancellationToken
+from app.websocket import (
+    compose_chat_input_upload_key,
+    concatenate_message_parts,
+    load_uploaded_chat_input,
+    watch_stop_request,
+)
+
+
+class TestConcatenateMessageParts(unittest.TestCase):
+    def setUp(self):
+        self.table = MagicMock()
+
+    def _items(self, parts: list[str], compression: str | None = None) -> list[dict]:
+        session = {
+            "ConnectionId": "connection",
+            "MessagePartId": decimal(0),
+            "UserId": "user",
+        }
+        if compression is not None:
+            session["Compression"] = compression
+
+        return [session] + [
+            {
+                "ConnectionId": "connection",
+                "MessagePartId": decimal(i + 1),
+                "MessagePart": part,
+            }
+            for i, part in enumerate(parts)
+        ]
+
+    def test_concatenate_with_pagination(self):
+        items = self._items(["Hello", ", ", "World"])
+        self.table.query.side_effect = [
+            {"Items": items[:2], "LastEvaluatedKey": {"MessagePartId": 1}},
+            {"Items": items[2:]},
+        ]
+
+        user_id, message = concatenate_message_parts(self.table, "connection")
+        self.assertEqual(user_id, "user")
+        self.assertEqual(message, "Hello, World")
+        self.assertEqual(self.table.query.call_count, 2)
+        self.assertEqual(
+            self.table.query.call_args.kwargs["ExclusiveStartKey"],
+            {"MessagePartId": 1},
+        )
+
+    def test_concatenate_compressed(self):
+        compressed = base64.b64encode(gzip.compress(b'{"key": "value"}')).decode()
+        self.table.query.return_value = {
+            "Items": self._items([compressed[:10], compressed[10:]], "gzip")
+        }
+
+        _, message = concatenate_message_parts(self.table, "connection")
+        self.assertEqual(message, '{"key": "value"}')
+
+    def test_session_not_started(self):
+        self.table.query.return_value = {"Items": self._items(["Hello"])[1:]}
+
+        with self.assertRaises(ValueError):
+            concatenate_message_parts(self.table, "connection")
+
+
+class TestLoadUploadedChatInput(unittest.TestCase):
+    def test_load_and_remove(self):
+        chat_input = {
+            "conversationId": "conversation",
+            "message": {
+                "role": "user",
+                "content": [{"contentType": "text", "body": "Hello"}],
+                "model": "claude-v3-haiku",
+                "parentMessageId": "system",
+            },
+        }
+        s3_client = MagicMock()
+        s3_client.get_object.return_value = {
+            "Body": MagicMock(read=lambda: json.dumps(chat_input).encode())
+        }
+
+        with patch("app.websocket.s3_client", s3_client):
+            loaded = load_uploaded_chat_input("user", "connection")
+
+        self.assertEqual(loaded.conversation_id, "conversation")
+        self.assertEqual(loaded.message.content[0].body, "Hello")  # type: ignore
+        s3_client.delete_object.assert_called_once()
+        self.assertEqual(
+            s3_client.delete_object.call_args.kwargs["Key"],
+            compose_chat_input_upload_key("user", "connection"),
+        )
+
+
+class TestWatchStopRequest(unittest.TestCase):
+    def setUp(self):
+        self.cancellation_token = CancellationToken()
+        self.finished = MagicMock()
+        patcher = patch("app.websocket.table")
+        self.table = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _watch(self):
+        watch_stop_request("connection", self.cancellation_token, self.finished)
+
+    def test_polling_backs_off(self):
+        self.finished.wait.side_effect = [False] * 5 + [True]
+        self.table.get_item.return_value = {}
+
+        self._watch()
+        self.assertEqual(
+            [call.kwargs["timeout"] for call in self.finished.wait.call_args_list],
+            [1.0, 2.0, 4.0, 4.0, 4.0, 4.0],
+        )
+        self.assertEqual(self.table.get_item.call_count, 5)
+        self.assertFalse(self.cancellation_token.is_cancelled)
+
+    def test_stop_requested(self):
+        self.finished.wait.return_value = False
+        self.table.get_item.side_effect = [{}, {"Item": {}}]
+
+        self._watch()
+        self.assertTrue(self.cancellation_token.is_cancelled)
+        self.assertEqual(self.table.get_item.call_count, 2)
+
+    def test_no_read_after_cancellation(self):
+        self.finished.wait.return_value = False
+        self.cancellation_token.cancel()
+
+        self._watch()
+        self.table.get_item.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
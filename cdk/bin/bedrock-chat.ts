@@ -44,6 +44,21 @@ const ENABLE_BEDROCK_CROSS_REGION_INFERENCE: boolean = app.node.tryGetContext(
   "enableBedrockCrossRegionInference"
 );
 const ENABLE_LAMBDA_SNAPSTART: boolean = app.node.tryGetContext("enableLambdaSnapStart");
+const CONVERSATION_ARCHIVE_AFTER_DAYS: number | undefined = app.node.tryGetContext(
+  "conversationArchiveAfterDays"
+)
+  ? Number(app.node.tryGetContext("conversationArchiveAfterDays"))
+  : undefined;
+const CONVERSATION_ARCHIVE_TTL_DAYS: number | undefined = app.node.tryGetContext(
+  "conversationArchiveTtlDays"
+)
+  ? Number(app.node.tryGetContext("conversationArchiveTtlDays"))
+  : undefined;
+// Set only to update an existing table stage by stage. See docs/migration/TABLE_INDEXES.md.
+const CONVERSATION_TABLE_INDEX_STAGE: number | undefined =
+  app.node.tryGetContext("conversationTableIndexStage") !== undefined
+    ? Number(app.node.tryGetContext("conversationTableIndexStage"))
+    : undefined;
 
 // WAF for frontend
 // 2023/9: Currently, the WAF for CloudFront needs to be created in the North America region (us-east-1), so the stacks are separated
@@ -96,6 +111,9 @@ const chat = new BedrockChatStack(app, `BedrockChatStack`, {
   useStandbyReplicas: USE_STAND_BY_REPLICAS,
   enableBedrockCrossRegionInference: ENABLE_BEDROCK_CROSS_REGION_INFERENCE,
   enableLambdaSnapStart: ENABLE_LAMBDA_SNAPSTART,
+  conversationArchiveAfterDays: CONVERSATION_ARCHIVE_AFTER_DAYS,
+  conversationArchiveTtlDays: CONVERSATION_ARCHIVE_TTL_DAYS,
+  conversationTableIndexStage: CONVERSATION_TABLE_INDEX_STAGE,
 });
 chat.addDependency(waf);
 chat.addDependency(bedrockRegionResources);
@@ -23,6 +23,12 @@ import * as s3deploy from "aws-cdk-lib/aws-s3-deployment";
 import * as logs from "aws-cdk-lib/aws-logs";
 import * as path from "path";
 import { BedrockCustomBotCodebuild } from "./constructs/bedrock-custom-bot-codebuild";
+import { ConversationArchive } from "./constructs/conversation-archive";
+import { ConversationDeletion } from "./constructs/conversation-deletion";
+import { AliasSync } from "./constructs/alias-sync";
+import { BotListKeyBackfill } from "./constructs/bot-list-key-backfill";
+import { AliasOwnerBackfill } from "./constructs/alias-owner-backfill";
+import { LastMessageTimeBackfill } from "./constructs/last-message-time-backfill";
 
 export interface BedrockChatStackProps extends StackProps {
   readonly bedrockRegion: string;
@@ -40,6 +46,9 @@ export interface BedrockChatStackProps extends StackProps {
   readonly useStandbyReplicas: boolean;
   readonly enableBedrockCrossRegionInference: boolean;
   readonly enableLambdaSnapStart: boolean;
+  readonly conversationArchiveAfterDays?: number;
+  readonly conversationArchiveTtlDays?: number;
+  readonly conversationTableIndexStage?: number;
 }
 
 export class BedrockChatStack extends cdk.Stack {
@@ -143,11 +152,20 @@ export class BedrockChatStack extends cdk.Stack {
       autoDeleteObjects: true,
       serverAccessLogsBucket: accessLogBucket,
       serverAccessLogsPrefix: "LargeMessageBucket",
+      lifecycleRules: [
+        {
+          // Chat inputs uploaded via presigned URL are removed on `END` step.
+          // Expire the ones left by abandoned sessions.
+          prefix: "chat-inputs/",
+          expiration: cdk.Duration.days(1),
+        },
+      ],
     });
 
     const database = new Database(this, "Database", {
       // Enable PITR to export data to s3
       pointInTimeRecovery: true,
+      indexStage: props.conversationTableIndexStage,
     });
 
     const usageAnalysis = new UsageAnalysis(this, "UsageAnalysis", {
@@ -155,6 +173,17 @@ export class BedrockChatStack extends cdk.Stack {
       sourceDatabase: database,
     });
 
+    const conversationDeletion = new ConversationDeletion(
+      this,
+      "ConversationDeletion",
+      {
+        database: database.table,
+        tableAccessRole: database.tableAccessRole,
+        largeMessageBucket,
+        bedrockRegion: props.bedrockRegion,
+      }
+    );
+
     const backendApi = new Api(this, "BackendApi", {
       database: database.table,
       auth,
@@ -165,8 +194,11 @@ export class BedrockChatStack extends cdk.Stack {
       bedrockCustomBotProject: bedrockCustomBotCodebuild.project,
       usageAnalysis,
       largeMessageBucket,
+      conversationDeletionQueue: conversationDeletion.queue,
       enableMistral: props.enableMistral,
       enableLambdaSnapStart: props.enableLambdaSnapStart,
+      enableBotListKeyIndex: database.stagedIndexNames.has("BotListKeyIndex"),
+      conversationArchiveTtlDays: props.conversationArchiveTtlDays,
     });
     props.documentBucket.grantReadWrite(backendApi.handler);
 
@@ -184,7 +216,58 @@ export class BedrockChatStack extends cdk.Stack {
       enableBedrockCrossRegionInference:
         props.enableBedrockCrossRegionInference,
       enableLambdaSnapStart: props.enableLambdaSnapStart,
+      conversationArchiveTtlDays: props.conversationArchiveTtlDays,
     });
+
+    if (props.conversationArchiveAfterDays !== undefined) {
+      if (!database.stagedIndexNames.has("LastMessageTimeIndex")) {
+        throw new Error(
+          "conversationArchiveAfterDays requires LastMessageTimeIndex. See docs/migration/TABLE_INDEXES.md."
+        );
+      }
+      new ConversationArchive(this, "ConversationArchive", {
+        database: database.table,
+        tableAccessRole: database.tableAccessRole,
+        largeMessageBucket,
+        bedrockRegion: props.bedrockRegion,
+        archiveAfterDays: props.conversationArchiveAfterDays,
+        archiveTtlDays: props.conversationArchiveTtlDays,
+      });
+    }
+
+    // NOTE: Created once the indexes they query are, so that updates of existing tables
+    // are staged. See `docs/migration/TABLE_INDEXES.md`.
+    if (database.stagedIndexNames.has("LastMessageTimeIndex")) {
+      new LastMessageTimeBackfill(this, "LastMessageTimeBackfill", {
+        database: database.table,
+        tableAccessRole: database.tableAccessRole,
+        largeMessageBucket,
+        bedrockRegion: props.bedrockRegion,
+      });
+    }
+    if (database.stagedIndexNames.has("OriginalBotIdIndex")) {
+      new AliasSync(this, "AliasSync", {
+        database: database.table,
+        tableAccessRole: database.tableAccessRole,
+        bedrockRegion: props.bedrockRegion,
+      });
+      // Aliases stored before are not synchronized until their original bots change
+      new AliasOwnerBackfill(this, "AliasOwnerBackfill", {
+        database: database.table,
+        tableAccessRole: database.tableAccessRole,
+        bedrockRegion: props.bedrockRegion,
+      });
+    }
+    if (database.stagedIndexNames.has("BotListKeyIndex")) {
+      new BotListKeyBackfill(this, "BotListKeyBackfill", {
+        database: database.table,
+        tableAccessRole: database.tableAccessRole,
+        bedrockRegion: props.bedrockRegion,
+        // The API queries the index once it is updated
+        executeBefore: [backendApi.handler],
+      });
+    }
+
     frontend.buildViteApp({
       backendApiEndpoint: backendApi.api.apiEndpoint,
       webSocketApiEndpoint: websocket.apiEndpoint,
@@ -207,6 +290,16 @@ export class BedrockChatStack extends cdk.Stack {
       maxAge: 3000,
     });
 
+    largeMessageBucket.addCorsRule({
+      allowedMethods: [HttpMethods.PUT],
+      allowedOrigins: [
+        `https://${cloudFrontWebDistribution.distributionDomainName}`, // frontend.getOrigin() is cyclic reference
+        "http://localhost:5173",
+      ],
+      allowedHeaders: ["*"],
+      maxAge: 3000,
+    });
+
     const embedding = new Embedding(this, "Embedding", {
       bedrockRegion: props.bedrockRegion,
       database: database.table,
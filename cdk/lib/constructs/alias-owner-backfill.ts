@@ -0,0 +1,72 @@
+import { Construct } from "constructs";
+import * as path from "path";
+import { Duration, Stack } from "aws-cdk-lib";
+import * as iam from "aws-cdk-lib/aws-iam";
+import * as logs from "aws-cdk-lib/aws-logs";
+import * as triggers from "aws-cdk-lib/triggers";
+import { ITable } from "aws-cdk-lib/aws-dynamodb";
+import { DockerImageCode, DockerImageFunction } from "aws-cdk-lib/aws-lambda";
+import { Platform } from "aws-cdk-lib/aws-ecr-assets";
+import { excludeDockerImage } from "../constants/docker";
+
+export interface AliasOwnerBackfillProps {
+  readonly database: ITable;
+  readonly tableAccessRole: iam.IRole;
+  readonly bedrockRegion: string;
+}
+
+/**
+ * Store the owners of the original bots for the aliases stored before they were recorded,
+ * so that the original bots are read by their keys when bots are listed.
+ * Executed on deployment after the table is updated. Aliases which already have the
+ * owner are skipped, so that later executions only scan the bots.
+ */
+export class AliasOwnerBackfill extends Construct {
+  constructor(scope: Construct, id: string, props: AliasOwnerBackfillProps) {
+    super(scope, id);
+
+    const handlerRole = new iam.Role(this, "HandlerRole", {
+      assumedBy: new iam.ServicePrincipal("lambda.amazonaws.com"),
+    });
+    handlerRole.addManagedPolicy(
+      iam.ManagedPolicy.fromAwsManagedPolicyName(
+        "service-role/AWSLambdaBasicExecutionRole"
+      )
+    );
+    handlerRole.addToPolicy(
+      // Assume the table access role to scan aliases of all users
+      new iam.PolicyStatement({
+        actions: ["sts:AssumeRole"],
+        resources: [props.tableAccessRole.roleArn],
+      })
+    );
+
+    const handler = new DockerImageFunction(this, "Handler", {
+      code: DockerImageCode.fromImageAsset(
+        path.join(__dirname, "../../../backend"),
+        {
+          platform: Platform.LINUX_AMD64,
+          file: "lambda.Dockerfile",
+          cmd: ["app.alias_owner_backfill.handler"],
+          exclude: [...excludeDockerImage],
+        }
+      ),
+      timeout: Duration.minutes(15),
+      environment: {
+        ACCOUNT: Stack.of(this).account,
+        REGION: Stack.of(this).region,
+        BEDROCK_REGION: props.bedrockRegion,
+        TABLE_NAME: props.database.tableName,
+        TABLE_ACCESS_ROLE_ARN: props.tableAccessRole.roleArn,
+      },
+      role: handlerRole,
+      logRetention: logs.RetentionDays.THREE_MONTHS,
+    });
+
+    new triggers.Trigger(this, "Trigger", {
+      handler,
+      timeout: Duration.minutes(15),
+      executeAfter: [props.database],
+    });
+  }
+}
@@ -0,0 +1,81 @@
+import { Construct } from "constructs";
+import * as path from "path";
+import { Duration, Stack } from "aws-cdk-lib";
+import * as iam from "aws-cdk-lib/aws-iam";
+import * as lambda from "aws-cdk-lib/aws-lambda";
+import * as logs from "aws-cdk-lib/aws-logs";
+import { ITable } from "aws-cdk-lib/aws-dynamodb";
+import { DockerImageCode, DockerImageFunction } from "aws-cdk-lib/aws-lambda";
+import { DynamoEventSource } from "aws-cdk-lib/aws-lambda-event-sources";
+import { Platform } from "aws-cdk-lib/aws-ecr-assets";
+import { excludeDockerImage } from "../constants/docker";
+
+export interface AliasSyncProps {
+  readonly database: ITable;
+  readonly tableAccessRole: iam.IRole;
+  readonly bedrockRegion: string;
+}
+
+/**
+ * Update the aliases of public bots in the partitions of other users when the bots
+ * are modified. Triggered by the stream of the table, next to the bot removal handler.
+ */
+export class AliasSync extends Construct {
+  constructor(scope: Construct, id: string, props: AliasSyncProps) {
+    super(scope, id);
+
+    const handlerRole = new iam.Role(this, "HandlerRole", {
+      assumedBy: new iam.ServicePrincipal("lambda.amazonaws.com"),
+    });
+    handlerRole.addManagedPolicy(
+      iam.ManagedPolicy.fromAwsManagedPolicyName(
+        "service-role/AWSLambdaBasicExecutionRole"
+      )
+    );
+    handlerRole.addToPolicy(
+      // Assume the table access role to update aliases of all users
+      new iam.PolicyStatement({
+        actions: ["sts:AssumeRole"],
+        resources: [props.tableAccessRole.roleArn],
+      })
+    );
+    props.database.grantStreamRead(handlerRole);
+
+    const handler = new DockerImageFunction(this, "Handler", {
+      code: DockerImageCode.fromImageAsset(
+        path.join(__dirname, "../../../backend"),
+        {
+          platform: Platform.LINUX_AMD64,
+          file: "lambda.Dockerfile",
+          cmd: ["app.alias_sync.handler"],
+          exclude: [...excludeDockerImage],
+        }
+      ),
+      timeout: Duration.minutes(5),
+      environment: {
+        ACCOUNT: Stack.of(this).account,
+        REGION: Stack.of(this).region,
+        BEDROCK_REGION: props.bedrockRegion,
+        TABLE_NAME: props.database.tableName,
+        TABLE_ACCESS_ROLE_ARN: props.tableAccessRole.roleArn,
+      },
+      role: handlerRole,
+      logRetention: logs.RetentionDays.THREE_MONTHS,
+    });
+    handler.addEventSource(
+      new DynamoEventSource(props.database, {
+        startingPosition: lambda.StartingPosition.LATEST,
+        batchSize: 10,
+        retryAttempts: 2,
+        filters: [
+          {
+            // Public bots only. Modifications of attributes not copied to aliases
+            // (e.g. the last used time) are skipped by the handler using old images.
+            pattern:
+              '{"eventName":["INSERT","MODIFY"],"dynamodb":{"NewImage":{"PublicBotId":{"S":[{"exists":true}]}}}}',
+          },
+        ],
+      })
+    );
+  }
+}
@@ -21,6 +21,7 @@ import * as iam from "aws-cdk-lib/aws-iam";
 import * as logs from "aws-cdk-lib/aws-logs";
 import * as path from "path";
 import { IBucket } from "aws-cdk-lib/aws-s3";
+import { IQueue } from "aws-cdk-lib/aws-sqs";
 import * as codebuild from "aws-cdk-lib/aws-codebuild";
 import { UsageAnalysis } from "./usage-analysis";
 import { excludeDockerImage } from "../constants/docker";
@@ -34,11 +35,16 @@ export interface ApiProps {
   readonly tableAccessRole: iam.IRole;
   readonly documentBucket: IBucket;
   readonly largeMessageBucket: IBucket;
+  readonly conversationDeletionQueue: IQueue;
   readonly apiPublishProject: codebuild.IProject;
   readonly bedrockCustomBotProject: codebuild.IProject;
   readonly usageAnalysis?: UsageAnalysis;
   readonly enableMistral: boolean;
   readonly enableLambdaSnapStart: boolean;
+  // Whether `BotListKeyIndex` is active and backfilled
+  readonly enableBotListKeyIndex: boolean;
+  // Days until archived conversations are removed from the table
+  readonly conversationArchiveTtlDays?: number;
 }
 
 export class Api extends Construct {
@@ -173,6 +179,7 @@ export class Api extends Construct {
     props.usageAnalysis?.resultOutputBucket.grantReadWrite(handlerRole);
     props.usageAnalysis?.ddbBucket.grantRead(handlerRole);
     props.largeMessageBucket.grantReadWrite(handlerRole);
+    props.conversationDeletionQueue.grantSendMessages(handlerRole);
 
     const handler = new PythonFunction(this, "HandlerV2", {
       entry: path.join(__dirname, "../../../backend"),
@@ -196,6 +203,7 @@ export class Api extends Construct {
         TABLE_ACCESS_ROLE_ARN: tableAccessRole.roleArn,
         DOCUMENT_BUCKET: props.documentBucket.bucketName,
         LARGE_MESSAGE_BUCKET: props.largeMessageBucket.bucketName,
+        CONVERSATION_DELETION_QUEUE_URL: props.conversationDeletionQueue.queueUrl,
         PUBLISH_API_CODEBUILD_PROJECT_NAME: props.apiPublishProject.projectName,
         // KNOWLEDGE_BASE_CODEBUILD_PROJECT_NAME:
         //   props.bedrockCustomBotProject.projectName,
@@ -206,6 +214,14 @@ export class Api extends Construct {
         USAGE_ANALYSIS_WORKGROUP: props.usageAnalysis?.workgroupName || "",
         USAGE_ANALYSIS_OUTPUT_LOCATION: usageAnalysisOutputLocation,
         ENABLE_MISTRAL: props.enableMistral.toString(),
+        ENABLE_BOT_LIST_KEY_INDEX: props.enableBotListKeyIndex.toString(),
+        ...(props.conversationArchiveTtlDays !== undefined
+          ? {
+              CONVERSATION_ARCHIVE_TTL_DAYS: String(
+                props.conversationArchiveTtlDays
+              ),
+            }
+          : {}),
         AWS_LAMBDA_EXEC_WRAPPER: "/opt/bootstrap",
         PORT: "8000",
       },
@@ -0,0 +1,74 @@
+import { Construct } from "constructs";
+import * as path from "path";
+import { Duration, Stack } from "aws-cdk-lib";
+import * as iam from "aws-cdk-lib/aws-iam";
+import * as logs from "aws-cdk-lib/aws-logs";
+import * as triggers from "aws-cdk-lib/triggers";
+import { ITable } from "aws-cdk-lib/aws-dynamodb";
+import { DockerImageCode, DockerImageFunction } from "aws-cdk-lib/aws-lambda";
+import { Platform } from "aws-cdk-lib/aws-ecr-assets";
+import { excludeDockerImage } from "../constants/docker";
+
+export interface BotListKeyBackfillProps {
+  readonly database: ITable;
+  readonly tableAccessRole: iam.IRole;
+  readonly bedrockRegion: string;
+  // Updated after the backfill, e.g. the handlers enabling the index
+  readonly executeBefore?: Construct[];
+}
+
+/**
+ * Store the sort key of `BotListKeyIndex` for the bots stored before the index was added.
+ * Executed on deployment after the table is updated. Items which already have the key
+ * are skipped, so that later executions only scan the bots.
+ */
+export class BotListKeyBackfill extends Construct {
+  constructor(scope: Construct, id: string, props: BotListKeyBackfillProps) {
+    super(scope, id);
+
+    const handlerRole = new iam.Role(this, "HandlerRole", {
+      assumedBy: new iam.ServicePrincipal("lambda.amazonaws.com"),
+    });
+    handlerRole.addManagedPolicy(
+      iam.ManagedPolicy.fromAwsManagedPolicyName(
+        "service-role/AWSLambdaBasicExecutionRole"
+      )
+    );
+    handlerRole.addToPolicy(
+      // Assume the table access role to scan bots of all users
+      new iam.PolicyStatement({
+        actions: ["sts:AssumeRole"],
+        resources: [props.tableAccessRole.roleArn],
+      })
+    );
+
+    const handler = new DockerImageFunction(this, "Handler", {
+      code: DockerImageCode.fromImageAsset(
+        path.join(__dirname, "../../../backend"),
+        {
+          platform: Platform.LINUX_AMD64,
+          file: "lambda.Dockerfile",
+          cmd: ["app.bot_list_key_backfill.handler"],
+          exclude: [...excludeDockerImage],
+        }
+      ),
+      timeout: Duration.minutes(15),
+      environment: {
+        ACCOUNT: Stack.of(this).account,
+        REGION: Stack.of(this).region,
+        BEDROCK_REGION: props.bedrockRegion,
+        TABLE_NAME: props.database.tableName,
+        TABLE_ACCESS_ROLE_ARN: props.tableAccessRole.roleArn,
+      },
+      role: handlerRole,
+      logRetention: logs.RetentionDays.THREE_MONTHS,
+    });
+
+    new triggers.Trigger(this, "Trigger", {
+      handler,
+      timeout: Duration.minutes(15),
+      executeAfter: [props.database],
+      executeBefore: props.executeBefore,
+    });
+  }
+}
@@ -0,0 +1,83 @@
+import { Construct } from "constructs";
+import * as path from "path";
+import { Duration, Stack } from "aws-cdk-lib";
+import * as events from "aws-cdk-lib/aws-events";
+import * as targets from "aws-cdk-lib/aws-events-targets";
+import * as iam from "aws-cdk-lib/aws-iam";
+import * as logs from "aws-cdk-lib/aws-logs";
+import { ITable } from "aws-cdk-lib/aws-dynamodb";
+import { IBucket } from "aws-cdk-lib/aws-s3";
+import { DockerImageCode, DockerImageFunction } from "aws-cdk-lib/aws-lambda";
+import { Platform } from "aws-cdk-lib/aws-ecr-assets";
+import { excludeDockerImage } from "../constants/docker";
+
+export interface ConversationArchiveProps {
+  readonly database: ITable;
+  readonly tableAccessRole: iam.IRole;
+  readonly largeMessageBucket: IBucket;
+  readonly bedrockRegion: string;
+  // Days without messages until conversations are archived
+  readonly archiveAfterDays: number;
+  // Days until archived conversations are removed from the table
+  readonly archiveTtlDays?: number;
+}
+
+/**
+ * Archive inactive conversations to the large message bucket once a day.
+ * Only the attributes for listing are kept in the table.
+ */
+export class ConversationArchive extends Construct {
+  constructor(scope: Construct, id: string, props: ConversationArchiveProps) {
+    super(scope, id);
+
+    const handlerRole = new iam.Role(this, "HandlerRole", {
+      assumedBy: new iam.ServicePrincipal("lambda.amazonaws.com"),
+    });
+    handlerRole.addManagedPolicy(
+      iam.ManagedPolicy.fromAwsManagedPolicyName(
+        "service-role/AWSLambdaBasicExecutionRole"
+      )
+    );
+    handlerRole.addToPolicy(
+      // Assume the table access role to scan conversations of all users
+      new iam.PolicyStatement({
+        actions: ["sts:AssumeRole"],
+        resources: [props.tableAccessRole.roleArn],
+      })
+    );
+    props.largeMessageBucket.grantReadWrite(handlerRole);
+
+    const handler = new DockerImageFunction(this, "Handler", {
+      code: DockerImageCode.fromImageAsset(
+        path.join(__dirname, "../../../backend"),
+        {
+          platform: Platform.LINUX_AMD64,
+          file: "lambda.Dockerfile",
+          cmd: ["app.conversation_archiver.handler"],
+          exclude: [...excludeDockerImage],
+        }
+      ),
+      memorySize: 1024,
+      timeout: Duration.minutes(15),
+      environment: {
+        ACCOUNT: Stack.of(this).account,
+        REGION: Stack.of(this).region,
+        BEDROCK_REGION: props.bedrockRegion,
+        TABLE_NAME: props.database.tableName,
+        TABLE_ACCESS_ROLE_ARN: props.tableAccessRole.roleArn,
+        LARGE_MESSAGE_BUCKET: props.largeMessageBucket.bucketName,
+        CONVERSATION_ARCHIVE_AFTER_DAYS: String(props.archiveAfterDays),
+        ...(props.archiveTtlDays !== undefined
+          ? { CONVERSATION_ARCHIVE_TTL_DAYS: String(props.archiveTtlDays) }
+          : {}),
+      },
+      role: handlerRole,
+      logRetention: logs.RetentionDays.THREE_MONTHS,
+    });
+
+    new events.Rule(this, "ScheduleRule", {
+      schedule: events.Schedule.cron({ minute: "30", hour: "3" }),
+      targets: [new targets.LambdaFunction(handler)],
+    });
+  }
+}
@@ -0,0 +1,82 @@
+import { Construct } from "constructs";
+import * as path from "path";
+import { Duration, Stack } from "aws-cdk-lib";
+import * as iam from "aws-cdk-lib/aws-iam";
+import * as logs from "aws-cdk-lib/aws-logs";
+import * as sqs from "aws-cdk-lib/aws-sqs";
+import * as lambdaEventSources from "aws-cdk-lib/aws-lambda-event-sources";
+import { ITable } from "aws-cdk-lib/aws-dynamodb";
+import { IBucket } from "aws-cdk-lib/aws-s3";
+import { DockerImageCode, DockerImageFunction } from "aws-cdk-lib/aws-lambda";
+import { Platform } from "aws-cdk-lib/aws-ecr-assets";
+import { excludeDockerImage } from "../constants/docker";
+
+export interface ConversationDeletionProps {
+  readonly database: ITable;
+  readonly tableAccessRole: iam.IRole;
+  readonly largeMessageBucket: IBucket;
+  readonly bedrockRegion: string;
+}
+
+/**
+ * Delete all conversations of a user in the background.
+ * `DELETE /conversations` queues the deletion, and its progress is stored in the table.
+ */
+export class ConversationDeletion extends Construct {
+  readonly queue: sqs.IQueue;
+  constructor(scope: Construct, id: string, props: ConversationDeletionProps) {
+    super(scope, id);
+
+    const queue = new sqs.Queue(this, "Queue", {
+      // Longer than the timeout of the handler
+      visibilityTimeout: Duration.minutes(30),
+      enforceSSL: true,
+    });
+
+    const handlerRole = new iam.Role(this, "HandlerRole", {
+      assumedBy: new iam.ServicePrincipal("lambda.amazonaws.com"),
+    });
+    handlerRole.addManagedPolicy(
+      iam.ManagedPolicy.fromAwsManagedPolicyName(
+        "service-role/AWSLambdaBasicExecutionRole"
+      )
+    );
+    handlerRole.addToPolicy(
+      // Assume the table access role for row-level access control.
+      new iam.PolicyStatement({
+        actions: ["sts:AssumeRole"],
+        resources: [props.tableAccessRole.roleArn],
+      })
+    );
+    props.largeMessageBucket.grantReadWrite(handlerRole);
+
+    const handler = new DockerImageFunction(this, "Handler", {
+      code: DockerImageCode.fromImageAsset(
+        path.join(__dirname, "../../../backend"),
+        {
+          platform: Platform.LINUX_AMD64,
+          file: "lambda.Dockerfile",
+          cmd: ["app.conversation_deleter.handler"],
+          exclude: [...excludeDockerImage],
+        }
+      ),
+      memorySize: 1024,
+      timeout: Duration.minutes(15),
+      environment: {
+        ACCOUNT: Stack.of(this).account,
+        REGION: Stack.of(this).region,
+        BEDROCK_REGION: props.bedrockRegion,
+        TABLE_NAME: props.database.tableName,
+        TABLE_ACCESS_ROLE_ARN: props.tableAccessRole.roleArn,
+        LARGE_MESSAGE_BUCKET: props.largeMessageBucket.bucketName,
+      },
+      role: handlerRole,
+      logRetention: logs.RetentionDays.THREE_MONTHS,
+    });
+    handler.addEventSource(
+      new lambdaEventSources.SqsEventSource(queue, { batchSize: 1 })
+    );
+
+    this.queue = queue;
+  }
+}
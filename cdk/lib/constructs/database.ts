@@ -2,6 +2,8 @@ import { CfnOutput, RemovalPolicy, Stack } from "aws-cdk-lib";
 import {
   AttributeType,
   BillingMode,
+  GlobalSecondaryIndexProps,
+  ProjectionType,
   Table,
   TableEncryption,
   StreamViewType,
@@ -11,12 +13,75 @@ import { Construct } from "constructs";
 
 export interface DatabaseProps {
   pointInTimeRecovery?: boolean;
+  /**
+   * Number of the `STAGED_INDEXES` to create. All of them by default.
+   * DynamoDB creates one global secondary index per table update, so an existing table
+   * is updated stage by stage. See `docs/migration/TABLE_INDEXES.md`.
+   */
+  indexStage?: number;
 }
 
+/**
+ * Global secondary indexes added to the existing conversation table, in the order of
+ * their introduction.
+ */
+export const STAGED_INDEXES: GlobalSecondaryIndexProps[] = [
+  {
+    // Used to fetch conversations for a user. Sorted by last message time
+    // NOTE: Sparse index, since only conversations have `LastMessageTime`.
+    // GSI instead of LSI, because LSI cannot be added to an existing table.
+    indexName: "LastMessageTimeIndex",
+    partitionKey: { name: "PK", type: AttributeType.STRING },
+    sortKey: { name: "LastMessageTime", type: AttributeType.NUMBER },
+    projectionType: ProjectionType.INCLUDE,
+    // `ArchivePath` is read by the archival of inactive conversations
+    nonKeyAttributes: ["Title", "CreateTime", "Model", "BotId", "ArchivePath"],
+  },
+  {
+    // Used to find the aliases of a public bot in the partitions of all users
+    // NOTE: Sparse index, since only aliases have `OriginalBotId`.
+    indexName: "OriginalBotIdIndex",
+    partitionKey: { name: "OriginalBotId", type: AttributeType.STRING },
+    sortKey: { name: "PK", type: AttributeType.STRING },
+    projectionType: ProjectionType.INCLUDE,
+    // Attributes copied from the original bot. See `alias-sync.ts`.
+    nonKeyAttributes: [
+      "Title",
+      "Description",
+      "SyncStatus",
+      "HasKnowledge",
+      "HasAgent",
+      "ConversationQuickStarters",
+      "ActiveModels",
+      "OriginalBotOwnerUserId",
+    ],
+  },
+  {
+    // Used to list the bots of a user page by page. Sorted by bot used time
+    // NOTE: `BotListKey` is prefixed by the kind of the item, so that owned bots are
+    // queried without aliases. See `compose_bot_list_key` in the backend.
+    indexName: "BotListKeyIndex",
+    partitionKey: { name: "PK", type: AttributeType.STRING },
+    sortKey: { name: "BotListKey", type: AttributeType.STRING },
+    projectionType: ProjectionType.INCLUDE,
+    nonKeyAttributes: [
+      "Title",
+      "Description",
+      "CreateTime",
+      "LastBotUsed",
+      "IsPinned",
+      "PublicBotId",
+      "SyncStatus",
+      "HasBedrockKnowledgeBase",
+    ],
+  },
+];
+
 export class Database extends Construct {
   readonly table: Table;
   readonly tableAccessRole: Role;
   readonly websocketSessionTable: Table;
+  readonly stagedIndexNames: Set<string>;
 
   constructor(scope: Construct, id: string, props?: DatabaseProps) {
     super(scope, id);
@@ -28,9 +93,12 @@ export class Database extends Construct {
       sortKey: { name: "SK", type: AttributeType.STRING },
       billingMode: BillingMode.PAY_PER_REQUEST,
       removalPolicy: RemovalPolicy.DESTROY,
-      stream: StreamViewType.NEW_IMAGE,
+      // Old images let `alias_sync` skip modifications not copied to aliases
+      stream: StreamViewType.NEW_AND_OLD_IMAGES,
       pointInTimeRecovery: props?.pointInTimeRecovery,
       encryption: TableEncryption.AWS_MANAGED,
+      // Set to archived conversations. See `conversation-archive.ts`.
+      timeToLiveAttribute: "ExpireTime",
     });
     table.addGlobalSecondaryIndex({
       // Used to fetch conversation or bot by id
@@ -44,6 +112,20 @@ export class Database extends Construct {
       // TODO: add `nonKeyAttributes` for efficiency
       // For now we project all attributes to keep future compatibility
     });
+    const indexStage = props?.indexStage ?? STAGED_INDEXES.length;
+    if (
+      !Number.isInteger(indexStage) ||
+      indexStage < 0 ||
+      indexStage > STAGED_INDEXES.length
+    ) {
+      throw new Error(
+        `Index stage must be an integer from 0 to ${STAGED_INDEXES.length}: ${indexStage}`
+      );
+    }
+    const stagedIndexes = STAGED_INDEXES.slice(0, indexStage);
+    for (const index of stagedIndexes) {
+      table.addGlobalSecondaryIndex(index);
+    }
     table.addLocalSecondaryIndex({
       // Used to fetch all bots for a user. Sorted by bot used time
       indexName: "LastBotUsedIndex",
@@ -70,6 +152,9 @@ export class Database extends Construct {
     this.table = table;
     this.tableAccessRole = tableAccessRole;
     this.websocketSessionTable = websocketSessionTable;
+    this.stagedIndexNames = new Set(
+      stagedIndexes.map((index) => index.indexName)
+    );
 
     new CfnOutput(this, "ConversationTableName", {
       value: table.tableName,
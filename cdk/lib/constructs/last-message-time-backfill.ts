@@ -0,0 +1,83 @@
+import { Construct } from "constructs";
+import * as path from "path";
+import { Duration, Stack } from "aws-cdk-lib";
+import * as iam from "aws-cdk-lib/aws-iam";
+import * as logs from "aws-cdk-lib/aws-logs";
+import * as triggers from "aws-cdk-lib/triggers";
+import { ITable } from "aws-cdk-lib/aws-dynamodb";
+import { IBucket } from "aws-cdk-lib/aws-s3";
+import { DockerImageCode, DockerImageFunction } from "aws-cdk-lib/aws-lambda";
+import { Platform } from "aws-cdk-lib/aws-ecr-assets";
+import { excludeDockerImage } from "../constants/docker";
+
+export interface LastMessageTimeBackfillProps {
+  readonly database: ITable;
+  readonly tableAccessRole: iam.IRole;
+  readonly largeMessageBucket: IBucket;
+  readonly bedrockRegion: string;
+}
+
+/**
+ * Store the sort key of `LastMessageTimeIndex` for the conversations stored before the
+ * index was added, so that they are listed by activity and archived.
+ * Executed on deployment after the table is updated. Items which already have the key
+ * are skipped, so that later executions only scan the table.
+ */
+export class LastMessageTimeBackfill extends Construct {
+  constructor(
+    scope: Construct,
+    id: string,
+    props: LastMessageTimeBackfillProps
+  ) {
+    super(scope, id);
+
+    const handlerRole = new iam.Role(this, "HandlerRole", {
+      assumedBy: new iam.ServicePrincipal("lambda.amazonaws.com"),
+    });
+    handlerRole.addManagedPolicy(
+      iam.ManagedPolicy.fromAwsManagedPolicyName(
+        "service-role/AWSLambdaBasicExecutionRole"
+      )
+    );
+    handlerRole.addToPolicy(
+      // Assume the table access role to scan conversations of all users
+      new iam.PolicyStatement({
+        actions: ["sts:AssumeRole"],
+        resources: [props.tableAccessRole.roleArn],
+      })
+    );
+    // Read the message maps of large messages
+    props.largeMessageBucket.grantRead(handlerRole);
+
+    const handler = new DockerImageFunction(this, "Handler", {
+      code: DockerImageCode.fromImageAsset(
+        path.join(__dirname, "../../../backend"),
+        {
+          platform: Platform.LINUX_AMD64,
+          file: "lambda.Dockerfile",
+          cmd: ["app.last_message_time_backfill.handler"],
+          exclude: [...excludeDockerImage],
+        }
+      ),
+      // Large message maps are read to find the last messages
+      memorySize: 1024,
+      timeout: Duration.minutes(15),
+      environment: {
+        ACCOUNT: Stack.of(this).account,
+        REGION: Stack.of(this).region,
+        BEDROCK_REGION: props.bedrockRegion,
+        TABLE_NAME: props.database.tableName,
+        TABLE_ACCESS_ROLE_ARN: props.tableAccessRole.roleArn,
+        LARGE_MESSAGE_BUCKET: props.largeMessageBucket.bucketName,
+      },
+      role: handlerRole,
+      logRetention: logs.RetentionDays.THREE_MONTHS,
+    });
+
+    new triggers.Trigger(this, "Trigger", {
+      handler,
+      timeout: Duration.minutes(15),
+      executeAfter: [props.database],
+    });
+  }
+}
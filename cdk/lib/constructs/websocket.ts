@@ -30,6 +30,8 @@ export interface WebSocketProps {
   readonly enableMistral: boolean;
   readonly enableBedrockCrossRegionInference: boolean;
   readonly enableLambdaSnapStart: boolean;
+  // Days until archived conversations are removed from the table
+  readonly conversationArchiveTtlDays?: number;
 }
 
 export class WebSocket extends Construct {
@@ -109,6 +111,13 @@ export class WebSocket extends Construct {
         ENABLE_MISTRAL: props.enableMistral.toString(),
         ENABLE_BEDROCK_CROSS_REGION_INFERENCE:
           props.enableBedrockCrossRegionInference.toString(),
+        ...(props.conversationArchiveTtlDays !== undefined
+          ? {
+              CONVERSATION_ARCHIVE_TTL_DAYS: String(
+                props.conversationArchiveTtlDays
+              ),
+            }
+          : {}),
       },
       role: handlerRole,
       snapStart: props.enableLambdaSnapStart ? SnapStartConf.ON_PUBLISHED_VERSIONS : undefined,
@@ -1,6 +1,6 @@
 import * as cdk from "aws-cdk-lib";
 import { BedrockChatStack } from "../lib/bedrock-chat-stack";
-import { Template } from "aws-cdk-lib/assertions";
+import { Match, Template } from "aws-cdk-lib/assertions";
 import { AwsPrototypingChecks } from "@aws-prototyping-sdk/pdk-nag";
 import {
   getEmbeddingModel,
@@ -199,6 +199,59 @@ describe("Bedrock Chat Stack Test", () => {
       },
     });
   });
+
+  test("staged conversation table indexes", () => {
+    const app = new cdk.App();
+
+    const bedrockRegionResourcesStack = new BedrockRegionResourcesStack(
+      app,
+      "BedrockRegionResourcesStack",
+      {
+        env: {
+          region: "us-east-1",
+        },
+        crossRegionReferences: true,
+      }
+    );
+
+    const stack = new BedrockChatStack(app, "IndexStageStack", {
+      env: {
+        region: "us-west-2",
+      },
+      bedrockRegion: "us-east-1",
+      crossRegionReferences: true,
+      webAclId: "",
+      identityProviders: [],
+      userPoolDomainPrefix: "",
+      publishedApiAllowedIpV4AddressRanges: [""],
+      publishedApiAllowedIpV6AddressRanges: [""],
+      allowedSignUpEmailDomains: [],
+      autoJoinUserGroups: [],
+      enableMistral: false,
+      selfSignUpEnabled: true,
+      enableIpV6: true,
+      documentBucket: bedrockRegionResourcesStack.documentBucket,
+      useStandbyReplicas: false,
+      enableBedrockCrossRegionInference: false,
+      enableLambdaSnapStart: true,
+      conversationTableIndexStage: 1,
+    });
+    const template = Template.fromStack(stack);
+
+    // Only the first staged index is added next to the existing ones
+    template.hasResourceProperties("AWS::DynamoDB::Table", {
+      GlobalSecondaryIndexes: [
+        Match.objectLike({ IndexName: "SKIndex" }),
+        Match.objectLike({ IndexName: "PublicBotIdIndex" }),
+        Match.objectLike({ IndexName: "LastMessageTimeIndex" }),
+      ],
+    });
+    // The handlers querying the other indexes are not created yet.
+    // The trigger is of `LastMessageTimeBackfill`, and the mappings are of the bot removal
+    // stream and the conversation deletion queue.
+    template.resourceCountIs("Custom::Trigger", 1);
+    template.resourceCountIs("AWS::Lambda::EventSourceMapping", 2);
+  });
 });
 
 describe("Bedrock Knowledge Base Stack", () => {
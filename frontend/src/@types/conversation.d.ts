@@ -122,6 +122,17 @@ export type ConversationMeta = {
   botId?: string;
 };
 
+export type ConversationDeletion = {
+  status: 'QUEUED' | 'RUNNING' | 'SUCCEEDED' | 'FAILED';
+  progress: {
+    deletedItems: number;
+    deletedObjects: number;
+    failedItems: number;
+    failedObjects: number;
+  };
+  updateTime: number;
+};
+
 export type MessageMap = {
   [messageId: string]: MessageContent & {
     children: string[];
@@ -87,6 +87,8 @@ export const PostStreamingStatus = {
   AGENT_RELATED_DOCUMENT: 'AGENT_RELATED_DOCUMENT',
   ERROR: 'ERROR',
   END: 'END',
+  UPLOAD: 'UPLOAD',
+  UPLOAD_URL: 'UPLOAD_URL',
 } as const;
 
 export const GUARDRAILS_FILTERS_THRESHOLD = {
@@ -1,6 +1,8 @@
 import { produce } from 'immer';
 import useConversationApi from './useConversationApi';
 
+const DELETION_POLLING_INTERVAL_MS = 2000;
+
 const useConversation = () => {
   const conversationApi = useConversationApi();
 
@@ -34,7 +36,14 @@ const useConversation = () => {
     },
     clearConversations: () => {
       return mutate(async () => {
-        await conversationApi.clearConversations();
+        // Conversations are deleted in the background. Wait until it finishes.
+        let { data: deletion } = await conversationApi.clearConversations();
+        while (deletion.status === 'QUEUED' || deletion.status === 'RUNNING') {
+          await new Promise((resolve) =>
+            setTimeout(resolve, DELETION_POLLING_INTERVAL_MS)
+          );
+          deletion = await conversationApi.getConversationDeletion();
+        }
         return [];
       });
     },
@@ -1,6 +1,7 @@
 import { MutatorCallback, useSWRConfig } from 'swr';
 import {
   Conversation,
+  ConversationDeletion,
   ConversationMeta,
   PostMessageRequest,
   PostMessageResponse,
@@ -51,7 +52,13 @@ const useConversationApi = () => {
       return http.delete(`conversation/${conversationId}`);
     },
     clearConversations: () => {
-      return http.delete('conversations');
+      return http.delete<ConversationDeletion>('conversations');
+    },
+    getConversationDeletion: async () => {
+      const res = await http.getOnce<ConversationDeletion>(
+        'conversations/deletion'
+      );
+      return res.data;
     },
     updateTitle,
     updateTitleWithGeneratedTitle: async (conversationId: string) => {
@@ -7,6 +7,8 @@ import { PostStreamingStatus } from '../constants';
 
 const WS_ENDPOINT: string = import.meta.env.VITE_APP_WS_ENDPOINT;
 const CHUNK_SIZE = 32 * 1024; //32KB
+// Payloads larger than this are uploaded to S3 instead of being sent in chunks
+const UPLOAD_THRESHOLD = 4 * CHUNK_SIZE;
 
 const usePostMessageStreaming = create<{
   post: (params: {
@@ -25,6 +27,7 @@ const usePostMessageStreaming = create<{
         ...input,
         token,
       });
+      const shouldUpload = payloadString.length > UPLOAD_THRESHOLD;
 
       // chunking
       const chunkedPayloads: string[] = [];
@@ -61,6 +64,14 @@ const usePostMessageStreaming = create<{
             ) {
               return;
             } else if (message.data === 'Session started.') {
+              if (shouldUpload) {
+                ws.send(
+                  JSON.stringify({
+                    step: PostStreamingStatus.UPLOAD,
+                  })
+                );
+                return;
+              }
               chunkedPayloads.forEach((chunk, index) => {
                 ws.send(
                   JSON.stringify({
@@ -87,6 +98,29 @@ const usePostMessageStreaming = create<{
 
             if (data.status) {
               switch (data.status) {
+                case PostStreamingStatus.UPLOAD_URL:
+                  fetch(data.url, {
+                    method: 'PUT',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify(input),
+                  })
+                    .then((res) => {
+                      if (!res.ok) {
+                        throw new Error(res.statusText);
+                      }
+                      ws.send(
+                        JSON.stringify({
+                          step: PostStreamingStatus.END,
+                          objectKey: data.object_key,
+                        })
+                      );
+                    })
+                    .catch((e) => {
+                      ws.close();
+                      console.error(e);
+                      reject(i18next.t('error.predict.general'));
+                    });
+                  break;
                 case PostStreamingStatus.AGENT_THINKING:
                   if (completion.length > 0) {
                     dispatch('');